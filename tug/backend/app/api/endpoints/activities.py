@@ -7,7 +7,6 @@ import logging
 
 from ...models.user import User
 from ...models.value import Value
-from ...models.activity import Activity
 from ...schemas.activity import (
     ActivityCreate, 
     ActivityUpdate, 
@@ -194,35 +193,16 @@ async def update_activity(
         update_data = activity_update.model_dump(exclude_unset=True)
         logger.info(f"Update data received: {update_data}")
         
-        # First, try to convert the string ID to ObjectId
-        try:
-            object_id = ObjectId(activity_id)
-        except:
+        # First, check the string ID is a valid ObjectId
+        if not ObjectId.is_valid(activity_id):
             logger.error(f"Invalid ObjectId format: {activity_id}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid activity ID format"
             )
-            
-        # Verify the activity exists and belongs to this user
-        activity = await Activity.find_one(
-            Activity.id == object_id,
-            Activity.user_id == str(current_user.id)
-        )
-        
-        if not activity:
-            logger.warning(f"Activity not found: {activity_id} for user {current_user.id}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Activity not found"
-            )
-        
-        # Update fields from request data
-        for field, value in update_data.items():
-            setattr(activity, field, value)
         
-        # Save the updated activity
-        await activity.save()
+        # Update through the service so rollups and derived-data caches follow
+        activity = await ActivityService.update_activity(current_user, activity_id, activity_update)
         logger.info(f"Activity updated successfully: {activity_id}")
         
         # Convert the activity to a dictionary and serialize MongoDB types
@@ -246,10 +226,7 @@ async def delete_activity(
     activity_id: str,
     current_user: User = Depends(get_current_user)
 ):
-    try:
-        # Convert string ID to ObjectId
-        object_id = ObjectId(activity_id)
-    except:
+    if not ObjectId.is_valid(activity_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid activity ID format"
@@ -257,23 +234,12 @@ async def delete_activity(
 
     logger.info(f"Deleting activity {activity_id} for user: {current_user.id}")
     
-    # Find the activity with proper ObjectId conversion
-    activity = await Activity.find_one(
-        Activity.id == object_id,
-        Activity.user_id == str(current_user.id)
-    )
-    
-    if not activity:
-        logger.warning(f"Activity {activity_id} not found for user {current_user.id}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Activity not found"
-        )
-    
     try:
-        await activity.delete()
+        await ActivityService.delete_activity(current_user, activity_id)
         logger.info(f"Activity {activity_id} deleted successfully")
         return None
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting activity: {e}", exc_info=True)
         raise HTTPException(
@@ -8,6 +8,7 @@ from ...models.user import User
 from ...models.analytics import AnalyticsType, UserAnalytics, ValueInsights
 from ...services.analytics_service import AnalyticsService
 from ...core.auth import get_current_user
+from ...core.errors import ServiceOverloadedException
 from ...utils.json_utils import MongoJSONEncoder
 
 router = APIRouter()
@@ -140,11 +141,12 @@ async def get_activity_trends(
     try:
         logger.info(f"Generating activity trends for user: {current_user.id}")
         
-        # Get full analytics and extract trends
+        # Compute only the sections this endpoint returns
         analytics = await AnalyticsService.generate_user_analytics(
             user=current_user,
             analytics_type=analytics_type,
-            days_back=days_back
+            days_back=days_back,
+            sections=("trends", "patterns", "overview")
         )
         
         trends_data = {
@@ -191,11 +193,12 @@ async def get_streak_analytics(
     try:
         logger.info(f"Generating streak analytics for user: {current_user.id}")
         
-        # Get full analytics and extract streak data
+        # Compute only the streak section
         analytics = await AnalyticsService.generate_user_analytics(
             user=current_user,
             analytics_type=AnalyticsType.MONTHLY,
-            days_back=90
+            days_back=90,
+            sections=("streaks",)
         )
         
         streak_data = analytics.get("streaks", {})
@@ -236,11 +239,12 @@ async def get_predictions(
     try:
         logger.info(f"Generating predictions for user: {current_user.id}")
         
-        # Get full analytics and extract predictions
+        # Compute only the predictions section
         analytics = await AnalyticsService.generate_user_analytics(
             user=current_user,
             analytics_type=AnalyticsType.WEEKLY,
-            days_back=60
+            days_back=60,
+            sections=("predictions",)
         )
         
         predictions_data = analytics.get("predictions", {})
@@ -282,11 +286,12 @@ async def get_value_breakdown(
     try:
         logger.info(f"Generating value breakdown for user: {current_user.id}")
         
-        # Get full analytics and extract value breakdown
+        # Compute only the value breakdown section
         analytics = await AnalyticsService.generate_user_analytics(
             user=current_user,
             analytics_type=AnalyticsType.MONTHLY,
-            days_back=days_back
+            days_back=days_back,
+            sections=("value_breakdown",)
         )
         
         breakdown_data = analytics.get("value_breakdown", [])
@@ -472,7 +477,7 @@ async def export_analytics_pdf(
             }
         }
         
-    except HTTPException:
+    except (HTTPException, ServiceOverloadedException):
         raise
     except Exception as e:
         logger.error(f"Error exporting PDF analytics data: {e}", exc_info=True)
@@ -605,7 +610,7 @@ async def export_analytics_data(
                 }
             }
         
-    except HTTPException:
+    except (HTTPException, ServiceOverloadedException):
         raise
     except Exception as e:
         logger.error(f"Error exporting analytics data: {e}", exc_info=True)
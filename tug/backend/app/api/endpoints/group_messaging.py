@@ -14,6 +14,7 @@ from ...schemas.group_message import (
 )
 from ...services.group_messaging_service import group_messaging_service
 from ...services.websocket_manager import websocket_manager, WebSocketConnection
+from ...services.message_delivery_service import message_delivery_worker
 from ...services.media_service import media_service
 from ...core.auth import get_current_user, get_optional_user
 from ...utils.json_utils import MongoJSONEncoder
@@ -207,6 +208,29 @@ async def mark_messages_read(
             detail="Failed to mark messages as read"
         )
 
+@router.get("/{group_id}/messages/unread-count")
+async def get_unread_count(
+    group_id: str = Path(..., description="Group ID"),
+    thread_id: Optional[str] = Query(None, description="Thread ID, omitted for the main timeline"),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the number of unread messages in the group or one of its threads"""
+    try:
+        unread = await group_messaging_service.get_unread_count(current_user, group_id, thread_id)
+        
+        unread_dict = unread.dict()
+        unread_dict = MongoJSONEncoder.encode_mongo_data(unread_dict)
+        
+        return unread_dict
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_unread_count endpoint: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get unread count"
+        )
+
 @router.post("/{group_id}/search")
 async def search_messages(
     group_id: str = Path(..., description="Group ID"),
@@ -370,6 +394,7 @@ async def get_connection_stats(
     try:
         # In a real implementation, you'd check admin permissions here
         stats = websocket_manager.get_connection_stats()
+        stats["offline_delivery"] = await message_delivery_worker.get_stats()
         return stats
     except Exception as e:
         logger.error(f"Error getting connection stats: {e}", exc_info=True)
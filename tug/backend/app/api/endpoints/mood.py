@@ -79,44 +79,7 @@ async def update_mood_entry(
     current_user: User = Depends(get_current_user)
 ):
     """Update a mood entry"""
-    try:
-        from bson import ObjectId
-        from ...models.mood import MoodEntry
-        
-        mood_entry = await MoodEntry.find_one(
-            MoodEntry.id == ObjectId(entry_id),
-            MoodEntry.user_id == str(current_user.id)
-        )
-        
-        if not mood_entry:
-            raise HTTPException(status_code=404, detail="Mood entry not found")
-        
-        # Update fields
-        update_data = mood_data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(mood_entry, field, value)
-        
-        # Update positivity score if mood type changed
-        if mood_data.mood_type:
-            mood_entry.positivity_score = MoodEntry.get_positivity_score(mood_data.mood_type)
-        
-        mood_entry.update_timestamp()
-        await mood_entry.save()
-        
-        return MoodEntryResponse(
-            id=str(mood_entry.id),
-            user_id=mood_entry.user_id,
-            mood_type=mood_entry.mood_type,
-            positivity_score=mood_entry.positivity_score,
-            notes=mood_entry.notes,
-            activity_id=mood_entry.activity_id,
-            indulgence_id=mood_entry.indulgence_id,
-            recorded_at=mood_entry.recorded_at,
-            created_at=mood_entry.created_at,
-            updated_at=mood_entry.updated_at
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to update mood entry")
+    return await MoodService.update_mood_entry(current_user, entry_id, mood_data)
 
 @router.delete("/entries/{entry_id}")
 async def delete_mood_entry(
@@ -124,22 +87,8 @@ async def delete_mood_entry(
     current_user: User = Depends(get_current_user)
 ):
     """Delete a mood entry"""
-    try:
-        from bson import ObjectId
-        from ...models.mood import MoodEntry
-        
-        mood_entry = await MoodEntry.find_one(
-            MoodEntry.id == ObjectId(entry_id),
-            MoodEntry.user_id == str(current_user.id)
-        )
-        
-        if not mood_entry:
-            raise HTTPException(status_code=404, detail="Mood entry not found")
-        
-        await mood_entry.delete()
-        return {"message": "Mood entry deleted successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to delete mood entry")
+    await MoodService.delete_mood_entry(current_user, entry_id)
+    return {"message": "Mood entry deleted successfully"}
 
 @router.get("/chart-data", response_model=MoodChartResponse)
 async def get_mood_chart_data(
@@ -202,12 +202,13 @@ async def delete_post(
 async def get_social_feed(
     limit: int = Query(20, ge=1, le=50, description="Number of posts to return"),
     skip: int = Query(0, ge=0, description="Number of posts to skip"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; replaces skip"),
     current_user: User = Depends(get_current_user)
 ):
     """Get social feed for current user"""
     try:
-        posts = await SocialService.get_social_feed(current_user, limit, skip)
-        return {"posts": posts}
+        posts, next_cursor = await SocialService.get_social_feed_page(current_user, limit, skip, cursor)
+        return {"posts": posts, "next_cursor": next_cursor}
     except HTTPException:
         raise
     except Exception as e:
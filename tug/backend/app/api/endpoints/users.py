@@ -19,10 +19,13 @@ from ...models.post_comment import PostComment
 from ...models.friendship import Friendship
 from ...models.notification import Notification, NotificationBatch
 from ...models.achievement import Achievement
+from ...models.analytics import DailyActivityRollup, AnalyticsRollupState
 from ...schemas.user import UserCreate, UserUpdate, UserResponse
 from ...utils.json_utils import MongoJSONEncoder
 from ...core.auth import get_current_user, authenticate_request
 from ...utils.validation import InputValidator
+from ...services.timeline_service import TimelineService
+from ...services.friend_graph import friend_graph
 
 router = APIRouter()
 security = HTTPBearer()
@@ -386,6 +389,10 @@ async def delete_user_profile(current_user: User = Depends(get_current_user)):
         activities_result = await Activity.find(Activity.user_id == user_id_str).delete()
         logger.info(f"Deleted {activities_result.deleted_count} activities for user {user_id_str}")
         
+        # Delete analytics rollups derived from those activities
+        await DailyActivityRollup.find(DailyActivityRollup.user_id == user_id_str).delete()
+        await AnalyticsRollupState.find(AnalyticsRollupState.user_id == user_id_str).delete()
+        
         # Delete all user vices
         vices_result = await Vice.find(Vice.user_id == user_id_str).delete()
         logger.info(f"Deleted {vices_result.deleted_count} vices for user {user_id_str}")
@@ -398,11 +405,15 @@ async def delete_user_profile(current_user: User = Depends(get_current_user)):
         posts_result = await SocialPost.find(SocialPost.user_id == user_id_str).delete()
         logger.info(f"Deleted {posts_result.deleted_count} social posts for user {user_id_str}")
         
+        # Delete the user's feed and their posts in other users' feeds
+        await TimelineService.remove_user(user_id_str)
+        
         # Delete all comments by the user
         comments_result = await PostComment.find(PostComment.user_id == user_id_str).delete()
         logger.info(f"Deleted {comments_result.deleted_count} comments for user {user_id_str}")
         
         # Delete all friendships involving the user (both as requester and addressee)
+        await friend_graph.remove_user(user_id_str)
         friendships_requester_result = await Friendship.find(Friendship.requester_id == user_id_str).delete()
         friendships_addressee_result = await Friendship.find(Friendship.addressee_id == user_id_str).delete()
         total_friendships = friendships_requester_result.deleted_count + friendships_addressee_result.deleted_count
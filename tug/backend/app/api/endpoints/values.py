@@ -10,6 +10,8 @@ from ...models.activity import Activity
 from ...models.user import User
 from ...schemas.value import ValueCreate, ValueUpdate
 from ...services.value_service import ValueService
+from ...services.data_version_service import DataVersionService
+from ...services.analytics_rollup_service import AnalyticsRollupService
 from ...core.auth import get_current_user
 from ...utils.json_utils import MongoJSONEncoder
 
@@ -175,9 +177,12 @@ async def delete_value(
             "value_id": value_id,
             "user_id": str(current_user.id)
         }).delete()
+        # The bulk delete skips the per-activity rollup updates; rebuild them on next read
+        await AnalyticsRollupService.invalidate(str(current_user.id))
         
         # Delete the value itself
         await value.delete()
+        await DataVersionService.bump(current_user)
         
         logger.info(f"Value {value_id} deleted successfully")
         return None
@@ -5,6 +5,9 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from ..models.user import User
 from .config import settings
+from .principal_cache import principal_cache
+from .last_seen import last_seen_tracker
+import asyncio
 import os
 import logging
 from datetime import datetime
@@ -15,6 +18,9 @@ logger = logging.getLogger(__name__)
 # Initialize security
 security = HTTPBearer(auto_error=False)
 
+# Token verifications in progress, so concurrent requests with one token verify it once
+_inflight_verifications = {}
+
 # Initialize Firebase Admin SDK - only once (skip in mock mode)
 if getattr(settings, 'MOCK_AUTH', False):
     logger.info("Running in MOCK_AUTH mode - Firebase authentication disabled")
@@ -43,9 +49,29 @@ async def verify_firebase_token(token: str) -> dict:
             'email_verified': True,
         }
     
+    cached = principal_cache.get_claims(token)
+    if cached is not None:
+        return cached
+    
+    # Concurrent requests with the same uncached token share one verification
+    inflight = _inflight_verifications.get(token)
+    if inflight is None:
+        inflight = asyncio.ensure_future(_verify_and_cache(token))
+        _inflight_verifications[token] = inflight
+        inflight.add_done_callback(lambda _: _inflight_verifications.pop(token, None))
+    return await asyncio.shield(inflight)
+
+async def _verify_and_cache(token: str) -> dict:
+    decoded_token = await _verify_token_off_loop(token)
+    principal_cache.put_claims(token, decoded_token)
+    return decoded_token
+
+async def _verify_token_off_loop(token: str) -> dict:
+    """Verify the token signature on a worker thread; RSA verification would block the loop"""
     try:
         # Add generous clock skew tolerance (10 seconds)
-        decoded_token = auth.verify_id_token(
+        decoded_token = await asyncio.to_thread(
+            auth.verify_id_token,
             token, 
             clock_skew_seconds=10  # Increased tolerance for clock skew
         )
@@ -88,7 +114,8 @@ async def verify_firebase_token(token: str) -> dict:
                 
                 # Attempt with a more permissive approach
                 logger.info("Attempting token verification with very high tolerance...")
-                decoded_token = auth.verify_id_token(
+                decoded_token = await asyncio.to_thread(
+                    auth.verify_id_token,
                     token, 
                     clock_skew_seconds=30  # Use an even higher tolerance as last resort
                 )
@@ -111,8 +138,13 @@ async def get_current_user(
     token_data = await verify_firebase_token(credentials.credentials)
     firebase_uid = token_data["uid"]
     
-    # Try to find the user
-    user = await User.find_one(User.firebase_uid == firebase_uid)
+    # Try the principal cache, then the database
+    user = principal_cache.get_user(firebase_uid)
+    if user is None:
+        generation = principal_cache.generation
+        user = await User.find_one(User.firebase_uid == firebase_uid)
+        if user is not None and user.username:
+            principal_cache.put_user(user, generation)
     
     # If user doesn't exist, create a new one
     if not user:
@@ -129,7 +161,7 @@ async def get_current_user(
                 )
             else:
                 # Get user info from Firebase
-                firebase_user = auth.get_user(firebase_uid)
+                firebase_user = await asyncio.to_thread(auth.get_user, firebase_uid)
                 
                 # Create user in our database
                 user = User(
@@ -148,14 +180,46 @@ async def get_current_user(
                 detail=f"Failed to create user: {str(e)}",
             )
     else:
-        # Update last login time and ensure username exists
-        user.last_login = datetime.utcnow()
+        # Ensure username exists and record the login. last_login is written in bulk by
+        # the tracker, never through this request's copy of the user.
         if not user.username:
             await user.ensure_username()
-        await user.save()
+        last_seen_tracker.touch(user)
     
     return user
 
+def prefetch_certificates() -> None:
+    """Fetch Firebase's token signing certificates through the verifier's HTTP cache.
+
+    The verifier caches the certificates for as long as Google's Cache-Control allows and
+    fetches them again on the first verification after that. Calling this periodically
+    from a background job moves that fetch off the request path. It reaches into
+    firebase_admin's token verifier, so failures are logged and otherwise ignored.
+    """
+    if getattr(settings, 'MOCK_AUTH', False):
+        return
+    try:
+        from firebase_admin import _token_gen
+        verifier = auth._get_client(firebase_admin.get_app())._token_verifier
+        verifier.request(_token_gen.ID_TOKEN_CERT_URI, method='GET')
+    except Exception as e:
+        logger.warning(f"Failed to prefetch token signing certificates: {e}")
+
+def register_auth_jobs(scheduler) -> None:
+    """Keep the token signing certificates fresh on every replica"""
+    from .scheduler import Every, Job
+
+    async def refresh_certificates():
+        await asyncio.to_thread(prefetch_certificates)
+
+    if not getattr(settings, 'MOCK_AUTH', False):
+        scheduler.register(Job(
+            "auth.certificate_prefetch",
+            refresh_certificates,
+            Every(settings.AUTH_CERT_PREFETCH_SECONDS),
+            distributed=False
+        ))
+
 async def get_optional_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
@@ -0,0 +1,456 @@
+# app/core/cache.py
+"""
+Tiered cache shared by the services.
+
+Reads go to an in-process LRU tier first and then to a shared tier (MongoDB TTL
+collection or a Redis-protocol server) that every worker and replica sees. Values are
+stored as JSON so both tiers return the same types. Concurrent misses for one key are
+coalesced so the value is computed once per process.
+"""
+
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple, Union
+
+from bson import ObjectId
+
+from .config import settings
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+TTL = Union[float, Callable[[Any], float]]
+
+
+def _json_default(obj: Any) -> Any:
+    """Encode the non-JSON types that show up in analytics and ML results"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    # numpy scalars and arrays, without importing numpy here
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not cacheable")
+
+
+def encode_value(value: Any) -> str:
+    return json.dumps(value, default=_json_default)
+
+
+def decode_value(payload: str) -> Any:
+    return json.loads(payload)
+
+
+class MemoryLRUTier:
+    """Bounded in-process tier with O(1) get, set and LRU eviction"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (payload, expires_at)
+        self._tags: Dict[str, Set[str]] = {}
+        self._key_tags: Dict[str, Tuple[str, ...]] = {}
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, payload: str, ttl_seconds: float, tags: Iterable[str] = ()) -> int:
+        """Store an entry and return how many entries were evicted to make room"""
+        self.delete(key)
+        self._entries[key] = (payload, time.monotonic() + ttl_seconds)
+        tags = tuple(tags)
+        if tags:
+            self._key_tags[key] = tags
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self.delete(oldest_key)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def delete(self, key: str) -> bool:
+        if self._entries.pop(key, None) is None:
+            return False
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    def delete_tag(self, tag: str) -> int:
+        keys = list(self._tags.get(tag, ()))
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self.delete(key)
+        return len(expired)
+
+
+class SharedCacheBackend(ABC):
+    """Cache tier shared across workers and replicas"""
+
+    name = "shared"
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return (payload, remaining ttl seconds) or None"""
+
+    @abstractmethod
+    async def set(self, key: str, payload: str, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def delete_tag(self, tag: str) -> int:
+        ...
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class MongoCacheBackend(SharedCacheBackend):
+    """Shared tier in a MongoDB collection with a TTL index on expires_at"""
+
+    name = "mongo"
+
+    def __init__(self, namespace: str, collection_name: str = "cache_entries"):
+        self.namespace = namespace
+        self.collection_name = collection_name
+        self._indexes_ready = False
+
+    async def _collection(self):
+        from .database import get_database
+
+        collection = get_database()[self.collection_name]
+        if not self._indexes_ready:
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            await collection.create_index([("namespace", 1), ("tags", 1)])
+            self._indexes_ready = True
+        return collection
+
+    def _id(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        collection = await self._collection()
+        doc = await collection.find_one({"_id": self._id(key)})
+        if doc is None:
+            return None
+        # The TTL monitor only runs once a minute, so check expiry here too
+        expires_at = doc["expires_at"].replace(tzinfo=timezone.utc)
+        remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        if remaining <= 0:
+            return None
+        return doc["payload"], remaining
+
+    async def set(self, key: str, payload: str, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        collection = await self._collection()
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+        await collection.replace_one(
+            {"_id": self._id(key)},
+            {
+                "namespace": self.namespace,
+                "payload": payload,
+                "tags": list(tags),
+                "expires_at": expires_at
+            },
+            upsert=True
+        )
+
+    async def delete(self, key: str) -> None:
+        collection = await self._collection()
+        await collection.delete_one({"_id": self._id(key)})
+
+    async def delete_tag(self, tag: str) -> int:
+        collection = await self._collection()
+        result = await collection.delete_many({"namespace": self.namespace, "tags": tag})
+        return result.deleted_count
+
+    async def get_stats(self) -> Dict[str, Any]:
+        collection = await self._collection()
+        return {
+            "backend": self.name,
+            "entries": await collection.count_documents({"namespace": self.namespace})
+        }
+
+
+class RedisCacheBackend(SharedCacheBackend):
+    """Shared tier on a Redis-protocol server (Redis 7+ or compatible).
+
+    Needs the ``redis`` package, which is only imported when this backend is configured.
+    """
+
+    name = "redis"
+
+    def __init__(self, namespace: str, url: str):
+        import redis.asyncio as redis_asyncio
+
+        self.namespace = namespace
+        self._client = redis_asyncio.from_url(url)
+
+    def _key(self, key: str) -> str:
+        return f"tug:cache:{self.namespace}:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"tug:cache:{self.namespace}:tag:{tag}"
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        redis_key = self._key(key)
+        async with self._client.pipeline(transaction=False) as pipe:
+            payload, ttl_ms = await pipe.get(redis_key).pttl(redis_key).execute()
+        if payload is None or ttl_ms <= 0:
+            return None
+        return payload.decode(), ttl_ms / 1000
+
+    async def set(self, key: str, payload: str, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        redis_key = self._key(key)
+        ttl_ms = max(int(ttl_seconds * 1000), 1)
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.set(redis_key, payload, px=ttl_ms)
+            for tag in tags:
+                tag_key = self._tag_key(tag)
+                pipe.sadd(tag_key, redis_key)
+                # Tag sets live as long as their longest entry
+                pipe.pexpire(tag_key, ttl_ms, gt=True)
+                pipe.pexpire(tag_key, ttl_ms, nx=True)
+            await pipe.execute()
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self._key(key))
+
+    async def delete_tag(self, tag: str) -> int:
+        tag_key = self._tag_key(tag)
+        keys = await self._client.smembers(tag_key)
+        if keys:
+            await self._client.delete(*keys)
+        await self._client.delete(tag_key)
+        return len(keys)
+
+
+class TieredCache:
+    """Memory LRU tier in front of an optional shared tier, with single-flight loading.
+
+    Memory entries live at most ``memory_ttl_seconds`` so that invalidations made by
+    other workers (which only reach the shared tier) are picked up within that window.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_memory_entries: int = 1000,
+        shared: Optional[SharedCacheBackend] = None,
+        memory_ttl_seconds: float = 300
+    ):
+        self.namespace = namespace
+        self.memory = MemoryLRUTier(max_memory_entries)
+        self.memory_ttl_seconds = memory_ttl_seconds
+        self.shared = shared
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "shared_errors": 0,
+        }
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._record("memory", "hit")
+            return decode_value(entry[0])
+
+        if self.shared is not None:
+            try:
+                entry = await self.shared.get(key)
+            except Exception as e:
+                self._record_shared_error("get", e)
+                entry = None
+            if entry is not None:
+                payload, remaining = entry
+                self._record("shared", "hit")
+                self._store_in_memory(key, payload, remaining)
+                return decode_value(payload)
+
+        self._record("all", "miss")
+        return None
+
+    async def set(self, key: str, value: Any, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        await self._set_payload(key, encode_value(value), ttl_seconds, tags)
+
+    async def _set_payload(self, key: str, payload: str, ttl_seconds: float, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        self._store_in_memory(key, payload, ttl_seconds, tags)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, payload, ttl_seconds, tags)
+            except Exception as e:
+                self._record_shared_error("set", e)
+
+    async def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.shared is not None:
+            try:
+                await self.shared.delete(key)
+            except Exception as e:
+                self._record_shared_error("delete", e)
+
+    async def delete_tag(self, tag: str) -> int:
+        """Drop every entry stored with ``tag`` from both tiers"""
+        removed = self.memory.delete_tag(tag)
+        if self.shared is not None:
+            try:
+                removed = max(removed, await self.shared.delete_tag(tag))
+            except Exception as e:
+                self._record_shared_error("delete_tag", e)
+        return removed
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_seconds: TTL,
+        tags: Iterable[str] = ()
+    ) -> Any:
+        """Return the cached value or compute it once, however many callers miss together.
+
+        ``ttl_seconds`` may be a callable that derives the TTL from the computed value.
+        The value is returned as stored, i.e. JSON round-tripped.
+        """
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["coalesced"] += 1
+            self._record_metric("cache_coalesced_total", {"cache": self.namespace})
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+            try:
+                payload = encode_value(value)
+            except TypeError as e:
+                # Still serve the computed value, just without caching it
+                logger.warning(f"Value for {self.namespace} cache is not cacheable: {e}")
+                future.set_result(value)
+                return value
+
+            ttl = ttl_seconds(value) if callable(ttl_seconds) else ttl_seconds
+            await self._set_payload(key, payload, ttl, tags)
+            result = decode_value(payload)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved in case there are none
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def purge_expired(self) -> int:
+        """Drop expired memory entries (the shared tier expires entries on its own)"""
+        return self.memory.purge_expired()
+
+    async def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["memory_hits"] + self._stats["shared_hits"] + self._stats["misses"]
+        hits = self._stats["memory_hits"] + self._stats["shared_hits"]
+        stats = {
+            "namespace": self.namespace,
+            **self._stats,
+            "hit_rate": round(hits / lookups * 100, 1) if lookups else 0.0,
+            "in_flight": len(self._inflight),
+            "memory_cache": {
+                "entries": len(self.memory),
+                "max_size": self.memory.max_entries,
+                "utilization": round(len(self.memory) / self.memory.max_entries * 100, 1),
+                "evictions": self.memory.evictions,
+            },
+        }
+        if self.shared is not None:
+            try:
+                stats["shared_cache"] = await self.shared.get_stats()
+            except Exception as e:
+                stats["shared_cache"] = {"backend": self.shared.name, "error": str(e)}
+        return stats
+
+    def _store_in_memory(self, key: str, payload: str, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        ttl_seconds = min(ttl_seconds, self.memory_ttl_seconds) if self.shared is not None else ttl_seconds
+        evicted = self.memory.set(key, payload, ttl_seconds, tags)
+        if evicted:
+            self._record_metric("cache_evictions_total", {"cache": self.namespace}, evicted)
+
+    def _record(self, tier: str, result: str) -> None:
+        if result == "hit":
+            self._stats[f"{tier}_hits"] += 1
+        else:
+            self._stats["misses"] += 1
+        self._record_metric("cache_requests_total", {"cache": self.namespace, "tier": tier, "result": result})
+
+    def _record_shared_error(self, operation: str, error: Exception) -> None:
+        # The shared tier is an optimization: fall back to the memory tier and move on
+        self._stats["shared_errors"] += 1
+        logger.warning(f"Shared cache {operation} failed for {self.namespace}: {error}")
+
+    def _record_metric(self, name: str, labels: Dict[str, str], value: float = 1.0) -> None:
+        # Imported lazily: the monitoring package pulls in the whole app
+        from ..monitoring.metrics import metrics_collector
+        metrics_collector.increment_counter(name, value, labels)
+
+
+def build_cache(namespace: str, max_memory_entries: Optional[int] = None) -> TieredCache:
+    """Create a TieredCache with the shared backend chosen by CACHE_SHARED_BACKEND"""
+    backend_name = settings.CACHE_SHARED_BACKEND.lower()
+    if backend_name == "mongo":
+        shared = MongoCacheBackend(namespace)
+    elif backend_name == "redis":
+        shared = RedisCacheBackend(namespace, settings.CACHE_REDIS_URL)
+    else:
+        shared = None
+
+    return TieredCache(
+        namespace,
+        max_memory_entries=max_memory_entries or settings.CACHE_MEMORY_MAX_ENTRIES,
+        shared=shared,
+        memory_ttl_seconds=settings.CACHE_MEMORY_TTL_SECONDS
+    )
@@ -0,0 +1,131 @@
+# app/core/compute_executor.py
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .config import settings
+from .errors import ServiceOverloadedException
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: Dict[str, Any]) -> tuple:
+    """Run fn in the worker and report when it actually started (for queue-wait metrics)"""
+    started_at = time.time()
+    return started_at, fn(*args, **kwargs)
+
+
+class ComputeExecutor:
+    """Shared executor for CPU-bound work (model fitting, charts, PDF rendering).
+
+    Work runs in a process pool so it never blocks the event loop. Admission is bounded:
+    at most ``pool_size`` tasks run and ``queue_size`` more wait; beyond that ``run()``
+    raises ServiceOverloadedException, which the API returns as 503 with Retry-After.
+    A pool size of 0 runs tasks on the default thread pool instead (tests, local dev).
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        retry_after_seconds: Optional[int] = None
+    ):
+        self.pool_size = settings.COMPUTE_POOL_SIZE if pool_size is None else pool_size
+        self.queue_size = settings.COMPUTE_QUEUE_SIZE if queue_size is None else queue_size
+        self.retry_after_seconds = (
+            settings.COMPUTE_RETRY_AFTER_SECONDS if retry_after_seconds is None else retry_after_seconds
+        )
+        self._pool: Optional[Executor] = None
+        self._pending = 0
+        self._pending_by_type: Dict[str, int] = {}
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of running plus queued tasks"""
+        return max(self.pool_size, 1) + self.queue_size
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_pool(self) -> Optional[Executor]:
+        if self._pool is None and self.pool_size > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.pool_size)
+            logger.info(f"Started compute pool with {self.pool_size} processes")
+        return self._pool
+
+    async def run(self, task_type: str, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run a picklable, module-level function off the event loop and return its result"""
+        if self._pending >= self.capacity:
+            self._record_rejection(task_type)
+            raise ServiceOverloadedException(
+                resource="compute",
+                retry_after=self.retry_after_seconds,
+                details={"task_type": task_type, "pending": self._pending}
+            )
+
+        self._pending += 1
+        self._pending_by_type[task_type] = self._pending_by_type.get(task_type, 0) + 1
+        self._record_pending(task_type)
+        submitted_at = time.time()
+        status = "success"
+
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(_timed_call, fn, args, kwargs)
+            started_at, result = await loop.run_in_executor(self._get_pool(), call)
+            self._record_timing(task_type, started_at - submitted_at, time.time() - started_at)
+            return result
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self._pending -= 1
+            self._pending_by_type[task_type] -= 1
+            self._record_pending(task_type)
+            self._record_completion(task_type, status)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+            logger.info("Compute pool shut down")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.pool_size,
+            "queue_size": self.queue_size,
+            "pending": self._pending,
+            "pending_by_type": dict(self._pending_by_type),
+        }
+
+    # Metrics are imported lazily: the monitoring package pulls in the whole app
+
+    def _record_pending(self, task_type: str) -> None:
+        from ..monitoring.metrics import metrics_collector
+        metrics_collector.set_gauge(
+            "compute_tasks_pending", self._pending_by_type[task_type], {"task_type": task_type}
+        )
+
+    def _record_timing(self, task_type: str, queue_wait: float, duration: float) -> None:
+        from ..monitoring.metrics import metrics_collector
+        labels = {"task_type": task_type}
+        metrics_collector.observe_histogram("compute_queue_wait_seconds", max(queue_wait, 0.0), labels)
+        metrics_collector.observe_histogram("compute_task_duration_seconds", duration, labels)
+
+    def _record_completion(self, task_type: str, status: str) -> None:
+        from ..monitoring.metrics import metrics_collector
+        metrics_collector.increment_counter(
+            "compute_tasks_total", labels={"task_type": task_type, "status": status}
+        )
+
+    def _record_rejection(self, task_type: str) -> None:
+        logger.warning(f"Compute pool saturated, rejecting {task_type} task ({self._pending} pending)")
+        self._record_completion(task_type, "rejected")
+
+
+# Global executor shared by the services in this worker
+compute_executor = ComputeExecutor()
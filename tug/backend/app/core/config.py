@@ -50,10 +50,98 @@ class Settings(BaseSettings):
     MAX_REQUEST_SIZE: int = int(os.environ.get("MAX_REQUEST_SIZE", 10 * 1024 * 1024))  # 10MB
     RATE_LIMIT_REQUESTS_PER_MINUTE: int = int(os.environ.get("RATE_LIMIT_RPM", 100))
     RATE_LIMIT_BURST: int = int(os.environ.get("RATE_LIMIT_BURST", 20))
+
+    # Overload protection: above this many in-flight requests per worker, requests to the
+    # comma-separated low-priority path prefixes get a 503 (0 disables shedding)
+    LOAD_SHED_MAX_IN_FLIGHT: int = int(os.environ.get("LOAD_SHED_MAX_IN_FLIGHT", 200))
+    LOAD_SHED_LOW_PRIORITY_PREFIXES: str = os.environ.get(
+        "LOAD_SHED_LOW_PRIORITY_PREFIXES",
+        "/api/v1/analytics/export,/api/v1/ml-predictions/admin,"
+        "/api/v1/coaching/admin,/api/v1/habit-suggestions/admin"
+    )
+    LOAD_SHED_RETRY_AFTER_SECONDS: int = int(os.environ.get("LOAD_SHED_RETRY_AFTER_SECONDS", 5))
     
     # Security headers
     ENABLE_SECURITY_HEADERS: bool = os.environ.get("ENABLE_SECURITY_HEADERS", "True").lower() == "true"
     
+    # ML Settings
+    ML_MODELS_DIR: str = os.environ.get("ML_MODELS_DIR", "/tmp/tug_ml_models")
+    ML_MODEL_REFRESH_SECONDS: int = int(os.environ.get("ML_MODEL_REFRESH_SECONDS", 300))
+    # Fit per-user models on the request path when no global model is available
+    ML_PER_USER_FITTING: bool = os.environ.get("ML_PER_USER_FITTING", "False").lower() == "true"
+
+    # Compute pool for CPU-bound work (0 runs tasks on threads instead of processes)
+    COMPUTE_POOL_SIZE: int = int(os.environ.get("COMPUTE_POOL_SIZE", 2))
+    COMPUTE_QUEUE_SIZE: int = int(os.environ.get("COMPUTE_QUEUE_SIZE", 8))
+    COMPUTE_RETRY_AFTER_SECONDS: int = int(os.environ.get("COMPUTE_RETRY_AFTER_SECONDS", 10))
+
+    # Cache Settings (shared backend: "mongo", "redis" or "none")
+    CACHE_SHARED_BACKEND: str = os.environ.get("CACHE_SHARED_BACKEND", "mongo")
+    CACHE_REDIS_URL: str = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_MEMORY_MAX_ENTRIES: int = int(os.environ.get("CACHE_MEMORY_MAX_ENTRIES", 1000))
+    CACHE_MEMORY_TTL_SECONDS: int = int(os.environ.get("CACHE_MEMORY_TTL_SECONDS", 300))
+    # Analytics entries are keyed on the user's data version, so this only bounds storage
+    ANALYTICS_CACHE_TTL_SECONDS: int = int(os.environ.get("ANALYTICS_CACHE_TTL_SECONDS", 6 * 3600))
+
+    # Real-time state shared between replicas ("memory" for a single replica, or "redis")
+    REALTIME_PUBSUB_BACKEND: str = os.environ.get("REALTIME_PUBSUB_BACKEND", "memory")
+    REALTIME_REDIS_URL: str = os.environ.get("REALTIME_REDIS_URL", CACHE_REDIS_URL)
+    # Each replica republishes its connected users this often; peers forget them after 3 misses
+    REALTIME_PRESENCE_HEARTBEAT_SECONDS: float = float(os.environ.get("REALTIME_PRESENCE_HEARTBEAT_SECONDS", 15))
+    TYPING_INDICATOR_TTL_SECONDS: float = float(os.environ.get("TYPING_INDICATOR_TTL_SECONDS", 10))
+    # Repeated typing events within this window refresh the TTL without a new broadcast
+    TYPING_BROADCAST_DEBOUNCE_SECONDS: float = float(os.environ.get("TYPING_BROADCAST_DEBOUNCE_SECONDS", 3))
+
+    # WebSocket fan-out: each connection has a bounded send queue drained by its own writer.
+    # When a queue is full the slow consumer either loses its oldest queued message
+    # ("drop_oldest") or is disconnected ("disconnect").
+    WEBSOCKET_SEND_QUEUE_SIZE: int = int(os.environ.get("WEBSOCKET_SEND_QUEUE_SIZE", 256))
+    WEBSOCKET_SLOW_CONSUMER_POLICY: str = os.environ.get("WEBSOCKET_SLOW_CONSUMER_POLICY", "drop_oldest")
+    WEBSOCKET_SEND_TIMEOUT_SECONDS: float = float(os.environ.get("WEBSOCKET_SEND_TIMEOUT_SECONDS", 10))
+
+    # Premium groups and group messaging (routers, models and their background work) are
+    # off until the feature ships; keep this False while their routers stay disabled
+    ENABLE_GROUP_FEATURES: bool = os.environ.get("ENABLE_GROUP_FEATURES", "False").lower() == "true"
+
+    # Offline message delivery workers claim queued items in batches under a lease
+    MESSAGE_DELIVERY_BATCH_SIZE: int = int(os.environ.get("MESSAGE_DELIVERY_BATCH_SIZE", 100))
+    MESSAGE_DELIVERY_POLL_SECONDS: float = float(os.environ.get("MESSAGE_DELIVERY_POLL_SECONDS", 5))
+    MESSAGE_DELIVERY_LEASE_SECONDS: int = int(os.environ.get("MESSAGE_DELIVERY_LEASE_SECONDS", 60))
+    MESSAGE_DELIVERY_RETRY_BACKOFF_SECONDS: float = float(os.environ.get("MESSAGE_DELIVERY_RETRY_BACKOFF_SECONDS", 30))
+    GROUP_MEMBER_INDEX_TTL_SECONDS: int = int(os.environ.get("GROUP_MEMBER_INDEX_TTL_SECONDS", 600))
+
+    # Verified token claims are cached until the token expires; user documents briefly,
+    # dropped on every write to the user
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = int(os.environ.get("AUTH_TOKEN_CACHE_MAX_ENTRIES", 10000))
+    AUTH_USER_CACHE_MAX_ENTRIES: int = int(os.environ.get("AUTH_USER_CACHE_MAX_ENTRIES", 10000))
+    AUTH_USER_CACHE_TTL_SECONDS: float = float(os.environ.get("AUTH_USER_CACHE_TTL_SECONDS", 60))
+    AUTH_CERT_PREFETCH_SECONDS: int = int(os.environ.get("AUTH_CERT_PREFETCH_SECONDS", 300))
+
+    # Requests record users as seen at most once per granularity window; the buffered
+    # timestamps are flushed to last_login in bulk
+    LAST_SEEN_GRANULARITY_SECONDS: float = float(os.environ.get("LAST_SEEN_GRANULARITY_SECONDS", 60))
+    LAST_SEEN_FLUSH_SECONDS: float = float(os.environ.get("LAST_SEEN_FLUSH_SECONDS", 60))
+    LAST_SEEN_MAX_PENDING: int = int(os.environ.get("LAST_SEEN_MAX_PENDING", 5000))
+
+    # Friend-graph adjacency per user, dropped on every friendship change
+    FRIEND_GRAPH_CACHE_MAX_ENTRIES: int = int(os.environ.get("FRIEND_GRAPH_CACHE_MAX_ENTRIES", 10000))
+    FRIEND_GRAPH_CACHE_TTL_SECONDS: float = float(os.environ.get("FRIEND_GRAPH_CACHE_TTL_SECONDS", 300))
+
+    # User and group search ranks at most this many index matches per query
+    SEARCH_CANDIDATE_LIMIT: int = int(os.environ.get("SEARCH_CANDIDATE_LIMIT", 200))
+
+    # Public posts are written into each friend's feed unless the author has more friends
+    # than this; those authors' posts are merged into feeds when they are read
+    TIMELINE_FANOUT_MAX_FRIENDS: int = int(os.environ.get("TIMELINE_FANOUT_MAX_FRIENDS", 1000))
+
+    # Scheduled jobs run on the app loop; a lease in MongoDB lets one replica run each slot
+    SCHEDULER_MAX_CONCURRENT_JOBS: int = int(os.environ.get("SCHEDULER_MAX_CONCURRENT_JOBS", 4))
+    SCHEDULER_LEASE_SECONDS: int = int(os.environ.get("SCHEDULER_LEASE_SECONDS", 300))
+
+    # System sampler (resource usage is sampled off the event loop)
+    SYSTEM_SAMPLE_INTERVAL_SECONDS: float = float(os.environ.get("SYSTEM_SAMPLE_INTERVAL_SECONDS", 15))
+    EVENT_LOOP_LAG_PROBE_SECONDS: float = float(os.environ.get("EVENT_LOOP_LAG_PROBE_SECONDS", 0.5))
+
     # Trusted hosts for production
     TRUSTED_HOSTS: List[str] = [
         "tugg-app.web.app",
@@ -15,16 +15,37 @@ from ..models.activity import Activity
 from ..models.vice import Vice
 from ..models.indulgence import Indulgence
 from ..models.friendship import Friendship
+from ..models.friend_graph import UserFriendGraph
 from ..models.social_post import SocialPost
+from ..models.feed_entry import FeedEntry
 from ..models.post_comment import PostComment
 from ..models.notification import Notification, NotificationBatch
 from ..models.mood import MoodEntry
-from ..models.analytics import UserAnalytics, ValueInsights, StreakHistory, ActivityPattern
+from ..models.analytics import (
+    UserAnalytics, ValueInsights, StreakHistory, ActivityPattern,
+    DailyActivityRollup, AnalyticsRollupState
+)
 from ..models.habit_suggestion import HabitTemplate, PersonalizedSuggestion, SuggestionFeedback, HabitRecommendationConfig
+from ..models.scheduled_job import ScheduledJobLease, ScheduledJobRun, JobCheckpoint
+from ..models.premium_group import PremiumGroup, GroupMembership, GroupChallenge, GroupPost
+from ..models.group_analytics import GroupAnalytics, MemberAnalytics, GroupInsight
+from ..models.group_message import (
+    GroupMessage, MessageReaction, MessageReadWatermark, TypingIndicator, MessageQueue
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
+def group_document_models() -> list:
+    """Premium group and group messaging models, registered only with the feature enabled"""
+    if not settings.ENABLE_GROUP_FEATURES:
+        return []
+    return [
+        PremiumGroup, GroupMembership, GroupChallenge, GroupPost,
+        GroupAnalytics, MemberAnalytics, GroupInsight,
+        GroupMessage, MessageReaction, MessageReadWatermark, TypingIndicator, MessageQueue,
+    ]
+
 class QueryPerformanceMonitor(CommandListener):
     """Monitor MongoDB query performance and log slow queries"""
     
@@ -155,7 +176,9 @@ async def init_db():
                 Vice,
                 Indulgence,
                 Friendship,
+                UserFriendGraph,
                 SocialPost,
+                FeedEntry,
                 PostComment,
                 Notification,
                 NotificationBatch,
@@ -164,10 +187,16 @@ async def init_db():
                 ValueInsights,
                 StreakHistory,
                 ActivityPattern,
+                DailyActivityRollup,
+                AnalyticsRollupState,
                 HabitTemplate,
                 PersonalizedSuggestion,
                 SuggestionFeedback,
                 HabitRecommendationConfig,
+                ScheduledJobLease,
+                ScheduledJobRun,
+                JobCheckpoint,
+                *group_document_models(),
             ]
         )
         logger.info("Successfully initialized Beanie ODM with all models")
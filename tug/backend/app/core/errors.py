@@ -1,4 +1,5 @@
 # app/core/errors.py
+import time
 from typing import Any, Dict, Optional, List
 from fastapi import HTTPException, status
 from enum import Enum
@@ -213,6 +214,26 @@ class DatabaseException(TugException):
             user_message="A database error occurred. Please try again later."
         )
 
+class ServiceOverloadedException(TugException):
+    """Exception for work rejected because a bounded resource is saturated"""
+    
+    def __init__(
+        self,
+        resource: str,
+        retry_after: int = 5,
+        details: Optional[Dict[str, Any]] = None
+    ):
+        details = details or {}
+        details['resource'] = resource
+        self.retry_after = retry_after
+        
+        super().__init__(
+            message=f"{resource} capacity exhausted",
+            code=ErrorCode.SERVICE_UNAVAILABLE,
+            details=details,
+            user_message="The server is busy. Please try again shortly."
+        )
+
 def create_http_exception(
     exc: TugException,
     include_details: bool = False
@@ -274,7 +295,11 @@ def create_http_exception(
     if exc.context:
         error_response["context"] = exc.context
     
-    return HTTPException(status_code=http_status, detail=error_response)
+    headers = None
+    if isinstance(exc, ServiceOverloadedException):
+        headers = {"Retry-After": str(exc.retry_after)}
+    
+    return HTTPException(status_code=http_status, detail=error_response, headers=headers)
 
 # Error handler registry
 class ErrorHandlerRegistry:
@@ -0,0 +1,113 @@
+# app/core/last_seen.py
+"""
+Coalesced last-seen tracking.
+
+Authenticated requests record when each user was last seen here instead of writing
+``User.last_login`` themselves. A user is recorded at most once per granularity window,
+and the buffered timestamps are flushed periodically with one unordered ``bulk_write``
+of ``$max`` updates, so a late or retried flush can never move a timestamp backwards
+and no other field of the user is touched. Readers that select users by
+``last_login`` call ``flush()`` first to see this replica's latest timestamps.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from ..models.user import User
+from .config import settings
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class LastSeenTracker:
+    """Buffers per-user last-seen times and writes them in bulk"""
+
+    def __init__(
+        self,
+        granularity_seconds: Optional[float] = None,
+        flush_interval_seconds: Optional[float] = None,
+        max_pending: Optional[int] = None
+    ):
+        self.granularity = timedelta(seconds=granularity_seconds or settings.LAST_SEEN_GRANULARITY_SECONDS)
+        self.flush_interval_seconds = flush_interval_seconds or settings.LAST_SEEN_FLUSH_SECONDS
+        self.max_pending = max_pending or settings.LAST_SEEN_MAX_PENDING
+        self._pending: Dict[ObjectId, datetime] = {}
+        # What the last flush wrote, so a user whose cached document predates it is not re-recorded
+        self._flushed: Dict[ObjectId, datetime] = {}
+        self._flush_soon: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def touch(self, user: User) -> None:
+        """Record that the user was seen now; updates ``user.last_login`` for this request"""
+        now = datetime.utcnow()
+        user_id = user.id
+        last_seen = self._pending.get(user_id) or self._flushed.get(user_id) or user.last_login
+        if last_seen is not None and now - last_seen < self.granularity:
+            return
+
+        self._pending[user_id] = now
+        user.last_login = now
+        if len(self._pending) >= self.max_pending and self._flush_soon is not None:
+            self._flush_soon.set()
+
+    def start(self) -> None:
+        """Start flushing periodically; must be called from the running event loop"""
+        if self._task is None:
+            self._flush_soon = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Whatever is still buffered would otherwise be lost
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._flush_soon.wait(), timeout=self.flush_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._flush_soon.clear()
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in last-seen flusher: {e}", exc_info=True)
+
+    async def flush(self) -> int:
+        """Write the buffered timestamps; returns how many users were updated"""
+        if not self._pending:
+            return 0
+
+        batch, self._pending = self._pending, {}
+        operations = [
+            UpdateOne({"_id": user_id}, {"$max": {"last_login": seen_at}})
+            for user_id, seen_at in batch.items()
+        ]
+        try:
+            await User.get_motor_collection().bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Keep them for the next flush, without overwriting anything newer
+            for user_id, seen_at in batch.items():
+                if user_id not in self._pending or self._pending[user_id] < seen_at:
+                    self._pending[user_id] = seen_at
+            logger.warning(f"Failed to flush last-seen times for {len(batch)} users: {e}")
+            return 0
+        self._flushed = batch
+        return len(batch)
+
+
+last_seen_tracker = LastSeenTracker()
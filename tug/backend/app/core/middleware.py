@@ -1,14 +1,26 @@
 # app/core/middleware.py
+"""
+Raw-ASGI request pipeline.
+
+All per-request cross-cutting concerns (correlation IDs, security headers, size and rate
+limits, load shedding, metrics, error envelopes) run as stages of one
+``RequestPipelineMiddleware`` instead of a stack of ``BaseHTTPMiddleware`` layers. The
+pipeline wraps ``send`` rather than buffering the response, so it adds no extra task per
+request and streaming responses pass through untouched.
+"""
+
 import time
-import uuid
-from typing import Callable, Optional
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote_plus
 
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
 from .logging_config import (
-    get_logger, 
-    set_correlation_id, 
+    get_logger,
+    set_correlation_id,
     generate_correlation_id,
     get_correlation_id,
     log_security_event,
@@ -17,166 +29,262 @@ from .logging_config import (
 
 logger = get_logger(__name__)
 
-class RequestTrackingMiddleware(BaseHTTPMiddleware):
-    """Middleware for request tracking, correlation IDs, and performance monitoring"""
-    
-    def __init__(self, app, enable_detailed_logging: bool = True):
-        super().__init__(app)
+RawHeaders = List[Tuple[bytes, bytes]]
+
+
+class RequestContext:
+    """Per-request state shared by the pipeline stages"""
+
+    __slots__ = (
+        "scope", "method", "path", "start_time", "status_code", "error",
+        "correlation_id", "response_started", "route_template", "shed", "_headers"
+    )
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+        self.start_time = time.perf_counter()
+        self.status_code = 500
+        self.error: Optional[BaseException] = None
+        self.correlation_id: Optional[str] = None
+        self.response_started = False
+        self.route_template: Optional[str] = None
+        self.shed = False
+        self._headers: Optional[Headers] = None
+
+    @property
+    def headers(self) -> Headers:
+        if self._headers is None:
+            self._headers = Headers(scope=self.scope)
+        return self._headers
+
+    @property
+    def query_string(self) -> str:
+        return self.scope.get("query_string", b"").decode("latin-1")
+
+    @property
+    def client_host(self) -> str:
+        client = self.scope.get("client")
+        return client[0] if client else "unknown"
+
+    @property
+    def user_id(self) -> Optional[str]:
+        return self.scope.get("state", {}).get("user_id")
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start_time) * 1000
+
+
+class PipelineStage:
+    """One concern of the request pipeline; every hook is optional.
+
+    Stages run in order on the way in and in reverse on the way out. A stage that returns
+    a response from ``on_request`` short-circuits the request: later stages and the app
+    never see it, and only the stages that already ran see the response.
+    """
+
+    def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        """Called once with the response's raw header list, which may be appended to"""
+
+    def on_error(self, ctx: RequestContext, exc: Exception) -> Optional[Response]:
+        """Turn an exception from the app into a response, or return None to pass"""
+        return None
+
+    def on_complete(self, ctx: RequestContext) -> None:
+        """Called after the response finished or the request failed"""
+
+
+class RequestPipelineMiddleware:
+    """Runs the pipeline stages around every HTTP request"""
+
+    def __init__(self, app: ASGIApp, stages: Sequence[PipelineStage] = ()):
+        self.app = app
+        self.stages = tuple(stages)
+        self._response_start_stages = self._overriding("on_response_start")
+        self._complete_stages = self._overriding("on_complete")
+
+    def _overriding(self, hook: str) -> Tuple[Tuple[int, PipelineStage], ...]:
+        """(position, stage) for the stages that implement ``hook``, so the rest cost nothing"""
+        base = getattr(PipelineStage, hook)
+        return tuple(
+            (position, stage) for position, stage in enumerate(self.stages)
+            if getattr(type(stage), hook) is not base
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestContext(scope)
+        entered = 0
+        try:
+            for stage in self.stages:
+                entered += 1
+                response = stage.on_request(ctx)
+                if response is not None:
+                    await self._send_response(ctx, response, entered, receive, send)
+                    return
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    self._start_response(ctx, message, len(self.stages))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception as exc:
+                ctx.error = exc
+                response = None if ctx.response_started else self._handle_error(ctx, exc)
+                if response is None:
+                    raise
+                await self._send_response(ctx, response, entered, receive, send)
+        finally:
+            for position, stage in reversed(self._complete_stages):
+                if position < entered:
+                    try:
+                        stage.on_complete(ctx)
+                    except Exception as e:
+                        logger.error(f"Request pipeline stage {type(stage).__name__} failed: {e}")
+
+    def _start_response(self, ctx: RequestContext, message: Message, entered: int) -> None:
+        ctx.response_started = True
+        ctx.status_code = message["status"]
+        headers = list(message.get("headers", ()))
+        for position, stage in self._response_start_stages:
+            if position < entered:
+                stage.on_response_start(ctx, headers)
+        message["headers"] = headers
+
+    def _handle_error(self, ctx: RequestContext, exc: Exception) -> Optional[Response]:
+        for stage in reversed(self.stages):
+            response = stage.on_error(ctx, exc)
+            if response is not None:
+                return response
+        return None
+
+    async def _send_response(
+        self,
+        ctx: RequestContext,
+        response: Response,
+        entered: int,
+        receive: Receive,
+        send: Send
+    ) -> None:
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                self._start_response(ctx, message, entered)
+            await send(message)
+
+        await response(ctx.scope, receive, send_wrapper)
+
+
+class RequestTrackingStage(PipelineStage):
+    """Correlation IDs, request logging and security event monitoring"""
+
+    SUSPICIOUS_AGENTS = (
+        'sqlmap', 'nikto', 'nmap', 'masscan', 'burpsuite',
+        'dirbuster', 'gobuster', 'wget', 'curl'
+    )
+    SQL_PATTERNS = ('union select', 'drop table', 'insert into', '--', ';--')
+    XSS_PATTERNS = ('<script', 'javascript:', 'onerror=', 'onload=')
+
+    def __init__(self, enable_detailed_logging: bool = True, slow_request_ms: float = 1000):
         self.enable_detailed_logging = enable_detailed_logging
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        self.slow_request_ms = slow_request_ms
+
+    def on_request(self, ctx: RequestContext) -> Optional[Response]:
         # Generate or extract correlation ID
-        correlation_id = request.headers.get('X-Correlation-ID') or generate_correlation_id()
-        set_correlation_id(correlation_id)
-        
-        # Extract request information
-        client_ip = self._get_client_ip(request)
-        user_agent = request.headers.get('User-Agent', 'Unknown')
-        method = request.method
-        path = request.url.path
-        query_params = str(request.query_params) if request.query_params else None
-        
-        # Extract user information if available
-        user_id = None
-        if hasattr(request.state, 'user_id'):
-            user_id = request.state.user_id
-        
-        # Start timing
-        start_time = time.time()
-        
-        # Log request start
+        ctx.correlation_id = ctx.headers.get('x-correlation-id') or generate_correlation_id()
+        set_correlation_id(ctx.correlation_id)
+
+        user_agent = ctx.headers.get('user-agent', 'Unknown')
+        client_ip = self._get_client_ip(ctx)
+
         if self.enable_detailed_logging:
             logger.info(
-                f"Request started: {method} {path}",
+                f"Request started: {ctx.method} {ctx.path}",
                 extra={
-                    'request_id': correlation_id,
-                    'user_id': user_id,
+                    'request_id': ctx.correlation_id,
+                    'user_id': ctx.user_id,
                     'ip_address': client_ip,
                     'user_agent': user_agent,
-                    'endpoint': path,
-                    'method': method,
-                    'query_params': query_params,
+                    'endpoint': ctx.path,
+                    'method': ctx.method,
+                    'query_params': ctx.query_string or None,
                     'event_type': 'request_start'
                 }
             )
-        
-        # Security monitoring
-        self._monitor_security_events(request, client_ip, user_agent, user_id)
-        
-        response = None
-        error_occurred = False
-        
-        try:
-            # Process request
-            response = await call_next(request)
-            
-        except Exception as exc:
-            error_occurred = True
-            
-            # Log error with context
-            logger.error(
-                f"Request failed: {method} {path} - {str(exc)}",
-                extra={
-                    'request_id': correlation_id,
-                    'user_id': user_id,
-                    'ip_address': client_ip,
-                    'user_agent': user_agent,
-                    'endpoint': path,
-                    'method': method,
-                    'error_type': type(exc).__name__,
-                    'event_type': 'request_error'
-                },
-                exc_info=True
-            )
-            
-            # Return error response
-            response = JSONResponse(
-                status_code=500,
-                content={
-                    "error": "internal_server_error",
-                    "message": "An internal server error occurred",
-                    "correlation_id": correlation_id,
-                    "timestamp": time.time()
-                }
-            )
-        
-        # Calculate response time
-        end_time = time.time()
-        response_time_ms = (end_time - start_time) * 1000
-        
-        # Add correlation ID to response headers
-        response.headers['X-Correlation-ID'] = correlation_id
-        response.headers['X-Response-Time'] = f"{response_time_ms:.2f}ms"
-        
-        # Log request completion
-        status_code = response.status_code
-        
+
+        self._monitor_security_events(ctx, client_ip, user_agent)
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        headers.append((b"x-correlation-id", ctx.correlation_id.encode("latin-1")))
+        headers.append((b"x-response-time", f"{ctx.elapsed_ms:.2f}ms".encode("latin-1")))
+
+    def on_complete(self, ctx: RequestContext) -> None:
+        response_time_ms = ctx.elapsed_ms
+
         if self.enable_detailed_logging:
-            log_level = logger.error if error_occurred or status_code >= 400 else logger.info
+            log_level = logger.error if ctx.error or ctx.status_code >= 400 else logger.info
             log_level(
-                f"Request completed: {method} {path} - {status_code} ({response_time_ms:.2f}ms)",
+                f"Request completed: {ctx.method} {ctx.path} - {ctx.status_code} ({response_time_ms:.2f}ms)",
                 extra={
-                    'request_id': correlation_id,
-                    'user_id': user_id,
-                    'ip_address': client_ip,
-                    'user_agent': user_agent,
-                    'endpoint': path,
-                    'method': method,
-                    'status_code': status_code,
+                    'request_id': ctx.correlation_id,
+                    'user_id': ctx.user_id,
+                    'ip_address': self._get_client_ip(ctx),
+                    'endpoint': ctx.path,
+                    'method': ctx.method,
+                    'status_code': ctx.status_code,
                     'response_time_ms': response_time_ms,
                     'event_type': 'request_complete',
-                    'error_occurred': error_occurred
+                    'error_occurred': ctx.error is not None
                 }
             )
-        
+
         # Log performance metrics for slow requests
-        if response_time_ms > 1000:  # Log requests slower than 1 second
+        if response_time_ms > self.slow_request_ms:
             log_performance_metric(
                 logger,
                 'slow_request',
                 response_time_ms,
                 'ms',
                 {
-                    'endpoint': path,
-                    'method': method,
-                    'status_code': status_code,
-                    'user_id': user_id
+                    'endpoint': ctx.path,
+                    'method': ctx.method,
+                    'status_code': ctx.status_code,
+                    'user_id': ctx.user_id
                 }
             )
-        
-        return response
-    
-    def _get_client_ip(self, request: Request) -> str:
+
+    def _get_client_ip(self, ctx: RequestContext) -> str:
         """Extract client IP address from request"""
         # Check for forwarded headers first (from load balancers/proxies)
-        forwarded_for = request.headers.get('X-Forwarded-For')
+        forwarded_for = ctx.headers.get('x-forwarded-for')
         if forwarded_for:
             # X-Forwarded-For can contain multiple IPs, take the first one
             return forwarded_for.split(',')[0].strip()
-        
-        real_ip = request.headers.get('X-Real-IP')
+
+        real_ip = ctx.headers.get('x-real-ip')
         if real_ip:
             return real_ip
-        
+
         # Fallback to direct client host
-        return request.client.host if request.client else 'unknown'
-    
-    def _monitor_security_events(
-        self, 
-        request: Request, 
-        client_ip: str, 
-        user_agent: str, 
-        user_id: Optional[str]
-    ) -> None:
+        return ctx.client_host
+
+    def _monitor_security_events(self, ctx: RequestContext, client_ip: str, user_agent: str) -> None:
         """Monitor for potential security threats"""
-        
+        user_id = ctx.user_id
+
         # Check for suspicious user agents
-        suspicious_agents = [
-            'sqlmap', 'nikto', 'nmap', 'masscan', 'burpsuite',
-            'dirbuster', 'gobuster', 'wget', 'curl'
-        ]
-        
-        if any(agent.lower() in user_agent.lower() for agent in suspicious_agents):
+        lowered_agent = user_agent.lower()
+        if any(agent in lowered_agent for agent in self.SUSPICIOUS_AGENTS):
             log_security_event(
                 logger,
                 'suspicious_user_agent',
@@ -186,124 +294,244 @@ class RequestTrackingMiddleware(BaseHTTPMiddleware):
                 ip_address=client_ip,
                 additional_data={'user_agent': user_agent}
             )
-        
-        # Check for SQL injection patterns in query parameters
-        sql_patterns = ['union select', 'drop table', 'insert into', '--', ';--']
-        query_string = str(request.query_params).lower()
-        
-        for pattern in sql_patterns:
-            if pattern in query_string:
-                log_security_event(
-                    logger,
-                    'sql_injection_attempt',
-                    'high',
-                    f"Potential SQL injection attempt in query parameters",
-                    user_id=user_id,
-                    ip_address=client_ip,
-                    additional_data={
-                        'query_params': str(request.query_params),
-                        'detected_pattern': pattern
-                    }
-                )
-                break
-        
-        # Check for XSS patterns
-        xss_patterns = ['<script', 'javascript:', 'onerror=', 'onload=']
-        for pattern in xss_patterns:
-            if pattern in query_string:
-                log_security_event(
-                    logger,
-                    'xss_attempt',
-                    'high',
-                    f"Potential XSS attempt detected",
-                    user_id=user_id,
-                    ip_address=client_ip,
-                    additional_data={
-                        'query_params': str(request.query_params),
-                        'detected_pattern': pattern
-                    }
-                )
-                break
-        
+
+        query_string = ctx.query_string
+        if query_string:
+            decoded_query = unquote_plus(query_string).lower()
+
+            # Check for SQL injection patterns in query parameters
+            for pattern in self.SQL_PATTERNS:
+                if pattern in decoded_query:
+                    log_security_event(
+                        logger,
+                        'sql_injection_attempt',
+                        'high',
+                        "Potential SQL injection attempt in query parameters",
+                        user_id=user_id,
+                        ip_address=client_ip,
+                        additional_data={'query_params': query_string, 'detected_pattern': pattern}
+                    )
+                    break
+
+            # Check for XSS patterns
+            for pattern in self.XSS_PATTERNS:
+                if pattern in decoded_query:
+                    log_security_event(
+                        logger,
+                        'xss_attempt',
+                        'high',
+                        "Potential XSS attempt detected",
+                        user_id=user_id,
+                        ip_address=client_ip,
+                        additional_data={'query_params': query_string, 'detected_pattern': pattern}
+                    )
+                    break
+
         # Monitor for unusual request patterns
-        path = request.url.path
-        if path.count('../') > 2:
+        if ctx.path.count('../') > 2:
             log_security_event(
                 logger,
                 'path_traversal_attempt',
                 'high',
-                f"Potential path traversal attempt: {path}",
+                f"Potential path traversal attempt: {ctx.path}",
                 user_id=user_id,
                 ip_address=client_ip,
-                additional_data={'path': path}
+                additional_data={'path': ctx.path}
             )
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
-    """Centralized error handling middleware"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+
+class SecurityHeadersStage(PipelineStage):
+    """Adds the standard security headers to every response"""
+
+    HEADERS: RawHeaders = [
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),
+        (b"x-xss-protection", b"1; mode=block"),
+        (b"referrer-policy", b"strict-origin-when-cross-origin"),
+        (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+    ]
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        headers.extend(self.HEADERS)
+
+
+class RequestSizeLimitStage(PipelineStage):
+    """Rejects requests whose declared body exceeds the maximum size"""
+
+    def __init__(self, max_request_size: Optional[int] = None):
+        self.max_request_size = max_request_size or settings.MAX_REQUEST_SIZE
+
+    def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        content_length = ctx.headers.get("content-length")
+        if content_length is None:
+            return None
+
         try:
-            response = await call_next(request)
-            return response
-            
-        except ValueError as exc:
-            logger.warning(
-                f"Validation error: {str(exc)}",
-                extra={'error_type': 'validation_error'},
-                exc_info=True
-            )
+            size = int(content_length)
+        except ValueError:
             return JSONResponse(
                 status_code=400,
                 content={
-                    "error": "validation_error",
-                    "message": str(exc),
-                    "correlation_id": get_correlation_id()
+                    "error": "invalid_content_length",
+                    "message": "Content-Length header must be an integer",
+                    "correlation_id": ctx.correlation_id
                 }
             )
-            
-        except PermissionError as exc:
-            logger.warning(
-                f"Permission denied: {str(exc)}",
-                extra={'error_type': 'permission_denied'},
-                exc_info=True
-            )
+
+        if size > self.max_request_size:
             return JSONResponse(
-                status_code=403,
+                status_code=413,
                 content={
-                    "error": "permission_denied",
-                    "message": "You don't have permission to access this resource",
-                    "correlation_id": get_correlation_id()
+                    "error": "payload_too_large",
+                    "message": f"Request payload exceeds maximum size of {self.max_request_size} bytes",
+                    "max_size": self.max_request_size
                 }
             )
-            
-        except FileNotFoundError as exc:
-            logger.warning(
-                f"Resource not found: {str(exc)}",
-                extra={'error_type': 'not_found'},
-                exc_info=True
-            )
+        return None
+
+
+class RateLimitStage(PipelineStage):
+    """Fixed one-minute window rate limit per client IP (in production, use Redis)"""
+
+    WINDOW_SECONDS = 60
+
+    def __init__(self, requests_per_minute: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute or settings.RATE_LIMIT_REQUESTS_PER_MINUTE
+        self._window = 0
+        self._counts: Dict[str, int] = {}
+
+    def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        current_time = time.time()
+        window = int(current_time // self.WINDOW_SECONDS)
+        if window != self._window:
+            # Counts from earlier windows can never matter again
+            self._window = window
+            self._counts = {}
+
+        client_ip = ctx.client_host
+        count = self._counts.get(client_ip, 0)
+        if count >= self.requests_per_minute:
+            reset_at = (window + 1) * self.WINDOW_SECONDS
             return JSONResponse(
-                status_code=404,
+                status_code=429,
                 content={
-                    "error": "not_found",
-                    "message": "The requested resource was not found",
-                    "correlation_id": get_correlation_id()
+                    "error": "rate_limit_exceeded",
+                    "message": "Too many requests. Please slow down.",
+                    "limit": self.requests_per_minute,
+                    "window": "1 minute"
+                },
+                headers={
+                    "Retry-After": str(max(1, int(reset_at - current_time))),
+                    "X-RateLimit-Limit": str(self.requests_per_minute),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(reset_at)
                 }
             )
-            
-        except Exception as exc:
-            # Log unhandled exceptions
-            logger.error(
-                f"Unhandled exception: {str(exc)}",
-                extra={'error_type': 'unhandled_exception'},
-                exc_info=True
-            )
-            
+
+        self._counts[client_ip] = count + 1
+        return None
+
+
+class LoadSheddingStage(PipelineStage):
+    """Rejects low-priority requests while the worker has too many requests in flight.
+
+    Every request admitted by this stage counts towards the limit; only requests whose
+    path starts with one of the low-priority prefixes (exports, admin jobs) are turned
+    away, so interactive traffic keeps the capacity when the worker is saturated.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        low_priority_prefixes: Optional[Sequence[str]] = None,
+        retry_after_seconds: Optional[int] = None
+    ):
+        self.max_in_flight = settings.LOAD_SHED_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+        if low_priority_prefixes is None:
+            low_priority_prefixes = settings.LOAD_SHED_LOW_PRIORITY_PREFIXES.split(",")
+        self.low_priority_prefixes = tuple(prefix.strip() for prefix in low_priority_prefixes if prefix.strip())
+        self.retry_after_seconds = retry_after_seconds or settings.LOAD_SHED_RETRY_AFTER_SECONDS
+        self.in_flight = 0
+
+    def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        if (
+            self.max_in_flight
+            and self.in_flight >= self.max_in_flight
+            and ctx.path.startswith(self.low_priority_prefixes)
+        ):
+            ctx.shed = True
+            self._record_shed(ctx)
             return JSONResponse(
-                status_code=500,
+                status_code=503,
                 content={
-                    "error": "internal_server_error",
-                    "message": "An internal server error occurred",
-                    "correlation_id": get_correlation_id()
-                }
-            )
\ No newline at end of file
+                    "error": "server_overloaded",
+                    "message": "The server is busy. Please retry shortly.",
+                    "correlation_id": ctx.correlation_id
+                },
+                headers={"Retry-After": str(self.retry_after_seconds)}
+            )
+
+        self.in_flight += 1
+        return None
+
+    def on_complete(self, ctx: RequestContext) -> None:
+        if not ctx.shed:
+            self.in_flight -= 1
+
+    def _record_shed(self, ctx: RequestContext) -> None:
+        logger.warning(
+            f"Shedding {ctx.method} {ctx.path}: {self.in_flight} requests in flight",
+            extra={'load_shed': True, 'in_flight': self.in_flight}
+        )
+        # Imported lazily: the monitoring package pulls in the whole app
+        from ..monitoring.metrics import metrics_collector
+        prefix = next(p for p in self.low_priority_prefixes if ctx.path.startswith(p))
+        metrics_collector.increment_counter("http_requests_shed_total", labels={"prefix": prefix})
+
+
+class ErrorHandlingStage(PipelineStage):
+    """Turns unhandled exceptions into JSON error envelopes"""
+
+    def on_error(self, ctx: RequestContext, exc: Exception) -> Optional[Response]:
+        if isinstance(exc, ValueError):
+            logger.warning(
+                f"Validation error: {str(exc)}",
+                extra={'error_type': 'validation_error'},
+                exc_info=exc
+            )
+            return self._envelope(400, "validation_error", str(exc))
+
+        if isinstance(exc, PermissionError):
+            logger.warning(
+                f"Permission denied: {str(exc)}",
+                extra={'error_type': 'permission_denied'},
+                exc_info=exc
+            )
+            return self._envelope(403, "permission_denied", "You don't have permission to access this resource")
+
+        if isinstance(exc, FileNotFoundError):
+            logger.warning(
+                f"Resource not found: {str(exc)}",
+                extra={'error_type': 'not_found'},
+                exc_info=exc
+            )
+            return self._envelope(404, "not_found", "The requested resource was not found")
+
+        # Log unhandled exceptions
+        logger.error(
+            f"Unhandled exception: {str(exc)}",
+            extra={'error_type': 'unhandled_exception'},
+            exc_info=exc
+        )
+        return self._envelope(500, "internal_server_error", "An internal server error occurred")
+
+    @staticmethod
+    def _envelope(status_code: int, error: str, message: str) -> JSONResponse:
+        return JSONResponse(
+            status_code=status_code,
+            content={
+                "error": error,
+                "message": message,
+                "correlation_id": get_correlation_id()
+            }
+        )
@@ -0,0 +1,114 @@
+# app/core/principal_cache.py
+"""
+Per-process caches for request authentication.
+
+Verified Firebase ID token claims are kept under the SHA-256 of the token until the
+token expires, so a client reusing its token is not re-verified on every request. User
+documents are kept by Firebase UID for a short TTL. Every write to a User drops its
+entry here and, through the pub/sub bus, on the other replicas; the TTL bounds how
+long a write that bypassed the model (a raw collection update) can go unnoticed.
+Entries are stored as JSON and every hit returns a fresh User, so requests never share
+(or mutate) one instance.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional
+
+from ..models.user import User
+from .cache import MemoryLRUTier
+from .config import settings
+from .logging_config import get_logger
+from .pubsub import REPLICA_ID, PubSubBackend, build_pubsub
+
+logger = get_logger(__name__)
+
+CHANNEL = "auth.user_invalidated"
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class PrincipalCache:
+    """Verified token claims by token hash and user documents by Firebase UID"""
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_users: Optional[int] = None,
+        user_ttl_seconds: Optional[float] = None,
+        pubsub: Optional[PubSubBackend] = None
+    ):
+        self.tokens = MemoryLRUTier(max_tokens or settings.AUTH_TOKEN_CACHE_MAX_ENTRIES)
+        self.users = MemoryLRUTier(max_users or settings.AUTH_USER_CACHE_MAX_ENTRIES)
+        self.user_ttl_seconds = user_ttl_seconds or settings.AUTH_USER_CACHE_TTL_SECONDS
+        self.pubsub = pubsub
+        self._owns_pubsub = pubsub is None
+        self._subscribed = False
+        # Bumped by every invalidation, so a load that raced one is not cached
+        self.generation = 0
+
+    async def start(self) -> None:
+        """Follow user invalidations published by the other replicas"""
+        if self.pubsub is None:
+            self.pubsub = build_pubsub()
+        if not self._subscribed:
+            await self.pubsub.subscribe(CHANNEL, self._handle_remote_invalidation)
+            self._subscribed = True
+
+    async def stop(self) -> None:
+        if self.pubsub is not None and self._subscribed:
+            await self.pubsub.unsubscribe(CHANNEL, self._handle_remote_invalidation)
+            if self._owns_pubsub:
+                await self.pubsub.close()
+            self._subscribed = False
+
+    def get_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        entry = self.tokens.get(token_key(token))
+        self._record("auth_tokens", entry is not None)
+        return json.loads(entry[0]) if entry is not None else None
+
+    def put_claims(self, token: str, claims: Dict[str, Any]) -> None:
+        """Remember verified claims until the token expires"""
+        remaining = claims.get("exp", 0) - time.time()
+        if remaining > 0:
+            self.tokens.set(token_key(token), json.dumps(claims, default=str), remaining)
+
+    def get_user(self, firebase_uid: str) -> Optional[User]:
+        entry = self.users.get(firebase_uid)
+        self._record("auth_users", entry is not None)
+        return User.model_validate_json(entry[0]) if entry is not None else None
+
+    def put_user(self, user: User, generation: int) -> None:
+        """Cache a user loaded when ``generation`` was current"""
+        if generation == self.generation:
+            self.users.set(user.firebase_uid, user.model_dump_json(by_alias=True), self.user_ttl_seconds)
+
+    async def invalidate_user(self, firebase_uid: str) -> None:
+        """Drop the user here and on the other replicas; call after the user document changes"""
+        self.users.delete(firebase_uid)
+        self.generation += 1
+        if self.pubsub is not None and self._subscribed:
+            try:
+                await self.pubsub.publish(CHANNEL, {"firebase_uid": firebase_uid})
+            except Exception as e:
+                # Other replicas pick the change up when their entry expires
+                logger.warning(f"Failed to publish user invalidation: {e}")
+
+    async def _handle_remote_invalidation(self, event: Dict[str, Any]) -> None:
+        if event.get("origin") != REPLICA_ID:
+            self.users.delete(event.get("firebase_uid", ""))
+            self.generation += 1
+
+    @staticmethod
+    def _record(cache: str, hit: bool) -> None:
+        # Imported lazily: the monitoring package pulls in the whole app
+        from ..monitoring.metrics import metrics_collector
+        metrics_collector.increment_counter(
+            "cache_requests_total", 1, {"cache": cache, "tier": "memory", "result": "hit" if hit else "miss"}
+        )
+
+
+principal_cache = PrincipalCache()
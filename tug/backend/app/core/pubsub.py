@@ -0,0 +1,129 @@
+# app/core/pubsub.py
+"""
+Publish/subscribe transport for ephemeral real-time state.
+
+Replicas publish small JSON events (typing indicators, presence changes, websocket
+broadcasts for the groups and users they hold connections for) on named
+channels and every subscribed replica, including the publisher, receives them. The
+in-process backend serves a single replica; the Redis backend fans events out across
+replicas. Nothing is persisted: a replica that is down simply misses the events.
+"""
+
+import asyncio
+import json
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .config import settings
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Identifies this process in published events, so handlers can skip their own echoes
+REPLICA_ID = uuid.uuid4().hex
+
+
+class PubSubBackend(ABC):
+    """Channel-based event transport shared by the replicas"""
+
+    name = "pubsub"
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def unsubscribe(self, channel: str, handler: Handler) -> None:
+        handlers = self._handlers.get(channel)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            self._handlers.pop(channel, None)
+
+    @abstractmethod
+    async def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        ...
+
+    async def close(self) -> None:
+        self._handlers.clear()
+
+    async def _dispatch(self, channel: str, event: Dict[str, Any]) -> None:
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(event)
+            except Exception as e:
+                logger.error(f"Pub/sub handler for {channel} failed: {str(e)}")
+
+
+class InProcessPubSub(PubSubBackend):
+    """Delivers events to the handlers of this process only"""
+
+    name = "memory"
+
+    async def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        await self._dispatch(channel, {**event, "origin": REPLICA_ID})
+
+
+class RedisPubSub(PubSubBackend):
+    """Fans events out through Redis PUBLISH/SUBSCRIBE.
+
+    Needs the ``redis`` package, which is only imported when this backend is configured.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "tug:realtime:"):
+        import redis.asyncio as redis_asyncio
+
+        super().__init__()
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._listener: Optional[asyncio.Task] = None
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        await super().subscribe(channel, handler)
+        await self._pubsub.subscribe(self.prefix + channel)
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, channel: str, handler: Handler) -> None:
+        await super().unsubscribe(channel, handler)
+        if channel not in self._handlers:
+            await self._pubsub.unsubscribe(self.prefix + channel)
+
+    async def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        payload = json.dumps({**event, "origin": REPLICA_ID}, default=str)
+        await self._client.publish(self.prefix + channel, payload)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        await self._pubsub.aclose()
+        await self._client.aclose()
+        await super().close()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    channel = message["channel"].decode()[len(self.prefix):]
+                    await self._dispatch(channel, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis pub/sub listener failed, resubscribing: {str(e)}")
+                await asyncio.sleep(1)
+
+
+def build_pubsub() -> PubSubBackend:
+    """Create the backend chosen by REALTIME_PUBSUB_BACKEND"""
+    if settings.REALTIME_PUBSUB_BACKEND.lower() == "redis":
+        return RedisPubSub(settings.REALTIME_REDIS_URL)
+    return InProcessPubSub()
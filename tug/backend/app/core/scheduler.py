@@ -0,0 +1,331 @@
+# app/core/scheduler.py
+"""
+Scheduled background jobs.
+
+Jobs run as tasks on the application's event loop, so they share its Motor client
+instead of driving it from a thread with a loop of their own. Every schedule is
+computed in UTC and aligned to fixed slots (an hourly job is due on the hour, not an
+hour after the process started), so all replicas agree on which run is due. Before a
+distributed job runs, the replica claims that slot in ``scheduled_job_leases``; only
+the replica that wins the claim runs it, and it renews the lease while the job is
+running. A slot whose owner died is taken over once its lease expires. Jobs that only
+touch per-process state (memory caches) are registered with ``distributed=False``
+and run on every replica.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ..models.scheduled_job import ScheduledJobLease, ScheduledJobRun
+from .config import settings
+from .logging_config import get_logger
+from .pubsub import REPLICA_ID
+
+logger = get_logger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class Every:
+    """Due every ``seconds``, on multiples of the interval since the epoch"""
+
+    def __init__(self, seconds: int):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, moment: datetime) -> datetime:
+        elapsed = int((moment - _EPOCH).total_seconds())
+        return _EPOCH + timedelta(seconds=(elapsed // self.seconds + 1) * self.seconds)
+
+    def __repr__(self) -> str:
+        return f"every {self.seconds}s"
+
+
+class DailyAt:
+    """Due at hour:minute UTC, optionally only on one weekday (0 = Monday) or day of month"""
+
+    def __init__(self, hour: int, minute: int = 0, weekday: Optional[int] = None, day: Optional[int] = None):
+        self.hour = hour
+        self.minute = minute
+        self.weekday = weekday
+        self.day = day
+
+    def _matches(self, date: datetime) -> bool:
+        if self.weekday is not None and date.weekday() != self.weekday:
+            return False
+        return self.day is None or date.day == self.day
+
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if candidate <= moment:
+            candidate += timedelta(days=1)
+        # A day-of-month schedule can skip a month or two (day 31), never a year
+        for _ in range(366):
+            if self._matches(candidate):
+                return candidate
+            candidate += timedelta(days=1)
+        raise ValueError(f"Schedule {self!r} never matches")
+
+    def __repr__(self) -> str:
+        when = f"{self.hour:02d}:{self.minute:02d} UTC"
+        if self.weekday is not None:
+            return f"weekday {self.weekday} at {when}"
+        if self.day is not None:
+            return f"day {self.day} at {when}"
+        return f"daily at {when}"
+
+
+@dataclass
+class Job:
+    """A coroutine function run on a schedule"""
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    schedule: Any  # Every or DailyAt
+    # Start each run up to this many seconds after its slot, spreading load
+    jitter_seconds: float = 0
+    # Run each slot on one replica only; False runs it on every replica
+    distributed: bool = True
+    timeout_seconds: Optional[float] = None
+    next_slot: Optional[datetime] = None
+    last_run: Dict[str, Any] = field(default_factory=dict)
+
+
+class JobScheduler:
+    """Runs registered jobs on the app loop, at most ``max_concurrent_jobs`` at a time.
+
+    A job never overlaps itself on one replica: a slot that comes due while the previous
+    run is still going is skipped.
+    """
+
+    def __init__(self, max_concurrent_jobs: Optional[int] = None, lease_seconds: Optional[int] = None):
+        self.max_concurrent_jobs = max_concurrent_jobs or settings.SCHEDULER_MAX_CONCURRENT_JOBS
+        self.lease_seconds = lease_seconds or settings.SCHEDULER_LEASE_SECONDS
+        self.jobs: Dict[str, Job] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, job: Job) -> None:
+        if job.name in self.jobs:
+            raise ValueError(f"Job {job.name} is already registered")
+        job.next_slot = job.schedule.next_after(datetime.utcnow())
+        self.jobs[job.name] = job
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def unregister(self, name: str) -> None:
+        self.jobs.pop(name, None)
+
+    def start(self) -> None:
+        """Start running due jobs; must be called from the running event loop"""
+        if self._task is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_jobs)
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Started job scheduler with {len(self.jobs)} jobs")
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._task, *self._running.values()) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._running.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                now = datetime.utcnow()
+                for slot, job in self.due_jobs(now):
+                    self._running[job.name] = asyncio.create_task(self._execute(job, slot))
+
+                self._wakeup.clear()
+                next_due = min((job.next_slot for job in self.jobs.values()), default=None)
+                # Wake at least once a minute so a wall clock jump is noticed
+                delay = 60.0 if next_due is None else min(max((next_due - now).total_seconds(), 0.0), 60.0)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in job scheduler: {e}", exc_info=True)
+                await asyncio.sleep(60)
+
+    def due_jobs(self, now: datetime) -> List[Tuple[datetime, Job]]:
+        """Advance every due job to its next slot and return the ones to start now"""
+        due = []
+        for job in list(self.jobs.values()):
+            if job.next_slot > now:
+                continue
+            slot = job.next_slot
+            # Slots missed while the process was busy or asleep collapse into one run
+            job.next_slot = job.schedule.next_after(now)
+            running = self._running.get(job.name)
+            if running is not None and not running.done():
+                logger.warning(f"Skipping {job.name} run for {slot}: previous run still in progress")
+                self._record_metric(job.name, "skipped")
+                continue
+            due.append((slot, job))
+        return due
+
+    async def _execute(self, job: Job, slot: datetime) -> None:
+        try:
+            if job.jitter_seconds:
+                await asyncio.sleep(random.uniform(0, job.jitter_seconds))
+            async with self._semaphore:
+                if job.distributed and not await self.claim(job.name, slot):
+                    logger.debug(f"Job {job.name} for {slot} is owned by another replica")
+                    self._record_metric(job.name, "skipped")
+                    return
+                await self._run_job(job, slot)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error scheduling job {job.name}: {e}", exc_info=True)
+        finally:
+            if self._running.get(job.name) is asyncio.current_task():
+                del self._running[job.name]
+
+    async def _run_job(self, job: Job, slot: datetime) -> None:
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        renewal = asyncio.create_task(self._renew_lease(job.name, slot)) if job.distributed else None
+        error = None
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout_seconds)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            error = f"Timed out after {job.timeout_seconds}s"
+        except Exception as e:
+            error = str(e)[:500] or type(e).__name__
+            logger.error(f"Scheduled job {job.name} failed: {e}", exc_info=True)
+        finally:
+            if renewal is not None:
+                renewal.cancel()
+
+        duration = time.perf_counter() - start
+        status = "failed" if error else "succeeded"
+        job.last_run = {
+            "slot": slot.isoformat(),
+            "started_at": started_at.isoformat(),
+            "status": status,
+            "duration_seconds": round(duration, 3),
+            "error": error,
+        }
+        self._record_metric(job.name, status, duration)
+        logger.info(f"Scheduled job {job.name} {status} in {duration:.1f}s")
+        await self._record_run(job, slot, started_at, duration, status, error)
+
+    async def claim(self, name: str, slot: datetime) -> bool:
+        """Take the lease on a job's slot; False when another replica holds or ran it"""
+        now = datetime.utcnow()
+        try:
+            await ScheduledJobLease.get_motor_collection().find_one_and_update(
+                {"job_name": name, "$or": [
+                    {"slot": {"$lt": slot}},
+                    # The owner of this slot died before finishing it
+                    {"slot": slot, "status": "running", "lease_expires_at": {"$lte": now}},
+                ]},
+                {"$set": {
+                    "slot": slot,
+                    "owner": REPLICA_ID,
+                    "status": "running",
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The filter did not match an existing lease, so the upsert collided with it
+            return False
+        return True
+
+    async def _renew_lease(self, name: str, slot: datetime) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                now = datetime.utcnow()
+                await ScheduledJobLease.get_motor_collection().update_one(
+                    {"job_name": name, "slot": slot, "owner": REPLICA_ID},
+                    {"$set": {"lease_expires_at": now + timedelta(seconds=self.lease_seconds), "updated_at": now}}
+                )
+            except Exception as e:
+                logger.warning(f"Failed to renew lease for job {name}: {e}")
+
+    async def _record_run(
+        self,
+        job: Job,
+        slot: datetime,
+        started_at: datetime,
+        duration: float,
+        status: str,
+        error: Optional[str]
+    ) -> None:
+        finished_at = datetime.utcnow()
+        try:
+            if job.distributed:
+                await ScheduledJobLease.get_motor_collection().update_one(
+                    {"job_name": job.name, "slot": slot, "owner": REPLICA_ID},
+                    {"$set": {"status": status, "lease_expires_at": finished_at, "updated_at": finished_at}}
+                )
+            await ScheduledJobRun(
+                job_name=job.name,
+                slot=slot,
+                owner=REPLICA_ID,
+                status=status,
+                started_at=started_at,
+                finished_at=finished_at,
+                duration_seconds=duration,
+                error=error
+            ).insert()
+        except Exception as e:
+            logger.error(f"Failed to record run of job {job.name}: {e}")
+
+    def get_status(self, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Schedule, next slot and this replica's last run for each job"""
+        return {
+            "running": self._task is not None,
+            "max_concurrent_jobs": self.max_concurrent_jobs,
+            "jobs": {
+                job.name: {
+                    "schedule": repr(job.schedule),
+                    "distributed": job.distributed,
+                    "next_slot": job.next_slot.isoformat() if job.next_slot else None,
+                    "in_progress": job.name in self._running,
+                    "last_run": job.last_run or None,
+                }
+                for job in self.jobs.values()
+                if names is None or job.name in names
+            },
+        }
+
+    async def get_history(self, name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent runs of a job across all replicas"""
+        runs = await ScheduledJobRun.find(
+            ScheduledJobRun.job_name == name
+        ).sort(-ScheduledJobRun.started_at).limit(limit).to_list()
+        return [run.model_dump(exclude={"id", "revision_id"}) for run in runs]
+
+    @staticmethod
+    def _record_metric(name: str, status: str, duration: Optional[float] = None):
+        # Imported lazily: the monitoring package pulls in the whole app
+        from ..monitoring.metrics import metrics_collector
+        metrics_collector.increment_counter("scheduler_job_runs_total", 1, {"job": name, "status": status})
+        if duration is not None:
+            metrics_collector.observe_histogram("scheduler_job_duration_seconds", duration, {"job": name})
+
+
+job_scheduler = JobScheduler()
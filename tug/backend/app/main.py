@@ -1,4 +1,5 @@
 # app/main.py
+import asyncio
 import logging
 import time
 import os
@@ -6,22 +7,30 @@ from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
 from .core.config import settings
 from .core.database import init_db, close_db
 from .core.logging_config import setup_logging, get_logger
-from .core.middleware import RequestTrackingMiddleware, ErrorHandlingMiddleware
+from .core.middleware import (
+    RequestPipelineMiddleware,
+    RequestTrackingStage,
+    SecurityHeadersStage,
+    RequestSizeLimitStage,
+    RateLimitStage,
+    LoadSheddingStage,
+    ErrorHandlingStage
+)
 from .core.errors import error_registry, TugException, create_http_exception
 from .api.routes import api_router
 from .monitoring import (
-    MonitoringMiddleware, 
+    MonitoringStage,
     monitoring_router, 
     metrics_collector, 
     alert_manager,
     user_activity_monitor,
-    error_tracker
+    error_tracker,
+    system_sampler
 )
 
 # Setup structured logging
@@ -43,87 +52,19 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Security middleware for rate limiting and request size limits
-class SecurityMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, max_request_size: int = None):
-        super().__init__(app)
-        self.max_request_size = max_request_size or settings.MAX_REQUEST_SIZE
-        self.rate_limit_storage = {}  # In production, use Redis
-        self.requests_per_minute = settings.RATE_LIMIT_REQUESTS_PER_MINUTE
-        self.burst_requests = settings.RATE_LIMIT_BURST
-    
-    async def dispatch(self, request: Request, call_next):
-        # Check request size
-        if "content-length" in request.headers:
-            content_length = int(request.headers["content-length"])
-            if content_length > self.max_request_size:
-                return JSONResponse(
-                    status_code=413,
-                    content={
-                        "error": "payload_too_large",
-                        "message": f"Request payload exceeds maximum size of {self.max_request_size} bytes",
-                        "max_size": self.max_request_size
-                    }
-                )
-        
-        # Simple rate limiting (in production, use Redis with sliding window)
-        client_ip = request.client.host if request.client else "unknown"
-        current_time = time.time()
-        minute_key = f"{client_ip}:{int(current_time // 60)}"
-        
-        if minute_key not in self.rate_limit_storage:
-            self.rate_limit_storage[minute_key] = []
-        
-        # Clean old entries
-        self.rate_limit_storage[minute_key] = [
-            req_time for req_time in self.rate_limit_storage[minute_key]
-            if current_time - req_time < 60
-        ]
-        
-        # Check rate limit
-        if len(self.rate_limit_storage[minute_key]) >= self.requests_per_minute:
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "error": "rate_limit_exceeded",
-                    "message": "Too many requests. Please slow down.",
-                    "limit": self.requests_per_minute,
-                    "window": "1 minute"
-                },
-                headers={
-                    "Retry-After": "60",
-                    "X-RateLimit-Limit": str(self.requests_per_minute),
-                    "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(int(current_time) + 60)
-                }
-            )
-        
-        # Add current request
-        self.rate_limit_storage[minute_key].append(current_time)
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-        
-        return response
-
-# Add error handling middleware first
-app.add_middleware(ErrorHandlingMiddleware)
-
-# Add monitoring middleware
-app.add_middleware(MonitoringMiddleware, collect_system_metrics=True)
-
-# Add request tracking middleware
-app.add_middleware(RequestTrackingMiddleware, enable_detailed_logging=settings.DEBUG)
-
-# Add security middleware
-app.add_middleware(SecurityMiddleware)
+# Request pipeline: one raw-ASGI middleware running each concern as a stage, outermost first
+app.add_middleware(
+    RequestPipelineMiddleware,
+    stages=[
+        RequestTrackingStage(enable_detailed_logging=settings.DEBUG),
+        SecurityHeadersStage(),
+        RequestSizeLimitStage(settings.MAX_REQUEST_SIZE),
+        RateLimitStage(settings.RATE_LIMIT_REQUESTS_PER_MINUTE),
+        MonitoringStage(),
+        LoadSheddingStage(settings.LOAD_SHED_MAX_IN_FLIGHT),
+        ErrorHandlingStage()
+    ]
+)
 
 # Add trusted host middleware for production
 if not settings.DEBUG:
@@ -167,7 +108,8 @@ async def tug_exception_handler(request: Request, exc: TugException):
     )
     return JSONResponse(
         status_code=http_exc.status_code,
-        content=http_exc.detail
+        content=http_exc.detail,
+        headers=http_exc.headers
     )
 
 # Global exception handler for unhandled exceptions
@@ -219,6 +161,9 @@ async def startup_event():
     await init_db()
     logger.info("Database initialized")
     
+    # Sample CPU, memory, file descriptors and event loop lag off the request path
+    system_sampler.start()
+    
     # Start coaching scheduler
     try:
         from .services.coaching_scheduler import start_coaching_scheduler
@@ -228,6 +173,56 @@ async def startup_event():
         logger.error(f"Failed to start coaching scheduler: {e}")
         # Don't fail startup if coaching scheduler fails
     
+    # Follow user invalidations from the other replicas
+    try:
+        from .core.principal_cache import principal_cache
+        await principal_cache.start()
+    except Exception as e:
+        logger.error(f"Failed to start principal cache invalidation: {e}")
+        # Don't fail startup; cached principals expire on their own
+    
+    # Follow friendship changes from the other replicas
+    try:
+        from .services.friend_graph import friend_graph
+        await friend_graph.start()
+    except Exception as e:
+        logger.error(f"Failed to start friend graph invalidation: {e}")
+        # Don't fail startup; cached adjacency expires on its own
+    
+    # Write users' last-seen times in bulk
+    try:
+        from .core.last_seen import last_seen_tracker
+        last_seen_tracker.start()
+    except Exception as e:
+        logger.error(f"Failed to start last-seen tracker: {e}")
+    
+    # Run scheduled jobs; each slot of a distributed job runs on one replica only
+    from .core.scheduler import job_scheduler
+    try:
+        from .services.ml_background_service import start_ml_background_tasks
+        from .services.group_background_service import GroupBackgroundService
+        from .core.auth import register_auth_jobs
+        from .services.search_index_service import register_search_jobs
+        start_ml_background_tasks()
+        if settings.ENABLE_GROUP_FEATURES:
+            GroupBackgroundService.register_jobs(job_scheduler)
+        register_auth_jobs(job_scheduler)
+        register_search_jobs(job_scheduler)
+    except Exception as e:
+        logger.error(f"Failed to register scheduled jobs: {e}")
+    
+    try:
+        job_scheduler.start()
+    except Exception as e:
+        logger.error(f"Failed to start job scheduler: {e}")
+    
+    # Fetch the token signing certificates off the startup path; the job keeps them fresh
+    try:
+        from .core.auth import prefetch_certificates
+        app.state.certificate_prefetch = asyncio.create_task(asyncio.to_thread(prefetch_certificates))
+    except Exception as e:
+        logger.error(f"Failed to start certificate prefetch: {e}")
+    
     # Start WebSocket manager
     try:
         from .services.websocket_manager import websocket_manager
@@ -236,12 +231,21 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to start WebSocket manager: {e}")
         # Don't fail startup if WebSocket manager fails
+    
+    # Start offline message delivery; its queue only exists with group messaging
+    if settings.ENABLE_GROUP_FEATURES:
+        from .services.message_delivery_service import message_delivery_worker
+        message_delivery_worker.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Stop services and close database connection on shutdown"""
     logger.info("Shutting down application")
     
+    # Stop offline message delivery
+    from .services.message_delivery_service import message_delivery_worker
+    await message_delivery_worker.stop()
+    
     # Stop WebSocket manager
     try:
         from .services.websocket_manager import websocket_manager
@@ -250,6 +254,19 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"Error stopping WebSocket manager: {e}")
     
+    # Stop scheduled jobs
+    from .core.scheduler import job_scheduler
+    await job_scheduler.stop()
+    
+    from .core.principal_cache import principal_cache
+    await principal_cache.stop()
+    
+    from .services.friend_graph import friend_graph
+    await friend_graph.stop()
+    
+    from .core.last_seen import last_seen_tracker
+    await last_seen_tracker.stop()
+    
     # Stop coaching scheduler
     try:
         from .services.coaching_scheduler import stop_coaching_scheduler
@@ -258,6 +275,16 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"Error stopping coaching scheduler: {e}")
     
+    # Stop system sampler
+    await system_sampler.stop()
+    
+    # Stop compute pool
+    try:
+        from .core.compute_executor import compute_executor
+        compute_executor.shutdown(wait=False)
+    except Exception as e:
+        logger.error(f"Error stopping compute pool: {e}")
+    
     await close_db()
     logger.info("Database connection closed")
 
@@ -3,9 +3,14 @@ from beanie import Document, Indexed
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 from pydantic import Field
+from pymongo import IndexModel
 from enum import Enum
 
 
+# value_id used by rollups that total a user's activities across all values
+ALL_VALUES_KEY = "_all"
+
+
 class AnalyticsType(str, Enum):
     """Types of analytics data"""
     DAILY = "daily"
@@ -240,4 +245,38 @@ class ActivityPattern(Document):
             # Time-based pattern queries
             [("created_at", -1)],  # Pattern creation timeline
             [("updated_at", -1)],  # Recently updated patterns
-        ]
\ No newline at end of file
+        ]
+
+
+class DailyActivityRollup(Document):
+    """Per-user, per-value activity totals for one day, maintained incrementally on activity writes"""
+    user_id: str
+    value_id: str  # ALL_VALUES_KEY for the user's total across values
+    day: datetime  # Midnight of the activity date
+    weekday: int  # 0=Monday, 6=Sunday
+
+    activity_count: int = 0
+    total_duration: int = 0  # in minutes
+
+    # Histograms keyed by hour of day (0-23) and session length in minutes
+    hour_counts: Dict[str, int] = Field(default_factory=dict)
+    duration_counts: Dict[str, int] = Field(default_factory=dict)
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "daily_activity_rollups"
+        indexes = [
+            IndexModel([("user_id", 1), ("value_id", 1), ("day", 1)], unique=True),  # One rollup per key
+            [("user_id", 1), ("day", -1)],  # Window reads across values
+        ]
+
+
+class AnalyticsRollupState(Document):
+    """Marks a user's rollups as built from their full activity history"""
+    user_id: Indexed(str, unique=True)
+    version: int = 1
+    built_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "analytics_rollup_state"
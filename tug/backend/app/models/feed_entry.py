@@ -0,0 +1,23 @@
+# app/models/feed_entry.py
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel
+from datetime import datetime
+
+
+class FeedEntry(Document):
+    """A post materialized into one user's social feed when it was created"""
+
+    owner_id: str = Field(..., description="ID of the user whose feed this entry is in")
+    post_id: str = Field(..., description="ID of the social post")
+    author_id: str = Field(..., description="ID of the post's author")
+    # Copied from the post so feed pages are read from this collection alone
+    created_at: datetime
+
+    class Settings:
+        name = "feed_entries"
+        indexes = [
+            [("owner_id", 1), ("created_at", -1), ("post_id", -1)],  # Feed pages, newest first
+            IndexModel([("owner_id", 1), ("post_id", 1)], unique=True),  # One entry per feed and post
+            [("post_id", 1)],  # Removal with the post
+        ]
@@ -0,0 +1,34 @@
+# app/models/friend_graph.py
+from beanie import Document, Indexed
+from pydantic import BaseModel, Field
+from typing import Dict
+from datetime import datetime
+
+from .friendship import FriendshipStatus
+
+
+class FriendEdge(BaseModel):
+    """One of a user's friendships, seen from that user's side"""
+    friendship_id: str
+    status: FriendshipStatus
+    outgoing: bool  # True when this user sent the request
+    created_at: datetime
+    updated_at: datetime
+
+
+class UserFriendGraph(Document):
+    """A user's friendships keyed by the other user's id, denormalized from Friendship.
+
+    Each friendship change is applied to both users' documents. A document is only
+    trusted once ``built`` is set by a rebuild from ``friendships``; changes applied
+    before that create a partial document, and ``version`` (bumped by every change)
+    stops a rebuild that raced one from being saved.
+    """
+    user_id: Indexed(str, unique=True)
+    edges: Dict[str, FriendEdge] = Field(default_factory=dict)
+    built: bool = False
+    version: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "user_friend_graphs"
@@ -1,6 +1,7 @@
 # app/models/group_message.py
 from beanie import Document
 from pydantic import Field
+from pymongo import IndexModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -50,6 +51,7 @@ class GroupMessage(Document):
     # Message status and delivery
     status: MessageStatus = Field(default=MessageStatus.SENT, description="Message delivery status")
     delivery_receipts: List[Dict[str, Any]] = Field(default_factory=list, description="Delivery confirmation data")
+    # Legacy per-reader receipts; reads are tracked by MessageReadWatermark
     read_receipts: List[Dict[str, Any]] = Field(default_factory=list, description="Read confirmation data")
     
     # Media and attachments
@@ -156,29 +158,6 @@ class GroupMessage(Document):
         
         self.update_timestamp()
     
-    def add_read_receipt(self, user_id: str, read_at: datetime = None):
-        """Add read confirmation"""
-        if read_at is None:
-            read_at = datetime.utcnow()
-        
-        # Check if receipt already exists
-        for receipt in self.read_receipts:
-            if receipt.get("user_id") == user_id:
-                receipt["read_at"] = read_at  # Update read time
-                return
-        
-        self.read_receipts.append({
-            "user_id": user_id,
-            "read_at": read_at
-        })
-        
-        # Add delivery receipt if not exists
-        self.add_delivery_receipt(user_id, read_at)
-        
-        # Update status
-        self.status = MessageStatus.READ
-        self.update_timestamp()
-    
     def increment_reply_count(self):
         """Increment reply count for threaded messages"""
         self.reply_count += 1
@@ -237,6 +216,28 @@ class MessageReaction(Document):
         self.updated_at = datetime.utcnow()
 
 
+
+class MessageReadWatermark(Document):
+    """How far a user has read in a group's timeline or one of its threads.
+
+    Every message in the same timeline created at or before ``last_read_at`` counts as
+    read, so one document per (user, group, thread) replaces per-message receipts.
+    """
+    
+    user_id: str = Field(..., description="ID of the reader")
+    group_id: str = Field(..., description="ID of the group")
+    thread_id: Optional[str] = Field(None, description="Thread starter ID, or None for the main timeline")
+    last_read_at: datetime = Field(..., description="Creation time of the newest message read")
+    last_read_message_id: Optional[str] = Field(None, description="ID of the newest message read")
+    read_at: datetime = Field(default_factory=datetime.utcnow, description="When the watermark last moved")
+    
+    class Settings:
+        collection = "message_read_watermarks"
+        indexes = [
+            IndexModel([("user_id", 1), ("group_id", 1), ("thread_id", 1)], unique=True),  # One per reader and timeline
+            [("group_id", 1), ("thread_id", 1), ("last_read_at", -1)],  # Readers of a timeline
+        ]
+
 class TypingIndicator(Document):
     """Real-time typing indicators for group chat"""
     
@@ -297,10 +298,16 @@ class MessageQueue(Document):
     last_attempt_at: Optional[datetime] = Field(None)
     completed_at: Optional[datetime] = Field(None)
     
+    # Delivery worker lease
+    claimed_by: Optional[str] = Field(None, description="Worker currently delivering this item")
+    lease_expires_at: Optional[datetime] = Field(None, description="When an unfinished claim may be taken over")
+    last_error: Optional[str] = Field(None, description="Error from the last failed attempt")
+    
     class Settings:
         collection = "message_queue"
         indexes = [
             [("status", 1), ("scheduled_for", 1)],  # Pending messages to process
+            [("status", 1), ("lease_expires_at", 1)],  # Expired delivery leases
             [("group_id", 1), ("status", 1)],  # Group message queue
             [("message_id", 1)],  # Message queue lookup
             [("recipient_user_ids", 1)],  # User delivery queue
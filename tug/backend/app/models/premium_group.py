@@ -1,10 +1,12 @@
 # app/models/premium_group.py
-from beanie import Document
+from beanie import Document, before_event, Insert, Replace, Save, SaveChanges
 from pydantic import Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
 
+from ..utils.search_tokens import index_tokens
+
 class GroupType(str, Enum):
     PRIVATE_PREMIUM = "private_premium"
     PREMIUM_CHALLENGE = "premium_challenge"
@@ -87,6 +89,9 @@ class PremiumGroup(Document):
     total_posts: int = Field(default=0)
     average_engagement_score: float = Field(default=0.0)
     
+    # Maintained on every write; see app/utils/search_tokens.py
+    search_tokens: List[str] = Field(default_factory=list)
+    
     class Settings:
         collection = "premium_groups"
         indexes = [
@@ -98,6 +103,7 @@ class PremiumGroup(Document):
             # Search and discovery
             [("name", "text"), ("description", "text")],  # Text search
             [("custom_tags", 1)],  # Tag-based search
+            [("search_tokens", 1)],  # Prefix and trigram search
             [("group_type", 1), ("privacy_level", 1), ("status", 1)],  # Filtered discovery
             
             # Analytics and performance
@@ -124,6 +130,14 @@ class PremiumGroup(Document):
         """Update the last_activity_at timestamp"""
         self.last_activity_at = datetime.utcnow()
         self.update_timestamp()
+    
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def refresh_search_tokens(self):
+        self.search_tokens = self.build_search_tokens()
+    
+    def build_search_tokens(self) -> List[str]:
+        # Descriptions are long; their words match by prefix only
+        return index_tokens(self.name, *self.custom_tags, prefix_only=[self.description])
 
 
 class GroupMembership(Document):
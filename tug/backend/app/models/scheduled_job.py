@@ -0,0 +1,55 @@
+# app/models/scheduled_job.py
+from beanie import Document, Indexed
+from typing import Any, Dict, Optional
+from datetime import datetime
+from pydantic import Field
+
+
+class ScheduledJobLease(Document):
+    """Which replica owns the current run of a scheduled job.
+
+    One document per job (``job_name`` is unique). A replica claims a run by moving
+    ``slot`` forward to the run's scheduled time; the lease lets another replica take
+    over a run whose owner died before finishing it.
+    """
+    job_name: Indexed(str, unique=True)
+    slot: datetime
+    owner: str
+    status: str = "running"  # running, succeeded, failed
+    lease_expires_at: datetime
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "scheduled_job_leases"
+
+
+class ScheduledJobRun(Document):
+    """History of scheduled job executions"""
+    job_name: Indexed(str)
+    slot: datetime
+    owner: str
+    status: str  # succeeded, failed
+    started_at: datetime
+    finished_at: datetime
+    duration_seconds: float
+    error: Optional[str] = None
+
+    class Settings:
+        name = "scheduled_job_runs"
+        indexes = [
+            [("job_name", 1), ("started_at", -1)],
+        ]
+
+
+class JobCheckpoint(Document):
+    """Progress of a long-running job, so a run that died can resume where it stopped"""
+    job_name: Indexed(str, unique=True)
+    status: str = "running"  # running, completed
+    started_at: datetime
+    # Last key fully processed, in the order the job walks its input
+    last_key: Optional[str] = None
+    stats: Dict[str, Any] = Field(default_factory=dict)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "job_checkpoints"
@@ -30,6 +30,10 @@ class SocialPost(Document):
     # Privacy and visibility
     is_public: bool = Field(default=True, description="Whether post is visible to all friends")
     
+    # True once the post is in its readers' materialized feeds; otherwise feeds read it
+    # from here (authors with many friends, posts from before feeds were materialized)
+    timeline_fanout: Optional[bool] = Field(None, description="Whether the post was fanned out to feeds")
+    
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -45,6 +49,7 @@ class SocialPost(Document):
             # Feed and discovery queries
             [("is_public", 1), ("post_type", 1), ("created_at", -1)],  # Filtered public feed
             [("user_id", 1), ("is_public", 1), ("created_at", -1)],  # User's public posts
+            [("timeline_fanout", 1), ("user_id", 1), ("created_at", -1)],  # Feed posts read on demand
             [("user_id", 1), ("post_type", 1), ("created_at", -1)],  # User's posts by type
             
             # Engagement analytics
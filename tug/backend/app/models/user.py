@@ -1,5 +1,5 @@
 # app/models/user.py
-from beanie import Document, Indexed
+from beanie import Document, Indexed, after_event, before_event, Delete, Insert, Replace, Save, SaveChanges, Update
 from pydantic import EmailStr, Field
 from typing import Dict, Any, Optional, ClassVar, List
 from datetime import datetime
@@ -9,6 +9,8 @@ import re
 import secrets
 from enum import Enum
 
+from ..utils.search_tokens import index_tokens
+
 logger = logging.getLogger(__name__)
 
 class SubscriptionTier(str, Enum):
@@ -36,6 +38,8 @@ class User(Document):
     onboarding_completed: bool = False
     settings: Dict[str, Any] = Field(default_factory=dict)
     version: int = 1
+    # Bumped on every write that changes analytics or predictions; see DataVersionService
+    data_version: int = 0
     
     # Subscription fields
     subscription_tier: SubscriptionTier = Field(default=SubscriptionTier.FREE)
@@ -61,6 +65,9 @@ class User(Document):
     ab_test_cohorts: Dict[str, str] = Field(default_factory=dict)
     conversion_events: List[Dict[str, Any]] = Field(default_factory=list)
     paywall_interactions: List[Dict[str, Any]] = Field(default_factory=list)
+    
+    # Maintained on every write; see app/utils/search_tokens.py
+    search_tokens: List[str] = Field(default_factory=list)
 
     class Settings:
         name = "users"
@@ -78,6 +85,7 @@ class User(Document):
             
             # Performance indexes for user discovery
             [("username", 1), ("display_name", 1)],  # Search functionality
+            [("search_tokens", 1)],  # Prefix and trigram search
             [("created_at", -1), ("onboarding_completed", 1)],  # User analytics
             
             # Subscription indexes for premium features and analytics
@@ -106,6 +114,20 @@ class User(Document):
             }
         }
     
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def refresh_search_tokens(self):
+        self.search_tokens = self.build_search_tokens()
+    
+    def build_search_tokens(self) -> List[str]:
+        return index_tokens(self.username, self.display_name, self.email)
+    
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    async def invalidate_cached_principal(self):
+        """Drop this user from the authentication cache on every replica"""
+        # Imported lazily: the cache module imports this model
+        from ..core.principal_cache import principal_cache
+        await principal_cache.invalidate_user(self.firebase_uid)
+    
     @classmethod
     async def get_by_id(cls, id: str):
         """Get user by ID with proper ObjectId conversion"""
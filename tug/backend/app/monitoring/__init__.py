@@ -13,12 +13,13 @@ This package provides comprehensive monitoring capabilities including:
 
 from .health import health_checker, HealthChecker, HealthStatus
 from .metrics import metrics_collector, MetricsCollector, MetricType
+from .system_sampler import system_sampler, SystemSampler, SystemSample
 from .alerts import alert_manager, AlertManager, AlertSeverity
 from .log_aggregation import log_aggregator, LogAggregator
 from .dashboard import monitoring_dashboard, MonitoringDashboard
 from .deployment_monitor import deployment_monitor, DeploymentMonitor, DeploymentConfig
 from .middleware import (
-    MonitoringMiddleware,
+    MonitoringStage,
     DatabaseMonitoringMiddleware, 
     UserActivityMonitoringMiddleware,
     ErrorTrackingMiddleware,
@@ -32,13 +33,14 @@ __all__ = [
     # Core monitoring components
     'health_checker',
     'metrics_collector', 
+    'system_sampler',
     'alert_manager',
     'log_aggregator',
     'monitoring_dashboard',
     'deployment_monitor',
     
     # Middleware components
-    'MonitoringMiddleware',
+    'MonitoringStage',
     'DatabaseMonitoringMiddleware',
     'UserActivityMonitoringMiddleware', 
     'ErrorTrackingMiddleware',
@@ -52,6 +54,8 @@ __all__ = [
     # Classes for type hints
     'HealthChecker',
     'MetricsCollector',
+    'SystemSampler',
+    'SystemSample',
     'AlertManager',
     'LogAggregator',
     'MonitoringDashboard',
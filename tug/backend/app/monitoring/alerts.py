@@ -14,6 +14,8 @@ import aiohttp
 
 from .health import health_checker, HealthStatus
 from .metrics import metrics_collector
+from .system_sampler import system_sampler
+from ..core.config import settings
 from ..core.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -369,12 +371,11 @@ class AlertManager:
         # High memory usage alert
         def check_high_memory():
             memory_usage = metrics_collector.get_metric_value("system_memory_usage_bytes")
-            if not memory_usage:
+            sample = system_sampler.latest
+            if not memory_usage or sample is None:
                 return False
             
-            import psutil
-            total_memory = psutil.virtual_memory().total
-            usage_percent = (memory_usage / total_memory) * 100
+            usage_percent = (memory_usage / sample.memory_total) * 100
             return usage_percent > 85.0
         
         self.add_alert_rule(AlertRule(
@@ -397,6 +398,20 @@ class AlertManager:
             condition_func=check_high_cpu,
             cooldown_minutes=15
         ))
+        
+        # Request concurrency alert: shedding starts at LOAD_SHED_MAX_IN_FLIGHT
+        def check_high_concurrency():
+            in_flight = metrics_collector.get_metric_value("http_requests_in_flight")
+            limit = settings.LOAD_SHED_MAX_IN_FLIGHT
+            return bool(limit and in_flight and in_flight >= limit * 0.8)
+        
+        self.add_alert_rule(AlertRule(
+            name="high_request_concurrency",
+            description="In-flight requests are above 80% of the load shedding threshold",
+            severity=AlertSeverity.WARNING,
+            condition_func=check_high_concurrency,
+            cooldown_minutes=5
+        ))
     
     async def _monitoring_loop(self):
         """Main monitoring loop"""
@@ -509,13 +524,13 @@ class AlertManager:
             })
         
         elif rule_name in ["high_memory_usage", "high_cpu_usage"]:
-            import psutil
-            memory = psutil.virtual_memory()
-            metadata.update({
-                'memory_usage_percent': round(memory.percent, 1),
-                'cpu_usage_percent': round(psutil.cpu_percent(), 1),
-                'available_memory_gb': round(memory.available / (1024**3), 2)
-            })
+            sample = system_sampler.latest
+            if sample is not None:
+                metadata.update({
+                    'memory_usage_percent': round(sample.memory_percent, 1),
+                    'cpu_usage_percent': round(sample.cpu_percent, 1),
+                    'available_memory_gb': round(sample.memory_available / (1024**3), 2)
+                })
         
         return metadata
     
@@ -7,6 +7,7 @@ import asyncio
 
 from .health import health_checker
 from .metrics import metrics_collector
+from .system_sampler import system_sampler
 from .alerts import alert_manager
 from .log_aggregation import log_aggregator
 from ..core.logging_config import get_logger
@@ -174,10 +175,9 @@ class MonitoringDashboard:
             cpu_usage = metrics_collector.get_metric_value("system_cpu_usage_percent")
             
             system_metrics = []
-            if memory_usage:
-                import psutil
-                total_memory = psutil.virtual_memory().total
-                memory_percent = (memory_usage / total_memory) * 100
+            sample = system_sampler.latest
+            if memory_usage and sample:
+                memory_percent = (memory_usage / sample.memory_total) * 100
                 system_metrics.append(DashboardMetric(
                     name='Memory Usage',
                     value=round(memory_percent, 1),
@@ -241,6 +241,34 @@ async def application_status():
         logger.error(f"Status endpoint failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to get application status: {str(e)}")
 
+@monitoring_router.get("/jobs")
+async def scheduled_jobs(
+    job: Optional[str] = Query(None, description="Include the recent run history of this job"),
+    limit: int = Query(20, ge=1, le=200)
+):
+    """
+    Scheduled job status endpoint
+    
+    Returns each job's schedule, next slot and last run on this replica, and
+    optionally one job's run history across all replicas
+    """
+    try:
+        from ..core.scheduler import job_scheduler
+        
+        status_data = job_scheduler.get_status()
+        if job is not None:
+            if job not in job_scheduler.jobs:
+                raise HTTPException(status_code=404, detail=f"Unknown job: {job}")
+            status_data["history"] = await job_scheduler.get_history(job, limit)
+        status_data["timestamp"] = datetime.utcnow().isoformat() + 'Z'
+        return status_data
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Jobs endpoint failed: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to get job status: {str(e)}")
+
 @monitoring_router.post("/reset-metrics")
 async def reset_metrics():
     """
@@ -253,9 +281,7 @@ async def reset_metrics():
         logger.warning("Metrics reset requested - clearing all metrics data")
         
         # Clear all metrics
-        with metrics_collector._lock:
-            for metric in metrics_collector.metrics.values():
-                metric.samples.clear()
+        metrics_collector.reset()
         
         return {
             "status": "success",
@@ -4,10 +4,12 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from enum import Enum
+import platform
 import psutil
 import logging
 from dataclasses import dataclass, asdict
 
+from .system_sampler import system_sampler
 from ..core.database import get_database
 from ..core.logging_config import get_logger
 
@@ -65,7 +67,8 @@ class HealthChecker:
             'database_response_time_ms': 500,
             'memory_usage_percent': 85,
             'disk_usage_percent': 90,
-            'cpu_usage_percent': 80
+            'cpu_usage_percent': 80,
+            'event_loop_lag_ms': 250
         }
         self._register_default_checks()
     
@@ -75,6 +78,7 @@ class HealthChecker:
         self.register_check('memory', self._check_memory)
         self.register_check('disk', self._check_disk_space)
         self.register_check('cpu', self._check_cpu_usage)
+        self.register_check('event_loop', self._check_event_loop)
         self.register_check('network', self._check_network_connectivity)
     
     def register_check(self, name: str, check_func):
@@ -222,10 +226,10 @@ class HealthChecker:
         start_time = time.time()
         
         try:
-            memory = psutil.virtual_memory()
+            sample = await system_sampler.get_sample()
             response_time_ms = (time.time() - start_time) * 1000
             
-            usage_percent = memory.percent
+            usage_percent = sample.memory_percent
             
             if usage_percent > self.thresholds['memory_usage_percent']:
                 status = HealthStatus.DEGRADED if usage_percent < 95 else HealthStatus.UNHEALTHY
@@ -235,10 +239,12 @@ class HealthChecker:
                 message = f"Memory usage normal: {usage_percent:.1f}%"
             
             details = {
-                'total_gb': round(memory.total / (1024**3), 2),
-                'available_gb': round(memory.available / (1024**3), 2),
-                'used_gb': round(memory.used / (1024**3), 2),
-                'percent': usage_percent
+                'total_gb': round(sample.memory_total / (1024**3), 2),
+                'available_gb': round(sample.memory_available / (1024**3), 2),
+                'used_gb': round(sample.memory_used / (1024**3), 2),
+                'percent': usage_percent,
+                'process_rss_mb': round(sample.process_rss / (1024**2), 1),
+                'sampled_at': sample.timestamp.isoformat() + 'Z'
             } if include_details else None
             
             return HealthCheckResult(
@@ -264,10 +270,10 @@ class HealthChecker:
         start_time = time.time()
         
         try:
-            disk = psutil.disk_usage('/')
+            sample = await system_sampler.get_sample()
             response_time_ms = (time.time() - start_time) * 1000
             
-            usage_percent = (disk.used / disk.total) * 100
+            usage_percent = sample.disk_percent
             
             if usage_percent > self.thresholds['disk_usage_percent']:
                 status = HealthStatus.DEGRADED if usage_percent < 95 else HealthStatus.UNHEALTHY
@@ -277,9 +283,9 @@ class HealthChecker:
                 message = f"Disk usage normal: {usage_percent:.1f}%"
             
             details = {
-                'total_gb': round(disk.total / (1024**3), 2),
-                'used_gb': round(disk.used / (1024**3), 2),
-                'free_gb': round(disk.free / (1024**3), 2),
+                'total_gb': round(sample.disk_total / (1024**3), 2),
+                'used_gb': round(sample.disk_used / (1024**3), 2),
+                'free_gb': round(sample.disk_free / (1024**3), 2),
                 'percent': round(usage_percent, 1)
             } if include_details else None
             
@@ -306,8 +312,9 @@ class HealthChecker:
         start_time = time.time()
         
         try:
-            # Get CPU usage over a short interval
-            cpu_percent = psutil.cpu_percent(interval=0.1)
+            # CPU usage since the sampler's previous sample; nothing blocks here
+            sample = await system_sampler.get_sample()
+            cpu_percent = sample.cpu_percent
             response_time_ms = (time.time() - start_time) * 1000
             
             if cpu_percent > self.thresholds['cpu_usage_percent']:
@@ -319,8 +326,11 @@ class HealthChecker:
             
             details = {
                 'usage_percent': cpu_percent,
-                'core_count': psutil.cpu_count(),
-                'load_average': list(psutil.getloadavg()) if hasattr(psutil, 'getloadavg') else None
+                'process_usage_percent': sample.process_cpu_percent,
+                'core_count': sample.cpu_count,
+                'load_average': sample.load_average,
+                'open_fds': sample.open_fds,
+                'fd_limit': sample.fd_limit
             } if include_details else None
             
             return HealthCheckResult(
@@ -341,16 +351,56 @@ class HealthChecker:
                 details={'error': str(e)} if include_details else None
             )
     
+    async def _check_event_loop(self, include_details: bool = True) -> HealthCheckResult:
+        """Check how late the event loop runs scheduled callbacks"""
+        start_time = time.time()
+        
+        try:
+            sample = await system_sampler.get_sample()
+            response_time_ms = (time.time() - start_time) * 1000
+            
+            lag_ms = sample.event_loop_lag_max_ms
+            threshold_ms = self.thresholds['event_loop_lag_ms']
+            
+            if lag_ms > threshold_ms:
+                status = HealthStatus.DEGRADED if lag_ms < threshold_ms * 4 else HealthStatus.UNHEALTHY
+                message = f"High event loop lag: {lag_ms:.1f}ms"
+            else:
+                status = HealthStatus.HEALTHY
+                message = f"Event loop lag normal: {lag_ms:.1f}ms"
+            
+            details = {
+                'lag_ms': sample.event_loop_lag_ms,
+                'max_lag_ms': lag_ms,
+                'sampler_running': system_sampler.running
+            } if include_details else None
+            
+            return HealthCheckResult(
+                name='event_loop',
+                status=status,
+                response_time_ms=response_time_ms,
+                message=message,
+                details=details
+            )
+            
+        except Exception as e:
+            response_time_ms = (time.time() - start_time) * 1000
+            return HealthCheckResult(
+                name='event_loop',
+                status=HealthStatus.UNHEALTHY,
+                response_time_ms=response_time_ms,
+                message=f"Event loop check failed: {str(e)}",
+                details={'error': str(e)} if include_details else None
+            )
+    
     async def _check_network_connectivity(self, include_details: bool = True) -> HealthCheckResult:
         """Check network connectivity"""
         start_time = time.time()
         
         try:
-            import socket
-            
-            # Check if we can resolve DNS and connect
-            sock = socket.create_connection(('8.8.8.8', 53), timeout=5)
-            sock.close()
+            # Check if we can connect out, without blocking the event loop
+            _, writer = await asyncio.wait_for(asyncio.open_connection('8.8.8.8', 53), timeout=5)
+            writer.close()
             
             response_time_ms = (time.time() - start_time) * 1000
             
@@ -383,19 +433,21 @@ class HealthChecker:
     async def _get_system_info(self) -> Dict[str, Any]:
         """Get general system information"""
         try:
+            sample = await system_sampler.get_sample()
             boot_time = datetime.fromtimestamp(psutil.boot_time())
             uptime = datetime.utcnow() - boot_time
             
             return {
-                'python_version': f"{psutil.version_info.major}.{psutil.version_info.minor}.{psutil.version_info.micro}",
+                'python_version': platform.python_version(),
                 'uptime_seconds': int(uptime.total_seconds()),
                 'uptime_human': str(uptime),
                 'boot_time': boot_time.isoformat() + 'Z',
-                'process_count': len(psutil.pids()),
+                'process_count': sample.process_count,
                 'system': {
-                    'platform': psutil.LINUX if hasattr(psutil, 'LINUX') else 'unknown',
-                    'architecture': 'unknown'  # Would need platform module for this
-                }
+                    'platform': platform.system().lower(),
+                    'architecture': platform.machine()
+                },
+                'resources': sample.to_dict()
             }
         except Exception as e:
             logger.error(f"Failed to get system info: {str(e)}")
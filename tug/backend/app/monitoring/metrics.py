@@ -1,13 +1,13 @@
 # app/monitoring/metrics.py
+import math
 import time
 import threading
-from collections import defaultdict, deque
-from typing import Dict, List, Optional, Any
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Any, Sequence, Tuple
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
-import asyncio
-import json
 
 from ..core.logging_config import get_logger
 
@@ -19,35 +19,147 @@ class MetricType(Enum):
     HISTOGRAM = "histogram"
     SUMMARY = "summary"
 
-@dataclass
-class MetricSample:
-    """Individual metric sample"""
-    value: float
-    timestamp: datetime
-    labels: Dict[str, str] = field(default_factory=dict)
+# Prometheus client defaults; suit request and query latencies in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SUMMARY_QUANTILES: Tuple[float, ...] = (0.5, 0.9, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+OVERFLOW_LABELS: LabelKey = (('series_overflow', 'true'),)
+
+class QuantileSketch:
+    """Streaming quantile estimator with bounded relative error (DDSketch).
+
+    Values are counted in logarithmic bins, so a quantile is accurate to within
+    ``relative_accuracy`` of the true value while memory stays bounded by ``max_bins``
+    no matter how many observations are added. Values <= 0 share a single zero bin.
+    """
+
+    __slots__ = ('relative_accuracy', 'max_bins', '_gamma', '_log_gamma', 'bins', 'zero_count', 'count', 'min', 'max')
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        if value > 0:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + 1
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += 1
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return min(max(0.0, self.min), self.max)
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Midpoint of the bin (gamma^(k-1), gamma^k] in relative terms
+                estimate = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def _collapse(self) -> None:
+        # Fold the lowest bin into its neighbour: keeps the upper quantiles exact-to-accuracy
+        lowest = min(self.bins)
+        count = self.bins.pop(lowest)
+        neighbour = min(self.bins)
+        self.bins[neighbour] += count
+
+class MetricSeries:
+    """Current state of one label combination of a metric"""
+
+    __slots__ = ('labels', 'label_str', 'lock', 'value', 'updated_at', 'count', 'sum', 'bucket_counts', 'sketch')
+
+    def __init__(self, labels: LabelKey, lock: threading.Lock, metric_type: MetricType, bucket_count: int):
+        self.labels = labels
+        self.label_str = ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in labels)
+        self.lock = lock
+        self.value = 0.0  # counter total, gauge value or last observation
+        self.updated_at = 0.0
+        self.count = 0
+        self.sum = 0.0
+        self.bucket_counts: Optional[List[int]] = None
+        self.sketch: Optional[QuantileSketch] = None
+        if metric_type in (MetricType.HISTOGRAM, MetricType.SUMMARY):
+            self.sketch = QuantileSketch()
+        if metric_type == MetricType.HISTOGRAM:
+            # One slot per bound plus +Inf; counts are per bucket and made cumulative on export
+            self.bucket_counts = [0] * (bucket_count + 1)
 
 @dataclass
 class Metric:
-    """Metric definition and storage"""
+    """Metric definition and its label-keyed series"""
     name: str
     metric_type: MetricType
     help_text: str
-    samples: deque = field(default_factory=lambda: deque(maxlen=1000))
     labels: Dict[str, str] = field(default_factory=dict)
+    buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    series: Dict[LabelKey, MetricSeries] = field(default_factory=dict)
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == math.inf else repr(float(bound))
+
+def _join_labels(*parts: str) -> str:
+    joined = ",".join(part for part in parts if part)
+    return "{" + joined + "}" if joined else ""
 
 class MetricsCollector:
-    """Production-ready metrics collection system"""
+    """Production-ready metrics collection system.
+
+    Each metric keeps one series per label combination holding only its current state:
+    a value for counters and gauges, fixed bucket counts plus a quantile sketch for
+    histograms, and a sketch for summaries. Memory is proportional to the number of
+    series, updates are O(1) under a per-series striped lock, and exports walk the
+    series without taking the registry lock.
+    """
     
-    def __init__(self, retention_hours: int = 24):
+    LOCK_STRIPES = 16
+    
+    def __init__(self, max_series_per_metric: int = 10000):
         self.metrics: Dict[str, Metric] = {}
-        self.retention_hours = retention_hours
+        self.max_series_per_metric = max_series_per_metric
+        # Guards registration and series creation only; updates use the stripes
         self._lock = threading.RLock()
+        self._stripes = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
         self.start_time = datetime.utcnow()
         
-        # Performance tracking
-        self.request_durations = defaultdict(lambda: deque(maxlen=1000))
-        self.error_counts = defaultdict(int)
+        # Performance tracking, keyed by "METHOD:route"
         self.request_counts = defaultdict(int)
+        self.error_counts = defaultdict(int)
+        # Moving average over roughly the last 1000 requests per endpoint
+        self.request_duration_ewma: Dict[str, float] = {}
+        self._ewma_alpha = 2 / (1000 + 1)
         
         # System metrics
         self.active_connections = 0
@@ -55,9 +167,6 @@ class MetricsCollector:
         
         # Initialize default metrics
         self._initialize_default_metrics()
-        
-        # Start cleanup task
-        asyncio.create_task(self._cleanup_task())
     
     def _initialize_default_metrics(self):
         """Initialize default application metrics"""
@@ -81,6 +190,24 @@ class MetricsCollector:
             "Current number of HTTP requests being processed"
         )
         
+        self.register_metric(
+            "http_route_requests_in_flight",
+            MetricType.GAUGE,
+            "Current number of HTTP requests being processed per route"
+        )
+        
+        self.register_metric(
+            "http_request_queue_wait_seconds",
+            MetricType.HISTOGRAM,
+            "Time between the load balancer accepting a request (X-Request-Start) and this worker starting it"
+        )
+        
+        self.register_metric(
+            "http_requests_shed_total",
+            MetricType.COUNTER,
+            "Low-priority requests rejected while the worker was overloaded"
+        )
+        
         # Database metrics
         self.register_metric(
             "database_queries_total",
@@ -125,6 +252,79 @@ class MetricsCollector:
             "Total application errors"
         )
         
+        # WebSocket fan-out metrics
+        self.register_metric(
+            "websocket_fanout_duration_seconds",
+            MetricType.HISTOGRAM,
+            "Time from a group broadcast until its last recipient was written to",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+        )
+        
+        self.register_metric(
+            "websocket_messages_dropped_total",
+            MetricType.COUNTER,
+            "Messages dropped from the send queues of slow WebSocket consumers"
+        )
+        
+        self.register_metric(
+            "websocket_slow_consumer_disconnects_total",
+            MetricType.COUNTER,
+            "WebSocket connections closed because their send queue was full or a send timed out"
+        )
+        
+        # Offline message delivery metrics
+        self.register_metric(
+            "message_delivery_items_total",
+            MetricType.COUNTER,
+            "Claimed offline delivery queue items by outcome"
+        )
+        
+        self.register_metric(
+            "message_delivery_notifications_total",
+            MetricType.COUNTER,
+            "Coalesced notifications created for offline recipients"
+        )
+        
+        self.register_metric(
+            "message_delivery_lag_seconds",
+            MetricType.HISTOGRAM,
+            "Time from queuing an offline delivery until it was delivered",
+            buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+        )
+        
+        # Scheduled job metrics
+        self.register_metric(
+            "scheduler_job_runs_total",
+            MetricType.COUNTER,
+            "Scheduled job slots by job and outcome (succeeded, failed, skipped)"
+        )
+        
+        self.register_metric(
+            "scheduler_job_duration_seconds",
+            MetricType.HISTOGRAM,
+            "Time taken by scheduled job runs",
+            buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 1800.0, 3600.0)
+        )
+        
+        # Cache metrics
+        self.register_metric(
+            "cache_requests_total",
+            MetricType.COUNTER,
+            "Cache lookups by cache, tier and result"
+        )
+        
+        self.register_metric(
+            "cache_evictions_total",
+            MetricType.COUNTER,
+            "Entries evicted from in-memory cache tiers"
+        )
+        
+        self.register_metric(
+            "cache_coalesced_total",
+            MetricType.COUNTER,
+            "Cache misses that waited for an in-flight computation"
+        )
+        
         # System metrics
         self.register_metric(
             "system_memory_usage_bytes",
@@ -137,206 +337,266 @@ class MetricsCollector:
             MetricType.GAUGE,
             "System CPU usage percentage"
         )
+        
+        self.register_metric(
+            "process_cpu_usage_percent",
+            MetricType.GAUGE,
+            "CPU usage of this worker process"
+        )
+        
+        self.register_metric(
+            "process_resident_memory_bytes",
+            MetricType.GAUGE,
+            "Resident memory of this worker process in bytes"
+        )
+        
+        self.register_metric(
+            "process_open_fds",
+            MetricType.GAUGE,
+            "Open file descriptors of this worker process"
+        )
+        
+        self.register_metric(
+            "event_loop_lag_seconds",
+            MetricType.GAUGE,
+            "Worst event loop scheduling delay since the previous system sample"
+        )
     
-    def register_metric(self, name: str, metric_type: MetricType, help_text: str, labels: Optional[Dict[str, str]] = None):
-        """Register a new metric"""
+    def register_metric(
+        self,
+        name: str,
+        metric_type: MetricType,
+        help_text: str,
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Optional[Sequence[float]] = None
+    ):
+        """Register a new metric; ``buckets`` are the histogram upper bounds"""
         with self._lock:
             if name not in self.metrics:
                 self.metrics[name] = Metric(
                     name=name,
                     metric_type=metric_type,
                     help_text=help_text,
-                    labels=labels or {}
+                    labels=labels or {},
+                    buckets=tuple(sorted(buckets)) if buckets else DEFAULT_BUCKETS
                 )
                 logger.info(f"Registered metric: {name} ({metric_type.value})")
     
     def increment_counter(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
         """Increment a counter metric"""
-        self._record_sample(name, value, labels, expected_type=MetricType.COUNTER)
+        series = self._get_series(name, labels, MetricType.COUNTER)
+        if series is not None:
+            with series.lock:
+                series.value += value
+                series.updated_at = time.time()
     
     def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
         """Set a gauge metric value"""
-        self._record_sample(name, value, labels, expected_type=MetricType.GAUGE)
+        series = self._get_series(name, labels, MetricType.GAUGE)
+        if series is not None:
+            with series.lock:
+                series.value = value
+                series.updated_at = time.time()
+    
+    def inc_gauge(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        """Atomically raise a gauge, e.g. when a request or query starts"""
+        series = self._get_series(name, labels, MetricType.GAUGE)
+        if series is not None:
+            with series.lock:
+                series.value += value
+                series.updated_at = time.time()
+    
+    def dec_gauge(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        """Atomically lower a gauge raised with ``inc_gauge``"""
+        self.inc_gauge(name, -value, labels)
     
     def observe_histogram(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
         """Record a histogram observation"""
-        self._record_sample(name, value, labels, expected_type=MetricType.HISTOGRAM)
+        series = self._get_series(name, labels, MetricType.HISTOGRAM)
+        if series is not None:
+            bucket = bisect_left(self.metrics[name].buckets, value)
+            with series.lock:
+                series.bucket_counts[bucket] += 1
+                self._observe(series, value)
     
     def observe_summary(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
         """Record a summary observation"""
-        self._record_sample(name, value, labels, expected_type=MetricType.SUMMARY)
+        series = self._get_series(name, labels, MetricType.SUMMARY)
+        if series is not None:
+            with series.lock:
+                self._observe(series, value)
     
-    def _record_sample(self, name: str, value: float, labels: Optional[Dict[str, str]], expected_type: MetricType):
-        """Record a metric sample"""
-        with self._lock:
-            if name not in self.metrics:
-                logger.warning(f"Metric {name} not registered, auto-registering as {expected_type.value}")
-                self.register_metric(name, expected_type, f"Auto-registered metric: {name}")
-            
+    @staticmethod
+    def _observe(series: MetricSeries, value: float):
+        series.count += 1
+        series.sum += value
+        series.value = value
+        series.updated_at = time.time()
+        series.sketch.add(value)
+    
+    def _get_series(self, name: str, labels: Optional[Dict[str, str]], expected_type: MetricType) -> Optional[MetricSeries]:
+        """Find or create the series for a label set"""
+        metric = self.metrics.get(name)
+        if metric is None:
+            logger.warning(f"Metric {name} not registered, auto-registering as {expected_type.value}")
+            self.register_metric(name, expected_type, f"Auto-registered metric: {name}")
             metric = self.metrics[name]
-            if metric.metric_type != expected_type:
-                logger.error(f"Metric type mismatch for {name}: expected {expected_type.value}, got {metric.metric_type.value}")
-                return
-            
-            sample = MetricSample(
-                value=value,
-                timestamp=datetime.utcnow(),
-                labels=labels or {}
-            )
-            
-            metric.samples.append(sample)
+        
+        if metric.metric_type != expected_type:
+            logger.error(f"Metric type mismatch for {name}: expected {expected_type.value}, got {metric.metric_type.value}")
+            return None
+        
+        key = self._label_key(labels)
+        series = metric.series.get(key)
+        if series is not None:
+            return series
+        
+        with self._lock:
+            series = metric.series.get(key)
+            if series is None:
+                if len(metric.series) >= self.max_series_per_metric:
+                    # Unbounded label values would grow memory forever; fold them together
+                    logger.warning(f"Metric {name} reached {self.max_series_per_metric} series, folding new labels into overflow")
+                    key = OVERFLOW_LABELS
+                    series = metric.series.get(key)
+                if series is None:
+                    series = MetricSeries(key, self._stripes[hash(key) % self.LOCK_STRIPES], metric.metric_type, len(metric.buckets))
+                    metric.series[key] = series
+            return series
+    
+    @staticmethod
+    def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+        if not labels:
+            return ()
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+    
+    @staticmethod
+    def _snapshot(metric: Metric) -> List[MetricSeries]:
+        # list() copies the dict in one step, so concurrent series creation can't break iteration
+        return list(metric.series.values())
     
     def get_metric_value(self, name: str, labels: Optional[Dict[str, str]] = None) -> Optional[float]:
-        """Get current metric value"""
-        with self._lock:
-            if name not in self.metrics:
-                return None
-            
-            metric = self.metrics[name]
-            if not metric.samples:
-                return None
-            
-            # For counters, return sum
-            if metric.metric_type == MetricType.COUNTER:
-                return sum(sample.value for sample in metric.samples 
-                          if not labels or sample.labels == labels)
-            
-            # For gauges, return latest value
-            elif metric.metric_type == MetricType.GAUGE:
-                for sample in reversed(metric.samples):
-                    if not labels or sample.labels == labels:
-                        return sample.value
-                return None
-            
-            # For histograms and summaries, return latest value
-            else:
-                for sample in reversed(metric.samples):
-                    if not labels or sample.labels == labels:
-                        return sample.value
-                return None
+        """Get current metric value.
+        
+        With labels this is the matching series. Without labels, counters return the total
+        over all series, and gauges, histograms and summaries the unlabeled series or else
+        the most recently updated one.
+        """
+        metric = self.metrics.get(name)
+        if metric is None:
+            return None
+        
+        if labels:
+            series = metric.series.get(self._label_key(labels))
+            return series.value if series is not None else None
+        
+        all_series = self._snapshot(metric)
+        if not all_series:
+            return None
+        
+        # For counters, return sum
+        if metric.metric_type == MetricType.COUNTER:
+            return sum(series.value for series in all_series)
+        
+        unlabeled = metric.series.get(())
+        if unlabeled is not None:
+            return unlabeled.value
+        return max(all_series, key=lambda series: series.updated_at).value
     
     def get_metrics_summary(self) -> Dict[str, Any]:
         """Get summary of all metrics"""
-        with self._lock:
-            summary = {
-                'timestamp': datetime.utcnow().isoformat() + 'Z',
-                'uptime_seconds': (datetime.utcnow() - self.start_time).total_seconds(),
-                'metrics_count': len(self.metrics),
-                'metrics': {}
+        summary = {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'uptime_seconds': (datetime.utcnow() - self.start_time).total_seconds(),
+            'metrics_count': len(self.metrics),
+            'metrics': {}
+        }
+        
+        for name, metric in list(self.metrics.items()):
+            all_series = self._snapshot(metric)
+            entry = {
+                'type': metric.metric_type.value,
+                'help': metric.help_text,
+                'value': self.get_metric_value(name),
+                'series_count': len(all_series),
+                'sample_count': len(all_series),
+                'labels': metric.labels
             }
             
-            for name, metric in self.metrics.items():
-                latest_value = self.get_metric_value(name)
-                sample_count = len(metric.samples)
-                
-                summary['metrics'][name] = {
-                    'type': metric.metric_type.value,
-                    'help': metric.help_text,
-                    'value': latest_value,
-                    'sample_count': sample_count,
-                    'labels': metric.labels
-                }
-                
-                # Add additional statistics for histograms
-                if metric.metric_type in [MetricType.HISTOGRAM, MetricType.SUMMARY]:
-                    if metric.samples:
-                        values = [s.value for s in metric.samples]
-                        summary['metrics'][name].update({
-                            'min': min(values),
-                            'max': max(values),
-                            'avg': sum(values) / len(values),
-                            'p50': self._percentile(values, 50),
-                            'p95': self._percentile(values, 95),
-                            'p99': self._percentile(values, 99)
-                        })
+            # Add distribution statistics for histograms and summaries
+            if metric.metric_type in [MetricType.HISTOGRAM, MetricType.SUMMARY]:
+                merged = QuantileSketch()
+                total = 0.0
+                for series in all_series:
+                    with series.lock:
+                        merged.merge(series.sketch)
+                        total += series.sum
+                entry['sample_count'] = merged.count
+                if merged.count:
+                    entry.update({
+                        'min': merged.min,
+                        'max': merged.max,
+                        'avg': total / merged.count,
+                        'p50': merged.quantile(0.5),
+                        'p95': merged.quantile(0.95),
+                        'p99': merged.quantile(0.99)
+                    })
             
-            return summary
+            summary['metrics'][name] = entry
+        
+        return summary
     
     def get_prometheus_format(self) -> str:
-        """Export metrics in Prometheus format"""
-        with self._lock:
-            lines = []
+        """Export metrics in Prometheus text format; cost is linear in the number of series"""
+        lines = []
+        
+        for name, metric in list(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help_text}")
+            lines.append(f"# TYPE {name} {metric.metric_type.value}")
             
-            for name, metric in self.metrics.items():
-                # Add help text
-                lines.append(f"# HELP {name} {metric.help_text}")
-                lines.append(f"# TYPE {name} {metric.metric_type.value}")
+            for series in self._snapshot(metric):
+                if metric.metric_type in (MetricType.COUNTER, MetricType.GAUGE):
+                    lines.append(f"{name}{_join_labels(series.label_str)} {series.value}")
                 
-                if metric.metric_type == MetricType.COUNTER:
-                    # For counters, sum all samples
-                    total = sum(sample.value for sample in metric.samples)
-                    lines.append(f"{name} {total}")
+                elif metric.metric_type == MetricType.HISTOGRAM:
+                    with series.lock:
+                        bucket_counts = list(series.bucket_counts)
+                        count, total = series.count, series.sum
+                    cumulative = 0
+                    for bound, bucket_count in zip((*metric.buckets, math.inf), bucket_counts):
+                        cumulative += bucket_count
+                        le = f'le="{_format_bound(bound)}"'
+                        lines.append(f"{name}_bucket{_join_labels(series.label_str, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_join_labels(series.label_str)} {total}")
+                    lines.append(f"{name}_count{_join_labels(series.label_str)} {count}")
                 
-                elif metric.metric_type == MetricType.GAUGE:
-                    # For gauges, use latest value
-                    if metric.samples:
-                        latest = metric.samples[-1]
-                        label_str = self._format_labels(latest.labels)
-                        lines.append(f"{name}{label_str} {latest.value}")
-                
-                elif metric.metric_type in [MetricType.HISTOGRAM, MetricType.SUMMARY]:
-                    # For histograms, provide basic statistics
-                    if metric.samples:
-                        values = [s.value for s in metric.samples]
-                        lines.append(f"{name}_count {len(values)}")
-                        lines.append(f"{name}_sum {sum(values)}")
-                        if values:
-                            lines.append(f"{name}_bucket{{le=\"0.1\"}} {len([v for v in values if v <= 0.1])}")
-                            lines.append(f"{name}_bucket{{le=\"0.5\"}} {len([v for v in values if v <= 0.5])}")
-                            lines.append(f"{name}_bucket{{le=\"1.0\"}} {len([v for v in values if v <= 1.0])}")
-                            lines.append(f"{name}_bucket{{le=\"5.0\"}} {len([v for v in values if v <= 5.0])}")
-                            lines.append(f"{name}_bucket{{le=\"+Inf\"}} {len(values)}")
-                
-                lines.append("")  # Empty line between metrics
+                else:
+                    with series.lock:
+                        quantiles = [(q, series.sketch.quantile(q)) for q in SUMMARY_QUANTILES]
+                        count, total = series.count, series.sum
+                    for q, value in quantiles:
+                        if value is not None:
+                            quantile = f'quantile="{q}"'
+                            lines.append(f"{name}{_join_labels(series.label_str, quantile)} {value}")
+                    lines.append(f"{name}_sum{_join_labels(series.label_str)} {total}")
+                    lines.append(f"{name}_count{_join_labels(series.label_str)} {count}")
             
-            return "\n".join(lines)
-    
-    def _format_labels(self, labels: Dict[str, str]) -> str:
-        """Format labels for Prometheus format"""
-        if not labels:
-            return ""
+            lines.append("")  # Empty line between metrics
         
-        label_parts = [f'{k}="{v}"' for k, v in labels.items()]
-        return "{" + ",".join(label_parts) + "}"
+        return "\n".join(lines)
     
-    def _percentile(self, values: List[float], percentile: int) -> float:
-        """Calculate percentile"""
-        if not values:
-            return 0.0
-        
-        sorted_values = sorted(values)
-        index = int((percentile / 100.0) * len(sorted_values))
-        if index >= len(sorted_values):
-            index = len(sorted_values) - 1
-        return sorted_values[index]
-    
-    async def _cleanup_task(self):
-        """Periodic cleanup of old metric samples"""
-        while True:
-            try:
-                await asyncio.sleep(3600)  # Run every hour
-                await self._cleanup_old_samples()
-            except Exception as e:
-                logger.error(f"Error in metrics cleanup task: {str(e)}")
-    
-    async def _cleanup_old_samples(self):
-        """Remove old metric samples beyond retention period"""
-        cutoff_time = datetime.utcnow() - timedelta(hours=self.retention_hours)
-        
+    def reset(self):
+        """Drop every series and the request aggregates; registrations are kept"""
         with self._lock:
             for metric in self.metrics.values():
-                # Convert deque to list, filter, and convert back
-                samples = list(metric.samples)
-                recent_samples = [s for s in samples if s.timestamp > cutoff_time]
-                
-                metric.samples.clear()
-                metric.samples.extend(recent_samples)
-        
-        logger.info(f"Cleaned up metric samples older than {self.retention_hours} hours")
+                metric.series = {}
+            self.request_counts.clear()
+            self.error_counts.clear()
+            self.request_duration_ewma.clear()
     
     # Performance tracking helpers
     def track_request_duration(self, endpoint: str, method: str, duration_ms: float, status_code: int):
-        """Track HTTP request performance"""
+        """Track HTTP request performance; ``endpoint`` should be a route template, not a raw path"""
         labels = {
             'endpoint': endpoint,
             'method': method,
@@ -349,7 +609,10 @@ class MetricsCollector:
         
         # Track in internal structures for quick access
         key = f"{method}:{endpoint}"
-        self.request_durations[key].append(duration_ms)
+        previous = self.request_duration_ewma.get(key)
+        self.request_duration_ewma[key] = (
+            duration_ms if previous is None else previous + self._ewma_alpha * (duration_ms - previous)
+        )
         self.request_counts[key] += 1
         
         if status_code >= 400:
@@ -367,12 +630,12 @@ class MetricsCollector:
         self.observe_histogram("database_query_duration_seconds", duration_ms / 1000.0, labels=labels)
     
     def track_user_activity(self, activity_type: str, user_id: Optional[str] = None):
-        """Track user activities"""
-        labels = {'activity_type': activity_type}
-        if user_id:
-            labels['user_id'] = user_id
+        """Track user activities.
         
-        self.increment_counter(f"{activity_type}_total", labels=labels)
+        ``user_id`` is accepted for callers' convenience but not used as a label: one series
+        per user would grow without bound.
+        """
+        self.increment_counter(f"{activity_type}_total", labels={'activity_type': activity_type})
     
     def update_system_metrics(self, memory_usage: float, cpu_usage: float, active_connections: int):
         """Update system resource metrics"""
@@ -383,20 +646,22 @@ class MetricsCollector:
     
     def get_performance_summary(self) -> Dict[str, Any]:
         """Get performance summary for monitoring"""
-        with self._lock:
-            return {
-                'requests': {
-                    'total': sum(self.request_counts.values()),
-                    'errors': sum(self.error_counts.values()),
-                    'error_rate': (sum(self.error_counts.values()) / max(sum(self.request_counts.values()), 1)) * 100,
-                    'avg_duration_ms': sum(sum(durations) / len(durations) for durations in self.request_durations.values() if durations) / max(len(self.request_durations), 1)
-                },
-                'database': self.database_pool_stats,
-                'system': {
-                    'active_connections': self.active_connections,
-                    'uptime_seconds': (datetime.utcnow() - self.start_time).total_seconds()
-                }
+        total_requests = sum(self.request_counts.values())
+        total_errors = sum(self.error_counts.values())
+        durations = list(self.request_duration_ewma.values())
+        return {
+            'requests': {
+                'total': total_requests,
+                'errors': total_errors,
+                'error_rate': (total_errors / max(total_requests, 1)) * 100,
+                'avg_duration_ms': sum(durations) / max(len(durations), 1)
+            },
+            'database': self.database_pool_stats,
+            'system': {
+                'active_connections': self.active_connections,
+                'uptime_seconds': (datetime.utcnow() - self.start_time).total_seconds()
             }
+        }
 
 # Global metrics collector instance
-metrics_collector = MetricsCollector()
\ No newline at end of file
+metrics_collector = MetricsCollector()
@@ -1,111 +1,114 @@
 # app/monitoring/middleware.py
 import time
-import psutil
-import asyncio
-from typing import Callable, Optional
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Dict, Optional, Tuple
+
+from starlette.routing import Match
 
 from .metrics import metrics_collector
 from .health import health_checker
 from ..core.logging_config import get_logger
+from ..core.middleware import PipelineStage, RequestContext
 
 logger = get_logger(__name__)
 
-class MonitoringMiddleware(BaseHTTPMiddleware):
-    """Comprehensive monitoring middleware for production observability"""
+class MonitoringStage(PipelineStage):
+    """Request pipeline stage for production metrics (see core.middleware).
     
-    def __init__(self, app, collect_system_metrics: bool = True):
-        super().__init__(app)
-        self.collect_system_metrics = collect_system_metrics
-        self._system_metrics_task = None
-        
-        if collect_system_metrics:
-            # Start system metrics collection
-            asyncio.create_task(self._start_system_metrics_collection())
+    Requests are labelled with the template of the route they match, resolved once per
+    method and path, so in-flight gauges can be raised before the router runs and ids in
+    paths don't create a series per request.
+    """
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Track request start
-        start_time = time.time()
-        
-        # Extract request info
-        method = request.method
-        path = request.url.path
-        
+    ROUTE_CACHE_SIZE = 4096
+    
+    def __init__(self, slow_request_ms: float = 1000):
+        self.slow_request_ms = slow_request_ms
+        self._route_cache: Dict[Tuple[str, str], str] = {}
+    
+    @staticmethod
+    def _is_monitored(ctx: RequestContext) -> bool:
         # Skip monitoring for monitoring endpoints to avoid recursion
-        if path.startswith('/metrics') or path.startswith('/health'):
-            return await call_next(request)
-        
-        # Increment in-flight requests
-        metrics_collector.set_gauge("http_requests_in_flight", 
-                                  metrics_collector.get_metric_value("http_requests_in_flight") or 0 + 1)
-        
+        return not (ctx.path.startswith('/metrics') or ctx.path.startswith('/health'))
+    
+    def _route_template(self, ctx: RequestContext) -> str:
+        key = (ctx.method, ctx.path)
+        template = self._route_cache.get(key)
+        if template is None:
+            template = self._match_route(ctx.scope)
+            if len(self._route_cache) >= self.ROUTE_CACHE_SIZE:
+                # Drop the oldest entry; paths with ids are only worth caching briefly
+                del self._route_cache[next(iter(self._route_cache))]
+            self._route_cache[key] = template
+        return template
+    
+    @staticmethod
+    def _match_route(scope) -> str:
+        # Same matching the router does; a partial match is a route with another method
+        partial = None
+        for route in getattr(getattr(scope.get('app'), 'router', None), 'routes', ()):
+            match, _ = route.matches(scope)
+            if match is Match.FULL:
+                return route.path
+            if match is Match.PARTIAL and partial is None:
+                partial = route.path
+        return partial or 'unmatched'
+    
+    @staticmethod
+    def _queue_wait_seconds(ctx: RequestContext) -> Optional[float]:
+        """Time since the load balancer stamped X-Request-Start (t=<epoch>, in s, ms or us)"""
+        header = ctx.headers.get('x-request-start')
+        if not header:
+            return None
         try:
-            # Process request
-            response = await call_next(request)
-            status_code = response.status_code
-            
-        except Exception as e:
-            # Track errors
-            metrics_collector.increment_counter("errors_total", labels={'error_type': type(e).__name__})
-            logger.error(f"Request failed: {method} {path} - {str(e)}", exc_info=True)
-            raise
+            started = float(header[2:] if header.startswith('t=') else header)
+        except ValueError:
+            return None
+        # Normalise to seconds by magnitude: epoch microseconds > 1e15, milliseconds > 1e12
+        if started > 1e15:
+            started /= 1_000_000
+        elif started > 1e12:
+            started /= 1000
+        return max(0.0, time.time() - started)
+    
+    def on_request(self, ctx: RequestContext) -> None:
+        if not self._is_monitored(ctx):
+            return None
         
-        finally:
-            # Calculate duration
-            duration_ms = (time.time() - start_time) * 1000
-            
-            # Track performance metrics
-            metrics_collector.track_request_duration(path, method, duration_ms, status_code)
-            
-            # Decrement in-flight requests
-            current_in_flight = metrics_collector.get_metric_value("http_requests_in_flight") or 1
-            metrics_collector.set_gauge("http_requests_in_flight", max(0, current_in_flight - 1))
-            
-            # Log slow requests
-            if duration_ms > 1000:  # Log requests slower than 1 second
-                logger.warning(
-                    f"Slow request: {method} {path} took {duration_ms:.2f}ms",
-                    extra={
-                        'endpoint': path,
-                        'method': method,
-                        'duration_ms': duration_ms,
-                        'status_code': status_code,
-                        'slow_request': True
-                    }
-                )
+        ctx.route_template = self._route_template(ctx)
+        metrics_collector.inc_gauge("http_requests_in_flight")
+        metrics_collector.inc_gauge("http_route_requests_in_flight", labels={'endpoint': ctx.route_template})
         
-        return response
+        queue_wait = self._queue_wait_seconds(ctx)
+        if queue_wait is not None:
+            metrics_collector.observe_histogram("http_request_queue_wait_seconds", queue_wait)
+        return None
     
-    async def _start_system_metrics_collection(self):
-        """Start background system metrics collection"""
-        if self._system_metrics_task:
+    def on_complete(self, ctx: RequestContext) -> None:
+        if ctx.route_template is None:
             return
         
-        self._system_metrics_task = asyncio.create_task(self._collect_system_metrics())
-        logger.info("Started system metrics collection")
-    
-    async def _collect_system_metrics(self):
-        """Collect system metrics periodically"""
-        while True:
-            try:
-                # Collect system metrics
-                memory = psutil.virtual_memory()
-                cpu_percent = psutil.cpu_percent(interval=1)
-                
-                # Update metrics
-                metrics_collector.update_system_metrics(
-                    memory_usage=memory.used,
-                    cpu_usage=cpu_percent,
-                    active_connections=getattr(self, '_active_connections', 0)
-                )
-                
-                # Sleep for 30 seconds before next collection
-                await asyncio.sleep(30)
-                
-            except Exception as e:
-                logger.error(f"Error collecting system metrics: {str(e)}")
-                await asyncio.sleep(60)  # Wait longer on error
+        metrics_collector.dec_gauge("http_requests_in_flight")
+        metrics_collector.dec_gauge("http_route_requests_in_flight", labels={'endpoint': ctx.route_template})
+        
+        if ctx.error is not None:
+            metrics_collector.increment_counter("errors_total", labels={'error_type': type(ctx.error).__name__})
+        
+        # Track performance metrics
+        duration_ms = ctx.elapsed_ms
+        metrics_collector.track_request_duration(ctx.route_template, ctx.method, duration_ms, ctx.status_code)
+        
+        # Log slow requests
+        if duration_ms > self.slow_request_ms:
+            logger.warning(
+                f"Slow request: {ctx.method} {ctx.path} took {duration_ms:.2f}ms",
+                extra={
+                    'endpoint': ctx.path,
+                    'method': ctx.method,
+                    'duration_ms': duration_ms,
+                    'status_code': ctx.status_code,
+                    'slow_request': True
+                }
+            )
 
 class DatabaseMonitoringMiddleware:
     """Middleware to monitor database operations"""
@@ -123,8 +126,7 @@ class DatabaseMonitoringMiddleware:
         }
         
         # Track active database connections
-        current_active = metrics_collector.get_metric_value("database_connections_active") or 0
-        metrics_collector.set_gauge("database_connections_active", current_active + 1)
+        metrics_collector.inc_gauge("database_connections_active")
         
         return query_id
     
@@ -158,8 +160,7 @@ class DatabaseMonitoringMiddleware:
             )
         
         # Update active connections count
-        current_active = metrics_collector.get_metric_value("database_connections_active") or 1
-        metrics_collector.set_gauge("database_connections_active", max(0, current_active - 1))
+        metrics_collector.dec_gauge("database_connections_active")
 
 # Global database monitoring instance
 db_monitor = DatabaseMonitoringMiddleware()
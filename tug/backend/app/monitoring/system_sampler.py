@@ -0,0 +1,193 @@
+# app/monitoring/system_sampler.py
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from .metrics import metrics_collector
+from ..core.config import settings
+from ..core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@dataclass(frozen=True)
+class SystemSample:
+    """One snapshot of system and process resources"""
+    timestamp: datetime
+    cpu_percent: float
+    cpu_count: int
+    load_average: Optional[List[float]]
+    memory_total: int
+    memory_used: int
+    memory_available: int
+    memory_percent: float
+    disk_total: int
+    disk_used: int
+    disk_free: int
+    process_cpu_percent: float
+    process_rss: int
+    open_fds: Optional[int]
+    fd_limit: Optional[int]
+    process_count: int
+    event_loop_lag_ms: float
+    event_loop_lag_max_ms: float
+
+    @property
+    def disk_percent(self) -> float:
+        return (self.disk_used / self.disk_total) * 100 if self.disk_total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result['timestamp'] = self.timestamp.isoformat() + 'Z'
+        result['disk_percent'] = round(self.disk_percent, 1)
+        return result
+
+
+class SystemSampler:
+    """Samples system resources off the event loop and caches the latest sample.
+
+    psutil calls run on a dedicated thread and use non-blocking deltas: CPU usage is the
+    utilisation since the previous sample rather than a blocking measurement interval.
+    Event-loop lag is measured on the loop by a probe that sleeps for a fixed interval and
+    records how late it wakes up. Health checks, dashboards and alerts read ``latest``
+    instead of calling psutil themselves.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: Optional[float] = None,
+        lag_probe_seconds: Optional[float] = None,
+        disk_path: str = '/'
+    ):
+        self.interval_seconds = (
+            settings.SYSTEM_SAMPLE_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        )
+        self.lag_probe_seconds = (
+            settings.EVENT_LOOP_LAG_PROBE_SECONDS if lag_probe_seconds is None else lag_probe_seconds
+        )
+        self.disk_path = disk_path
+        self._latest: Optional[SystemSample] = None
+        self._process = psutil.Process(os.getpid())
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+        self._lag_ms = 0.0
+        self._lag_max_ms = 0.0
+
+    @property
+    def latest(self) -> Optional[SystemSample]:
+        """The most recent sample, or None before the first one was taken"""
+        return self._latest
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Start sampling; must be called from the running event loop"""
+        if self._tasks:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="system-sampler")
+        self._tasks = [
+            asyncio.create_task(self._run_sampler()),
+            asyncio.create_task(self._run_lag_probe())
+        ]
+        logger.info(f"Started system sampler (every {self.interval_seconds}s)")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def get_sample(self) -> SystemSample:
+        """The cached sample, taking one off-loop if none exists yet"""
+        if self._latest is None:
+            self._publish(await asyncio.get_running_loop().run_in_executor(self._executor, self._take_sample))
+        return self._latest
+
+    async def _run_sampler(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Prime the CPU counters so the first sample measures a real interval
+        await loop.run_in_executor(self._executor, self._prime)
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                self._publish(await loop.run_in_executor(self._executor, self._take_sample))
+            except Exception as e:
+                logger.error(f"Error sampling system metrics: {str(e)}")
+
+    async def _run_lag_probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_probe_seconds
+            await asyncio.sleep(self.lag_probe_seconds)
+            self._lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self._lag_max_ms = max(self._lag_max_ms, self._lag_ms)
+
+    def _prime(self) -> None:
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+
+    def _take_sample(self) -> SystemSample:
+        """Read every resource once; runs on the sampler thread"""
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+
+        # Worst lag since the previous sample; the probe keeps raising it until we reset
+        lag_max_ms, self._lag_max_ms = self._lag_max_ms, 0.0
+
+        return SystemSample(
+            timestamp=datetime.utcnow(),
+            cpu_percent=psutil.cpu_percent(interval=None),
+            cpu_count=psutil.cpu_count() or 1,
+            load_average=list(psutil.getloadavg()) if hasattr(psutil, 'getloadavg') else None,
+            memory_total=memory.total,
+            memory_used=memory.used,
+            memory_available=memory.available,
+            memory_percent=memory.percent,
+            disk_total=disk.total,
+            disk_used=disk.used,
+            disk_free=disk.free,
+            process_cpu_percent=self._process.cpu_percent(interval=None),
+            process_rss=self._process.memory_info().rss,
+            open_fds=self._open_fds(),
+            fd_limit=resource.getrlimit(resource.RLIMIT_NOFILE)[0] if resource else None,
+            process_count=len(psutil.pids()),
+            event_loop_lag_ms=round(self._lag_ms, 2),
+            event_loop_lag_max_ms=round(max(lag_max_ms, self._lag_ms), 2)
+        )
+
+    def _open_fds(self) -> Optional[int]:
+        try:
+            if hasattr(self._process, 'num_fds'):
+                return self._process.num_fds()
+            return self._process.num_handles()
+        except psutil.Error:
+            return None
+
+    def _publish(self, sample: SystemSample) -> None:
+        self._latest = sample
+        metrics_collector.set_gauge("system_cpu_usage_percent", sample.cpu_percent)
+        metrics_collector.set_gauge("system_memory_usage_bytes", sample.memory_used)
+        metrics_collector.set_gauge("process_cpu_usage_percent", sample.process_cpu_percent)
+        metrics_collector.set_gauge("process_resident_memory_bytes", sample.process_rss)
+        if sample.open_fds is not None:
+            metrics_collector.set_gauge("process_open_fds", sample.open_fds)
+        metrics_collector.set_gauge("event_loop_lag_seconds", sample.event_loop_lag_max_ms / 1000)
+
+
+# Global system sampler instance
+system_sampler = SystemSampler()
@@ -164,6 +164,14 @@ class TypingIndicatorResponse(BaseModel):
     typing_users: List[TypingUser] = Field(..., description="Users currently typing")
     count: int = Field(..., description="Number of users typing")
 
+class UnreadCountResponse(BaseModel):
+    """Response schema for a user's unread messages in a timeline"""
+    group_id: str = Field(..., description="Group ID")
+    thread_id: Optional[str] = Field(None, description="Thread ID, or None for the main timeline")
+    unread_count: int = Field(..., description="Messages from others newer than the read watermark")
+    last_read_at: Optional[datetime] = Field(None, description="Creation time of the newest message read")
+    last_read_message_id: Optional[str] = Field(None, description="ID of the newest message read")
+
 # WebSocket Message Schemas
 class WebSocketMessageType(str, Enum):
     # Outgoing (server -> client)
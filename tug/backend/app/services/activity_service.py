@@ -10,6 +10,9 @@ from ..models.value import Value
 from ..models.activity import Activity
 from ..models.social_post import SocialPost, PostType
 from ..schemas.activity import ActivityCreate, ActivityUpdate, ActivityStatistics
+from .analytics_rollup_service import AnalyticsRollupService, ActivityContribution
+from .data_version_service import DataVersionService
+from .timeline_service import TimelineService
 
 
 logger = logging.getLogger(__name__)
@@ -66,6 +69,8 @@ class ActivityService:
         )
         
         await new_activity.insert()
+        await AnalyticsRollupService.record_activity_created(new_activity)
+        await DataVersionService.bump(user)
         
         # Create social post if activity is public and has user-provided notes
         # Use the primary (first) value for social post
@@ -126,10 +131,7 @@ class ActivityService:
     async def update_activity(user: User, activity_id: str, activity_data: ActivityUpdate) -> Activity:
         """Update a specific activity"""
         # Find activity
-        activity = await Activity.find_one(
-            Activity.id == activity_id,
-            Activity.user_id == str(user.id)
-        )
+        activity = await Activity.get_by_id(activity_id, str(user.id))
         
         if not activity:
             raise HTTPException(
@@ -159,22 +161,27 @@ class ActivityService:
             )
         
         # Update activity
+        previous_contribution = ActivityContribution.from_activity(activity)
         for field, field_value in update_data.items():
             setattr(activity, field, field_value)
         
         await activity.save()
+        await AnalyticsRollupService.record_activity_updated(previous_contribution, activity)
+        await DataVersionService.bump(user)
         return activity
 
     @staticmethod
     async def delete_activity(user: User, activity_id: str) -> None:
         """Delete an activity after validating ownership"""
-        activity = await Activity.get_by_id(activity_id, user.id)
+        activity = await Activity.get_by_id(activity_id, str(user.id))
         if not activity:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Activity not found"
             )
         await activity.delete()
+        await AnalyticsRollupService.record_activity_deleted(activity)
+        await DataVersionService.bump(user)
 
     @staticmethod
     async def get_activity_statistics(
@@ -357,6 +364,7 @@ class ActivityService:
             )
             
             await social_post.save()
+            await TimelineService.fan_out(social_post)
             logger.info(f"Created social post for activity {activity.id} by user {user.id}")
             
         except Exception as e:
@@ -0,0 +1,303 @@
+# app/services/analytics_rollup_service.py
+"""
+Incremental daily analytics rollups.
+
+Every activity contributes to one DailyActivityRollup per (user, value, day) plus the
+user's all-values rollup for that day. ActivityService applies the contribution on
+create, reverses it on delete and swaps old for new on update, so analytics read a
+handful of small documents per day instead of every activity in the window.
+"""
+
+import logging
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from ..models.activity import Activity
+from ..models.analytics import ALL_VALUES_KEY, AnalyticsRollupState, DailyActivityRollup
+
+logger = logging.getLogger(__name__)
+
+# Bump to rebuild every user's rollups after a change to how they are computed
+ROLLUP_VERSION = 1
+
+
+@dataclass(frozen=True)
+class ActivityContribution:
+    """The part of an activity that the rollups depend on"""
+    day: date
+    hour: int
+    duration: int
+    value_ids: tuple
+
+    @classmethod
+    def from_activity(cls, activity: Activity) -> "ActivityContribution":
+        return cls(
+            day=activity.date.date(),
+            hour=activity.date.hour,
+            duration=activity.duration,
+            value_ids=tuple(dict.fromkeys(activity.effective_value_ids))
+        )
+
+    @property
+    def rollup_keys(self) -> List[str]:
+        return [ALL_VALUES_KEY, *self.value_ids]
+
+
+@dataclass
+class RollupSummary:
+    """Rollups for one value (or all values) merged over a window of days.
+
+    Active days are kept as a bitmap where bit ``i`` is ``start_day + i``.
+    """
+    start_day: date
+    end_day: date
+    activity_count: int = 0
+    total_duration: int = 0
+    active_days: int = 0
+    daily: Dict[date, List[int]] = field(default_factory=dict)  # day -> [count, duration]
+    hour_histogram: List[int] = field(default_factory=lambda: [0] * 24)
+    weekday_histogram: List[int] = field(default_factory=lambda: [0] * 7)
+    duration_counts: Dict[int, int] = field(default_factory=dict)
+
+    def add(self, rollup: DailyActivityRollup) -> None:
+        day = rollup.day.date()
+        self.activity_count += rollup.activity_count
+        self.total_duration += rollup.total_duration
+        self.daily[day] = [rollup.activity_count, rollup.total_duration]
+        self.weekday_histogram[rollup.weekday] += rollup.activity_count
+        self.active_days |= 1 << (day - self.start_day).days
+
+        for hour, count in rollup.hour_counts.items():
+            self.hour_histogram[int(hour)] += count
+        for duration, count in rollup.duration_counts.items():
+            if count:
+                self.duration_counts[int(duration)] = self.duration_counts.get(int(duration), 0) + count
+
+    @property
+    def active_day_count(self) -> int:
+        return self.active_days.bit_count()
+
+    def current_streak(self, today: date) -> int:
+        """Consecutive active days ending today"""
+        offset = (today - self.start_day).days
+        if offset < 0 or not (self.active_days >> offset) & 1:
+            return 0
+        # Trailing ones of the bitmap cut at today
+        bits = self.active_days & ((1 << (offset + 1)) - 1)
+        inverted = ~bits & ((1 << (offset + 1)) - 1)
+        return offset + 1 - inverted.bit_length()
+
+    def streak_lengths(self) -> List[int]:
+        """Lengths of every run of consecutive active days, oldest first"""
+        streaks = []
+        bits = self.active_days
+        while bits:
+            bits >>= (bits & -bits).bit_length() - 1  # Skip inactive days
+            run = (~bits & (bits + 1)).bit_length() - 1  # Count the run of ones
+            streaks.append(run)
+            bits >>= run
+        return streaks
+
+    def duration_stats(self) -> Dict[str, float]:
+        """Mean, median, mode and sample standard deviation of session lengths"""
+        n = sum(self.duration_counts.values())
+        if n == 0:
+            return {}
+
+        durations = sorted(self.duration_counts)
+        mean = sum(d * c for d, c in self.duration_counts.items()) / n
+        variance = (
+            sum(c * (d - mean) ** 2 for d, c in self.duration_counts.items()) / (n - 1) if n > 1 else 0
+        )
+        mode = max(durations, key=lambda d: self.duration_counts[d])
+
+        return {
+            "average": round(mean, 2),
+            "median": round(self._median(durations, n), 2),
+            "mode": mode,
+            "std_dev": round(math.sqrt(variance), 2) if n > 1 else 0
+        }
+
+    def _median(self, durations: List[int], n: int) -> float:
+        lower_rank, upper_rank = (n - 1) // 2, n // 2
+        lower = upper = None
+        seen = 0
+        for duration in durations:
+            seen += self.duration_counts[duration]
+            if lower is None and seen > lower_rank:
+                lower = duration
+            if seen > upper_rank:
+                upper = duration
+                break
+        return (lower + upper) / 2
+
+    @property
+    def min_duration(self) -> int:
+        return min(self.duration_counts) if self.duration_counts else 0
+
+    @property
+    def max_duration(self) -> int:
+        return max(self.duration_counts) if self.duration_counts else 0
+
+
+class AnalyticsRollupService:
+    """Maintains and reads the daily analytics rollups"""
+
+    @staticmethod
+    def _day_start(day: date) -> datetime:
+        return datetime(day.year, day.month, day.day)
+
+    @staticmethod
+    def _rollup_updates(user_id: str, contribution: ActivityContribution, sign: int) -> List[UpdateOne]:
+        day_start = AnalyticsRollupService._day_start(contribution.day)
+        increments = {
+            "activity_count": sign,
+            "total_duration": sign * contribution.duration,
+            f"hour_counts.{contribution.hour}": sign,
+            f"duration_counts.{contribution.duration}": sign,
+        }
+        return [
+            UpdateOne(
+                {"user_id": user_id, "value_id": value_id, "day": day_start},
+                {
+                    "$inc": increments,
+                    "$set": {"updated_at": datetime.utcnow()},
+                    "$setOnInsert": {"weekday": contribution.day.weekday()}
+                },
+                upsert=True
+            )
+            for value_id in contribution.rollup_keys
+        ]
+
+    @staticmethod
+    async def _apply(
+        user_id: str,
+        added: Optional[ActivityContribution] = None,
+        removed: Optional[ActivityContribution] = None
+    ) -> None:
+        if added == removed:
+            return
+
+        updates = []
+        if removed is not None:
+            updates.extend(AnalyticsRollupService._rollup_updates(user_id, removed, -1))
+        if added is not None:
+            updates.extend(AnalyticsRollupService._rollup_updates(user_id, added, 1))
+
+        try:
+            await DailyActivityRollup.get_motor_collection().bulk_write(updates, ordered=False)
+        except Exception as e:
+            # Rollups are derived data: rebuild them from activities on the next read
+            logger.error(f"Failed to update analytics rollups for user {user_id}: {e}")
+            await AnalyticsRollupService.invalidate(user_id)
+
+    @staticmethod
+    async def record_activity_created(activity: Activity) -> None:
+        await AnalyticsRollupService._apply(
+            activity.user_id, added=ActivityContribution.from_activity(activity)
+        )
+
+    @staticmethod
+    async def record_activity_updated(previous: ActivityContribution, activity: Activity) -> None:
+        await AnalyticsRollupService._apply(
+            activity.user_id, added=ActivityContribution.from_activity(activity), removed=previous
+        )
+
+    @staticmethod
+    async def record_activity_deleted(activity: Activity) -> None:
+        await AnalyticsRollupService._apply(
+            activity.user_id, removed=ActivityContribution.from_activity(activity)
+        )
+
+    @staticmethod
+    async def invalidate(user_id: str) -> None:
+        """Force a rebuild of the user's rollups on their next analytics read"""
+        try:
+            await AnalyticsRollupState.find(AnalyticsRollupState.user_id == user_id).delete()
+        except Exception as e:
+            logger.error(f"Failed to invalidate analytics rollups for user {user_id}: {e}")
+
+    @staticmethod
+    async def ensure_user_rollups(user_id: str) -> None:
+        """Build the user's rollups from their activity history if they were never built"""
+        state = await AnalyticsRollupState.find_one(AnalyticsRollupState.user_id == user_id)
+        if state is None or state.version != ROLLUP_VERSION:
+            await AnalyticsRollupService.rebuild_user_rollups(user_id)
+
+    @staticmethod
+    async def rebuild_user_rollups(user_id: str) -> int:
+        """Recompute all of a user's rollups from their activities; returns the rollup count.
+
+        Writes that land while the rebuild runs can be lost, so this is meant for backfill
+        and repair rather than the request path's steady state.
+        """
+        rollups: Dict[tuple, DailyActivityRollup] = {}
+
+        async for activity in Activity.find(Activity.user_id == user_id):
+            contribution = ActivityContribution.from_activity(activity)
+            for value_id in contribution.rollup_keys:
+                key = (value_id, contribution.day)
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = rollups[key] = DailyActivityRollup(
+                        user_id=user_id,
+                        value_id=value_id,
+                        day=AnalyticsRollupService._day_start(contribution.day),
+                        weekday=contribution.day.weekday()
+                    )
+                rollup.activity_count += 1
+                rollup.total_duration += contribution.duration
+                hour, duration = str(contribution.hour), str(contribution.duration)
+                rollup.hour_counts[hour] = rollup.hour_counts.get(hour, 0) + 1
+                rollup.duration_counts[duration] = rollup.duration_counts.get(duration, 0) + 1
+
+        await DailyActivityRollup.find(DailyActivityRollup.user_id == user_id).delete()
+        if rollups:
+            await DailyActivityRollup.insert_many(list(rollups.values()))
+
+        state = await AnalyticsRollupState.find_one(AnalyticsRollupState.user_id == user_id)
+        if state is None:
+            state = AnalyticsRollupState(user_id=user_id)
+        state.version = ROLLUP_VERSION
+        state.built_at = datetime.utcnow()
+        await state.save()
+
+        logger.info(f"Rebuilt {len(rollups)} analytics rollups for user {user_id}")
+        return len(rollups)
+
+    @staticmethod
+    async def load_summaries(
+        user_id: str,
+        start_day: date,
+        end_day: date,
+        value_ids: Optional[Iterable[str]] = None
+    ) -> Dict[str, RollupSummary]:
+        """Merge the user's rollups in [start_day, end_day] into one summary per value_id.
+
+        The all-values summary is always present under ALL_VALUES_KEY.
+        """
+        await AnalyticsRollupService.ensure_user_rollups(user_id)
+
+        query = {
+            "user_id": user_id,
+            "day": {
+                "$gte": AnalyticsRollupService._day_start(start_day),
+                "$lte": AnalyticsRollupService._day_start(end_day)
+            },
+            "activity_count": {"$gt": 0}
+        }
+        if value_ids is not None:
+            query["value_id"] = {"$in": [ALL_VALUES_KEY, *value_ids]}
+
+        summaries: Dict[str, RollupSummary] = {ALL_VALUES_KEY: RollupSummary(start_day, end_day)}
+        async for rollup in DailyActivityRollup.find(query):
+            summary = summaries.get(rollup.value_id)
+            if summary is None:
+                summary = summaries[rollup.value_id] = RollupSummary(start_day, end_day)
+            summary.add(rollup)
+
+        return summaries
@@ -1,6 +1,6 @@
 # app/services/analytics_service.py
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
 from bson import ObjectId
 import logging
 from collections import defaultdict, Counter
@@ -36,16 +36,28 @@ from matplotlib.backends.backend_pdf import PdfPages
 import pandas as pd
 from PIL import Image as PILImage
 
+from ..core.cache import build_cache
+from ..core.compute_executor import compute_executor
+from ..core.config import settings
 from ..models.user import User
 from ..models.activity import Activity
 from ..models.value import Value
 from ..models.analytics import (
-    UserAnalytics, ValueInsights, StreakHistory, ActivityPattern,
-    AnalyticsType, MetricType
+    ValueInsights, StreakHistory, ActivityPattern,
+    AnalyticsType, ALL_VALUES_KEY
 )
+from .analytics_rollup_service import AnalyticsRollupService, RollupSummary
+from .data_version_service import DataVersionService
 
 logger = logging.getLogger(__name__)
 
+# Sections returned by generate_user_analytics; all but predictions come from the rollups
+ANALYTICS_SECTIONS = ("overview", "value_breakdown", "trends", "patterns", "streaks", "predictions")
+ROLLUP_SECTIONS = {"overview", "value_breakdown", "trends", "patterns", "streaks"}
+
+# Rollup sections per (user, data version, day, window, type, sections)
+analytics_cache = build_cache("analytics")
+
 
 class AnalyticsService:
     """Service for advanced analytics and insights - Premium Feature"""
@@ -54,51 +66,105 @@ class AnalyticsService:
     async def generate_user_analytics(
         user: User, 
         analytics_type: AnalyticsType = AnalyticsType.MONTHLY,
-        days_back: int = 30
+        days_back: int = 30,
+        sections: Optional[Iterable[str]] = None
     ) -> Dict[str, Any]:
-        """Generate comprehensive analytics for a user (Premium Feature)"""
+        """Generate analytics for a user (Premium Feature)
+
+        Only the requested ``sections`` are computed (all of them by default). Everything
+        except predictions is served from the daily rollups; predictions still load the
+        activities because the ML models need them. Rollup sections are cached until the
+        user's data version changes.
+        """
+        requested = set(sections) if sections is not None else set(ANALYTICS_SECTIONS)
         
         # Calculate date ranges
         end_date = datetime.now(timezone.utc)
         start_date = end_date - timedelta(days=days_back)
+        user_id = str(user.id)
+        
+        analytics = {}
+        
+        if requested & ROLLUP_SECTIONS:
+            # Keyed on the data version, so entries live until the user's data changes; the
+            # day is part of the key because streaks and trends are relative to today
+            rollup_sections = sorted(requested & ROLLUP_SECTIONS)
+            data_version = await DataVersionService.current(user)
+            cache_key = ":".join([
+                user_id,
+                f"v{data_version}",
+                end_date.strftime("%Y%m%d"),
+                str(days_back),
+                analytics_type.value,
+                ",".join(rollup_sections)
+            ])
+            analytics.update(await analytics_cache.get_or_compute(
+                cache_key,
+                lambda: AnalyticsService._calculate_rollup_sections(
+                    user_id, rollup_sections, analytics_type, start_date, end_date
+                ),
+                ttl_seconds=settings.ANALYTICS_CACHE_TTL_SECONDS,
+                tags=[user_id]
+            ))
+        
+        if "predictions" in requested:
+            activities = await Activity.find(
+                Activity.user_id == user_id,
+                Activity.date >= start_date,
+                Activity.date <= end_date
+            ).sort([("date", -1)]).to_list()
+            analytics["predictions"] = await AnalyticsService._generate_predictions(user, activities)
+        
+        analytics["generated_at"] = datetime.now(timezone.utc)
+        return analytics
+
+    @staticmethod
+    async def _calculate_rollup_sections(
+        user_id: str,
+        requested: Iterable[str],
+        analytics_type: AnalyticsType,
+        start_date: datetime,
+        end_date: datetime
+    ) -> Dict[str, Any]:
+        """Compute the requested rollup-backed sections"""
         
-        # Get user activities in the period
-        activities = await Activity.find(
-            Activity.user_id == str(user.id),
-            Activity.date >= start_date,
-            Activity.date <= end_date
-        ).sort([("date", -1)]).to_list()
-        
-        # Get all user values for context
-        values = await Value.find(Value.user_id == str(user.id)).to_list()
-        value_map = {str(v.id): v for v in values}
-        
-        # Calculate comprehensive metrics
-        analytics = {
-            "overview": await AnalyticsService._calculate_overview_metrics(activities, start_date, end_date),
-            "value_breakdown": await AnalyticsService._calculate_value_breakdown(activities, value_map),
-            "trends": await AnalyticsService._calculate_trends(activities, analytics_type),
-            "patterns": await AnalyticsService._calculate_activity_patterns(activities),
-            "streaks": await AnalyticsService._calculate_streak_analytics(user, activities, value_map),
-            "predictions": await AnalyticsService._generate_predictions(user, activities),
-            "generated_at": datetime.now(timezone.utc)
-        }
+        requested = set(requested)
+        analytics = {}
         
-        # Store analytics for faster future access
-        await AnalyticsService._store_analytics_cache(user, analytics, analytics_type)
+        # Values are only needed to label per-value sections
+        value_map = {}
+        if requested & {"value_breakdown", "streaks"}:
+            values = await Value.find(Value.user_id == user_id).to_list()
+            value_map = {str(v.id): v for v in values}
+        
+        summaries = await AnalyticsRollupService.load_summaries(
+            user_id, start_date.date(), end_date.date(), value_ids=value_map.keys()
+        )
+        totals = summaries[ALL_VALUES_KEY]
+        
+        if "overview" in requested:
+            analytics["overview"] = AnalyticsService._calculate_overview_metrics(totals, start_date, end_date)
+        if "value_breakdown" in requested:
+            analytics["value_breakdown"] = AnalyticsService._calculate_value_breakdown(summaries, value_map)
+        if "trends" in requested:
+            analytics["trends"] = AnalyticsService._calculate_trends(totals, analytics_type)
+        if "patterns" in requested:
+            analytics["patterns"] = AnalyticsService._calculate_rollup_patterns(totals)
+        if "streaks" in requested:
+            analytics["streaks"] = AnalyticsService._calculate_streak_analytics(summaries, value_map)
         
         return analytics
 
     @staticmethod
-    async def _calculate_overview_metrics(
-        activities: List[Activity], 
+    def _calculate_overview_metrics(
+        totals: RollupSummary, 
         start_date: datetime, 
         end_date: datetime
     ) -> Dict[str, Any]:
         """Calculate high-level overview metrics"""
         
-        total_activities = len(activities)
-        total_duration = sum(a.duration for a in activities)
+        total_activities = totals.activity_count
+        total_duration = totals.total_duration
         
         # Calculate daily averages
         total_days = (end_date - start_date).days + 1
@@ -106,7 +172,7 @@ class AnalyticsService:
         avg_daily_duration = round(total_duration / total_days, 2) if total_days > 0 else 0
         
         # Calculate active days
-        active_days = len(set(a.date.date() for a in activities))
+        active_days = totals.active_day_count
         consistency_percentage = round((active_days / total_days) * 100, 1) if total_days > 0 else 0
         
         # Calculate productivity score (activities per hour of total duration)
@@ -126,77 +192,53 @@ class AnalyticsService:
         }
 
     @staticmethod
-    async def _calculate_value_breakdown(
-        activities: List[Activity], 
+    def _calculate_value_breakdown(
+        summaries: Dict[str, RollupSummary], 
         value_map: Dict[str, Value]
     ) -> List[Dict[str, Any]]:
         """Break down activities by value with detailed metrics"""
         
-        value_stats = defaultdict(lambda: {
-            "activity_count": 0,
-            "total_duration": 0,
-            "sessions": [],
-            "days_active": set()
-        })
-        
-        for activity in activities:
-            for value_id in activity.effective_value_ids:
-                if value_id in value_map:
-                    value_stats[value_id]["activity_count"] += 1
-                    value_stats[value_id]["total_duration"] += activity.duration
-                    value_stats[value_id]["sessions"].append(activity.duration)
-                    value_stats[value_id]["days_active"].add(activity.date.date())
-        
         breakdown = []
-        for value_id, stats in value_stats.items():
-            if value_id in value_map:
-                value = value_map[value_id]
-                sessions = stats["sessions"]
-                
-                breakdown.append({
-                    "value_id": value_id,
-                    "value_name": value.name,
-                    "value_color": getattr(value, 'color', '#3B82F6'),
-                    "activity_count": stats["activity_count"],
-                    "total_duration": stats["total_duration"],
-                    "avg_session_duration": round(sum(sessions) / len(sessions), 2) if sessions else 0,
-                    "min_session_duration": min(sessions) if sessions else 0,
-                    "max_session_duration": max(sessions) if sessions else 0,
-                    "days_active": len(stats["days_active"]),
-                    "consistency_score": round((len(stats["days_active"]) / 30) * 100, 1)  # Assuming 30-day period
-                })
+        for value_id, value in value_map.items():
+            stats = summaries.get(value_id)
+            if stats is None or stats.activity_count == 0:
+                continue
+            
+            days_active = stats.active_day_count
+            breakdown.append({
+                "value_id": value_id,
+                "value_name": value.name,
+                "value_color": getattr(value, 'color', '#3B82F6'),
+                "activity_count": stats.activity_count,
+                "total_duration": stats.total_duration,
+                "avg_session_duration": round(stats.total_duration / stats.activity_count, 2),
+                "min_session_duration": stats.min_duration,
+                "max_session_duration": stats.max_duration,
+                "days_active": days_active,
+                "consistency_score": round((days_active / 30) * 100, 1)  # Assuming 30-day period
+            })
         
         return sorted(breakdown, key=lambda x: x["total_duration"], reverse=True)
 
     @staticmethod
-    async def _calculate_trends(
-        activities: List[Activity], 
+    def _calculate_trends(
+        totals: RollupSummary, 
         analytics_type: AnalyticsType
     ) -> List[Dict[str, Any]]:
         """Calculate trend data for charts"""
         
-        # Group activities by time period
-        if analytics_type == AnalyticsType.DAILY:
-            time_groups = defaultdict(lambda: {"count": 0, "duration": 0})
-            for activity in activities:
-                day_key = activity.date.strftime("%Y-%m-%d")
-                time_groups[day_key]["count"] += 1
-                time_groups[day_key]["duration"] += activity.duration
-        
-        elif analytics_type == AnalyticsType.WEEKLY:
-            time_groups = defaultdict(lambda: {"count": 0, "duration": 0})
-            for activity in activities:
-                week_start = activity.date - timedelta(days=activity.date.weekday())
-                week_key = week_start.strftime("%Y-W%U")
-                time_groups[week_key]["count"] += 1
-                time_groups[week_key]["duration"] += activity.duration
-        
-        else:  # MONTHLY
-            time_groups = defaultdict(lambda: {"count": 0, "duration": 0})
-            for activity in activities:
-                month_key = activity.date.strftime("%Y-%m")
-                time_groups[month_key]["count"] += 1
-                time_groups[month_key]["duration"] += activity.duration
+        # Group daily totals by time period
+        time_groups = defaultdict(lambda: {"count": 0, "duration": 0})
+        for day, (count, duration) in totals.daily.items():
+            if analytics_type == AnalyticsType.DAILY:
+                period_key = day.strftime("%Y-%m-%d")
+            elif analytics_type == AnalyticsType.WEEKLY:
+                week_start = day - timedelta(days=day.weekday())
+                period_key = week_start.strftime("%Y-W%U")
+            else:  # MONTHLY
+                period_key = day.strftime("%Y-%m")
+            time_groups[period_key]["count"] += count
+            time_groups[period_key]["duration"] += duration
         
         # Convert to trend format
         trends = [
@@ -211,6 +253,29 @@ class AnalyticsService:
         
         return trends
 
+    @staticmethod
+    def _calculate_rollup_patterns(totals: RollupSummary) -> Dict[str, Any]:
+        """Analyze activity patterns from the rollup histograms"""
+        
+        if totals.activity_count == 0:
+            return {}
+        
+        day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        day_counts = Counter({day: count for day, count in enumerate(totals.weekday_histogram) if count})
+        hour_counts = Counter({hour: count for hour, count in enumerate(totals.hour_histogram) if count})
+        
+        return {
+            "best_days_of_week": [
+                {"day": day_names[day], "count": count, "percentage": round((count / totals.activity_count) * 100, 1)}
+                for day, count in day_counts.most_common(3)
+            ],
+            "best_hours": [
+                {"hour": hour, "count": count, "time_label": f"{hour:02d}:00"}
+                for hour, count in hour_counts.most_common(3)
+            ],
+            "duration_stats": totals.duration_stats()
+        }
+
     @staticmethod
     async def _calculate_activity_patterns(activities: List[Activity]) -> Dict[str, Any]:
         """Analyze user activity patterns for optimization suggestions"""
@@ -246,33 +311,25 @@ class AnalyticsService:
         }
 
     @staticmethod
-    async def _calculate_streak_analytics(
-        user: User, 
-        activities: List[Activity], 
+    def _calculate_streak_analytics(
+        summaries: Dict[str, RollupSummary], 
         value_map: Dict[str, Value]
     ) -> Dict[str, Any]:
-        """Calculate detailed streak information for all values"""
+        """Calculate detailed streak information for all values from their active-day bitmaps"""
         
+        today = datetime.now(timezone.utc).date()
         streak_data = {}
         
         for value_id, value in value_map.items():
-            value_activities = [a for a in activities if value_id in a.effective_value_ids]
-            
-            if not value_activities:
+            stats = summaries.get(value_id)
+            if stats is None or stats.activity_count == 0:
                 continue
             
-            # Sort activities by date
-            value_activities.sort(key=lambda x: x.date)
-            
-            # Calculate current streak
-            current_streak = await AnalyticsService._calculate_current_streak(value_activities)
-            
-            # Calculate all streaks
-            all_streaks = await AnalyticsService._calculate_all_streaks(value_activities)
+            all_streaks = stats.streak_lengths()
             
             streak_data[value_id] = {
                 "value_name": value.name,
-                "current_streak": current_streak,
+                "current_streak": stats.current_streak(today),
                 "longest_streak": max(all_streaks) if all_streaks else 0,
                 "total_streaks": len(all_streaks),
                 "avg_streak_length": round(sum(all_streaks) / len(all_streaks), 2) if all_streaks else 0,
@@ -304,26 +361,6 @@ class AnalyticsService:
         
         return streak
 
-    @staticmethod
-    async def _calculate_all_streaks(activities: List[Activity]) -> List[int]:
-        """Calculate all historical streak lengths"""
-        if not activities:
-            return []
-        
-        activity_dates = sorted(set(a.date.date() for a in activities))
-        streaks = []
-        current_streak = 1
-        
-        for i in range(1, len(activity_dates)):
-            if (activity_dates[i] - activity_dates[i-1]).days == 1:
-                current_streak += 1
-            else:
-                streaks.append(current_streak)
-                current_streak = 1
-        
-        streaks.append(current_streak)  # Add the last streak
-        return streaks
-
     @staticmethod
     async def _generate_predictions(user: User, activities: List[Activity]) -> Dict[str, Any]:
         """Generate AI-powered predictions and recommendations using ML models with caching"""
@@ -333,85 +370,77 @@ class AnalyticsService:
             from .ml_prediction_service import MLPredictionService
             from .prediction_cache_service import PredictionCacheService
             
-            # Initialize cache service
             cache_service = PredictionCacheService()
             
-            # Try to get cached predictions first
-            cached_predictions = await cache_service.get_cached_predictions(user, "analytics")
-            
-            if cached_predictions and cached_predictions.get("predictions"):
-                logger.info(f"Using cached predictions for user {user.id}")
-                return cached_predictions["predictions"]
-            
-            logger.info(f"Generating fresh predictions for user {user.id}")
+            async def generate_ml_predictions() -> Dict[str, Any]:
+                logger.info(f"Generating fresh predictions for user {user.id}")
             
-            # Get user values for context
-            values = await Value.find(Value.user_id == str(user.id)).to_list()
+                # Get user values for context
+                values = await Value.find(Value.user_id == str(user.id)).to_list()
             
-            # Use ML prediction service for comprehensive predictions
-            ml_predictions = await MLPredictionService.generate_comprehensive_predictions(
-                user, activities, values
-            )
+                # Use ML prediction service for comprehensive predictions
+                ml_predictions = await MLPredictionService.generate_comprehensive_predictions(
+                    user, activities, values
+                )
             
-            # Transform ML predictions to match expected analytics format
-            analytics_predictions = {
-                "ml_powered": True,
-                "confidence_level": ml_predictions.get("confidence_metrics", {}).get("overall_confidence", 50.0),
+                # Transform ML predictions to match expected analytics format
+                analytics_predictions = {
+                    "ml_powered": True,
+                    "confidence_level": ml_predictions.get("confidence_metrics", {}).get("overall_confidence", 50.0),
                 
-                # Habit formation insights
-                "habit_formation": ml_predictions.get("habit_formation", {}),
+                    # Habit formation insights
+                    "habit_formation": ml_predictions.get("habit_formation", {}),
                 
-                # Optimal timing recommendations  
-                "optimal_timing": ml_predictions.get("optimal_timing", {}),
-                "recommended_activity_hours": [
-                    h["hour"] for h in ml_predictions.get("optimal_timing", {}).get("optimal_hours", [])[:3]
-                ],
+                    # Optimal timing recommendations  
+                    "optimal_timing": ml_predictions.get("optimal_timing", {}),
+                    "recommended_activity_hours": [
+                        h["hour"] for h in ml_predictions.get("optimal_timing", {}).get("optimal_hours", [])[:3]
+                    ],
                 
-                # Streak and risk assessment
-                "streak_risk": ml_predictions.get("streak_risk", {}),
+                    # Streak and risk assessment
+                    "streak_risk": ml_predictions.get("streak_risk", {}),
                 
-                # Trend analysis (enhanced with ML)
-                "trend_direction": ml_predictions.get("activity_forecasting", {}).get("trend_direction", "stable"),
-                "trend_percentage": ml_predictions.get("activity_forecasting", {}).get("trend_percentage", 0),
-                "weekly_goal_probability": ml_predictions.get("habit_formation", {}).get("formation_probability", 50.0),
+                    # Trend analysis (enhanced with ML)
+                    "trend_direction": ml_predictions.get("activity_forecasting", {}).get("trend_direction", "stable"),
+                    "trend_percentage": ml_predictions.get("activity_forecasting", {}).get("trend_percentage", 0),
+                    "weekly_goal_probability": ml_predictions.get("habit_formation", {}).get("formation_probability", 50.0),
                 
-                # Goal recommendations
-                "goal_recommendations": ml_predictions.get("goal_recommendations", {}),
+                    # Goal recommendations
+                    "goal_recommendations": ml_predictions.get("goal_recommendations", {}),
                 
-                # Motivation and timing
-                "motivation_timing": ml_predictions.get("motivation_timing", {}),
+                    # Motivation and timing
+                    "motivation_timing": ml_predictions.get("motivation_timing", {}),
                 
-                # User insights
-                "user_segment": ml_predictions.get("user_segmentation", {}).get("user_segment", "Getting Started"),
-                "personalized_strategies": ml_predictions.get("user_segmentation", {}).get("personalized_strategies", []),
+                    # User insights
+                    "user_segment": ml_predictions.get("user_segmentation", {}).get("user_segment", "Getting Started"),
+                    "personalized_strategies": ml_predictions.get("user_segmentation", {}).get("personalized_strategies", []),
                 
-                # Activity forecasting
-                "activity_forecast": ml_predictions.get("activity_forecasting", {}),
+                    # Activity forecasting
+                    "activity_forecast": ml_predictions.get("activity_forecasting", {}),
                 
-                # Enhanced consistency tips using ML insights
-                "consistency_improvement_tips": AnalyticsService._generate_ml_enhanced_tips(ml_predictions),
+                    # Enhanced consistency tips using ML insights
+                    "consistency_improvement_tips": AnalyticsService._generate_ml_enhanced_tips(ml_predictions),
                 
-                # Additional ML insights
-                "success_factors": ml_predictions.get("habit_formation", {}).get("key_factors", []),
-                "risk_factors": ml_predictions.get("streak_risk", {}).get("recommendations", []),
+                    # Additional ML insights
+                    "success_factors": ml_predictions.get("habit_formation", {}).get("key_factors", []),
+                    "risk_factors": ml_predictions.get("streak_risk", {}).get("recommendations", []),
                 
-                # Model metadata
-                "prediction_metadata": {
-                    "data_points": len(activities),
-                    "models_used": list(ml_predictions.keys()),
-                    "generated_at": datetime.now(timezone.utc),
-                    "confidence_breakdown": ml_predictions.get("confidence_metrics", {}).get("factors", {})
+                    # Model metadata
+                    "prediction_metadata": {
+                        "data_points": len(activities),
+                        "models_used": list(ml_predictions.keys()),
+                        "generated_at": datetime.now(timezone.utc),
+                        "confidence_breakdown": ml_predictions.get("confidence_metrics", {}).get("factors", {})
+                    }
                 }
-            }
-            
-            # Cache the predictions for future requests
-            try:
-                await cache_service.store_predictions(user, analytics_predictions, "analytics")
-                logger.info(f"Cached fresh predictions for user {user.id}")
-            except Exception as cache_error:
-                logger.warning(f"Failed to cache predictions for user {user.id}: {cache_error}")
+                
+                return analytics_predictions
             
-            return analytics_predictions
+            # Concurrent requests for the same user share one generation
+            cached = await cache_service.get_or_generate_predictions(
+                user, generate_ml_predictions, "analytics"
+            )
+            return cached["predictions"]
             
         except Exception as e:
             logger.error(f"ML prediction failed, falling back to heuristic method: {e}")
@@ -506,35 +535,6 @@ class AnalyticsService:
         
         return unique_tips[:5]
 
-    @staticmethod
-    async def _store_analytics_cache(
-        user: User, 
-        analytics: Dict[str, Any], 
-        analytics_type: AnalyticsType
-    ) -> None:
-        """Store analytics in cache for faster future access"""
-        
-        # Store key metrics as UserAnalytics documents
-        overview = analytics.get("overview", {})
-        
-        metrics_to_store = [
-            (MetricType.ACTIVITY_COUNT, overview.get("total_activities", 0)),
-            (MetricType.DURATION_TOTAL, overview.get("total_duration_minutes", 0)),
-            (MetricType.CONSISTENCY_SCORE, overview.get("consistency_percentage", 0))
-        ]
-        
-        for metric_type, value in metrics_to_store:
-            analytics_doc = UserAnalytics(
-                user_id=str(user.id),
-                analytics_type=analytics_type,
-                metric_type=metric_type,
-                date_range_start=datetime.now(timezone.utc) - timedelta(days=30),
-                date_range_end=datetime.now(timezone.utc),
-                value=float(value),
-                metadata={"generated_by": "analytics_service"}
-            )
-            await analytics_doc.save()
-
     @staticmethod
     async def get_value_insights(user: User, value_id: str, days_back: int = 90) -> Dict[str, Any]:
         """Get detailed insights for a specific value (Premium Feature)"""
@@ -919,346 +919,401 @@ class AnalyticsService:
     ) -> tuple[io.BytesIO, List[str]]:
         """Create a comprehensive PDF report with charts and visualizations"""
         
-        # Create PDF buffer
-        buffer = io.BytesIO()
-        chart_paths = []
-        
-        # Create PDF document
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=18
-        )
+        chart_paths = {}
         
-        # Get styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=HexColor('#6366F1')
+        # Render charts first so the report can embed them
+        if include_charts:
+            breakdown = analytics.get('value_breakdown', [])
+            trends = analytics.get('trends', [])
+            
+            if 'breakdown' in requested_types and len(breakdown) > 1:
+                chart_path = await AnalyticsService._create_value_breakdown_chart(breakdown)
+                if chart_path:
+                    chart_paths['breakdown'] = chart_path
+            
+            if 'trends' in requested_types and trends:
+                chart_path = await AnalyticsService._create_trends_chart(trends)
+                if chart_path:
+                    chart_paths['trends'] = chart_path
+        
+        # Layout and rendering are CPU-bound, so they run in the compute pool
+        pdf_bytes = await compute_executor.run(
+            "analytics_pdf",
+            _render_comprehensive_pdf_report,
+            analytics,
+            user.email or f'User {user.id}',
+            requested_types,
+            days_back,
+            start_date,
+            end_date,
+            chart_paths
         )
         
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            spaceAfter=12,
-            spaceBefore=20,
-            textColor=HexColor('#374151')
+        return io.BytesIO(pdf_bytes), list(chart_paths.values())
+
+    @staticmethod
+    async def _create_value_breakdown_chart(breakdown: List[Dict[str, Any]]) -> Optional[str]:
+        """Create a pie chart for value breakdown"""
+        return await compute_executor.run(
+            "analytics_chart", _render_value_breakdown_chart, breakdown
         )
-        
-        # Story for PDF content
-        story = []
-        
-        # Title page
-        story.append(Paragraph("TUG ANALYTICS REPORT", title_style))
-        story.append(Spacer(1, 20))
-        
-        # User info and metadata
-        metadata_data = [
-            ['Report For:', user.email or f'User {user.id}'],
-            ['Generated:', datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')],
-            ['Period:', f'{days_back} days'],
-            ['Data Types:', ', '.join(requested_types)]
+
+    @staticmethod
+    async def _create_trends_chart(trends: List[Dict[str, Any]]) -> Optional[str]:
+        """Create a line chart for activity trends"""
+        return await compute_executor.run(
+            "analytics_chart", _render_trends_chart, trends
+        )
+
+
+# Rendering functions run in the compute pool, so they must be module-level and
+# only take picklable arguments.
+
+def _render_comprehensive_pdf_report(
+    analytics: Dict[str, Any], 
+    report_for: str, 
+    requested_types: List[str], 
+    days_back: int,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    chart_paths: Dict[str, str]
+) -> bytes:
+    """Lay out and build the analytics PDF, embedding pre-rendered chart images"""
+    
+    # Create PDF buffer
+    buffer = io.BytesIO()
+    
+    # Create PDF document
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=18
+    )
+    
+    # Get styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=HexColor('#6366F1')
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        spaceAfter=12,
+        spaceBefore=20,
+        textColor=HexColor('#374151')
+    )
+    
+    # Story for PDF content
+    story = []
+    
+    # Title page
+    story.append(Paragraph("TUG ANALYTICS REPORT", title_style))
+    story.append(Spacer(1, 20))
+    
+    # User info and metadata
+    metadata_data = [
+        ['Report For:', report_for],
+        ['Generated:', datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')],
+        ['Period:', f'{days_back} days'],
+        ['Data Types:', ', '.join(requested_types)]
+    ]
+    
+    if start_date and end_date:
+        metadata_data.extend([
+            ['Start Date:', start_date.strftime('%Y-%m-%d')],
+            ['End Date:', end_date.strftime('%Y-%m-%d')]
+        ])
+    
+    metadata_table = Table(metadata_data, colWidths=[2*inch, 4*inch])
+    metadata_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), HexColor('#F9FAFB')),
+        ('TEXTCOLOR', (0, 0), (0, -1), HexColor('#374151')),
+        ('TEXTCOLOR', (1, 0), (1, -1), HexColor('#111827')),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 1, HexColor('#E5E7EB')),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 12),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ]))
+    
+    story.append(metadata_table)
+    story.append(PageBreak())
+    
+    # Overview section
+    if 'activities' in requested_types:
+        overview = analytics.get('overview', {})
+        story.append(Paragraph("OVERVIEW", heading_style))
+    
+        overview_data = [
+            ['Total Activities', str(overview.get('total_activities', 0))],
+            ['Total Duration', f"{overview.get('total_duration_hours', 0):.1f} hours"],
+            ['Active Days', f"{overview.get('active_days', 0)} / {overview.get('total_days', 0)}"],
+            ['Consistency', f"{overview.get('consistency_percentage', 0):.1f}%"],
+            ['Productivity Score', f"{overview.get('productivity_score', 0):.2f}"],
+            ['Avg Daily Activities', f"{overview.get('avg_daily_activities', 0):.1f}"],
+            ['Avg Session Duration', f"{overview.get('avg_session_duration', 0):.1f} minutes"]
         ]
-        
-        if start_date and end_date:
-            metadata_data.extend([
-                ['Start Date:', start_date.strftime('%Y-%m-%d')],
-                ['End Date:', end_date.strftime('%Y-%m-%d')]
-            ])
-        
-        metadata_table = Table(metadata_data, colWidths=[2*inch, 4*inch])
-        metadata_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), HexColor('#F9FAFB')),
-            ('TEXTCOLOR', (0, 0), (0, -1), HexColor('#374151')),
-            ('TEXTCOLOR', (1, 0), (1, -1), HexColor('#111827')),
+    
+        overview_table = Table(overview_data, colWidths=[3*inch, 2*inch])
+        overview_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), HexColor('#6366F1')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), white),
+            ('BACKGROUND', (0, 1), (-1, -1), HexColor('#F8FAFC')),
+            ('TEXTCOLOR', (0, 1), (-1, -1), HexColor('#374151')),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
             ('GRID', (0, 0), (-1, -1), 1, HexColor('#E5E7EB')),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
             ('LEFTPADDING', (0, 0), (-1, -1), 12),
             ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
         ]))
-        
-        story.append(metadata_table)
-        story.append(PageBreak())
-        
-        # Overview section
-        if 'activities' in requested_types:
-            overview = analytics.get('overview', {})
-            story.append(Paragraph("OVERVIEW", heading_style))
-            
-            overview_data = [
-                ['Total Activities', str(overview.get('total_activities', 0))],
-                ['Total Duration', f"{overview.get('total_duration_hours', 0):.1f} hours"],
-                ['Active Days', f"{overview.get('active_days', 0)} / {overview.get('total_days', 0)}"],
-                ['Consistency', f"{overview.get('consistency_percentage', 0):.1f}%"],
-                ['Productivity Score', f"{overview.get('productivity_score', 0):.2f}"],
-                ['Avg Daily Activities', f"{overview.get('avg_daily_activities', 0):.1f}"],
-                ['Avg Session Duration', f"{overview.get('avg_session_duration', 0):.1f} minutes"]
-            ]
-            
-            overview_table = Table(overview_data, colWidths=[3*inch, 2*inch])
-            overview_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), HexColor('#6366F1')),
+    
+        story.append(overview_table)
+        story.append(Spacer(1, 20))
+    
+    # Value breakdown section
+    if 'breakdown' in requested_types:
+        story.append(Paragraph("VALUE BREAKDOWN", heading_style))
+    
+        breakdown = analytics.get('value_breakdown', [])
+        if breakdown:
+            breakdown_data = [['Value', 'Activities', 'Duration (min)', 'Avg Session', 'Consistency']]
+    
+            for item in breakdown[:10]:  # Limit to top 10 values
+                breakdown_data.append([
+                    item.get('value_name', 'Unknown')[:20],  # Truncate long names
+                    str(item.get('activity_count', 0)),
+                    str(item.get('total_duration', 0)),
+                    f"{item.get('avg_session_duration', 0):.1f}",
+                    f"{item.get('consistency_score', 0):.1f}%"
+                ])
+    
+            breakdown_table = Table(breakdown_data, colWidths=[2*inch, 1*inch, 1.2*inch, 1*inch, 1*inch])
+            breakdown_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), HexColor('#10B981')),
                 ('TEXTCOLOR', (0, 0), (-1, 0), white),
-                ('BACKGROUND', (0, 1), (-1, -1), HexColor('#F8FAFC')),
+                ('BACKGROUND', (0, 1), (-1, -1), HexColor('#F0FDF4')),
                 ('TEXTCOLOR', (0, 1), (-1, -1), HexColor('#374151')),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+                ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
                 ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
                 ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 11),
+                ('FONTSIZE', (0, 0), (-1, -1), 9),
                 ('GRID', (0, 0), (-1, -1), 1, HexColor('#E5E7EB')),
                 ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 12),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-                ('TOPPADDING', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+                ('LEFTPADDING', (0, 0), (-1, -1), 8),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+                ('TOPPADDING', (0, 0), (-1, -1), 6),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
             ]))
-            
-            story.append(overview_table)
+    
+            story.append(breakdown_table)
             story.append(Spacer(1, 20))
-        
-        # Value breakdown section
-        if 'breakdown' in requested_types:
-            story.append(Paragraph("VALUE BREAKDOWN", heading_style))
-            
-            breakdown = analytics.get('value_breakdown', [])
-            if breakdown:
-                breakdown_data = [['Value', 'Activities', 'Duration (min)', 'Avg Session', 'Consistency']]
-                
-                for item in breakdown[:10]:  # Limit to top 10 values
-                    breakdown_data.append([
-                        item.get('value_name', 'Unknown')[:20],  # Truncate long names
-                        str(item.get('activity_count', 0)),
-                        str(item.get('total_duration', 0)),
-                        f"{item.get('avg_session_duration', 0):.1f}",
-                        f"{item.get('consistency_score', 0):.1f}%"
-                    ])
-                
-                breakdown_table = Table(breakdown_data, colWidths=[2*inch, 1*inch, 1.2*inch, 1*inch, 1*inch])
-                breakdown_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), HexColor('#10B981')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), white),
-                    ('BACKGROUND', (0, 1), (-1, -1), HexColor('#F0FDF4')),
-                    ('TEXTCOLOR', (0, 1), (-1, -1), HexColor('#374151')),
-                    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                    ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 9),
-                    ('GRID', (0, 0), (-1, -1), 1, HexColor('#E5E7EB')),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 8),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-                    ('TOPPADDING', (0, 0), (-1, -1), 6),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ]))
-                
-                story.append(breakdown_table)
-                story.append(Spacer(1, 20))
-                
-                # Add pie chart for value breakdown if charts are enabled
-                if include_charts and len(breakdown) > 1:
-                    chart_path = await AnalyticsService._create_value_breakdown_chart(breakdown)
-                    if chart_path:
-                        chart_paths.append(chart_path)
-                        chart_image = Image(chart_path, width=5*inch, height=3*inch)
-                        story.append(chart_image)
-                        story.append(Spacer(1, 20))
-        
-        # Trends section with chart
-        if 'trends' in requested_types:
-            story.append(Paragraph("ACTIVITY TRENDS", heading_style))
-            
-            trends = analytics.get('trends', [])
-            if trends and include_charts:
-                chart_path = await AnalyticsService._create_trends_chart(trends)
-                if chart_path:
-                    chart_paths.append(chart_path)
-                    chart_image = Image(chart_path, width=6*inch, height=3*inch)
-                    story.append(chart_image)
-                    story.append(Spacer(1, 20))
-        
-        # Streaks section
-        if 'streaks' in requested_types:
-            story.append(Paragraph("STREAK ANALYTICS", heading_style))
-            
-            streaks = analytics.get('streaks', {})
-            if streaks:
-                streak_data = [['Value', 'Current Streak', 'Longest Streak', 'Avg Streak']]
-                
-                for value_id, streak_info in list(streaks.items())[:10]:
-                    streak_data.append([
-                        streak_info.get('value_name', 'Unknown')[:20],
-                        f"{streak_info.get('current_streak', 0)} days",
-                        f"{streak_info.get('longest_streak', 0)} days",
-                        f"{streak_info.get('avg_streak_length', 0):.1f} days"
-                    ])
-                
-                streak_table = Table(streak_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-                streak_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), HexColor('#F59E0B')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), white),
-                    ('BACKGROUND', (0, 1), (-1, -1), HexColor('#FFFBEB')),
-                    ('TEXTCOLOR', (0, 1), (-1, -1), HexColor('#374151')),
-                    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                    ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('GRID', (0, 0), (-1, -1), 1, HexColor('#E5E7EB')),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 10),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-                    ('TOPPADDING', (0, 0), (-1, -1), 8),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ]))
-                
-                story.append(streak_table)
+    
+            # Add pie chart for value breakdown if charts are enabled
+            chart_path = chart_paths.get('breakdown')
+            if chart_path:
+                chart_image = Image(chart_path, width=5*inch, height=3*inch)
+                story.append(chart_image)
                 story.append(Spacer(1, 20))
-        
-        # Insights and patterns section
-        if 'insights' in requested_types:
-            story.append(Paragraph("INSIGHTS & PATTERNS", heading_style))
-            
-            patterns = analytics.get('patterns', {})
-            predictions = analytics.get('predictions', {})
-            
-            # Activity patterns
-            if patterns:
-                story.append(Paragraph("Activity Patterns", styles['Heading3']))
-                
-                # Best days of week
-                best_days = patterns.get('best_days_of_week', [])
-                if best_days:
-                    story.append(Paragraph("Most Active Days:", styles['Heading4']))
-                    for day_pattern in best_days[:3]:
-                        story.append(Paragraph(
-                            f"• {day_pattern.get('day', 'Unknown')}: {day_pattern.get('count', 0)} activities ({day_pattern.get('percentage', 0):.1f}%)",
-                            styles['Normal']
-                        ))
-                    story.append(Spacer(1, 10))
-                
-                # Best hours
-                best_hours = patterns.get('best_hours', [])
-                if best_hours:
-                    story.append(Paragraph("Most Active Hours:", styles['Heading4']))
-                    for hour_pattern in best_hours[:3]:
-                        story.append(Paragraph(
-                            f"• {hour_pattern.get('time_label', 'Unknown')}: {hour_pattern.get('count', 0)} activities",
-                            styles['Normal']
-                        ))
-                    story.append(Spacer(1, 10))
-            
-            # Predictions and recommendations
-            if predictions and not predictions.get('insufficient_data'):
-                story.append(Paragraph("AI Predictions & Recommendations", styles['Heading3']))
-                
-                story.append(Paragraph(f"Trend Direction: {predictions.get('trend_direction', 'stable').title()}", styles['Normal']))
-                story.append(Paragraph(f"Weekly Goal Probability: {predictions.get('weekly_goal_probability', 0):.1f}%", styles['Normal']))
-                
-                tips = predictions.get('consistency_improvement_tips', [])
-                if tips:
-                    story.append(Paragraph("Recommendations:", styles['Heading4']))
-                    for tip in tips:
-                        story.append(Paragraph(f"• {tip}", styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        
-        return buffer, chart_paths
+    
+    # Trends section with chart
+    if 'trends' in requested_types:
+        story.append(Paragraph("ACTIVITY TRENDS", heading_style))
+    
+        trends = analytics.get('trends', [])
+        chart_path = chart_paths.get('trends')
+        if trends and chart_path:
+            chart_image = Image(chart_path, width=6*inch, height=3*inch)
+            story.append(chart_image)
+            story.append(Spacer(1, 20))
+    
+    # Streaks section
+    if 'streaks' in requested_types:
+        story.append(Paragraph("STREAK ANALYTICS", heading_style))
+    
+        streaks = analytics.get('streaks', {})
+        if streaks:
+            streak_data = [['Value', 'Current Streak', 'Longest Streak', 'Avg Streak']]
+    
+            for value_id, streak_info in list(streaks.items())[:10]:
+                streak_data.append([
+                    streak_info.get('value_name', 'Unknown')[:20],
+                    f"{streak_info.get('current_streak', 0)} days",
+                    f"{streak_info.get('longest_streak', 0)} days",
+                    f"{streak_info.get('avg_streak_length', 0):.1f} days"
+                ])
+    
+            streak_table = Table(streak_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
+            streak_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), HexColor('#F59E0B')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), white),
+                ('BACKGROUND', (0, 1), (-1, -1), HexColor('#FFFBEB')),
+                ('TEXTCOLOR', (0, 1), (-1, -1), HexColor('#374151')),
+                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+                ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('GRID', (0, 0), (-1, -1), 1, HexColor('#E5E7EB')),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('LEFTPADDING', (0, 0), (-1, -1), 10),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+                ('TOPPADDING', (0, 0), (-1, -1), 8),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ]))
+    
+            story.append(streak_table)
+            story.append(Spacer(1, 20))
+    
+    # Insights and patterns section
+    if 'insights' in requested_types:
+        story.append(Paragraph("INSIGHTS & PATTERNS", heading_style))
+    
+        patterns = analytics.get('patterns', {})
+        predictions = analytics.get('predictions', {})
+    
+        # Activity patterns
+        if patterns:
+            story.append(Paragraph("Activity Patterns", styles['Heading3']))
+    
+            # Best days of week
+            best_days = patterns.get('best_days_of_week', [])
+            if best_days:
+                story.append(Paragraph("Most Active Days:", styles['Heading4']))
+                for day_pattern in best_days[:3]:
+                    story.append(Paragraph(
+                        f"• {day_pattern.get('day', 'Unknown')}: {day_pattern.get('count', 0)} activities ({day_pattern.get('percentage', 0):.1f}%)",
+                        styles['Normal']
+                    ))
+                story.append(Spacer(1, 10))
+    
+            # Best hours
+            best_hours = patterns.get('best_hours', [])
+            if best_hours:
+                story.append(Paragraph("Most Active Hours:", styles['Heading4']))
+                for hour_pattern in best_hours[:3]:
+                    story.append(Paragraph(
+                        f"• {hour_pattern.get('time_label', 'Unknown')}: {hour_pattern.get('count', 0)} activities",
+                        styles['Normal']
+                    ))
+                story.append(Spacer(1, 10))
+    
+        # Predictions and recommendations
+        if predictions and not predictions.get('insufficient_data'):
+            story.append(Paragraph("AI Predictions & Recommendations", styles['Heading3']))
+    
+            story.append(Paragraph(f"Trend Direction: {predictions.get('trend_direction', 'stable').title()}", styles['Normal']))
+            story.append(Paragraph(f"Weekly Goal Probability: {predictions.get('weekly_goal_probability', 0):.1f}%", styles['Normal']))
+    
+            tips = predictions.get('consistency_improvement_tips', [])
+            if tips:
+                story.append(Paragraph("Recommendations:", styles['Heading4']))
+                for tip in tips:
+                    story.append(Paragraph(f"• {tip}", styles['Normal']))
+    
+    # Build PDF
+    doc.build(story)
+    
+    return buffer.getvalue()
 
-    @staticmethod
-    async def _create_value_breakdown_chart(breakdown: List[Dict[str, Any]]) -> Optional[str]:
-        """Create a pie chart for value breakdown"""
-        try:
-            # Prepare data for pie chart
-            values = []
-            labels = []
-            colors = []
-            
-            for item in breakdown[:8]:  # Limit to top 8 values
-                values.append(item.get('total_duration', 0))
-                labels.append(item.get('value_name', 'Unknown')[:15])  # Truncate labels
-                # Use value color if available, otherwise default colors
-                color = item.get('value_color', '#6366F1')
-                if color.startswith('#'):
-                    color = color[1:]
-                colors.append(f'#{color}')
-            
-            if not values:
-                return None
-            
-            # Create chart
-            plt.figure(figsize=(10, 6))
-            plt.pie(values, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-            plt.title('Activity Duration by Value', fontsize=16, fontweight='bold', pad=20)
-            plt.axis('equal')
-            
-            # Save to temporary file
-            temp_path = tempfile.mktemp(suffix='.png')
-            plt.savefig(temp_path, dpi=150, bbox_inches='tight', facecolor='white')
-            plt.close()
-            
-            return temp_path
-            
-        except Exception as e:
-            logger.error(f"Error creating value breakdown chart: {e}")
+
+def _render_value_breakdown_chart(breakdown: List[Dict[str, Any]]) -> Optional[str]:
+    """Render the value breakdown pie chart to a temporary PNG"""
+    try:
+        # Prepare data for pie chart
+        values = []
+        labels = []
+        colors = []
+    
+        for item in breakdown[:8]:  # Limit to top 8 values
+            values.append(item.get('total_duration', 0))
+            labels.append(item.get('value_name', 'Unknown')[:15])  # Truncate labels
+            # Use value color if available, otherwise default colors
+            color = item.get('value_color', '#6366F1')
+            if color.startswith('#'):
+                color = color[1:]
+            colors.append(f'#{color}')
+    
+        if not values:
             return None
+    
+        # Create chart
+        plt.figure(figsize=(10, 6))
+        plt.pie(values, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
+        plt.title('Activity Duration by Value', fontsize=16, fontweight='bold', pad=20)
+        plt.axis('equal')
+    
+        # Save to temporary file
+        temp_path = tempfile.mktemp(suffix='.png')
+        plt.savefig(temp_path, dpi=150, bbox_inches='tight', facecolor='white')
+        plt.close()
+    
+        return temp_path
+    
+    except Exception as e:
+        logger.error(f"Error creating value breakdown chart: {e}")
+        return None
 
-    @staticmethod
-    async def _create_trends_chart(trends: List[Dict[str, Any]]) -> Optional[str]:
-        """Create a line chart for activity trends"""
-        try:
-            if not trends:
-                return None
-            
-            # Prepare data
-            periods = [trend.get('period', '') for trend in trends]
-            activity_counts = [trend.get('activity_count', 0) for trend in trends]
-            durations = [trend.get('total_duration', 0) / 60 for trend in trends]  # Convert to hours
-            
-            # Create chart
-            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
-            
-            # Activity count trend
-            ax1.plot(periods, activity_counts, marker='o', linewidth=2, color='#6366F1')
-            ax1.set_title('Activity Count Over Time', fontsize=14, fontweight='bold')
-            ax1.set_ylabel('Number of Activities')
-            ax1.grid(True, alpha=0.3)
-            ax1.tick_params(axis='x', rotation=45)
-            
-            # Duration trend
-            ax2.plot(periods, durations, marker='s', linewidth=2, color='#10B981')
-            ax2.set_title('Activity Duration Over Time', fontsize=14, fontweight='bold')
-            ax2.set_ylabel('Duration (Hours)')
-            ax2.set_xlabel('Time Period')
-            ax2.grid(True, alpha=0.3)
-            ax2.tick_params(axis='x', rotation=45)
-            
-            plt.tight_layout()
-            
-            # Save to temporary file
-            temp_path = tempfile.mktemp(suffix='.png')
-            plt.savefig(temp_path, dpi=150, bbox_inches='tight', facecolor='white')
-            plt.close()
-            
-            return temp_path
-            
-        except Exception as e:
-            logger.error(f"Error creating trends chart: {e}")
-            return None
\ No newline at end of file
+
+def _render_trends_chart(trends: List[Dict[str, Any]]) -> Optional[str]:
+    """Render the activity trends line charts to a temporary PNG"""
+    try:
+        if not trends:
+            return None
+    
+        # Prepare data
+        periods = [trend.get('period', '') for trend in trends]
+        activity_counts = [trend.get('activity_count', 0) for trend in trends]
+        durations = [trend.get('total_duration', 0) / 60 for trend in trends]  # Convert to hours
+    
+        # Create chart
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
+    
+        # Activity count trend
+        ax1.plot(periods, activity_counts, marker='o', linewidth=2, color='#6366F1')
+        ax1.set_title('Activity Count Over Time', fontsize=14, fontweight='bold')
+        ax1.set_ylabel('Number of Activities')
+        ax1.grid(True, alpha=0.3)
+        ax1.tick_params(axis='x', rotation=45)
+    
+        # Duration trend
+        ax2.plot(periods, durations, marker='s', linewidth=2, color='#10B981')
+        ax2.set_title('Activity Duration Over Time', fontsize=14, fontweight='bold')
+        ax2.set_ylabel('Duration (Hours)')
+        ax2.set_xlabel('Time Period')
+        ax2.grid(True, alpha=0.3)
+        ax2.tick_params(axis='x', rotation=45)
+    
+        plt.tight_layout()
+    
+        # Save to temporary file
+        temp_path = tempfile.mktemp(suffix='.png')
+        plt.savefig(temp_path, dpi=150, bbox_inches='tight', facecolor='white')
+        plt.close()
+    
+        return temp_path
+    
+    except Exception as e:
+        logger.error(f"Error creating trends chart: {e}")
+        return None
@@ -1,9 +1,13 @@
 # app/services/coaching_background_service.py
 import asyncio
 import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta, timezone
 
+from bson import ObjectId
+
 from ..models.user import User
 from ..models.activity import Activity
 from ..models.value import Value
@@ -12,10 +16,22 @@ from ..models.coaching_message import (
 )
 from ..services.coaching_service import CoachingService
 from ..services.notification_service import NotificationService
-from ..core.database import get_database
+from ..models.scheduled_job import JobCheckpoint
+from ..core.last_seen import last_seen_tracker
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class UserBatch:
+    """A batch of users with their activities, values, profiles and recent messages, keyed by user id"""
+    users: List[User]
+    activities: Dict[str, List[Activity]] = field(default_factory=lambda: defaultdict(list))
+    values: Dict[str, List[Value]] = field(default_factory=lambda: defaultdict(list))
+    profiles: Dict[str, UserPersonalizationProfile] = field(default_factory=dict)
+    recent_messages: Dict[str, List[Dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
+
+
 class CoachingBackgroundService:
     """Background service for coaching message processing and delivery"""
     
@@ -27,9 +43,16 @@ class CoachingBackgroundService:
         self.batch_size = 50  # Users to process per batch
         self.max_concurrent_users = 10  # Maximum concurrent user processing
         self.delivery_batch_size = 100  # Messages to deliver per batch
+        self.checkpoint_max_age_hours = 6  # Older unfinished runs start over
         
-    async def process_all_users_for_coaching_messages(self) -> Dict[str, Any]:
-        """Process all active users for coaching message generation"""
+    async def process_all_users_for_coaching_messages(self, checkpoint: Optional[str] = None) -> Dict[str, Any]:
+        """Process all active users for coaching message generation
+
+        Users are streamed in ``_id`` order, one batch at a time, and the next batch is
+        loaded while the current one is analyzed. With ``checkpoint`` set to a job name,
+        progress is saved after every batch and a run that died resumes after the last
+        batch it finished.
+        """
         
         start_time = datetime.utcnow()
         stats = {
@@ -40,74 +63,44 @@ class CoachingBackgroundService:
         }
         
         try:
-            logger.info("Starting coaching message generation for all users")
-            
-            # Get all active users (users who have logged in recently or have activities)
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=30)
-            
-            # Find active users using aggregation for better performance
-            db = await get_database()
-            pipeline = [
-                {
-                    "$match": {
-                        "$or": [
-                            {"last_login": {"$gte": cutoff_date}},
-                            {"created_at": {"$gte": cutoff_date}}
-                        ]
-                    }
-                },
-                {
-                    "$lookup": {
-                        "from": "activities",
-                        "localField": "_id",
-                        "foreignField": "user_id",
-                        "as": "recent_activities",
-                        "pipeline": [
-                            {
-                                "$match": {
-                                    "date": {"$gte": cutoff_date}
-                                }
-                            },
-                            {"$limit": 1}  # Just check if any exist
-                        ]
-                    }
-                },
-                {
-                    "$match": {
-                        "$or": [
-                            {"recent_activities": {"$ne": []}},
-                            {"last_login": {"$gte": cutoff_date}}
-                        ]
-                    }
-                },
-                {
-                    "$project": {
-                        "_id": 1,
-                        "firebase_uid": 1,
-                        "display_name": 1,
-                        "created_at": 1,
-                        "subscription_tier": 1,
-                        "last_login": 1
-                    }
-                }
-            ]
+            state = await self._load_checkpoint(checkpoint, start_time) if checkpoint else None
+            run_started_at = state.started_at if state else start_time
+            after_id = ObjectId(state.last_key) if state and state.last_key else None
+            if state and state.stats:
+                stats.update({key: state.stats.get(key, 0) for key in ("users_processed", "messages_generated", "errors")})
+                logger.info(f"Resuming coaching message generation after user {after_id}")
+            else:
+                logger.info("Starting coaching message generation for all users")
             
-            active_users_cursor = db.users.aggregate(pipeline)
-            active_users = await active_users_cursor.to_list(length=None)
+            # Candidates logged in or signed up recently; those with a login or activity since are processed
+            await last_seen_tracker.flush()
+            cutoff_date = run_started_at - timedelta(days=30)
+            semaphore = asyncio.Semaphore(self.max_concurrent_users)
             
-            logger.info(f"Found {len(active_users)} active users to process")
+            next_batch = asyncio.create_task(self._load_user_batch(after_id, cutoff_date))
+            try:
+                while True:
+                    batch = await next_batch
+                    if not batch.users:
+                        break
+                    after_id = batch.users[-1].id
+                    # Read ahead while this batch is analyzed
+                    next_batch = asyncio.create_task(self._load_user_batch(after_id, cutoff_date))
+                    
+                    batch_stats = await self._process_user_batch(batch, cutoff_date, semaphore)
+                    stats["users_processed"] += batch_stats["users_processed"]
+                    stats["messages_generated"] += batch_stats["messages_generated"]
+                    stats["errors"] += batch_stats["errors"]
+                    
+                    if state:
+                        await self._save_checkpoint(state, str(after_id), stats)
+            finally:
+                # Don't leave the read-ahead running when the loop fails or the job is cancelled
+                next_batch.cancel()
+                await asyncio.gather(next_batch, return_exceptions=True)
             
-            # Process users in batches
-            for i in range(0, len(active_users), self.batch_size):
-                batch = active_users[i:i + self.batch_size]
-                batch_stats = await self._process_user_batch(batch)
-                
-                stats["users_processed"] += batch_stats["users_processed"]
-                stats["messages_generated"] += batch_stats["messages_generated"]
-                stats["errors"] += batch_stats["errors"]
-                
-                # Small delay between batches to prevent overload
-                await asyncio.sleep(1)
+            if state:
+                await self._save_checkpoint(state, None, stats, status="completed")
             
             stats["processing_time_seconds"] = (datetime.utcnow() - start_time).total_seconds()
             
@@ -127,7 +120,93 @@ class CoachingBackgroundService:
             stats["processing_time_seconds"] = (datetime.utcnow() - start_time).total_seconds()
             return stats
 
-    async def _process_user_batch(self, user_batch: List[Dict]) -> Dict[str, Any]:
+    async def _load_checkpoint(self, job_name: str, now: datetime) -> JobCheckpoint:
+        """The unfinished run to resume, or a fresh checkpoint"""
+        
+        state = await JobCheckpoint.find_one(JobCheckpoint.job_name == job_name)
+        resumable = (
+            state is not None
+            and state.status == "running"
+            and now - state.started_at < timedelta(hours=self.checkpoint_max_age_hours)
+        )
+        if resumable:
+            return state
+        
+        if state is None:
+            state = JobCheckpoint(job_name=job_name, started_at=now)
+        state.status = "running"
+        state.started_at = now
+        state.last_key = None
+        state.stats = {}
+        await state.save()
+        return state
+
+    @staticmethod
+    async def _save_checkpoint(
+        state: JobCheckpoint,
+        last_key: Optional[str],
+        stats: Dict[str, Any],
+        status: str = "running"
+    ) -> None:
+        state.last_key = last_key
+        state.stats = {key: stats[key] for key in ("users_processed", "messages_generated", "errors")}
+        state.status = status
+        state.updated_at = datetime.utcnow()
+        try:
+            await state.save()
+        except Exception as e:
+            # A failed save only means a resumed run repeats this batch
+            logger.warning(f"Failed to save checkpoint for {state.job_name}: {e}")
+
+    async def _load_user_batch(self, after_id: Optional[ObjectId], cutoff_date: datetime) -> UserBatch:
+        """The next ``batch_size`` candidate users after ``after_id`` with everything needed to analyze them"""
+        
+        query: Dict[str, Any] = {
+            "$or": [
+                {"last_login": {"$gte": cutoff_date}},
+                {"created_at": {"$gte": cutoff_date}}
+            ]
+        }
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        users = await User.find(query).sort([("_id", 1)]).limit(self.batch_size).to_list()
+        if not users:
+            return UserBatch(users=[])
+        
+        user_ids = [str(user.id) for user in users]
+        now = datetime.utcnow()
+        activities, values, profiles, recent_messages = await asyncio.gather(
+            Activity.find({
+                "user_id": {"$in": user_ids},
+                "date": {"$gte": now - timedelta(days=60)}
+            }).sort([("user_id", 1), ("date", -1)]).to_list(),
+            Value.find({"user_id": {"$in": user_ids}}).to_list(),
+            UserPersonalizationProfile.find({"user_id": {"$in": user_ids}}).to_list(),
+            CoachingMessage.get_motor_collection().find(
+                {"user_id": {"$in": user_ids}, "created_at": {"$gte": now - timedelta(days=3)}},
+                projection={"user_id": 1, "priority": 1, "status": 1, "created_at": 1}
+            ).to_list(length=None)
+        )
+        
+        batch = UserBatch(users=users)
+        for activity in activities:
+            user_activities = batch.activities[activity.user_id]
+            if len(user_activities) < 200:
+                user_activities.append(activity)
+        for value in values:
+            batch.values[value.user_id].append(value)
+        for profile in profiles:
+            batch.profiles[profile.user_id] = profile
+        for message in recent_messages:
+            batch.recent_messages[message["user_id"]].append(message)
+        return batch
+
+    async def _process_user_batch(
+        self,
+        batch: UserBatch,
+        cutoff_date: datetime,
+        semaphore: asyncio.Semaphore
+    ) -> Dict[str, Any]:
         """Process a batch of users for coaching messages"""
         
         batch_stats = {
@@ -136,15 +215,19 @@ class CoachingBackgroundService:
             "errors": 0
         }
         
-        # Create semaphore to limit concurrent processing
-        semaphore = asyncio.Semaphore(self.max_concurrent_users)
-        
-        async def process_single_user(user_data: Dict) -> Dict[str, Any]:
+        async def process_single_user(user: User) -> Dict[str, Any]:
             async with semaphore:
-                return await self._process_user_for_coaching(user_data)
+                return await self._process_user_for_coaching(user, batch)
+        
+        # Only users who logged in recently or have recent activities are active
+        active_users = [
+            user for user in batch.users
+            if (user.last_login and user.last_login >= cutoff_date)
+            or any(activity.date >= cutoff_date for activity in batch.activities.get(str(user.id), []))
+        ]
         
         # Process users concurrently
-        tasks = [process_single_user(user_data) for user_data in user_batch]
+        tasks = [process_single_user(user) for user in active_users]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Aggregate results
@@ -159,7 +242,7 @@ class CoachingBackgroundService:
         
         return batch_stats
 
-    async def _process_user_for_coaching(self, user_data: Dict) -> Dict[str, Any]:
+    async def _process_user_for_coaching(self, user: User, batch: UserBatch) -> Dict[str, Any]:
         """Process a single user for coaching message generation"""
         
         user_stats = {
@@ -169,28 +252,19 @@ class CoachingBackgroundService:
         }
         
         try:
-            # Convert dict to User object
-            user = User(**user_data)
-            user.id = user_data["_id"]
+            user_id = str(user.id)
+            activities = batch.activities.get(user_id, [])
             
             # Check if user needs coaching messages
-            if not await self._should_generate_messages_for_user(user):
+            if not self._should_generate_messages_for_user(
+                batch.profiles.get(user_id), activities, batch.recent_messages.get(user_id, [])
+            ):
                 user_stats["users_processed"] = 1
                 return user_stats
             
-            # Get user's recent activities and values
-            activities = await Activity.find({
-                "user_id": str(user.id),
-                "date": {"$gte": datetime.now(timezone.utc) - timedelta(days=60)}
-            }).sort([("date", -1)]).limit(200).to_list()
-            
-            values = await Value.find({
-                "user_id": str(user.id)
-            }).to_list()
-            
             # Generate coaching messages
             messages = await self.coaching_service.analyze_user_behavior_and_generate_messages(
-                user, activities, values
+                user, activities, batch.values.get(user_id, [])
             )
             
             user_stats["users_processed"] = 1
@@ -199,71 +273,57 @@ class CoachingBackgroundService:
             logger.debug(f"Generated {len(messages)} messages for user {user.id}")
             
         except Exception as e:
-            logger.error(f"Error processing user {user_data.get('_id')}: {e}")
+            logger.error(f"Error processing user {user.id}: {e}")
             user_stats["errors"] = 1
         
         return user_stats
 
-    async def _should_generate_messages_for_user(self, user: User) -> bool:
-        """Check if we should generate messages for this user"""
+    @staticmethod
+    def _should_generate_messages_for_user(
+        profile: Optional[UserPersonalizationProfile],
+        activities: List[Activity],
+        recent_messages: List[Dict[str, Any]]
+    ) -> bool:
+        """Check if we should generate messages for this user
+
+        ``activities`` are the user's activities, newest first, and ``recent_messages``
+        their coaching messages from the last three days.
+        """
         
-        try:
-            # Check user's personalization profile
-            profile = await UserPersonalizationProfile.find_one({"user_id": str(user.id)})
-            
-            if profile:
-                # Check if user wants minimal messaging
-                if profile.message_frequency == "minimal":
-                    # For minimal users, only generate high-priority messages
-                    last_urgent = await CoachingMessage.find_one({
-                        "user_id": str(user.id),
-                        "priority": "urgent",
-                        "created_at": {"$gte": datetime.now(timezone.utc) - timedelta(days=3)}
-                    })
-                    if last_urgent:
-                        return False
-                
-                # Check daily message limit
-                today = datetime.now(timezone.utc).date()
-                messages_today = await CoachingMessage.find({
-                    "user_id": str(user.id),
-                    "created_at": {
-                        "$gte": datetime.combine(today, datetime.min.time()),
-                        "$lt": datetime.combine(today + timedelta(days=1), datetime.min.time())
-                    },
-                    "status": {"$nin": ["cancelled", "expired"]}
-                }).count()
-                
-                daily_limit = {
-                    "minimal": 1,
-                    "optimal": 3,
-                    "frequent": 5,
-                    "daily": 2
-                }.get(profile.message_frequency, 3)
-                
-                if messages_today >= daily_limit:
+        now = datetime.utcnow()
+        if profile:
+            # Check if user wants minimal messaging
+            if profile.message_frequency == "minimal":
+                # For minimal users, only generate high-priority messages
+                if any(message.get("priority") == "urgent" for message in recent_messages):
                     return False
             
-            # Check if user has recent activity (active users get more messages)
-            recent_activity = await Activity.find_one({
-                "user_id": str(user.id),
-                "date": {"$gte": datetime.now(timezone.utc) - timedelta(days=7)}
-            })
-            
-            if not recent_activity:
-                # For inactive users, be more conservative
-                recent_message = await CoachingMessage.find_one({
-                    "user_id": str(user.id),
-                    "created_at": {"$gte": datetime.now(timezone.utc) - timedelta(days=2)}
-                })
-                if recent_message:
-                    return False
+            # Check daily message limit
+            today = datetime.combine(now.date(), datetime.min.time())
+            messages_today = sum(
+                1 for message in recent_messages
+                if message["created_at"] >= today and message.get("status") not in ("cancelled", "expired")
+            )
             
-            return True
+            daily_limit = {
+                "minimal": 1,
+                "optimal": 3,
+                "frequent": 5,
+                "daily": 2
+            }.get(profile.message_frequency, 3)
             
-        except Exception as e:
-            logger.error(f"Error checking if should generate messages for user: {e}")
-            return True  # Default to generating messages
+            if messages_today >= daily_limit:
+                return False
+        
+        # Check if user has recent activity (active users get more messages)
+        recent_activity = bool(activities) and activities[0].date >= now - timedelta(days=7)
+        
+        if not recent_activity:
+            # For inactive users, be more conservative
+            if any(message["created_at"] >= now - timedelta(days=2) for message in recent_messages):
+                return False
+        
+        return True
 
     async def deliver_scheduled_messages(self) -> Dict[str, Any]:
         """Deliver all scheduled coaching messages that are due"""
@@ -1,27 +1,25 @@
 # app/services/coaching_scheduler.py
-import asyncio
 import logging
 from typing import Dict, Any
 from datetime import datetime, timedelta
-import schedule
-import threading
 
+from ..core.scheduler import DailyAt, Every, Job, JobScheduler, job_scheduler
 from ..services.coaching_background_service import CoachingBackgroundService
 from ..services.coaching_template_service import CoachingTemplateService
 
 logger = logging.getLogger(__name__)
 
 class CoachingScheduler:
-    """Scheduler for automated coaching message tasks"""
+    """Scheduled coaching message tasks, run by the shared job scheduler"""
     
-    def __init__(self):
+    def __init__(self, scheduler: JobScheduler = job_scheduler):
         self.background_service = CoachingBackgroundService()
         self.template_service = CoachingTemplateService()
-        self.scheduler_thread = None
+        self.scheduler = scheduler
         self.is_running = False
         
     async def start_scheduler(self):
-        """Start the coaching scheduler"""
+        """Seed templates and register the coaching jobs"""
         
         if self.is_running:
             logger.warning("Coaching scheduler is already running")
@@ -35,113 +33,54 @@ class CoachingScheduler:
         except Exception as e:
             logger.error(f"Error seeding templates on startup: {e}")
         
-        # Set up scheduled tasks
-        self._setup_schedule()
-        
-        # Start scheduler in background thread
+        for job in self._jobs():
+            self.scheduler.register(job)
         self.is_running = True
-        self.scheduler_thread = threading.Thread(target=self._run_scheduler)
-        self.scheduler_thread.daemon = True
-        self.scheduler_thread.start()
         
         logger.info("Coaching scheduler started successfully")
     
     def stop_scheduler(self):
-        """Stop the coaching scheduler"""
+        """Unregister the coaching jobs"""
         
         if not self.is_running:
             return
         
-        logger.info("Stopping coaching scheduler...")
+        for job in self._jobs():
+            self.scheduler.unregister(job.name)
         self.is_running = False
-        
-        if self.scheduler_thread:
-            self.scheduler_thread.join(timeout=5.0)
-        
-        schedule.clear()
         logger.info("Coaching scheduler stopped")
     
-    def _setup_schedule(self):
-        """Set up the scheduled tasks"""
-        
-        # Message delivery - every 5 minutes during active hours
-        schedule.every(5).minutes.do(self._schedule_message_delivery)
-        
-        # Message generation - every 2 hours during active hours
-        schedule.every(2).hours.do(self._schedule_message_generation)
-        
-        # Analytics generation - daily at 2 AM
-        schedule.every().day.at("02:00").do(self._schedule_analytics_generation)
-        
-        # Cleanup old messages - weekly on Sunday at 3 AM
-        schedule.every().sunday.at("03:00").do(self._schedule_cleanup)
-        
-        # Health check - every hour
-        schedule.every().hour.do(self._schedule_health_check)
-        
-        logger.info("Scheduled tasks configured")
-    
-    def _run_scheduler(self):
-        """Run the scheduler in a background thread"""
-        
-        while self.is_running:
-            try:
-                schedule.run_pending()
-                # Sleep for 1 minute between checks
-                for _ in range(60):
-                    if not self.is_running:
-                        break
-                    threading.Event().wait(1.0)
-            except Exception as e:
-                logger.error(f"Error in scheduler loop: {e}")
-                # Continue running even if there's an error
-                threading.Event().wait(60.0)
+    def _jobs(self):
+        """The scheduled coaching tasks"""
+        
+        return [
+            # Message delivery - every 5 minutes during active hours
+            Job("coaching.message_delivery", self._schedule_message_delivery, Every(5 * 60)),
+            # Message generation - every 2 hours during active hours
+            Job("coaching.message_generation", self._schedule_message_generation, Every(2 * 3600), jitter_seconds=120),
+            # Analytics generation - daily at 2 AM
+            Job("coaching.analytics", self._analytics_task, DailyAt(2), jitter_seconds=300),
+            # Cleanup old messages - weekly on Sunday at 3 AM
+            Job("coaching.cleanup", self._cleanup_task, DailyAt(3, weekday=6), jitter_seconds=300),
+            # Health check - every hour
+            Job("coaching.health_check", self._health_check_task, Every(3600)),
+        ]
     
-    def _schedule_message_delivery(self):
+    async def _schedule_message_delivery(self):
         """Schedule message delivery task"""
         
-        try:
-            # Only run during reasonable hours (6 AM - 11 PM)
-            current_hour = datetime.now().hour
-            if 6 <= current_hour <= 23:
-                asyncio.run(self._deliver_messages_task())
-        except Exception as e:
-            logger.error(f"Error in scheduled message delivery: {e}")
+        # Only run during reasonable hours (6 AM - 11 PM)
+        current_hour = datetime.now().hour
+        if 6 <= current_hour <= 23:
+            await self._deliver_messages_task()
     
-    def _schedule_message_generation(self):
+    async def _schedule_message_generation(self):
         """Schedule message generation task"""
         
-        try:
-            # Only run during reasonable hours (7 AM - 10 PM)
-            current_hour = datetime.now().hour
-            if 7 <= current_hour <= 22:
-                asyncio.run(self._generate_messages_task())
-        except Exception as e:
-            logger.error(f"Error in scheduled message generation: {e}")
-    
-    def _schedule_analytics_generation(self):
-        """Schedule analytics generation task"""
-        
-        try:
-            asyncio.run(self._analytics_task())
-        except Exception as e:
-            logger.error(f"Error in scheduled analytics generation: {e}")
-    
-    def _schedule_cleanup(self):
-        """Schedule cleanup task"""
-        
-        try:
-            asyncio.run(self._cleanup_task())
-        except Exception as e:
-            logger.error(f"Error in scheduled cleanup: {e}")
-    
-    def _schedule_health_check(self):
-        """Schedule health check task"""
-        
-        try:
-            asyncio.run(self._health_check_task())
-        except Exception as e:
-            logger.error(f"Error in scheduled health check: {e}")
+        # Only run during reasonable hours (7 AM - 10 PM)
+        current_hour = datetime.now().hour
+        if 7 <= current_hour <= 22:
+            await self._generate_messages_task()
     
     async def _deliver_messages_task(self):
         """Deliver scheduled messages"""
@@ -163,6 +102,7 @@ class CoachingScheduler:
                 
         except Exception as e:
             logger.error(f"Error in message delivery task: {e}")
+            raise
     
     async def _generate_messages_task(self):
         """Generate messages for active users"""
@@ -170,7 +110,9 @@ class CoachingScheduler:
         logger.info("Running scheduled message generation task")
         
         try:
-            stats = await self.background_service.process_all_users_for_coaching_messages()
+            stats = await self.background_service.process_all_users_for_coaching_messages(
+                checkpoint="coaching.message_generation"
+            )
             
             if stats["messages_generated"] > 0:
                 logger.info(
@@ -185,6 +127,7 @@ class CoachingScheduler:
                 
         except Exception as e:
             logger.error(f"Error in message generation task: {e}")
+            raise
     
     async def _analytics_task(self):
         """Generate and log analytics"""
@@ -210,6 +153,7 @@ class CoachingScheduler:
             
         except Exception as e:
             logger.error(f"Error in analytics task: {e}")
+            raise
     
     async def _cleanup_task(self):
         """Clean up old messages and data"""
@@ -225,6 +169,7 @@ class CoachingScheduler:
                 
         except Exception as e:
             logger.error(f"Error in cleanup task: {e}")
+            raise
     
     async def _health_check_task(self):
         """Perform health checks on the coaching system"""
@@ -260,6 +205,7 @@ class CoachingScheduler:
             
         except Exception as e:
             logger.error(f"Error in health check task: {e}")
+            raise
 
 # Global scheduler instance
 coaching_scheduler = CoachingScheduler()
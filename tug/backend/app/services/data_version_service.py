@@ -0,0 +1,64 @@
+# app/services/data_version_service.py
+"""
+Per-user data versions.
+
+Every write that can change a user's analytics or predictions bumps ``User.data_version``.
+Caches of derived data put the version in their keys, so an entry stays valid until the
+underlying data actually changes and is never served once it has. Keys are built from the
+version read back with ``current``: the user from ``get_current_user`` may be a
+principal-cache copy that predates a write handled by another replica.
+"""
+
+import logging
+
+from pymongo import ReturnDocument
+
+from ..core.principal_cache import principal_cache
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class DataVersionService:
+    """Maintains the per-user data-version counter"""
+
+    @staticmethod
+    async def bump(user: User) -> int:
+        """Increment the user's data version and return the new value.
+
+        The counter is incremented atomically in MongoDB so concurrent writers never hand out
+        the same version, and the in-memory user is updated so the rest of the request keys
+        its caches on the new version. Failures are logged rather than raised: the write that
+        triggered the bump has already succeeded.
+        """
+        try:
+            updated = await User.get_motor_collection().find_one_and_update(
+                {"_id": user.id},
+                {"$inc": {"data_version": 1}},
+                projection={"data_version": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if updated is not None:
+                user.data_version = updated.get("data_version", 0)
+            # The raw update skips the model's hooks; cached copies carry the old version
+            await principal_cache.invalidate_user(user.firebase_uid)
+        except Exception as e:
+            logger.error(f"Failed to bump data version for user {user.id}: {e}")
+        return user.data_version
+
+    @staticmethod
+    async def current(user: User) -> int:
+        """Read the user's data version from MongoDB, update the in-memory user and return it.
+
+        Falls back to the in-memory version if the read fails.
+        """
+        try:
+            stored = await User.get_motor_collection().find_one(
+                {"_id": user.id},
+                projection={"data_version": 1}
+            )
+            if stored is not None:
+                user.data_version = stored.get("data_version", 0)
+        except Exception as e:
+            logger.warning(f"Failed to read data version for user {user.id}: {e}")
+        return user.data_version
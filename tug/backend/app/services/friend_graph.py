@@ -0,0 +1,282 @@
+# app/services/friend_graph.py
+"""
+Cached friend-graph adjacency per user.
+
+Social screens need a user's friend ids, pending requests or the friendship status with
+a handful of other users. Instead of scanning ``friendships`` with an ``$or`` over
+requester and addressee each time, they read the user's adjacency: one
+``user_friend_graphs`` document holding every friendship from that user's side, kept
+in a bounded in-process LRU. Friendship changes are applied to both users' documents
+and drop the cached entries here and, through the pub/sub bus, on the other replicas.
+A user without a built document is rebuilt from ``friendships`` on first read.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from ..core.cache import MemoryLRUTier, decode_value, encode_value
+from ..core.config import settings
+from ..core.logging_config import get_logger
+from ..core.pubsub import REPLICA_ID, PubSubBackend, build_pubsub
+from ..models.friend_graph import UserFriendGraph
+from ..models.friendship import Friendship, FriendshipStatus
+
+logger = get_logger(__name__)
+
+CHANNEL = "social.friend_graph_invalidated"
+
+
+class FriendAdjacency:
+    """One user's friendships by the other user's id, as stored in the cache"""
+
+    __slots__ = ("user_id", "edges")
+
+    def __init__(self, user_id: str, edges: Dict[str, Dict[str, Any]]):
+        self.user_id = user_id
+        self.edges = edges
+
+    def status(self, other_id: str) -> Optional[FriendshipStatus]:
+        edge = self.edges.get(other_id)
+        return FriendshipStatus(edge["status"]) if edge is not None else None
+
+    def ids_with_status(self, status: FriendshipStatus, outgoing: Optional[bool] = None) -> List[str]:
+        return [
+            other_id for other_id, edge in self.edges.items()
+            if edge["status"] == status and (outgoing is None or edge["outgoing"] == outgoing)
+        ]
+
+    def friend_ids(self) -> List[str]:
+        return self.ids_with_status(FriendshipStatus.ACCEPTED)
+
+
+def edge_from_friendship(friendship: Friendship, user_id: str) -> Dict[str, Any]:
+    return {
+        "friendship_id": str(friendship.id),
+        "status": friendship.status.value,
+        "outgoing": friendship.requester_id == user_id,
+        "created_at": friendship.created_at,
+        "updated_at": friendship.updated_at
+    }
+
+
+class FriendGraphService:
+    """Reads adjacency through the cache and applies friendship changes to it"""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        pubsub: Optional[PubSubBackend] = None
+    ):
+        self.cache = MemoryLRUTier(max_entries or settings.FRIEND_GRAPH_CACHE_MAX_ENTRIES)
+        self.ttl_seconds = ttl_seconds or settings.FRIEND_GRAPH_CACHE_TTL_SECONDS
+        self.pubsub = pubsub
+        self._owns_pubsub = pubsub is None
+        self._subscribed = False
+        # Bumped by every invalidation, so a load that raced one is not cached
+        self.generation = 0
+
+    async def start(self) -> None:
+        """Follow friendship changes applied by the other replicas"""
+        if self.pubsub is None:
+            self.pubsub = build_pubsub()
+        if not self._subscribed:
+            await self.pubsub.subscribe(CHANNEL, self._handle_remote_invalidation)
+            self._subscribed = True
+
+    async def stop(self) -> None:
+        if self.pubsub is not None and self._subscribed:
+            await self.pubsub.unsubscribe(CHANNEL, self._handle_remote_invalidation)
+            if self._owns_pubsub:
+                await self.pubsub.close()
+            self._subscribed = False
+
+    # Reads
+
+    async def get(self, user_id: str) -> FriendAdjacency:
+        return (await self.get_many([user_id]))[user_id]
+
+    async def get_many(self, user_ids: Iterable[str]) -> Dict[str, FriendAdjacency]:
+        """Adjacency for several users, loading every cache miss with one query"""
+        result: Dict[str, FriendAdjacency] = {}
+        misses = []
+        for user_id in dict.fromkeys(user_ids):
+            entry = self.cache.get(user_id)
+            if entry is not None:
+                result[user_id] = FriendAdjacency(user_id, decode_value(entry[0]))
+            else:
+                misses.append(user_id)
+        self._record(len(result), len(misses))
+        if not misses:
+            return result
+
+        generation = self.generation
+        loaded = await self._load(misses)
+        for user_id, edges in loaded.items():
+            payload = encode_value(edges)
+            if generation == self.generation:
+                self.cache.set(user_id, payload, self.ttl_seconds)
+            # Round-trip through JSON so hits and misses look the same to callers
+            result[user_id] = FriendAdjacency(user_id, decode_value(payload))
+        return result
+
+    async def friend_ids(self, user_id: str) -> List[str]:
+        return (await self.get(user_id)).friend_ids()
+
+    async def status_between(self, user_id: str, other_id: str) -> Optional[FriendshipStatus]:
+        return (await self.get(user_id)).status(other_id)
+
+    async def stored_friend_ids(self, user_id: str) -> List[str]:
+        """Friend ids read from the database, bypassing the cache
+
+        For writes that must not miss a friendship made moments ago on another replica,
+        whose invalidation may not have reached this one.
+        """
+        edges = (await self._load([user_id]))[user_id]
+        return FriendAdjacency(user_id, edges).friend_ids()
+
+    async def _load(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read users' documents, rebuilding the ones that are missing or not built"""
+        documents = {
+            doc["user_id"]: doc
+            async for doc in UserFriendGraph.get_motor_collection().find({"user_id": {"$in": user_ids}})
+        }
+        loaded = {
+            user_id: doc.get("edges", {})
+            for user_id, doc in documents.items() if doc.get("built")
+        }
+        to_build = [user_id for user_id in user_ids if user_id not in loaded]
+        if to_build:
+            versions = {user_id: documents[user_id].get("version", 0) for user_id in to_build if user_id in documents}
+            loaded.update(await self._rebuild(to_build, versions))
+        return loaded
+
+    async def _rebuild(self, user_ids: List[str], versions: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+        """Rebuild users' adjacency from ``friendships`` with one scan and save it
+
+        A document whose version moved since it was read had a change applied meanwhile;
+        it is left unbuilt so the next read rebuilds it again.
+        """
+        edges: Dict[str, Dict[str, Any]] = {user_id: {} for user_id in user_ids}
+        friendships = await Friendship.find({"$or": [
+            {"requester_id": {"$in": user_ids}},
+            {"addressee_id": {"$in": user_ids}}
+        ]}).to_list()
+        for friendship in friendships:
+            for user_id, other_id in (
+                (friendship.requester_id, friendship.addressee_id),
+                (friendship.addressee_id, friendship.requester_id)
+            ):
+                if user_id in edges:
+                    edges[user_id][other_id] = edge_from_friendship(friendship, user_id)
+
+        collection = UserFriendGraph.get_motor_collection()
+        now = datetime.utcnow()
+        for user_id in user_ids:
+            try:
+                if user_id in versions:
+                    await collection.update_one(
+                        {"user_id": user_id, "version": versions[user_id]},
+                        {"$set": {"edges": edges[user_id], "built": True, "updated_at": now}}
+                    )
+                else:
+                    await collection.insert_one(
+                        {"user_id": user_id, "edges": edges[user_id], "built": True, "version": 0, "updated_at": now}
+                    )
+            except DuplicateKeyError:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to save friend graph for user {user_id}: {e}")
+        return edges
+
+    # Writes
+
+    async def record(self, friendship: Friendship) -> None:
+        """Apply a saved friendship to both users; call after creating or updating one"""
+        await self._apply(friendship, {
+            user_id: {"$set": {f"edges.{other_id}": edge_from_friendship(friendship, user_id)}}
+            for user_id, other_id in self._sides(friendship)
+        })
+
+    async def remove(self, friendship: Friendship) -> None:
+        """Remove a deleted friendship from both users"""
+        await self._apply(friendship, {
+            user_id: {"$unset": {f"edges.{other_id}": ""}}
+            for user_id, other_id in self._sides(friendship)
+        })
+
+    async def remove_user(self, user_id: str) -> None:
+        """Drop a user being deleted from the graph; call before deleting their friendships"""
+        other_ids = list((await self.get(user_id)).edges)
+        collection = UserFriendGraph.get_motor_collection()
+        if other_ids:
+            await collection.update_many(
+                {"user_id": {"$in": other_ids}},
+                {"$unset": {f"edges.{user_id}": ""}, "$inc": {"version": 1}}
+            )
+        await collection.delete_one({"user_id": user_id})
+        await self.invalidate([user_id] + other_ids)
+
+    @staticmethod
+    def _sides(friendship: Friendship):
+        return (
+            (friendship.requester_id, friendship.addressee_id),
+            (friendship.addressee_id, friendship.requester_id)
+        )
+
+    async def _apply(self, friendship: Friendship, changes: Dict[str, Dict[str, Any]]) -> None:
+        # Upserted documents stay unbuilt until a rebuild fills in the other friendships
+        operations = [
+            UpdateOne(
+                {"user_id": user_id},
+                {
+                    **change,
+                    "$inc": {"version": 1},
+                    "$currentDate": {"updated_at": True},
+                    "$setOnInsert": {"built": False}
+                },
+                upsert=True
+            )
+            for user_id, change in changes.items()
+        ]
+        try:
+            await UserFriendGraph.get_motor_collection().bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Dropped documents are rebuilt from friendships on the next read
+            logger.warning(f"Failed to apply friendship {friendship.id} to the friend graph: {e}")
+            await UserFriendGraph.get_motor_collection().delete_many({"user_id": {"$in": list(changes)}})
+        await self.invalidate(list(changes))
+
+    async def invalidate(self, user_ids: List[str]) -> None:
+        """Drop users' adjacency here and on the other replicas"""
+        for user_id in user_ids:
+            self.cache.delete(user_id)
+        self.generation += 1
+        if self.pubsub is not None and self._subscribed:
+            try:
+                await self.pubsub.publish(CHANNEL, {"user_ids": user_ids})
+            except Exception as e:
+                # Other replicas pick the change up when their entries expire
+                logger.warning(f"Failed to publish friend graph invalidation: {e}")
+
+    async def _handle_remote_invalidation(self, event: Dict[str, Any]) -> None:
+        if event.get("origin") != REPLICA_ID:
+            for user_id in event.get("user_ids", []):
+                self.cache.delete(user_id)
+            self.generation += 1
+
+    @staticmethod
+    def _record(hits: int, misses: int) -> None:
+        # Imported lazily: the monitoring package pulls in the whole app
+        from ..monitoring.metrics import metrics_collector
+        for result, count in (("hit", hits), ("miss", misses)):
+            if count:
+                metrics_collector.increment_counter(
+                    "cache_requests_total", count, {"cache": "friend_graph", "tier": "memory", "result": result}
+                )
+
+
+friend_graph = FriendGraphService()
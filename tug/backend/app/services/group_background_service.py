@@ -3,6 +3,7 @@ import asyncio
 import logging
 from datetime import datetime, timedelta, date
 from typing import List
+from ..core.scheduler import DailyAt, Job, JobScheduler
 from ..models.premium_group import PremiumGroup, GroupStatus
 from ..models.group_analytics import AnalyticsPeriod
 from .group_analytics_service import GroupAnalyticsService
@@ -206,25 +207,21 @@ class GroupBackgroundService:
                 "status": "active"
             }).to_list()
             
-            for membership in leadership_memberships:
-                try:
-                    # Create digest notification
-                    await NotificationService.create_group_notification(
-                        user_id=membership.user_id,
-                        group_id=membership.group_id,
-                        notification_type="weekly_digest",
-                        message="Your weekly group digest is ready",
-                        data={
-                            "digest_type": "weekly",
-                            "action_url": f"/premium-groups/{membership.group_id}/dashboard"
-                        }
-                    )
-                    
-                    await asyncio.sleep(0.1)  # Brief pause between notifications
-                except Exception as e:
-                    logger.error(f"Error sending digest notification for membership {membership.id}: {e}")
+            created = await NotificationService.create_many([
+                NotificationService.build_group_notification(
+                    user_id=membership.user_id,
+                    group_id=membership.group_id,
+                    notification_type="weekly_digest",
+                    message="Your weekly group digest is ready",
+                    data={
+                        "digest_type": "weekly",
+                        "action_url": f"/premium-groups/{membership.group_id}/dashboard"
+                    }
+                )
+                for membership in leadership_memberships
+            ])
             
-            logger.info(f"Sent digest notifications to {len(leadership_memberships)} group leaders")
+            logger.info(f"Sent digest notifications to {created} group leaders")
             
         except Exception as e:
             logger.error(f"Error sending digest notifications: {e}")
@@ -334,4 +331,11 @@ class GroupBackgroundService:
             logger.info("Completed monthly group background tasks")
             
         except Exception as e:
-            logger.error(f"Error in monthly group background tasks: {e}", exc_info=True)
\ No newline at end of file
+            logger.error(f"Error in monthly group background tasks: {e}", exc_info=True)
+    
+    @staticmethod
+    def register_jobs(scheduler: JobScheduler):
+        """Schedule the daily, weekly and monthly tasks"""
+        scheduler.register(Job("groups.daily", GroupBackgroundService.run_daily_tasks, DailyAt(1), jitter_seconds=300))
+        scheduler.register(Job("groups.weekly", GroupBackgroundService.run_weekly_tasks, DailyAt(4, weekday=0), jitter_seconds=300))
+        scheduler.register(Job("groups.monthly", GroupBackgroundService.run_monthly_tasks, DailyAt(5, day=1), jitter_seconds=300))
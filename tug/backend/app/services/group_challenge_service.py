@@ -299,17 +299,18 @@ class GroupChallengeService:
                 "status": "active"
             }).to_list()
             
-            # Send notifications
-            for membership in memberships:
-                # Check notification preferences
-                if membership.notification_preferences.get("challenges", True):
-                    await NotificationService.create_group_notification(
-                        user_id=membership.user_id,
-                        group_id=group_id,
-                        notification_type=notification_type,
-                        message=message,
-                        data=data
-                    )
+            # Send notifications to members who opted in
+            await NotificationService.create_many([
+                NotificationService.build_group_notification(
+                    user_id=membership.user_id,
+                    group_id=group_id,
+                    notification_type=notification_type,
+                    message=message,
+                    data=data
+                )
+                for membership in memberships
+                if membership.notification_preferences.get("challenges", True)
+            ])
             
         except Exception as e:
             logger.error(f"Error sending group notifications: {e}")
@@ -0,0 +1,51 @@
+# app/services/group_member_index.py
+"""
+Cached active-member lists per group.
+
+Fan-out paths (offline delivery, @all mentions) need the ids of a group's active members
+for every message. They read them from this index, which holds one small list per group
+in the tiered cache and is invalidated wherever a membership becomes or stops being
+active, instead of scanning GroupMembership per message.
+"""
+
+import logging
+from typing import List
+
+from ..core.cache import build_cache
+from ..core.config import settings
+from ..models.premium_group import GroupMembership, MembershipStatus
+
+logger = logging.getLogger(__name__)
+
+
+class GroupMemberIndex:
+    """Active member ids per group, cached until a membership change invalidates them"""
+
+    def __init__(self):
+        self.cache = build_cache("group_members")
+
+    @staticmethod
+    def _key(group_id: str) -> str:
+        return f"group_members:{group_id}"
+
+    async def get_active_member_ids(self, group_id: str) -> List[str]:
+        async def load() -> List[str]:
+            cursor = GroupMembership.get_motor_collection().find(
+                {"group_id": group_id, "status": MembershipStatus.ACTIVE},
+                projection={"user_id": 1, "_id": 0}
+            )
+            return [doc["user_id"] async for doc in cursor]
+
+        return await self.cache.get_or_compute(
+            self._key(group_id), load, settings.GROUP_MEMBER_INDEX_TTL_SECONDS
+        )
+
+    async def invalidate(self, group_id: str) -> None:
+        """Call after a membership of the group is activated, removed or deleted"""
+        try:
+            await self.cache.delete(self._key(group_id))
+        except Exception as e:
+            logger.error(f"Failed to invalidate member index for group {group_id}: {e}")
+
+
+group_member_index = GroupMemberIndex()
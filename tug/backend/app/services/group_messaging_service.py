@@ -2,30 +2,32 @@
 import logging
 import asyncio
 from typing import Optional, List, Dict, Any, Tuple
+from bisect import bisect_left
 from datetime import datetime, timedelta
 from uuid import uuid4
 
 from fastapi import HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from pymongo import DESCENDING, ASCENDING
-from beanie import PydanticObjectId
+from pymongo import DESCENDING, ASCENDING, UpdateOne
+from bson import ObjectId
 
 from ..models.user import User
 from ..models.premium_group import GroupMembership, MembershipStatus, GroupRole, PremiumGroup
 from ..models.group_message import (
-    GroupMessage, MessageReaction, TypingIndicator, MessageQueue,
+    GroupMessage, MessageReaction, MessageQueue, MessageReadWatermark,
     MessageType, MessageStatus, ReactionType
 )
 from ..schemas.group_message import (
     SendMessageRequest, EditMessageRequest, ReactToMessageRequest,
     MarkMessagesReadRequest, MessageSearchRequest, TypingIndicatorRequest,
     MessageData, MessageAuthor, MessageReactionData, MessageListResponse,
-    MessageSearchResponse, TypingUser, TypingIndicatorResponse,
-    WebSocketMessage, WebSocketMessageType
+    MessageSearchResponse, TypingUser, TypingIndicatorResponse, UnreadCountResponse,
+    WebSocketMessage
 )
 from ..core.database import get_database
 from ..services.websocket_manager import websocket_manager
 from ..services.notification_service import NotificationService
+from ..services.group_member_index import group_member_index
 from ..utils.validation import sanitize_text_content
 
 logger = logging.getLogger(__name__)
@@ -301,38 +303,79 @@ class GroupMessagingService:
         group_id: str, 
         read_data: MarkMessagesReadRequest
     ):
-        """Mark messages as read"""
+        """Move the reader's watermarks up to the newest of the given messages.
+        
+        Only the newest message of each timeline (main or thread) matters, so marking a
+        backlog as read is one aggregation and one upsert per timeline, however many
+        messages it covers, and group members get a single event for it.
+        """
         try:
             # Verify group access
             await self._verify_group_access(current_user.id, group_id)
             
-            # Get messages to mark as read
-            messages = await GroupMessage.find({
-                "_id": {"$in": [PydanticObjectId(msg_id) for msg_id in read_data.message_ids]},
-                "group_id": group_id,
-                "is_deleted": False
-            }).to_list()
+            object_ids = [ObjectId(msg_id) for msg_id in read_data.message_ids if ObjectId.is_valid(msg_id)]
+            if not object_ids:
+                return
+            
+            newest_by_thread = await GroupMessage.aggregate([
+                {"$match": {"_id": {"$in": object_ids}, "group_id": group_id, "is_deleted": False}},
+                {"$sort": {"created_at": DESCENDING}},
+                {"$group": {
+                    "_id": "$thread_id",
+                    "message_id": {"$first": "$_id"},
+                    "created_at": {"$first": "$created_at"}
+                }}
+            ]).to_list()
+            if not newest_by_thread:
+                return
             
             read_at = read_data.read_at or datetime.utcnow()
+            updates = [
+                UpdateOne(
+                    {"user_id": current_user.id, "group_id": group_id, "thread_id": newest["_id"]},
+                    # Watermarks never move backwards, even when older reads arrive late
+                    [{"$set": {
+                        "last_read_message_id": {"$cond": [
+                            {"$gt": [newest["created_at"], {"$ifNull": ["$last_read_at", None]}]},
+                            str(newest["message_id"]),
+                            "$last_read_message_id"
+                        ]},
+                        "last_read_at": {"$max": ["$last_read_at", newest["created_at"]]},
+                        "read_at": read_at
+                    }}],
+                    upsert=True
+                )
+                for newest in newest_by_thread
+            ]
+            await MessageReadWatermark.get_motor_collection().bulk_write(updates, ordered=False)
+            
+            # Senders see their message as read; each message flips at most once
+            await GroupMessage.get_motor_collection().update_many(
+                {
+                    "_id": {"$in": object_ids},
+                    "group_id": group_id,
+                    "user_id": {"$ne": current_user.id},
+                    "status": {"$ne": MessageStatus.READ.value}
+                },
+                {"$set": {"status": MessageStatus.READ.value}}
+            )
             
-            # Add read receipts
-            for message in messages:
-                message.add_read_receipt(current_user.id, read_at)
-                await message.save()
-            
-            # Broadcast read receipts for real-time updates
-            for message in messages:
-                await websocket_manager.send_to_user(message.user_id, {
-                    "type": WebSocketMessageType.MESSAGE_READ,
-                    "data": {
-                        "message_id": str(message.id),
-                        "reader_user_id": current_user.id,
-                        "reader_username": current_user.username,
-                        "read_at": read_at.isoformat()
+            # One event per read, carrying the new watermark of every timeline touched
+            await websocket_manager.broadcast_read_receipt(group_id, {
+                "reader_user_id": current_user.id,
+                "reader_username": current_user.username,
+                "read_at": read_at.isoformat(),
+                "watermarks": [
+                    {
+                        "thread_id": newest["_id"],
+                        "last_read_message_id": str(newest["message_id"]),
+                        "last_read_at": newest["created_at"].isoformat()
                     }
-                })
+                    for newest in newest_by_thread
+                ]
+            })
             
-            logger.info(f"User {current_user.username} marked {len(messages)} messages as read in group {group_id}")
+            logger.info(f"User {current_user.username} marked {len(object_ids)} messages as read in group {group_id}")
             
         except HTTPException:
             raise
@@ -343,6 +386,51 @@ class GroupMessagingService:
                 detail="Failed to mark messages as read"
             )
     
+    async def get_unread_count(
+        self,
+        current_user: User,
+        group_id: str,
+        thread_id: Optional[str] = None
+    ) -> UnreadCountResponse:
+        """Count messages from others newer than the user's watermark for a timeline"""
+        try:
+            # Verify group access
+            await self._verify_group_access(current_user.id, group_id)
+            
+            watermark = await MessageReadWatermark.find_one({
+                "user_id": current_user.id,
+                "group_id": group_id,
+                "thread_id": thread_id
+            })
+            
+            query = {
+                "group_id": group_id,
+                "thread_id": thread_id,
+                "is_deleted": False,
+                "user_id": {"$ne": current_user.id}
+            }
+            if watermark:
+                query["created_at"] = {"$gt": watermark.last_read_at}
+            
+            unread_count = await GroupMessage.find(query).count()
+            
+            return UnreadCountResponse(
+                group_id=group_id,
+                thread_id=thread_id,
+                unread_count=unread_count,
+                last_read_at=watermark.last_read_at if watermark else None,
+                last_read_message_id=watermark.last_read_message_id if watermark else None
+            )
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error counting unread messages in group {group_id}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to get unread count"
+            )
+    
     async def get_group_messages(
         self, 
         current_user: User, 
@@ -353,7 +441,7 @@ class GroupMessagingService:
         """Get paginated group messages"""
         try:
             # Verify group access
-            await self._verify_group_access(current_user.id, group_id)
+            membership = await self._verify_group_access(current_user.id, group_id)
             
             # Build query
             query = {
@@ -374,11 +462,7 @@ class GroupMessagingService:
                 messages = messages[:limit]
             
             # Format message data
-            formatted_messages = []
-            for message in messages:
-                author = await self._get_message_author(message.user_id)
-                formatted_message = await self._format_message_data(message, current_user, author)
-                formatted_messages.append(formatted_message)
+            formatted_messages = await self._hydrate_messages(messages, current_user, membership)
             
             # Get total count for this group
             total_count = await GroupMessage.find({
@@ -413,7 +497,7 @@ class GroupMessagingService:
         """Search messages within a group"""
         try:
             # Verify group access
-            await self._verify_group_access(current_user.id, group_id)
+            membership = await self._verify_group_access(current_user.id, group_id)
             
             # Build search query
             query = {
@@ -445,11 +529,7 @@ class GroupMessagingService:
                 messages = messages[:search_data.limit]
             
             # Format results
-            formatted_messages = []
-            for message in messages:
-                author = await self._get_message_author(message.user_id)
-                formatted_message = await self._format_message_data(message, current_user, author)
-                formatted_messages.append(formatted_message)
+            formatted_messages = await self._hydrate_messages(messages, current_user, membership)
             
             # Get total results count
             total_results = await GroupMessage.find({
@@ -482,55 +562,19 @@ class GroupMessagingService:
     ):
         """Handle typing indicator updates"""
         try:
-            # Verify group access
-            await self._verify_group_access(current_user.id, group_id)
-            
-            if typing_data.is_typing:
-                # Update or create typing indicator
-                typing_indicator = await TypingIndicator.find_one({
-                    "group_id": group_id,
-                    "user_id": current_user.id,
-                    "thread_id": typing_data.thread_id
-                })
-                
-                if typing_indicator:
-                    typing_indicator.refresh_typing()
-                    await typing_indicator.save()
-                else:
-                    typing_indicator = TypingIndicator(
-                        group_id=group_id,
-                        user_id=current_user.id,
-                        thread_id=typing_data.thread_id,
-                        expires_at=datetime.utcnow() + timedelta(seconds=10)
-                    )
-                    await typing_indicator.save()
-                
-                # Broadcast typing start
-                await websocket_manager.broadcast_typing_start(
-                    group_id,
-                    {
-                        "user_id": current_user.id,
-                        "username": current_user.username
-                    },
-                    typing_data.thread_id
-                )
-            else:
-                # Stop typing
-                await TypingIndicator.find({
-                    "group_id": group_id,
-                    "user_id": current_user.id,
-                    "thread_id": typing_data.thread_id
-                }).delete()
-                
-                # Broadcast typing stop
-                await websocket_manager.broadcast_typing_stop(
-                    group_id,
-                    {
-                        "user_id": current_user.id,
-                        "username": current_user.username
-                    },
-                    typing_data.thread_id
-                )
+            # Connections that joined the group were checked then; others need a lookup
+            if not websocket_manager.is_subscribed(current_user.id, group_id):
+                await self._verify_group_access(current_user.id, group_id)
+            
+            # Typing state lives in memory; the registry debounces the broadcasts
+            await websocket_manager.set_typing(
+                group_id,
+                current_user.id,
+                current_user.username,
+                display_name=current_user.display_name,
+                thread_id=typing_data.thread_id,
+                is_typing=typing_data.is_typing
+            )
                 
         except HTTPException:
             raise
@@ -545,27 +589,19 @@ class GroupMessagingService:
         """Get users currently typing in a group"""
         try:
             # Verify group access
-            await self._verify_group_access(current_user.id, group_id)
-            
-            # Get active typing indicators
-            typing_indicators = await TypingIndicator.find({
-                "group_id": group_id,
-                "is_typing": True,
-                "expires_at": {"$gt": datetime.utcnow()},
-                "user_id": {"$ne": current_user.id}  # Exclude current user
-            }).to_list()
+            if not websocket_manager.is_subscribed(current_user.id, group_id):
+                await self._verify_group_access(current_user.id, group_id)
             
             # Format typing users
-            typing_users = []
-            for indicator in typing_indicators:
-                user = await User.get(indicator.user_id)
-                if user:
-                    typing_users.append(TypingUser(
-                        user_id=indicator.user_id,
-                        username=user.username,
-                        display_name=user.display_name,
-                        thread_id=indicator.thread_id
-                    ))
+            typing_users = [
+                TypingUser(
+                    user_id=state.user_id,
+                    username=state.username,
+                    display_name=state.display_name,
+                    thread_id=state.thread_id
+                )
+                for state in websocket_manager.get_typing_users(group_id, exclude_user_id=current_user.id)
+            ]
             
             return TypingIndicatorResponse(
                 group_id=group_id,
@@ -627,11 +663,59 @@ class GroupMessagingService:
         # Get reactions
         reactions = await self._get_message_reactions(str(message.id), current_user.id)
         
+        read_counts = await self._get_read_counts([message])
+        
+        # Admins may edit and delete any message
+        is_admin = message.user_id != current_user.id and await self._is_group_admin(current_user.id, message.group_id)
+        
+        return self._build_message_data(
+            message, current_user, author, reactions, read_counts[str(message.id)], is_admin
+        )
+    
+    async def _hydrate_messages(
+        self,
+        messages: List[GroupMessage],
+        current_user: User,
+        membership: GroupMembership
+    ) -> List[MessageData]:
+        """Format a page of messages with one query each for authors, reactions and reads.
+        
+        ``membership`` is the caller's membership in the group, already loaded by
+        ``_verify_group_access``, so permissions need no further lookups.
+        """
+        if not messages:
+            return []
+        
+        authors = await self._get_message_authors([message.user_id for message in messages])
+        reactions = await self._get_reactions_by_message([str(message.id) for message in messages], current_user.id)
+        read_counts = await self._get_read_counts(messages)
+        is_admin = membership.role in [GroupRole.ADMIN, GroupRole.OWNER]
+        
+        return [
+            self._build_message_data(
+                message,
+                current_user,
+                authors[message.user_id],
+                reactions.get(str(message.id), []),
+                read_counts[str(message.id)],
+                is_admin
+            )
+            for message in messages
+        ]
+    
+    def _build_message_data(
+        self,
+        message: GroupMessage,
+        current_user: User,
+        author: MessageAuthor,
+        reactions: List[MessageReactionData],
+        read_count: int,
+        is_admin: bool
+    ) -> MessageData:
+        """Assemble message data from already loaded author, reactions and read count"""
         # Check user permissions
-        can_edit = (message.user_id == current_user.id or 
-                   await self._is_group_admin(current_user.id, message.group_id))
-        can_delete = (message.user_id == current_user.id or 
-                     await self._is_group_admin(current_user.id, message.group_id))
+        can_edit = message.user_id == current_user.id or is_admin
+        can_delete = message.user_id == current_user.id or is_admin
         
         return MessageData(
             id=str(message.id),
@@ -656,59 +740,127 @@ class GroupMessagingService:
             mentioned_user_ids=message.mentioned_user_ids,
             reactions=reactions,
             delivery_count=len(message.delivery_receipts),
-            read_count=len(message.read_receipts),
+            read_count=read_count,
             user_can_edit=can_edit,
             user_can_delete=can_delete
         )
     
     async def _get_message_author(self, user_id: str) -> MessageAuthor:
         """Get message author information"""
-        user = await User.get(user_id)
-        if not user:
-            return MessageAuthor(
+        authors = await self._get_message_authors([user_id])
+        return authors[user_id]
+    
+    async def _get_message_authors(self, user_ids: List[str]) -> Dict[str, MessageAuthor]:
+        """Get author information for every user id in one query"""
+        unique_ids = list(dict.fromkeys(user_ids))
+        object_ids = [ObjectId(uid) for uid in unique_ids if ObjectId.is_valid(uid)]
+        users = await User.find({"_id": {"$in": object_ids}}).to_list() if object_ids else []
+        users_by_id = {str(user.id): user for user in users}
+        
+        authors = {}
+        for user_id in unique_ids:
+            user = users_by_id.get(user_id)
+            if not user:
+                authors[user_id] = MessageAuthor(
+                    id=user_id,
+                    username="Unknown User",
+                    display_name=None,
+                    avatar_url=None,
+                    role=None
+                )
+                continue
+            
+            authors[user_id] = MessageAuthor(
                 id=user_id,
-                username="Unknown User",
-                display_name=None,
-                avatar_url=None,
-                role=None
+                username=user.username,
+                display_name=user.display_name,
+                avatar_url=user.profile_picture_url,
+                role=None  # Will be populated with group role if needed
             )
         
-        return MessageAuthor(
-            id=user_id,
-            username=user.username,
-            display_name=user.display_name,
-            avatar_url=user.profile_picture_url,
-            role=None  # Will be populated with group role if needed
-        )
+        return authors
     
     async def _get_message_reactions(self, message_id: str, current_user_id: str) -> List[MessageReactionData]:
         """Get aggregated reaction data for a message"""
-        reactions = await MessageReaction.find({"message_id": message_id}).to_list()
-        
-        # Group reactions by type
-        reaction_groups = {}
-        for reaction in reactions:
-            reaction_type = reaction.reaction_type.value
-            if reaction_type not in reaction_groups:
-                reaction_groups[reaction_type] = {
-                    "user_ids": [],
-                    "custom_emoji": reaction.custom_emoji
-                }
-            reaction_groups[reaction_type]["user_ids"].append(reaction.user_id)
+        reactions = await self._get_reactions_by_message([message_id], current_user_id)
+        return reactions.get(message_id, [])
+    
+    async def _get_reactions_by_message(
+        self,
+        message_ids: List[str],
+        current_user_id: str
+    ) -> Dict[str, List[MessageReactionData]]:
+        """Get aggregated reaction data for several messages with one aggregation"""
+        pipeline = [
+            {"$match": {"message_id": {"$in": message_ids}}},
+            {"$sort": {"created_at": ASCENDING}},
+            # One group per message and reaction type, in order of the first reaction
+            {"$group": {
+                "_id": {"message_id": "$message_id", "reaction_type": "$reaction_type"},
+                "user_ids": {"$push": "$user_id"},
+                "custom_emoji": {"$first": "$custom_emoji"},
+                "first_reacted_at": {"$first": "$created_at"}
+            }},
+            {"$sort": {"first_reacted_at": ASCENDING}},
+            {"$group": {
+                "_id": "$_id.message_id",
+                "reactions": {"$push": {
+                    "reaction_type": "$_id.reaction_type",
+                    "user_ids": "$user_ids",
+                    "custom_emoji": "$custom_emoji"
+                }}
+            }}
+        ]
+        results = await MessageReaction.aggregate(pipeline).to_list()
         
         # Format reaction data
-        formatted_reactions = []
-        for reaction_type, data in reaction_groups.items():
-            user_reacted = current_user_id in data["user_ids"]
-            formatted_reactions.append(MessageReactionData(
-                reaction_type=ReactionType(reaction_type),
-                count=len(data["user_ids"]),
-                user_ids=data["user_ids"],
-                user_reacted=user_reacted,
-                custom_emoji=data["custom_emoji"]
-            ))
+        reactions_by_message = {}
+        for result in results:
+            reactions_by_message[result["_id"]] = [
+                MessageReactionData(
+                    reaction_type=ReactionType(reaction["reaction_type"]),
+                    count=len(reaction["user_ids"]),
+                    user_ids=reaction["user_ids"],
+                    user_reacted=current_user_id in reaction["user_ids"],
+                    custom_emoji=reaction["custom_emoji"]
+                )
+                for reaction in result["reactions"]
+            ]
+        
+        return reactions_by_message
+    
+    async def _get_read_counts(self, messages: List[GroupMessage]) -> Dict[str, int]:
+        """Count the other members whose watermark covers each message, with one aggregation"""
+        if not messages:
+            return {}
+        
+        thread_ids = list({message.thread_id for message in messages})
+        results = await MessageReadWatermark.aggregate([
+            {"$match": {"group_id": messages[0].group_id, "thread_id": {"$in": thread_ids}}},
+            {"$group": {
+                "_id": "$thread_id",
+                "readers": {"$push": {"user_id": "$user_id", "last_read_at": "$last_read_at"}}
+            }}
+        ]).to_list()
+        
+        # Per timeline: sorted watermarks for counting, and each reader's own for the author
+        read_times = {}
+        reader_watermarks = {}
+        for result in results:
+            read_times[result["_id"]] = sorted(reader["last_read_at"] for reader in result["readers"])
+            for reader in result["readers"]:
+                reader_watermarks[(result["_id"], reader["user_id"])] = reader["last_read_at"]
         
-        return formatted_reactions
+        read_counts = {}
+        for message in messages:
+            times = read_times.get(message.thread_id, [])
+            count = len(times) - bisect_left(times, message.created_at)
+            author_read_at = reader_watermarks.get((message.thread_id, message.user_id))
+            if author_read_at is not None and author_read_at >= message.created_at:
+                count -= 1
+            read_counts[str(message.id)] = count
+        
+        return read_counts
     
     async def _handle_message_mentions(
         self, 
@@ -718,60 +870,41 @@ class GroupMessagingService:
     ):
         """Handle notifications for message mentions"""
         try:
-            mentioned_users = message.get_mentioned_users()
-            
             if message.notify_all:
-                # Get all group members
-                memberships = await GroupMembership.find({
-                    "group_id": message.group_id,
-                    "status": MembershipStatus.ACTIVE
-                }).to_list()
-                
-                for membership in memberships:
-                    if membership.user_id != sender.id:  # Don't notify sender
-                        await NotificationService.create_group_message_notification(
-                            user_id=membership.user_id,
-                            sender_id=sender.id,
-                            sender_name=sender.display_name or sender.username,
-                            group_id=message.group_id,
-                            group_name=group.name,
-                            message_content=message.content[:100],
-                            is_mention=True
-                        )
+                # Every active group member
+                recipient_ids = await group_member_index.get_active_member_ids(message.group_id)
             else:
                 # Notify mentioned users
-                for user_id in mentioned_users:
-                    if user_id != sender.id:  # Don't notify sender
-                        await NotificationService.create_group_message_notification(
-                            user_id=user_id,
-                            sender_id=sender.id,
-                            sender_name=sender.display_name or sender.username,
-                            group_id=message.group_id,
-                            group_name=group.name,
-                            message_content=message.content[:100],
-                            is_mention=True
-                        )
-                        
+                recipient_ids = message.get_mentioned_users()
+            
+            sender_id = str(sender.id)
+            await NotificationService.create_many([
+                NotificationService.build_group_message_notification(
+                    user_id=user_id,
+                    sender_id=sender_id,
+                    sender_name=sender.display_name or sender.username,
+                    group_id=message.group_id,
+                    group_name=group.name,
+                    message_content=message.content[:100],
+                    is_mention=True
+                )
+                for user_id in dict.fromkeys(recipient_ids)
+                if user_id != sender_id  # Don't notify sender
+            ])
+            
         except Exception as e:
             logger.error(f"Error handling message mentions: {e}")
     
     async def _queue_message_for_offline_users(self, message: GroupMessage, group_id: str):
-        """Queue message for offline users"""
+        """Queue message for offline users; delivered by the message delivery workers"""
         try:
-            # Get all group members
-            memberships = await GroupMembership.find({
-                "group_id": group_id,
-                "status": MembershipStatus.ACTIVE
-            }).to_list()
-            
-            # Get currently connected users
-            connected_users = set(websocket_manager.user_connections.keys())
+            member_ids = await group_member_index.get_active_member_ids(group_id)
             
-            # Find offline users
-            offline_users = []
-            for membership in memberships:
-                if membership.user_id not in connected_users:
-                    offline_users.append(membership.user_id)
+            # Find offline users (connected to no replica)
+            offline_users = [
+                user_id for user_id in member_ids
+                if user_id != message.user_id and not websocket_manager.is_user_online(user_id)
+            ]
             
             if offline_users:
                 # Create message queue entry
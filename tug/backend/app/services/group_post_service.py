@@ -427,16 +427,18 @@ class GroupPostService:
             author_name = author.display_name or author.username if author else "A member"
             
             # Send notifications to members who opted in
-            for membership in memberships:
-                if membership.notification_preferences.get("group_posts", True):
-                    await NotificationService.create_group_post_notification(
-                        member_id=membership.user_id,
-                        author_id=author_id,
-                        author_name=author_name,
-                        group_id=group_id,
-                        post_id=str(post.id),
-                        post_content=post.content[:100]  # First 100 chars
-                    )
+            await NotificationService.create_many([
+                NotificationService.build_group_post_notification(
+                    member_id=membership.user_id,
+                    author_id=author_id,
+                    author_name=author_name,
+                    group_id=group_id,
+                    post_id=str(post.id),
+                    post_content=post.content[:100]  # First 100 chars
+                )
+                for membership in memberships
+                if membership.notification_preferences.get("group_posts", True)
+            ])
             
         except Exception as e:
             logger.error(f"Error sending new post notifications: {e}")
@@ -0,0 +1,268 @@
+# app/services/message_delivery_service.py
+"""
+Offline message delivery.
+
+GroupMessagingService queues a MessageQueue item per message for the members who were
+offline when it was sent. Delivery workers claim pending items in batches, each claim an
+atomic find-and-modify that takes a lease, so any number of workers across replicas can
+drain the queue without delivering an item twice; a claim whose worker died is taken
+over once its lease expires. A batch is coalesced per recipient and group, so someone
+who missed twenty messages in a group gets one notification rather than twenty. Failed
+items are retried with exponential backoff until ``increment_retry`` marks them failed.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from ..core.config import settings
+from ..models.group_message import GroupMessage, MessageQueue
+from ..models.notification import Notification, NotificationType
+from ..models.premium_group import PremiumGroup
+from ..models.user import User
+from .notification_service import NotificationService
+from .websocket_manager import websocket_manager
+
+logger = logging.getLogger(__name__)
+
+# (recipient user_id, group_id) -> that recipient's undelivered messages in the group
+Digests = Dict[Tuple[str, str], List[GroupMessage]]
+
+
+def coalesce(items: List[MessageQueue], messages: Dict[str, GroupMessage]) -> Digests:
+    """Group the claimed items' messages per recipient and group, oldest first"""
+    digests: Digests = defaultdict(list)
+    for item in items:
+        message = messages.get(item.message_id)
+        if message is None or message.is_deleted:
+            continue
+        for user_id in item.recipient_user_ids:
+            digests[(user_id, item.group_id)].append(message)
+    for group_messages in digests.values():
+        group_messages.sort(key=lambda message: message.created_at)
+    return digests
+
+
+class MessageDeliveryWorker:
+    """Claims queued offline deliveries in batches and turns them into notifications"""
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        poll_interval_seconds: Optional[float] = None,
+        lease_seconds: Optional[int] = None,
+        retry_backoff_seconds: Optional[float] = None
+    ):
+        self.batch_size = batch_size or settings.MESSAGE_DELIVERY_BATCH_SIZE
+        self.poll_interval_seconds = poll_interval_seconds or settings.MESSAGE_DELIVERY_POLL_SECONDS
+        self.lease_seconds = lease_seconds or settings.MESSAGE_DELIVERY_LEASE_SECONDS
+        self.retry_backoff_seconds = retry_backoff_seconds or settings.MESSAGE_DELIVERY_RETRY_BACKOFF_SECONDS
+        self.worker_id = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start draining the queue; must be called from the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Started message delivery worker {self.worker_id}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.run_once()
+                # Keep going while the queue has a backlog
+                if claimed < self.batch_size:
+                    await asyncio.sleep(self.poll_interval_seconds)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in message delivery worker: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval_seconds)
+
+    async def run_once(self) -> int:
+        """Claim and deliver one batch; returns the number of items claimed"""
+        items = await self.claim_batch()
+        if not items:
+            return 0
+
+        try:
+            notifications = await self._deliver(items)
+        except Exception as e:
+            logger.error(f"Failed to deliver {len(items)} queued messages: {e}")
+            for item in items:
+                await self._retry_later(item, e)
+            return len(items)
+
+        await self._complete(items)
+        now = datetime.utcnow()
+        for item in items:
+            self._observe_metric("message_delivery_lag_seconds", (now - item.created_at).total_seconds())
+        self._record_metric("message_delivery_items_total", {"result": "delivered"}, len(items))
+        self._record_metric("message_delivery_notifications_total", {"result": "created"}, notifications)
+        return len(items)
+
+    async def claim_batch(self) -> List[MessageQueue]:
+        """Lease up to ``batch_size`` due items, highest priority and oldest first"""
+        collection = MessageQueue.get_motor_collection()
+        items = []
+        for _ in range(self.batch_size):
+            now = datetime.utcnow()
+            raw = await collection.find_one_and_update(
+                {"$or": [
+                    {"status": "pending", "scheduled_for": {"$lte": now}},
+                    # Claimed by a worker that did not finish within its lease
+                    {"status": "processing", "lease_expires_at": {"$lte": now}},
+                ]},
+                {"$set": {
+                    "status": "processing",
+                    "claimed_by": self.worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                }},
+                sort=[("priority", -1), ("created_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if raw is None:
+                break
+            items.append(MessageQueue.model_validate(raw))
+        return items
+
+    async def _deliver(self, items: List[MessageQueue]) -> int:
+        """Create one notification per recipient and group; returns how many were created"""
+        message_ids = {ObjectId(item.message_id) for item in items if ObjectId.is_valid(item.message_id)}
+        messages = await GroupMessage.find({"_id": {"$in": list(message_ids)}}).to_list()
+        digests = coalesce(items, {str(message.id): message for message in messages})
+
+        # Members who came back online since read the messages live or from history
+        online = [key for key in digests if websocket_manager.is_user_online(key[0])]
+        for key in online:
+            del digests[key]
+        if online:
+            self._record_metric("message_delivery_notifications_total", {"result": "skipped_online"}, len(online))
+        if not digests:
+            return 0
+
+        group_ids = {ObjectId(group_id) for _, group_id in digests if ObjectId.is_valid(group_id)}
+        groups = await PremiumGroup.find({"_id": {"$in": list(group_ids)}}).to_list()
+        group_names = {str(group.id): group.name for group in groups}
+
+        sender_ids = {
+            ObjectId(group_messages[-1].user_id) for group_messages in digests.values()
+            if ObjectId.is_valid(group_messages[-1].user_id)
+        }
+        senders = await User.find({"_id": {"$in": list(sender_ids)}}).to_list()
+        sender_names = {str(user.id): user.display_name or user.username or "Someone" for user in senders}
+
+        notifications = [
+            self._build_notification(
+                user_id,
+                group_id,
+                group_names.get(group_id, "your group"),
+                group_messages,
+                sender_names.get(group_messages[-1].user_id, "Someone")
+            )
+            for (user_id, group_id), group_messages in digests.items()
+        ]
+        # Later digests for the same group join the recipient's notification batch
+        return await NotificationService.create_many(
+            notifications, batch_window_minutes=15, related_user_names=sender_names
+        )
+
+    @staticmethod
+    def _build_notification(
+        user_id: str,
+        group_id: str,
+        group_name: str,
+        group_messages: List[GroupMessage],
+        sender_name: str
+    ) -> Notification:
+        latest = group_messages[-1]
+        count = len(group_messages)
+        title = f"New message in {group_name}" if count == 1 else f"{count} new messages in {group_name}"
+        preview = latest.content[:100] + ("..." if len(latest.content) > 100 else "")
+        return Notification(
+            user_id=user_id,
+            type=NotificationType.GROUP_ACTIVITY,
+            title=title[:200],
+            message=f'{sender_name}: "{preview}"',
+            related_id=group_id,
+            related_user_id=latest.user_id,
+            metadata={
+                "group_name": group_name,
+                "message_count": count,
+                "message_ids": [str(message.id) for message in group_messages],
+                "message_preview": latest.content[:200]
+            }
+        )
+
+    async def _complete(self, items: List[MessageQueue]) -> None:
+        now = datetime.utcnow()
+        # Only complete what we still hold; a takeover after an expired lease wins
+        await MessageQueue.get_motor_collection().update_many(
+            {"_id": {"$in": [item.id for item in items]}, "claimed_by": self.worker_id},
+            {"$set": {"status": "completed", "completed_at": now, "lease_expires_at": None}}
+        )
+
+    async def _retry_later(self, item: MessageQueue, error: Exception) -> None:
+        self.schedule_retry(item, error)
+        self._record_metric("message_delivery_items_total", {"result": item.status})
+        try:
+            await item.save()
+        except Exception as e:
+            # The lease runs out and another claim retries it
+            logger.error(f"Failed to reschedule queued message {item.id}: {e}")
+
+    def schedule_retry(self, item: MessageQueue, error: Exception) -> None:
+        """Count the failed attempt and back off exponentially, or give up after max_retries"""
+        item.increment_retry()
+        item.last_error = str(error)[:500]
+        item.claimed_by = None
+        item.lease_expires_at = None
+        if item.status != "failed":
+            item.status = "pending"
+            delay = self.retry_backoff_seconds * 2 ** (item.retry_count - 1)
+            item.scheduled_for = datetime.utcnow() + timedelta(seconds=delay)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and the age of the oldest due item"""
+        collection = MessageQueue.get_motor_collection()
+        now = datetime.utcnow()
+        pending = await collection.count_documents({"status": "pending"})
+        processing = await collection.count_documents({"status": "processing"})
+        oldest = await collection.find_one(
+            {"status": "pending", "scheduled_for": {"$lte": now}},
+            projection={"created_at": 1},
+            sort=[("created_at", 1)]
+        )
+        return {
+            "worker_id": self.worker_id,
+            "running": self._task is not None,
+            "pending": pending,
+            "processing": processing,
+            "oldest_pending_seconds": (now - oldest["created_at"]).total_seconds() if oldest else 0.0,
+        }
+
+    @staticmethod
+    def _record_metric(name: str, labels: Dict[str, str], value: float = 1.0):
+        # Imported lazily: the monitoring package pulls in the whole app
+        from ..monitoring.metrics import metrics_collector
+        metrics_collector.increment_counter(name, value, labels)
+
+    @staticmethod
+    def _observe_metric(name: str, value: float):
+        from ..monitoring.metrics import metrics_collector
+        metrics_collector.observe_histogram(name, value)
+
+
+message_delivery_worker = MessageDeliveryWorker()
@@ -1,11 +1,8 @@
 # app/services/ml_background_service.py
-import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
 from typing import Dict, Any
-import schedule
-import threading
 
+from ..core.scheduler import DailyAt, Every, Job, JobScheduler, job_scheduler
 from .ml_training_service import MLTrainingService
 from .prediction_cache_service import PredictionCacheService
 
@@ -15,11 +12,11 @@ logger = logging.getLogger(__name__)
 class MLBackgroundService:
     """Background service for ML model training, cache management, and maintenance"""
     
-    def __init__(self):
+    def __init__(self, scheduler: JobScheduler = job_scheduler):
         self.training_service = MLTrainingService()
         self.cache_service = PredictionCacheService()
+        self.scheduler = scheduler
         self.is_running = False
-        self._background_thread = None
         
         # Task scheduling configuration
         self.schedule_config = {
@@ -30,7 +27,7 @@ class MLBackgroundService:
         }
 
     def start_background_tasks(self):
-        """Start the background task scheduler"""
+        """Register the ML jobs with the job scheduler"""
         
         if self.is_running:
             logger.warning("Background tasks already running")
@@ -38,19 +35,14 @@ class MLBackgroundService:
         
         logger.info("Starting ML background tasks")
         
-        # Schedule tasks
-        self._schedule_tasks()
-        
-        # Start background thread
+        for job in self._jobs():
+            self.scheduler.register(job)
         self.is_running = True
-        self._background_thread = threading.Thread(target=self._run_scheduler)
-        self._background_thread.daemon = True
-        self._background_thread.start()
         
         logger.info("ML background tasks started successfully")
 
     def stop_background_tasks(self):
-        """Stop the background task scheduler"""
+        """Unregister the ML jobs"""
         
         if not self.is_running:
             logger.warning("Background tasks not running")
@@ -58,63 +50,27 @@ class MLBackgroundService:
         
         logger.info("Stopping ML background tasks")
         
+        for job in self._jobs():
+            self.scheduler.unregister(job.name)
         self.is_running = False
-        schedule.clear()
-        
-        if self._background_thread and self._background_thread.is_alive():
-            self._background_thread.join(timeout=30)
         
         logger.info("ML background tasks stopped")
 
-    def _schedule_tasks(self):
+    def _jobs(self):
         """Configure task scheduling"""
         
-        # Model training - daily at 2 AM
-        schedule.every().day.at("02:00").do(self._run_async_task, self._train_models_task)
-        
-        # Cache cleanup - every hour
-        schedule.every().hour.do(self._run_async_task, self._cache_cleanup_task)
-        
-        # Cache warming - every 4 hours
-        schedule.every(4).hours.do(self._run_async_task, self._cache_warming_task)
-        
-        # Model evaluation - weekly on Sunday at 3 AM
-        schedule.every().sunday.at("03:00").do(self._run_async_task, self._model_evaluation_task)
-        
-        # Health check - every 30 minutes
-        schedule.every(30).minutes.do(self._run_async_task, self._health_check_task)
-        
-        logger.info("Background tasks scheduled successfully")
-
-    def _run_scheduler(self):
-        """Run the task scheduler in background thread"""
-        
-        while self.is_running:
-            try:
-                schedule.run_pending()
-                threading.Event().wait(60)  # Check every minute
-            except Exception as e:
-                logger.error(f"Error in background scheduler: {e}", exc_info=True)
-                threading.Event().wait(300)  # Wait 5 minutes before retrying
-
-    def _run_async_task(self, task_func):
-        """Wrapper to run async tasks in the background thread"""
-        
-        try:
-            # Create new event loop for this thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            # Run the async task
-            loop.run_until_complete(task_func())
-            
-        except Exception as e:
-            logger.error(f"Error running async task {task_func.__name__}: {e}", exc_info=True)
-        finally:
-            try:
-                loop.close()
-            except:
-                pass
+        return [
+            # Model training - daily at 2 AM
+            Job("ml.model_training", self._train_models_task, DailyAt(2), jitter_seconds=300),
+            # Cache cleanup - every hour; purges this process's memory tier, so runs on every replica
+            Job("ml.cache_cleanup", self._cache_cleanup_task, Every(3600), distributed=False),
+            # Cache warming - every 4 hours
+            Job("ml.cache_warming", self._cache_warming_task, Every(4 * 3600), jitter_seconds=300),
+            # Model evaluation - weekly on Sunday at 3 AM
+            Job("ml.model_evaluation", self._model_evaluation_task, DailyAt(3, weekday=6), jitter_seconds=300),
+            # Health check - every 30 minutes; reports this process's models and cache
+            Job("ml.health_check", self._health_check_task, Every(30 * 60), distributed=False),
+        ]
 
     async def _train_models_task(self):
         """Background task for model training"""
@@ -205,9 +161,9 @@ class MLBackgroundService:
             total_models = len(model_info.get("models", {}))
             
             cache_utilization = cache_stats.get("memory_cache", {}).get("utilization", 0)
-            disk_size_mb = cache_stats.get("disk_cache", {}).get("directory_size_mb", 0)
+            shared_entries = cache_stats.get("shared_cache", {}).get("entries", 0)
             
-            logger.info(f"ML Health Check - Models: {available_models}/{total_models}, Cache: {cache_utilization}% memory, {disk_size_mb}MB disk")
+            logger.info(f"ML Health Check - Models: {available_models}/{total_models}, Cache: {cache_utilization}% memory, {shared_entries} shared entries, {cache_stats.get('hit_rate', 0)}% hit rate")
             
             # Alert on issues
             if available_models < total_models * 0.5:  # Less than 50% models available
@@ -216,15 +172,12 @@ class MLBackgroundService:
             if cache_utilization > 90:  # High memory cache utilization
                 logger.warning(f"High cache utilization: {cache_utilization}%")
             
-            if disk_size_mb > 500:  # Large disk cache
-                logger.warning(f"Large disk cache: {disk_size_mb}MB")
-            
             return {
                 "status": "healthy",
                 "models_available": available_models,
                 "total_models": total_models,
                 "cache_utilization": cache_utilization,
-                "disk_cache_mb": disk_size_mb
+                "shared_cache_entries": shared_entries
             }
             
         except Exception as e:
@@ -262,15 +215,14 @@ class MLBackgroundService:
     def get_task_status(self) -> Dict[str, Any]:
         """Get status of background tasks"""
         
+        status = self.scheduler.get_status([job.name for job in self._jobs()])
         return {
             "is_running": self.is_running,
-            "background_thread_alive": self._background_thread.is_alive() if self._background_thread else False,
-            "scheduled_jobs": len(schedule.jobs),
+            "scheduler_running": status["running"],
+            "scheduled_jobs": len(status["jobs"]),
             "schedule_config": self.schedule_config,
-            "next_run_times": {
-                job.tags[0] if job.tags else f"job_{i}": job.next_run.isoformat() if job.next_run else None
-                for i, job in enumerate(schedule.jobs)
-            }
+            "next_run_times": {name: job["next_slot"] for name, job in status["jobs"].items()},
+            "last_runs": {name: job["last_run"] for name, job in status["jobs"].items()}
         }
 
     async def force_model_training(self) -> Dict[str, Any]:
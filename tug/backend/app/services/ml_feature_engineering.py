@@ -0,0 +1,237 @@
+# app/services/ml_feature_engineering.py
+"""
+Shared feature engineering for ML prediction and training.
+
+Every per-activity feature is built with prefix sums and searchsorted windows over
+arrays extracted from the activities once, so the cost is linear in the number of
+activities instead of re-scanning all previous activities for every row.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ..models.user import User
+from ..models.activity import Activity
+from ..models.value import Value
+
+DEFAULT_VALUE_IMPORTANCE = 3
+RECENT_ACTIVITY_WINDOW = 7  # activities considered "recent" for prediction features
+WEEK_NS = 7 * 24 * 3600 * 10**9
+
+
+def _activity_arrays(activities: List[Activity], value_map: Dict[str, Value]) -> Dict[str, np.ndarray]:
+    """Extract the raw per-activity columns in a single pass over the activities"""
+    n = len(activities)
+    day_ordinal = np.empty(n, dtype=np.int64)
+    hour = np.empty(n, dtype=np.int64)
+    day_of_week = np.empty(n, dtype=np.int64)
+    month = np.empty(n, dtype=np.int64)
+    duration = np.empty(n, dtype=np.int64)
+    has_notes = np.empty(n, dtype=np.int64)
+    is_public = np.empty(n, dtype=np.int64)
+    value_count = np.empty(n, dtype=np.int64)
+    value_importance = np.empty(n, dtype=np.int64)
+    value_age_days = np.empty(n, dtype=np.int64)
+
+    for i, activity in enumerate(activities):
+        date = activity.date
+        day_ordinal[i] = date.toordinal()
+        hour[i] = date.hour
+        day_of_week[i] = date.weekday()
+        month[i] = date.month
+        duration[i] = activity.duration
+        has_notes[i] = 1 if activity.notes else 0
+        is_public[i] = 1 if activity.is_public else 0
+
+        value_ids = activity.effective_value_ids
+        value_count[i] = len(value_ids)
+        value = value_map.get(value_ids[0]) if value_ids else None
+        if value is not None:
+            value_importance[i] = value.importance
+            value_age_days[i] = (date - value.created_at).days
+        else:
+            value_importance[i] = DEFAULT_VALUE_IMPORTANCE
+            value_age_days[i] = 0
+
+    # Nanosecond timestamps for gaps and time windows (naive datetimes are treated as UTC)
+    timestamps = pd.to_datetime([a.date for a in activities], utc=True).as_unit("ns").asi8
+
+    return {
+        "day_ordinal": day_ordinal,
+        "timestamps": timestamps,
+        "hour": hour,
+        "day_of_week": day_of_week,
+        "month": month,
+        "duration": duration,
+        "has_notes": has_notes,
+        "is_public": is_public,
+        "value_count": value_count,
+        "value_importance": value_importance,
+        "value_age_days": value_age_days,
+    }
+
+
+def _hours_since_previous(timestamps: np.ndarray) -> np.ndarray:
+    """Hours since the previous activity (0 for the first one)"""
+    gaps = np.zeros(len(timestamps), dtype=np.float64)
+    gaps[1:] = np.diff(timestamps) / 3.6e12
+    return gaps
+
+
+def _streaks_before(day_ordinal: np.ndarray) -> np.ndarray:
+    """Streak length at each activity, counted over the activities before it.
+
+    Walking back from the activity's date, a streak continues while the most recent
+    earlier active day is at most one day back and consecutive active days are at
+    most two days apart (one missed day is tolerated).
+    """
+    n = len(day_ordinal)
+    streaks = np.zeros(n, dtype=np.int64)
+    if n < 2:
+        return streaks
+
+    # Run length of "close enough" distinct active days, indexed per activity
+    new_day = np.empty(n, dtype=bool)
+    new_day[0] = True
+    new_day[1:] = day_ordinal[1:] != day_ordinal[:-1]
+    distinct_days = day_ordinal[new_day]
+    breaks = np.ones(len(distinct_days), dtype=bool)
+    breaks[1:] = np.diff(distinct_days) > 2
+    run_ids = np.cumsum(breaks) - 1
+    run_starts = np.flatnonzero(breaks)
+    run_lengths = np.arange(len(distinct_days)) - run_starts[run_ids] + 1
+    run_at_activity = run_lengths[np.cumsum(new_day) - 1]
+
+    # Streak for activity i continues from the latest earlier activity (i - 1)
+    still_active = (day_ordinal[1:] - day_ordinal[:-1]) <= 1
+    streaks[1:] = np.where(still_active, run_at_activity[:-1], 0)
+    return streaks
+
+
+def _distinct_days_in(day_ordinal: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Number of distinct days among activities[start:end] for each (start, end) pair"""
+    changes = np.zeros(len(day_ordinal) + 1, dtype=np.int64)
+    changes[2:] = np.cumsum(day_ordinal[1:] != day_ordinal[:-1])
+    # changes[k] counts day changes between positions 0..k-1
+    counts = 1 + changes[np.maximum(end, 1)] - changes[np.minimum(start + 1, len(day_ordinal))]
+    return np.where(end > start, counts, 0)
+
+
+def _window_mean(values: np.ndarray, start: np.ndarray, end: np.ndarray, default: np.ndarray) -> np.ndarray:
+    """Mean of values[start:end] for each pair, or ``default`` for empty windows"""
+    prefix = np.zeros(len(values) + 1, dtype=np.float64)
+    prefix[1:] = np.cumsum(values)
+    size = end - start
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (prefix[end] - prefix[start]) / size
+    return np.where(size > 0, means, default)
+
+
+def build_prediction_features(
+    user: User,
+    activities: List[Activity],
+    values: List[Value]
+) -> pd.DataFrame:
+    """Per-activity feature frame used by MLPredictionService.
+
+    ``activities`` must be sorted by date ascending.
+    """
+    total_activities = len(activities)
+    if total_activities == 0:
+        return pd.DataFrame()
+
+    value_map = {str(v.id): v for v in values}
+    cols = _activity_arrays(activities, value_map)
+    index = np.arange(total_activities)
+
+    start_date = activities[0].date
+    total_days = max((activities[-1].date - start_date).days + 1, 1)
+    now = datetime.now(timezone.utc)
+    user_age_days = (now - user.created_at).days
+
+    # Previous RECENT_ACTIVITY_WINDOW activities (or all previous ones if fewer)
+    window_start = np.maximum(index - RECENT_ACTIVITY_WINDOW, 0)
+    week_consistency = _distinct_days_in(cols["day_ordinal"], window_start, index)
+    avg_duration_week = _window_mean(cols["duration"], window_start, index, cols["duration"])
+
+    return pd.DataFrame({
+        'user_age_days': user_age_days,
+        'total_activities': total_activities,
+        'avg_daily_activities': total_activities / total_days,
+        'total_values': len(values),
+        'is_premium': user.is_premium,
+        'days_since_signup': user_age_days,
+        'hour': cols["hour"],
+        'day_of_week': cols["day_of_week"],
+        'month': cols["month"],
+        'is_weekend': (cols["day_of_week"] >= 5).astype(np.int64),
+        'days_since_start': (cols["timestamps"] - cols["timestamps"][0]) // (24 * 3600 * 10**9),
+        'duration': cols["duration"],
+        'activity_sequence': index,
+        'has_notes': cols["has_notes"],
+        'is_public': cols["is_public"],
+        'value_count': cols["value_count"],
+        'time_since_last_activity': _hours_since_previous(cols["timestamps"]),
+        'value_importance': cols["value_importance"],
+        'value_age_days': cols["value_age_days"],
+        'current_streak': _streaks_before(cols["day_ordinal"]),
+        'week_consistency': week_consistency,
+        'avg_duration_week': avg_duration_week,
+    })
+
+
+def build_training_features(
+    user: User,
+    activities: List[Activity],
+    values: List[Value]
+) -> pd.DataFrame:
+    """Per-activity features and targets used by MLTrainingService.
+
+    ``activities`` must be sorted by date ascending. The first activity only provides
+    history, so the frame has one row per activity after it.
+    """
+    n = len(activities)
+    if n < 2:
+        return pd.DataFrame()
+
+    value_map = {str(v.id): v for v in values}
+    cols = _activity_arrays(activities, value_map)
+    index = np.arange(n)
+    timestamps = cols["timestamps"]
+    day_ordinal = cols["day_ordinal"]
+
+    # Previous activities within the 7 days before each activity
+    window_start = np.searchsorted(timestamps, timestamps - WEEK_NS, side="left")
+    window_start = np.minimum(window_start, index)
+    week_consistency = _distinct_days_in(day_ordinal, window_start, index)
+    avg_duration_week = _window_mean(cols["duration"], window_start, index, cols["duration"])
+
+    current_streak = _streaks_before(day_ordinal)
+
+    # Streak break risk: fewer than 3 active days among the next 7 activities
+    future_days = _distinct_days_in(day_ordinal, index + 1, np.minimum(index + 8, n))
+    streak_break_risk = ((future_days > 0) & (future_days < 3)).astype(np.int64)
+
+    user_age_days = np.array([(a.date - user.created_at).days for a in activities], dtype=np.int64)
+
+    rows = slice(1, None)
+    return pd.DataFrame({
+        'user_id': str(user.id),
+        'hour': cols["hour"][rows],
+        'day_of_week': cols["day_of_week"][rows],
+        'is_weekend': (cols["day_of_week"][rows] >= 5).astype(np.int64),
+        'duration': cols["duration"][rows],
+        'has_notes': cols["has_notes"][rows],
+        'is_premium': 1 if user.is_premium else 0,
+        'user_age_days': user_age_days[rows],
+        'value_importance': cols["value_importance"][rows],
+        'time_since_last_activity': _hours_since_previous(timestamps)[rows],
+        'week_consistency': week_consistency[rows],
+        'avg_duration_week': avg_duration_week[rows],
+        'current_streak': current_streak[rows],
+        'habit_success': (current_streak[rows] >= 7).astype(np.int64),
+        'streak_break_risk': streak_break_risk[rows],
+    })
@@ -0,0 +1,178 @@
+# app/services/ml_model_registry.py
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from joblib import load
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadedModel:
+    """A global model artifact loaded into worker memory"""
+    name: str
+    version: str
+    model: Any
+    features: List[str]
+    model_type: str
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+    def positive_probability(self, X) -> float:
+        """Probability of the positive class (1) for the first row of X"""
+        proba = self.model.predict_proba(X)[0]
+        classes = list(self.model.classes_)
+        if 1 not in classes:
+            return 0.0
+        return float(proba[classes.index(1)])
+
+    @property
+    def feature_importance(self) -> Dict[str, float]:
+        importances = getattr(self.model, "feature_importances_", None)
+        if importances is None:
+            return {}
+        return {name: float(score) for name, score in zip(self.features, importances)}
+
+
+class ModelRegistry:
+    """Per-worker registry of the versioned global models trained by MLTrainingService.
+
+    Training writes each run into its own version directory and then atomically
+    replaces a JSON manifest pointing at it. Workers load the artifacts named by the
+    manifest once and only re-read it every ``refresh_seconds`` to pick up new versions.
+    """
+
+    MANIFEST_NAME = "model_manifest.json"
+
+    def __init__(self, models_dir: Optional[str] = None, refresh_seconds: Optional[int] = None):
+        self.models_dir = Path(models_dir or settings.ML_MODELS_DIR)
+        self.refresh_seconds = (
+            refresh_seconds if refresh_seconds is not None else settings.ML_MODEL_REFRESH_SECONDS
+        )
+        self._models: Dict[str, LoadedModel] = {}
+        self._version: Optional[str] = None
+        self._last_check = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.models_dir / self.MANIFEST_NAME
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version
+
+    def version_dir(self, version: str) -> Path:
+        return self.models_dir / "versions" / version
+
+    def get(self, model_name: str) -> Optional[LoadedModel]:
+        """Return the loaded global model, or None if it is not available"""
+        return self._models.get(model_name)
+
+    def read_manifest(self) -> Optional[Dict[str, Any]]:
+        if not self.manifest_path.exists():
+            return None
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read model manifest: {e}")
+            return None
+
+    def artifact_path(self, model_name: str) -> Optional[Path]:
+        """Path of the current artifact for a model according to the manifest"""
+        manifest = self.read_manifest()
+        if not manifest:
+            return None
+        entry = manifest.get("models", {}).get(model_name)
+        return Path(entry["model_path"]) if entry else None
+
+    def publish(self, version: str, training_results: Dict[str, Any]) -> bool:
+        """Point the manifest at a new model version (called after training)"""
+        models = {
+            name: {
+                "model_path": result["model_path"],
+                "features": result["features_used"],
+                "model_type": result["model_type"],
+                "metrics": result.get("metrics", {}),
+            }
+            for name, result in training_results.items()
+            if result.get("status") == "success"
+        }
+
+        if not models:
+            logger.warning(f"No successfully trained models to publish for version {version}")
+            return False
+
+        manifest = {
+            "version": version,
+            "published_at": datetime.now(timezone.utc).isoformat(),
+            "models": models,
+        }
+
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, default=float)
+        os.replace(tmp_path, self.manifest_path)
+
+        # Force the next ensure_loaded() in this worker to pick it up immediately
+        self._last_check = 0.0
+        logger.info(f"Published ML model version {version}: {sorted(models)}")
+        return True
+
+    async def ensure_loaded(self) -> None:
+        """Load the current model version if it changed since the last check"""
+        now = time.monotonic()
+        if self._last_check and now - self._last_check < self.refresh_seconds:
+            return
+
+        async with self._lock:
+            if self._last_check and time.monotonic() - self._last_check < self.refresh_seconds:
+                return
+            self._last_check = time.monotonic()
+
+            manifest = await asyncio.to_thread(self.read_manifest)
+            if not manifest or manifest.get("version") == self._version:
+                return
+
+            try:
+                models = await asyncio.to_thread(self._load_manifest_models, manifest)
+            except Exception as e:
+                logger.error(f"Failed to load ML model version {manifest.get('version')}: {e}")
+                return
+
+            self._models = models
+            self._version = manifest["version"]
+            logger.info(f"Loaded ML model version {self._version}: {sorted(models)}")
+
+    def _load_manifest_models(self, manifest: Dict[str, Any]) -> Dict[str, LoadedModel]:
+        models = {}
+        for name, entry in manifest.get("models", {}).items():
+            models[name] = LoadedModel(
+                name=name,
+                version=manifest["version"],
+                model=load(entry["model_path"]),
+                features=list(entry["features"]),
+                model_type=entry.get("model_type", "classifier"),
+                metrics=entry.get("metrics", {}),
+            )
+        return models
+
+    def clear(self) -> None:
+        """Drop loaded models (used by tests and on shutdown)"""
+        self._models = {}
+        self._version = None
+        self._last_check = 0.0
+
+
+# Global instance shared by every request in the worker
+model_registry = ModelRegistry()
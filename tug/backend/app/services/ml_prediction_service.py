@@ -5,7 +5,6 @@ import pickle
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict, Counter
-import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
 from sklearn.cluster import KMeans
@@ -24,10 +23,35 @@ from ..models.user import User
 from ..models.activity import Activity
 from ..models.value import Value
 from ..models.analytics import UserAnalytics, ValueInsights, ActivityPattern
+from ..core.config import settings
+from ..core.compute_executor import compute_executor
+from .ml_model_registry import model_registry, LoadedModel
+from .ml_feature_engineering import build_prediction_features
 
 logger = logging.getLogger(__name__)
 
 
+def _fit_habit_formation_model(X: pd.DataFrame, y: pd.Series) -> Tuple[RandomForestClassifier, StandardScaler, float]:
+    """Fit a per-user habit formation model (runs in the compute pool)"""
+    model = RandomForestClassifier(n_estimators=50, random_state=42, max_depth=10)
+    scaler = StandardScaler()
+    
+    X_scaled = scaler.fit_transform(X)
+    
+    # Split for validation
+    if len(X) >= 20:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_scaled, y, test_size=0.3, random_state=42, stratify=y if y.sum() > 1 else None
+        )
+        model.fit(X_train, y_train)
+        accuracy = accuracy_score(y_test, model.predict(X_test))
+    else:
+        model.fit(X_scaled, y)
+        accuracy = 0.8  # Conservative estimate for small datasets
+    
+    return model, scaler, accuracy
+
+
 class MLPredictionService:
     """Machine Learning-powered prediction and recommendation service"""
     
@@ -37,8 +61,8 @@ class MLPredictionService:
     _encoders_cache = {}
     
     def __init__(self):
-        self.models_dir = Path("/tmp/tug_ml_models")
-        self.models_dir.mkdir(exist_ok=True)
+        self.models_dir = Path(settings.ML_MODELS_DIR)
+        self.models_dir.mkdir(parents=True, exist_ok=True)
         
         # Feature configuration
         self.time_features = [
@@ -70,6 +94,9 @@ class MLPredictionService:
             return await service._generate_fallback_predictions(user, activities, values)
         
         try:
+            # Pick up the latest published global models (no-op most of the time)
+            await model_registry.ensure_loaded()
+            
             # Create feature datasets
             features_df = await service._extract_features(user, activities, values)
             
@@ -102,127 +129,10 @@ class MLPredictionService:
     ) -> pd.DataFrame:
         """Extract comprehensive features for ML models"""
         
-        features = []
-        value_map = {str(v.id): v for v in values}
-        
         # Sort activities by date
         activities.sort(key=lambda x: x.date)
         
-        # Calculate user baseline metrics
-        total_activities = len(activities)
-        if total_activities == 0:
-            return pd.DataFrame()
-            
-        start_date = activities[0].date
-        end_date = activities[-1].date
-        total_days = max((end_date - start_date).days + 1, 1)
-        
-        # User-level features
-        user_features = {
-            'user_age_days': (datetime.now(timezone.utc) - user.created_at).days,
-            'total_activities': total_activities,
-            'avg_daily_activities': total_activities / total_days,
-            'total_values': len(values),
-            'is_premium': user.is_premium,
-            'days_since_signup': (datetime.now(timezone.utc) - user.created_at).days
-        }
-        
-        # Activity-level features
-        for i, activity in enumerate(activities):
-            feature_row = user_features.copy()
-            
-            # Time-based features
-            feature_row.update({
-                'hour': activity.date.hour,
-                'day_of_week': activity.date.weekday(),
-                'month': activity.date.month,
-                'is_weekend': 1 if activity.date.weekday() >= 5 else 0,
-                'days_since_start': (activity.date - start_date).days,
-            })
-            
-            # Activity-specific features
-            feature_row.update({
-                'duration': activity.duration,
-                'activity_sequence': i,
-                'has_notes': 1 if activity.notes else 0,
-                'is_public': 1 if activity.is_public else 0,
-                'value_count': len(activity.effective_value_ids)
-            })
-            
-            # Calculate time since last activity
-            if i > 0:
-                time_diff = (activity.date - activities[i-1].date).total_seconds() / 3600
-                feature_row['time_since_last_activity'] = time_diff
-            else:
-                feature_row['time_since_last_activity'] = 0
-            
-            # Value-related features
-            primary_value_id = activity.effective_value_ids[0] if activity.effective_value_ids else None
-            if primary_value_id and primary_value_id in value_map:
-                value = value_map[primary_value_id]
-                feature_row.update({
-                    'value_importance': value.importance,
-                    'value_age_days': (activity.date - value.created_at).days
-                })
-            else:
-                feature_row.update({
-                    'value_importance': 3,  # Default middle importance
-                    'value_age_days': 0
-                })
-            
-            # Behavioral patterns (calculated from previous activities)
-            if i > 0:
-                prev_activities = activities[:i]
-                
-                # Calculate streak at this point
-                current_streak = self._calculate_streak_at_point(prev_activities, activity.date.date())
-                feature_row['current_streak'] = current_streak
-                
-                # Calculate consistency metrics
-                if len(prev_activities) >= 7:
-                    recent_week = prev_activities[-7:]
-                    feature_row['week_consistency'] = len(set(a.date.date() for a in recent_week))
-                    feature_row['avg_duration_week'] = np.mean([a.duration for a in recent_week])
-                else:
-                    feature_row['week_consistency'] = len(set(a.date.date() for a in prev_activities))
-                    feature_row['avg_duration_week'] = np.mean([a.duration for a in prev_activities])
-            else:
-                feature_row.update({
-                    'current_streak': 0,
-                    'week_consistency': 0,
-                    'avg_duration_week': activity.duration
-                })
-            
-            features.append(feature_row)
-        
-        return pd.DataFrame(features)
-
-    def _calculate_streak_at_point(self, activities: List[Activity], target_date) -> int:
-        """Calculate streak length at a specific point in time"""
-        if not activities:
-            return 0
-            
-        # Get activity dates before target date
-        activity_dates = sorted(set(a.date.date() for a in activities if a.date.date() <= target_date))
-        
-        if not activity_dates:
-            return 0
-        
-        # Calculate streak backwards from target date
-        streak = 0
-        current_date = target_date
-        
-        for date in reversed(activity_dates):
-            if date == current_date:
-                streak += 1
-                current_date -= timedelta(days=1)
-            elif (current_date - date).days == 1:
-                streak += 1
-                current_date = date - timedelta(days=1)
-            else:
-                break
-                
-        return streak
+        return build_prediction_features(user, activities, values)
 
     async def _predict_habit_formation(self, user: User, features_df: pd.DataFrame) -> Dict[str, Any]:
         """Predict likelihood of successful habit formation"""
@@ -240,6 +150,14 @@ class MLPredictionService:
             if not available_features:
                 return {"error": "Insufficient features for habit formation prediction"}
             
+            global_model = model_registry.get("habit_formation")
+            if global_model is not None:
+                return self._predict_habit_formation_global(global_model, features_df)
+            
+            # Per-user fitting is expensive; only do it when explicitly enabled
+            if not settings.ML_PER_USER_FITTING:
+                return self._generate_habit_formation_heuristics(features_df)
+            
             X = features_df[available_features].fillna(0)
             
             # Create target variable: successful habit formation 
@@ -249,22 +167,10 @@ class MLPredictionService:
             if len(X) < 10 or y.sum() == 0:  # Need minimum data and positive examples
                 return self._generate_habit_formation_heuristics(features_df)
             
-            # Train model
-            model = RandomForestClassifier(n_estimators=50, random_state=42, max_depth=10)
-            scaler = StandardScaler()
-            
-            X_scaled = scaler.fit_transform(X)
-            
-            # Split for validation
-            if len(X) >= 20:
-                X_train, X_test, y_train, y_test = train_test_split(
-                    X_scaled, y, test_size=0.3, random_state=42, stratify=y if y.sum() > 1 else None
-                )
-                model.fit(X_train, y_train)
-                accuracy = accuracy_score(y_test, model.predict(X_test))
-            else:
-                model.fit(X_scaled, y)
-                accuracy = 0.8  # Conservative estimate for small datasets
+            # Fitting is CPU-bound, so it runs in the shared compute pool
+            model, scaler, accuracy = await compute_executor.run(
+                "ml_user_fit", _fit_habit_formation_model, X, y
+            )
             
             # Get feature importance
             feature_importance = dict(zip(available_features, model.feature_importances_))
@@ -290,6 +196,30 @@ class MLPredictionService:
             logger.error(f"Error in habit formation prediction: {e}")
             return self._generate_habit_formation_heuristics(features_df)
 
+    def _model_input(self, model: LoadedModel, features_df: pd.DataFrame) -> pd.DataFrame:
+        """Latest feature row laid out in the column order the global model was trained on"""
+        return features_df.reindex(columns=model.features).fillna(0).iloc[-1:]
+
+    def _predict_habit_formation_global(
+        self, 
+        model: LoadedModel, 
+        features_df: pd.DataFrame
+    ) -> Dict[str, Any]:
+        """Score habit formation with the pre-trained global model"""
+        
+        habit_probability = model.positive_probability(self._model_input(model, features_df))
+        feature_importance = model.feature_importance
+        accuracy = model.metrics.get("accuracy", 0.8)
+        
+        return {
+            "formation_probability": round(habit_probability * 100, 1),
+            "confidence_score": round(accuracy * 100, 1),
+            "key_factors": sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)[:3],
+            "recommendations": self._generate_habit_recommendations(feature_importance, features_df),
+            "model_type": "global_random_forest_classifier",
+            "model_version": model.version
+        }
+
     def _generate_habit_formation_heuristics(self, features_df: pd.DataFrame) -> Dict[str, Any]:
         """Generate habit formation predictions using heuristic methods"""
         
@@ -525,6 +455,16 @@ class MLPredictionService:
                 risk_score += 15  # Vulnerable new streak
             
             risk_score = min(risk_score, 100)
+            model_type = "heuristic"
+            
+            # Prefer the global model trained on observed streak breaks when available
+            global_model = model_registry.get("streak_risk")
+            if global_model is not None:
+                break_probability = global_model.positive_probability(
+                    self._model_input(global_model, features_df)
+                )
+                risk_score = int(round(break_probability * 100))
+                model_type = "global_random_forest_classifier"
             
             # Determine risk level
             if risk_score < 30:
@@ -546,7 +486,8 @@ class MLPredictionService:
                 "time_since_last_activity_hours": round(time_since_last, 1),
                 "recent_consistency_score": round(recent_consistency, 1),
                 "recommendations": recommendations,
-                "urgency_level": "high" if time_since_last > 36 else "medium" if time_since_last > 18 else "low"
+                "urgency_level": "high" if time_since_last > 36 else "medium" if time_since_last > 18 else "low",
+                "model_type": model_type
             }
             
         except Exception as e:
@@ -1026,6 +967,10 @@ class MLPredictionService:
             
             trend = (recent_avg - previous_avg) / previous_avg if previous_avg > 0 else 0
             
+            global_model = model_registry.get("duration_prediction")
+            if global_model is not None:
+                return self._forecast_activities_global(global_model, features_df, trend)
+            
             # Forecast next week
             next_week_forecast = []
             for day in range(7):
@@ -1055,6 +1000,50 @@ class MLPredictionService:
             logger.error(f"Error in activity forecasting: {e}")
             return self._generate_simple_forecast(features_df)
 
+    def _forecast_activities_global(
+        self, 
+        model: LoadedModel, 
+        features_df: pd.DataFrame, 
+        trend: float
+    ) -> Dict[str, Any]:
+        """Forecast next week's session durations with the global duration model"""
+        
+        last_row = features_df.iloc[-1]
+        preferred_hour = int(features_df['hour'].mode().iloc[0]) if 'hour' in features_df else 9
+        today = datetime.now(timezone.utc)
+        
+        # One row per upcoming day, assuming the user keeps their current streak going
+        upcoming = pd.DataFrame([
+            {
+                **last_row.to_dict(),
+                'hour': preferred_hour,
+                'day_of_week': (today + timedelta(days=day + 1)).weekday(),
+                'current_streak': last_row.get('current_streak', 0) + day + 1,
+            }
+            for day in range(7)
+        ])
+        predicted = model.model.predict(upcoming.reindex(columns=model.features).fillna(0))
+        
+        next_week_forecast = [
+            {
+                "day": day + 1,
+                "forecasted_duration": round(max(5, float(duration)), 1),
+                "confidence": max(30, 80 - (day * 10))
+            }
+            for day, duration in enumerate(predicted)
+        ]
+        total_forecasted = sum(f["forecasted_duration"] for f in next_week_forecast)
+        
+        return {
+            "next_week_forecast": next_week_forecast,
+            "weekly_total_forecast": round(total_forecasted, 1),
+            "trend_direction": "increasing" if trend > 0.05 else "decreasing" if trend < -0.05 else "stable",
+            "trend_percentage": round(trend * 100, 1),
+            "forecast_confidence": round(min(80, len(features_df) * 2), 1),
+            "model_type": "global_random_forest_regressor",
+            "model_version": model.version
+        }
+
     def _generate_simple_forecast(self, features_df: pd.DataFrame) -> Dict[str, Any]:
         """Generate simple forecast for limited data"""
         
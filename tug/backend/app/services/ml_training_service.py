@@ -4,7 +4,7 @@ import logging
 import pickle
 import os
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 import numpy as np
 import pandas as pd
@@ -18,16 +18,27 @@ from joblib import dump, load
 from ..models.user import User
 from ..models.activity import Activity
 from ..models.value import Value
+from ..core.config import settings
+from ..core.compute_executor import compute_executor
+from ..core.last_seen import last_seen_tracker
+from .ml_model_registry import model_registry
+from .ml_feature_engineering import build_training_features
 
 logger = logging.getLogger(__name__)
 
 
+def _fit_grid_search(grid_search: GridSearchCV, X: pd.DataFrame, y: pd.Series) -> GridSearchCV:
+    """Run the hyperparameter search (runs in the compute pool)"""
+    grid_search.fit(X, y)
+    return grid_search
+
+
 class MLTrainingService:
     """Service for training, evaluating, and managing ML models"""
     
     def __init__(self):
-        self.models_dir = Path("/tmp/tug_ml_models")
-        self.models_dir.mkdir(exist_ok=True)
+        self.models_dir = Path(settings.ML_MODELS_DIR)
+        self.models_dir.mkdir(parents=True, exist_ok=True)
         
         # Model configurations
         self.model_configs = {
@@ -80,6 +91,7 @@ class MLTrainingService:
         
         logger.info("Starting global model training")
         training_results = {}
+        version = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
         
         try:
             # Collect training data from all users
@@ -96,7 +108,7 @@ class MLTrainingService:
                 logger.info(f"Training {model_name} model")
                 
                 try:
-                    result = await self._train_single_model(model_name, config, training_data)
+                    result = await self._train_single_model(model_name, config, training_data, version)
                     training_results[model_name] = result
                     
                     logger.info(f"Successfully trained {model_name}: accuracy={result.get('accuracy', 'N/A')}")
@@ -105,11 +117,13 @@ class MLTrainingService:
                     logger.error(f"Failed to train {model_name}: {e}")
                     training_results[model_name] = {"error": str(e)}
             
-            # Save training metadata
+            # Save training metadata and make the new version visible to workers
             await self._save_training_metadata(training_results)
+            published = model_registry.publish(version, training_results)
             
             return {
                 "status": "completed",
+                "model_version": version if published else None,
                 "models_trained": len([r for r in training_results.values() if "error" not in r]),
                 "training_data_points": len(training_data),
                 "results": training_results,
@@ -124,6 +138,7 @@ class MLTrainingService:
         """Collect and prepare training data from all users"""
         
         # Get recent active users (last 30 days)
+        await last_seen_tracker.flush()
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=30)
         
         users = await User.find(
@@ -170,112 +185,15 @@ class MLTrainingService:
         
         # Get user values
         values = await Value.find(Value.user_id == str(user.id)).to_list()
-        value_map = {str(v.id): v for v in values}
         
-        # Extract features similar to MLPredictionService
-        features = []
-        
-        for i, activity in enumerate(activities):
-            if i == 0:  # Skip first activity as we need previous context
-                continue
-            
-            # Basic features
-            feature_row = {
-                'user_id': str(user.id),
-                'hour': activity.date.hour,
-                'day_of_week': activity.date.weekday(),
-                'is_weekend': 1 if activity.date.weekday() >= 5 else 0,
-                'duration': activity.duration,
-                'has_notes': 1 if activity.notes else 0,
-                'is_premium': 1 if user.is_premium else 0,
-                'user_age_days': (activity.date - user.created_at).days
-            }
-            
-            # Value-related features
-            primary_value_id = activity.effective_value_ids[0] if activity.effective_value_ids else None
-            if primary_value_id and primary_value_id in value_map:
-                value = value_map[primary_value_id]
-                feature_row['value_importance'] = value.importance
-            else:
-                feature_row['value_importance'] = 3  # Default
-            
-            # Historical context features
-            prev_activities = activities[:i]
-            
-            # Time since last activity
-            if prev_activities:
-                last_activity = prev_activities[-1]
-                time_diff = (activity.date - last_activity.date).total_seconds() / 3600
-                feature_row['time_since_last_activity'] = time_diff
-            else:
-                feature_row['time_since_last_activity'] = 0
-            
-            # Weekly consistency
-            week_start = activity.date - timedelta(days=7)
-            recent_activities = [a for a in prev_activities if a.date >= week_start]
-            feature_row['week_consistency'] = len(set(a.date.date() for a in recent_activities))
-            
-            # Average duration in past week
-            if recent_activities:
-                feature_row['avg_duration_week'] = np.mean([a.duration for a in recent_activities])
-            else:
-                feature_row['avg_duration_week'] = activity.duration
-            
-            # Calculate current streak at this point
-            feature_row['current_streak'] = self._calculate_streak_at_point(prev_activities, activity.date.date())
-            
-            # Create target variables
-            
-            # 1. Habit formation success (7+ day streaks)
-            feature_row['habit_success'] = 1 if feature_row['current_streak'] >= 7 else 0
-            
-            # 2. Streak break risk (based on future behavior)
-            future_activities = activities[i+1:i+8]  # Next 7 days
-            if future_activities:
-                days_with_future_activity = len(set(a.date.date() for a in future_activities))
-                feature_row['streak_break_risk'] = 1 if days_with_future_activity < 3 else 0
-            else:
-                feature_row['streak_break_risk'] = 0  # No future data available
-            
-            # 3. Duration target (current activity duration)
-            # Already included as 'duration'
-            
-            features.append(feature_row)
-        
-        return pd.DataFrame(features)
-
-    def _calculate_streak_at_point(self, activities: List[Activity], target_date) -> int:
-        """Calculate streak length at a specific point in time"""
-        if not activities:
-            return 0
-            
-        # Get activity dates before target date
-        activity_dates = sorted(set(a.date.date() for a in activities if a.date.date() <= target_date))
-        
-        if not activity_dates:
-            return 0
-        
-        # Calculate streak backwards from target date
-        streak = 0
-        current_date = target_date
-        
-        for date in reversed(activity_dates):
-            if date == current_date:
-                streak += 1
-                current_date -= timedelta(days=1)
-            elif (current_date - date).days == 1:
-                streak += 1
-                current_date = date - timedelta(days=1)
-            else:
-                break
-                
-        return streak
+        return build_training_features(user, activities, values)
 
     async def _train_single_model(
         self, 
         model_name: str, 
         config: Dict[str, Any], 
-        training_data: pd.DataFrame
+        training_data: pd.DataFrame,
+        version: str
     ) -> Dict[str, Any]:
         """Train a single ML model with the given configuration"""
         
@@ -331,8 +249,10 @@ class MLTrainingService:
                 stratify=y if config["model_type"] == "classifier" and len(np.unique(y)) > 1 else None
             )
             
-            # Train model
-            grid_search.fit(X_train, y_train)
+            # Train model in the compute pool so the event loop stays responsive
+            grid_search = await compute_executor.run(
+                "ml_training", _fit_grid_search, grid_search, X_train, y_train
+            )
             best_model = grid_search.best_estimator_
             
             # Evaluate model
@@ -361,19 +281,22 @@ class MLTrainingService:
             # Feature importance
             feature_importance = dict(zip(available_features, best_model.feature_importances_))
             
-            # Save model
-            model_path = self.models_dir / f"{model_name}_model.joblib"
+            # Save model into this run's version directory
+            version_dir = model_registry.version_dir(version)
+            version_dir.mkdir(parents=True, exist_ok=True)
+            model_path = version_dir / f"{model_name}_model.joblib"
             dump(best_model, model_path)
             
             # Save feature scaler if needed
             scaler = StandardScaler()
             X_scaled = scaler.fit_transform(X)
-            scaler_path = self.models_dir / f"{model_name}_scaler.joblib"
+            scaler_path = version_dir / f"{model_name}_scaler.joblib"
             dump(scaler, scaler_path)
             
             return {
                 "status": "success",
                 "model_path": str(model_path),
+                "model_version": version,
                 "scaler_path": str(scaler_path),
                 "features_used": available_features,
                 "training_samples": len(X_train),
@@ -388,6 +311,10 @@ class MLTrainingService:
             logger.error(f"Error training {model_name}: {e}", exc_info=True)
             return {"error": f"Training failed: {str(e)}"}
 
+    def _current_model_path(self, model_name: str) -> Path:
+        """Path of the published artifact, falling back to the pre-versioning location"""
+        return model_registry.artifact_path(model_name) or self.models_dir / f"{model_name}_model.joblib"
+
     async def _save_training_metadata(self, training_results: Dict[str, Any]) -> None:
         """Save training metadata for future reference"""
         
@@ -423,7 +350,7 @@ class MLTrainingService:
             
             for model_name in self.model_configs.keys():
                 try:
-                    model_path = self.models_dir / f"{model_name}_model.joblib"
+                    model_path = self._current_model_path(model_name)
                     
                     if not model_path.exists():
                         results[model_name] = {"error": "Model not found"}
@@ -455,6 +382,7 @@ class MLTrainingService:
         """Collect fresh data for model evaluation"""
         
         # Get recent data not used in training
+        await last_seen_tracker.flush()
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=7)  # Last week
         
         users = await User.find(
@@ -584,7 +512,7 @@ class MLTrainingService:
             model_info = {}
             
             for model_name in self.model_configs.keys():
-                model_path = self.models_dir / f"{model_name}_model.joblib"
+                model_path = self._current_model_path(model_name)
                 
                 if model_path.exists():
                     stat = model_path.stat()
@@ -617,6 +545,7 @@ class MLTrainingService:
             
             return {
                 "models": model_info,
+                "current_version": (model_registry.read_manifest() or {}).get("version"),
                 "training_info": training_info,
                 "models_directory": str(self.models_dir)
             }
@@ -17,6 +17,7 @@ from ..schemas.mood import (
 )
 from ..core.graceful_degradation import with_graceful_degradation, degradation_manager
 from ..core.logging_config import get_logger
+from .data_version_service import DataVersionService
 
 logger = get_logger(__name__)
 
@@ -213,6 +214,7 @@ class MoodService:
             )
             
             await mood_entry.insert()
+            await DataVersionService.bump(user)
             logger.info(f"Created mood entry {mood_entry.id} for user {user.id}")
             
             return MoodEntryResponse(
@@ -237,6 +239,81 @@ class MoodService:
                 detail="Failed to create mood entry"
             )
 
+    @staticmethod
+    async def _get_owned_entry(user: User, entry_id: str) -> MoodEntry:
+        """Find a user's mood entry or raise 404"""
+        mood_entry = None
+        if ObjectId.is_valid(entry_id):
+            mood_entry = await MoodEntry.find_one(
+                MoodEntry.id == ObjectId(entry_id),
+                MoodEntry.user_id == str(user.id)
+            )
+        if not mood_entry:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Mood entry not found"
+            )
+        return mood_entry
+
+    @staticmethod
+    async def update_mood_entry(user: User, entry_id: str, mood_data: MoodEntryUpdate) -> MoodEntryResponse:
+        """Update a mood entry"""
+        try:
+            mood_entry = await MoodService._get_owned_entry(user, entry_id)
+
+            update_data = mood_data.model_dump(exclude_unset=True)
+            for field, value in update_data.items():
+                setattr(mood_entry, field, value)
+
+            # Update positivity score if mood type changed
+            if mood_data.mood_type:
+                mood_entry.positivity_score = MoodEntry.get_positivity_score(mood_data.mood_type)
+
+            mood_entry.update_timestamp()
+            await mood_entry.save()
+            await DataVersionService.bump(user)
+            logger.info(f"Updated mood entry {mood_entry.id} for user {user.id}")
+
+            return MoodEntryResponse(
+                id=str(mood_entry.id),
+                user_id=mood_entry.user_id,
+                mood_type=mood_entry.mood_type,
+                positivity_score=mood_entry.positivity_score,
+                notes=mood_entry.notes,
+                activity_id=mood_entry.activity_id,
+                indulgence_id=mood_entry.indulgence_id,
+                recorded_at=mood_entry.recorded_at,
+                created_at=mood_entry.created_at,
+                updated_at=mood_entry.updated_at
+            )
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error updating mood entry: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to update mood entry"
+            )
+
+    @staticmethod
+    async def delete_mood_entry(user: User, entry_id: str) -> None:
+        """Delete a mood entry"""
+        try:
+            mood_entry = await MoodService._get_owned_entry(user, entry_id)
+            await mood_entry.delete()
+            await DataVersionService.bump(user)
+            logger.info(f"Deleted mood entry {entry_id} for user {user.id}")
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error deleting mood entry: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to delete mood entry"
+            )
+
     @staticmethod
     async def get_mood_entries(
         user: User,
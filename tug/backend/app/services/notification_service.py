@@ -1,9 +1,11 @@
 # app/services/notification_service.py
 import logging
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 from bson import ObjectId
+from beanie import PydanticObjectId
+from pymongo import InsertOne, UpdateOne
 
 from ..models.user import User
 from ..models.notification import Notification, NotificationBatch, NotificationType
@@ -311,24 +313,10 @@ class NotificationService:
         try:
             if user_id != sender_id:  # Don't notify sender about their own message
                 # Create individual notification
-                notification_type = NotificationType.POST_MENTION if is_mention else NotificationType.GROUP_ACTIVITY
-                
-                title = f"@{sender_name} mentioned you in {group_name}" if is_mention else f"New message in {group_name}"
-                message = f'"{message_content[:100]}{"..." if len(message_content) > 100 else ""}"'
-                
-                notification = Notification(
-                    user_id=user_id,
-                    type=notification_type,
-                    title=title,
-                    message=message,
-                    related_id=group_id,
-                    related_user_id=sender_id,
-                    metadata={
-                        "group_name": group_name,
-                        "is_mention": is_mention,
-                        "message_preview": message_content[:200]
-                    }
+                notification = NotificationService.build_group_message_notification(
+                    user_id, sender_id, sender_name, group_id, group_name, message_content, is_mention
                 )
+                notification_type = notification.type
                 await notification.save()
                 
                 # Add to batch (only for regular messages, not mentions)
@@ -348,6 +336,36 @@ class NotificationService:
             logger.error(f"Error creating group message notification: {e}", exc_info=True)
             # Don't raise exception to avoid breaking message sending
     
+    @staticmethod
+    def build_group_message_notification(
+        user_id: str,
+        sender_id: str,
+        sender_name: str,
+        group_id: str,
+        group_name: str,
+        message_content: str,
+        is_mention: bool = False
+    ) -> Notification:
+        """Build an unsaved group message notification, for create_many"""
+        notification_type = NotificationType.POST_MENTION if is_mention else NotificationType.GROUP_ACTIVITY
+        
+        title = f"@{sender_name} mentioned you in {group_name}" if is_mention else f"New message in {group_name}"
+        message = f'"{message_content[:100]}{"..." if len(message_content) > 100 else ""}"'
+        
+        return Notification(
+            user_id=user_id,
+            type=notification_type,
+            title=title[:200],
+            message=message,
+            related_id=group_id,
+            related_user_id=sender_id,
+            metadata={
+                "group_name": group_name,
+                "is_mention": is_mention,
+                "message_preview": message_content[:200]
+            }
+        )
+    
     @staticmethod
     async def create_group_invitation_notification(
         user_id: str,
@@ -446,6 +464,99 @@ class NotificationService:
             logger.error(f"Error adding notification to batch: {e}", exc_info=True)
             # Don't raise exception to avoid breaking notification creation
     
+    @staticmethod
+    async def create_many(
+        notifications: List[Notification],
+        batch_window_minutes: Optional[int] = None,
+        related_user_names: Optional[Dict[str, str]] = None,
+        chunk_size: int = 1000
+    ) -> int:
+        """Insert notifications built in memory with one insert_many per chunk.
+        
+        With ``batch_window_minutes`` each notification is also added to its recipient's
+        active NotificationBatch; the batches are read with one query and written with one
+        bulk_write per chunk. ``related_user_names`` maps related_user_id to the name the
+        batch shows. Returns how many notifications were created.
+        """
+        created = 0
+        for start in range(0, len(notifications), chunk_size):
+            chunk = notifications[start:start + chunk_size]
+            try:
+                for notification in chunk:
+                    # Assigned here so the batches can reference them
+                    notification.id = PydanticObjectId()
+                await Notification.insert_many(chunk)
+                created += len(chunk)
+            except Exception as e:
+                logger.error(f"Error inserting {len(chunk)} notifications: {e}", exc_info=True)
+                continue
+            
+            if batch_window_minutes is not None:
+                await NotificationService._add_many_to_batches(
+                    chunk, batch_window_minutes, related_user_names or {}
+                )
+        return created
+    
+    @staticmethod
+    async def _add_many_to_batches(
+        notifications: List[Notification],
+        window_minutes: int,
+        related_user_names: Dict[str, str]
+    ):
+        """Bulk counterpart of _add_to_batch"""
+        try:
+            now = datetime.utcnow()
+            existing = await NotificationBatch.find({
+                "user_id": {"$in": list({n.user_id for n in notifications})},
+                "batch_type": {"$in": list({n.type for n in notifications})},
+                "is_active": True,
+                "batch_window_end": {"$gt": now}
+            }).to_list()
+            batches = {(b.user_id, b.batch_type, b.related_id): b for b in existing}
+            new_keys = set()
+            
+            for notification in notifications:
+                key = (notification.user_id, notification.type, notification.related_id)
+                batch = batches.get(key)
+                if batch is None:
+                    batch = NotificationBatch(
+                        user_id=notification.user_id,
+                        batch_type=notification.type,
+                        related_id=notification.related_id,
+                        title=notification.title,
+                        message=notification.message,
+                        batch_window_start=now - timedelta(minutes=window_minutes),
+                        batch_window_end=now + timedelta(minutes=window_minutes)
+                    )
+                    batches[key] = batch
+                    new_keys.add(key)
+                related_user_id = notification.related_user_id or ""
+                batch.add_notification(
+                    notification_id=str(notification.id),
+                    user_id=related_user_id,
+                    user_name=related_user_names.get(related_user_id, "Someone")
+                )
+            
+            operations = []
+            for key, batch in batches.items():
+                if key in new_keys:
+                    operations.append(InsertOne(batch.model_dump(by_alias=True, exclude={"id", "revision_id"})))
+                else:
+                    operations.append(UpdateOne({"_id": batch.id}, {"$set": {
+                        "title": batch.title,
+                        "message": batch.message,
+                        "notification_ids": batch.notification_ids,
+                        "user_ids": batch.user_ids,
+                        "user_names": batch.user_names,
+                        "notification_count": batch.notification_count,
+                        "updated_at": batch.updated_at
+                    }}))
+            if operations:
+                await NotificationBatch.get_motor_collection().bulk_write(operations, ordered=False)
+            
+        except Exception as e:
+            logger.error(f"Error adding notifications to batches: {e}", exc_info=True)
+    
     @staticmethod
     async def get_batched_notifications(
         current_user: User,
@@ -594,22 +705,35 @@ class NotificationService:
     ) -> Notification:
         """Create general group notification"""
         try:
-            notification = Notification(
-                user_id=user_id,
-                type=NotificationType.GROUP_ACTIVITY,
-                title="Group Activity",
-                message=message,
-                related_id=group_id,
-                metadata={
-                    "notification_type": notification_type,
-                    **data
-                }
+            notification = NotificationService.build_group_notification(
+                user_id, group_id, notification_type, message, data
             )
             await notification.save()
             return notification
         except Exception as e:
             logger.error(f"Error creating group notification: {e}")
             return None
+    
+    @staticmethod
+    def build_group_notification(
+        user_id: str,
+        group_id: str,
+        notification_type: str,
+        message: str,
+        data: dict
+    ) -> Notification:
+        """Build an unsaved general group notification, for create_many"""
+        return Notification(
+            user_id=user_id,
+            type=NotificationType.GROUP_ACTIVITY,
+            title="Group Activity",
+            message=message,
+            related_id=group_id,
+            metadata={
+                "notification_type": notification_type,
+                **data
+            }
+        )
 
     @staticmethod
     async def create_group_post_notification(
@@ -622,24 +746,38 @@ class NotificationService:
     ) -> Notification:
         """Create notification for new group post"""
         try:
-            notification = Notification(
-                user_id=member_id,
-                type=NotificationType.GROUP_POST,
-                title="New Group Post",
-                message=f"{author_name} posted in your group: {post_content}",
-                related_id=post_id,
-                related_user_id=author_id,
-                metadata={
-                    "group_id": group_id,
-                    "post_id": post_id,
-                    "action_url": f"/premium-groups/{group_id}/feed"
-                }
+            notification = NotificationService.build_group_post_notification(
+                member_id, author_id, author_name, group_id, post_id, post_content
             )
             await notification.save()
             return notification
         except Exception as e:
             logger.error(f"Error creating group post notification: {e}")
             return None
+    
+    @staticmethod
+    def build_group_post_notification(
+        member_id: str,
+        author_id: str,
+        author_name: str,
+        group_id: str,
+        post_id: str,
+        post_content: str
+    ) -> Notification:
+        """Build an unsaved group post notification, for create_many"""
+        return Notification(
+            user_id=member_id,
+            type=NotificationType.GROUP_POST,
+            title="New Group Post",
+            message=f"{author_name} posted in your group: {post_content}",
+            related_id=post_id,
+            related_user_id=author_id,
+            metadata={
+                "group_id": group_id,
+                "post_id": post_id,
+                "action_url": f"/premium-groups/{group_id}/feed"
+            }
+        )
 
     @staticmethod
     async def create_group_like_notification(
@@ -1,25 +1,25 @@
 # app/services/prediction_cache_service.py
-import asyncio
 import logging
-import json
 import hashlib
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, Optional, List
-from pathlib import Path
-import tempfile
-import pickle
+from typing import Dict, Any, Optional, Callable, Awaitable
 
+from ..core.cache import build_cache
+from ..core.last_seen import last_seen_tracker
 from ..models.user import User
+from .data_version_service import DataVersionService
 
 logger = logging.getLogger(__name__)
 
+# Shared by every PredictionCacheService instance in this worker
+prediction_cache = build_cache("predictions")
+
 
 class PredictionCacheService:
     """Service for caching ML predictions to improve performance"""
     
     def __init__(self):
-        self.cache_dir = Path("/tmp/tug_prediction_cache")
-        self.cache_dir.mkdir(exist_ok=True)
+        self.cache = prediction_cache
         
         # Cache configuration
         self.cache_ttl_hours = {
@@ -32,11 +32,6 @@ class PredictionCacheService:
             "activity_forecasting": 8,  # Forecasts need regular updates
             "confidence_metrics": 6     # Confidence updates moderately
         }
-        
-        # Memory cache for frequently accessed predictions
-        self._memory_cache = {}
-        self._memory_cache_timestamps = {}
-        self._max_memory_cache_size = 100  # Max users to keep in memory
 
     async def get_cached_predictions(
         self, 
@@ -46,21 +41,9 @@ class PredictionCacheService:
         """Get cached predictions for a user"""
         
         try:
+            await DataVersionService.current(user)
             cache_key = self._generate_cache_key(user, cache_key_suffix)
-            
-            # Check memory cache first
-            memory_result = self._get_from_memory_cache(cache_key)
-            if memory_result:
-                return memory_result
-            
-            # Check disk cache
-            disk_result = await self._get_from_disk_cache(cache_key)
-            if disk_result:
-                # Store in memory cache for faster future access
-                self._store_in_memory_cache(cache_key, disk_result)
-                return disk_result
-            
-            return None
+            return await self.cache.get(cache_key)
             
         except Exception as e:
             logger.error(f"Error getting cached predictions for user {user.id}: {e}")
@@ -75,36 +58,63 @@ class PredictionCacheService:
         """Store predictions in cache"""
         
         try:
+            await DataVersionService.current(user)
             cache_key = self._generate_cache_key(user, cache_key_suffix)
-            
-            # Add timestamp and metadata
-            cached_data = {
-                "predictions": predictions,
-                "cached_at": datetime.now(timezone.utc),
-                "user_id": str(user.id),
-                "cache_key": cache_key,
-                "ttl_hours": self._calculate_adaptive_ttl(predictions)
-            }
-            
-            # Store in memory cache
-            self._store_in_memory_cache(cache_key, cached_data)
-            
-            # Store in disk cache asynchronously
-            await self._store_in_disk_cache(cache_key, cached_data)
-            
+            cached_data = self._build_cache_entry(user, cache_key, predictions)
+            
+            await self.cache.set(
+                cache_key,
+                cached_data,
+                ttl_seconds=cached_data["ttl_hours"] * 3600,
+                tags=[str(user.id)]
+            )
             return True
             
         except Exception as e:
             logger.error(f"Error storing predictions for user {user.id}: {e}")
             return False
 
+    async def get_or_generate_predictions(
+        self,
+        user: User,
+        generate: Callable[[], Awaitable[Dict[str, Any]]],
+        cache_key_suffix: str = ""
+    ) -> Dict[str, Any]:
+        """Return cached predictions, generating them at most once for concurrent callers"""
+        
+        await DataVersionService.current(user)
+        cache_key = self._generate_cache_key(user, cache_key_suffix)
+        
+        async def build_entry() -> Dict[str, Any]:
+            predictions = await generate()
+            return self._build_cache_entry(user, cache_key, predictions)
+        
+        return await self.cache.get_or_compute(
+            cache_key,
+            build_entry,
+            ttl_seconds=lambda entry: entry["ttl_hours"] * 3600,
+            tags=[str(user.id)]
+        )
+
+    def _build_cache_entry(self, user: User, cache_key: str, predictions: Dict[str, Any]) -> Dict[str, Any]:
+        """Wrap predictions with their cache metadata"""
+        return {
+            "predictions": predictions,
+            "cached_at": datetime.now(timezone.utc),
+            "user_id": str(user.id),
+            "cache_key": cache_key,
+            "ttl_hours": self._calculate_adaptive_ttl(predictions)
+        }
+
     def _generate_cache_key(self, user: User, suffix: str = "") -> str:
         """Generate a unique cache key for a user"""
         
-        # Include factors that might affect predictions
+        # Include factors that might affect predictions. The data version changes on every
+        # write to the user's activities, values, indulgences and moods, so entries are reused
+        # until the data behind them changes and are never served once it has.
         key_components = [
             str(user.id),
-            user.last_login.strftime("%Y%m%d") if user.last_login else "never",
+            f"v{user.data_version}",
             str(user.is_premium),
             suffix
         ]
@@ -113,113 +123,6 @@ class PredictionCacheService:
         key_string = "_".join(filter(None, key_components))
         return hashlib.md5(key_string.encode()).hexdigest()
 
-    def _get_from_memory_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """Get predictions from memory cache"""
-        
-        if cache_key not in self._memory_cache:
-            return None
-        
-        cached_data = self._memory_cache[cache_key]
-        cached_at = cached_data.get("cached_at")
-        ttl_hours = cached_data.get("ttl_hours", 6)
-        
-        if not cached_at:
-            # Invalid cache entry
-            del self._memory_cache[cache_key]
-            return None
-        
-        # Check if expired
-        if datetime.now(timezone.utc) - cached_at > timedelta(hours=ttl_hours):
-            del self._memory_cache[cache_key]
-            if cache_key in self._memory_cache_timestamps:
-                del self._memory_cache_timestamps[cache_key]
-            return None
-        
-        # Update access timestamp
-        self._memory_cache_timestamps[cache_key] = datetime.now(timezone.utc)
-        
-        return cached_data
-
-    def _store_in_memory_cache(self, cache_key: str, data: Dict[str, Any]) -> None:
-        """Store predictions in memory cache"""
-        
-        # Manage cache size
-        if len(self._memory_cache) >= self._max_memory_cache_size:
-            self._evict_old_memory_cache_entries()
-        
-        self._memory_cache[cache_key] = data
-        self._memory_cache_timestamps[cache_key] = datetime.now(timezone.utc)
-
-    def _evict_old_memory_cache_entries(self) -> None:
-        """Remove old entries from memory cache"""
-        
-        if not self._memory_cache_timestamps:
-            return
-        
-        # Remove 20% of oldest entries
-        sorted_keys = sorted(
-            self._memory_cache_timestamps.items(), 
-            key=lambda x: x[1]
-        )
-        
-        num_to_remove = max(1, len(sorted_keys) // 5)
-        
-        for cache_key, _ in sorted_keys[:num_to_remove]:
-            if cache_key in self._memory_cache:
-                del self._memory_cache[cache_key]
-            if cache_key in self._memory_cache_timestamps:
-                del self._memory_cache_timestamps[cache_key]
-
-    async def _get_from_disk_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """Get predictions from disk cache"""
-        
-        cache_file = self.cache_dir / f"{cache_key}.pkl"
-        
-        if not cache_file.exists():
-            return None
-        
-        try:
-            with open(cache_file, 'rb') as f:
-                cached_data = pickle.load(f)
-            
-            cached_at = cached_data.get("cached_at")
-            ttl_hours = cached_data.get("ttl_hours", 6)
-            
-            if not cached_at:
-                # Invalid cache file
-                cache_file.unlink(missing_ok=True)
-                return None
-            
-            # Check if expired
-            if datetime.now(timezone.utc) - cached_at > timedelta(hours=ttl_hours):
-                cache_file.unlink(missing_ok=True)
-                return None
-            
-            return cached_data
-            
-        except Exception as e:
-            logger.warning(f"Error reading disk cache {cache_key}: {e}")
-            cache_file.unlink(missing_ok=True)  # Remove corrupted file
-            return None
-
-    async def _store_in_disk_cache(self, cache_key: str, data: Dict[str, Any]) -> None:
-        """Store predictions in disk cache"""
-        
-        cache_file = self.cache_dir / f"{cache_key}.pkl"
-        
-        try:
-            # Use temporary file for atomic write
-            with tempfile.NamedTemporaryFile(dir=self.cache_dir, delete=False, suffix='.tmp') as temp_file:
-                pickle.dump(data, temp_file)
-                temp_file.flush()
-                
-                # Atomic rename
-                temp_path = Path(temp_file.name)
-                temp_path.rename(cache_file)
-                
-        except Exception as e:
-            logger.error(f"Error storing disk cache {cache_key}: {e}")
-
     def _calculate_adaptive_ttl(self, predictions: Dict[str, Any]) -> float:
         """Calculate adaptive TTL based on prediction confidence and type"""
         
@@ -249,26 +152,8 @@ class PredictionCacheService:
         """Invalidate all cached predictions for a user"""
         
         try:
-            # Generate possible cache keys (we don't know all suffixes)
-            base_cache_key = self._generate_cache_key(user, "")
-            
-            # Remove from memory cache
-            keys_to_remove = [key for key in self._memory_cache.keys() if key.startswith(base_cache_key[:16])]
-            for key in keys_to_remove:
-                if key in self._memory_cache:
-                    del self._memory_cache[key]
-                if key in self._memory_cache_timestamps:
-                    del self._memory_cache_timestamps[key]
-            
-            # Remove from disk cache
-            cache_files = list(self.cache_dir.glob(f"{base_cache_key[:16]}*.pkl"))
-            for cache_file in cache_files:
-                try:
-                    cache_file.unlink()
-                except Exception as e:
-                    logger.warning(f"Failed to remove cache file {cache_file}: {e}")
-            
-            logger.info(f"Invalidated cache for user {user.id}")
+            removed = await self.cache.delete_tag(str(user.id))
+            logger.info(f"Invalidated {removed} cached predictions for user {user.id}")
             return True
             
         except Exception as e:
@@ -280,6 +165,7 @@ class PredictionCacheService:
         
         try:
             # Get recently active users
+            await last_seen_tracker.flush()
             cutoff_date = datetime.now(timezone.utc) - timedelta(hours=24)
             
             users = await User.find(
@@ -298,9 +184,8 @@ class PredictionCacheService:
             
             for user in users:
                 try:
-                    # Check if cache already exists and is fresh
-                    cache_key = self._generate_cache_key(user)
-                    existing_cache = await self.get_cached_predictions(user)
+                    # Check if the analytics predictions are already cached
+                    existing_cache = await self.get_cached_predictions(user, "analytics")
                     
                     if existing_cache:
                         continue  # Already cached
@@ -313,15 +198,14 @@ class PredictionCacheService:
                     if len(activities) < 5:
                         continue  # Skip users with insufficient data
                     
+                    # Generating the predictions stores them under the key analytics reads
                     analytics = await AnalyticsService.generate_user_analytics(
                         user=user,
-                        days_back=30
+                        days_back=30,
+                        sections=("predictions",)
                     )
                     
-                    predictions = analytics.get("predictions", {})
-                    
-                    if predictions:
-                        await self.store_predictions(user, predictions, "warm_cache")
+                    if analytics.get("predictions"):
                         warming_results["predictions_cached"] += 1
                     
                     warming_results["users_processed"] += 1
@@ -342,55 +226,11 @@ class PredictionCacheService:
         """Clean up expired cache entries"""
         
         try:
+            # The shared tier expires entries itself; only the memory tier needs a sweep
             cleanup_results = {
-                "memory_entries_removed": 0,
-                "disk_files_removed": 0,
-                "errors": 0
+                "memory_entries_removed": self.cache.purge_expired()
             }
             
-            # Clean up memory cache
-            current_time = datetime.now(timezone.utc)
-            expired_keys = []
-            
-            for cache_key, cached_data in self._memory_cache.items():
-                cached_at = cached_data.get("cached_at")
-                ttl_hours = cached_data.get("ttl_hours", 6)
-                
-                if not cached_at or current_time - cached_at > timedelta(hours=ttl_hours):
-                    expired_keys.append(cache_key)
-            
-            for key in expired_keys:
-                if key in self._memory_cache:
-                    del self._memory_cache[key]
-                if key in self._memory_cache_timestamps:
-                    del self._memory_cache_timestamps[key]
-                cleanup_results["memory_entries_removed"] += 1
-            
-            # Clean up disk cache
-            cache_files = list(self.cache_dir.glob("*.pkl"))
-            
-            for cache_file in cache_files:
-                try:
-                    with open(cache_file, 'rb') as f:
-                        cached_data = pickle.load(f)
-                    
-                    cached_at = cached_data.get("cached_at")
-                    ttl_hours = cached_data.get("ttl_hours", 6)
-                    
-                    if not cached_at or current_time - cached_at > timedelta(hours=ttl_hours):
-                        cache_file.unlink()
-                        cleanup_results["disk_files_removed"] += 1
-                        
-                except Exception as e:
-                    logger.warning(f"Error checking cache file {cache_file}: {e}")
-                    cleanup_results["errors"] += 1
-                    # Remove corrupted files
-                    try:
-                        cache_file.unlink()
-                        cleanup_results["disk_files_removed"] += 1
-                    except:
-                        pass
-            
             logger.info(f"Cache cleanup completed: {cleanup_results}")
             return cleanup_results
             
@@ -402,22 +242,7 @@ class PredictionCacheService:
         """Get statistics about the prediction cache"""
         
         try:
-            stats = {
-                "memory_cache": {
-                    "entries": len(self._memory_cache),
-                    "max_size": self._max_memory_cache_size,
-                    "utilization": round(len(self._memory_cache) / self._max_memory_cache_size * 100, 1)
-                },
-                "disk_cache": {
-                    "files": len(list(self.cache_dir.glob("*.pkl"))),
-                    "directory_size_mb": 0
-                },
-                "cache_directory": str(self.cache_dir)
-            }
-            
-            # Calculate disk cache size
-            total_size = sum(f.stat().st_size for f in self.cache_dir.glob("*.pkl"))
-            stats["disk_cache"]["directory_size_mb"] = round(total_size / 1024 / 1024, 2)
+            stats = await self.cache.get_stats()
             
             # TTL configuration
             stats["ttl_configuration"] = self.cache_ttl_hours
@@ -20,8 +20,11 @@ from ..schemas.premium_group import (
     GroupDashboardData, GroupLeaderboardEntry
 )
 from .notification_service import NotificationService
+from .group_member_index import group_member_index
 from .ml_prediction_service import MLPredictionService
 from ..utils.validation import InputValidator
+from ..utils.search_tokens import query_filter, relevance
+from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -87,6 +90,7 @@ class PremiumGroupService:
                 join_date=datetime.utcnow()
             )
             await membership.save()
+            await group_member_index.invalidate(str(group.id))
             
             logger.info(f"Premium group created: {group.id} by user {current_user.id}")
             
@@ -312,6 +316,7 @@ class PremiumGroupService:
                 membership.join_date = datetime.utcnow()
                 membership.update_timestamp()
                 await membership.save()
+                await group_member_index.invalidate(group_id)
                 
                 # Update group member count
                 group.total_members += 1
@@ -656,6 +661,7 @@ class PremiumGroupService:
             target_membership.status = MembershipStatus.REMOVED
             target_membership.update_timestamp()
             await target_membership.save()
+            await group_member_index.invalidate(group_id)
             
             # Update group member count
             group = await PremiumGroup.get(group_id)
@@ -704,6 +710,7 @@ class PremiumGroupService:
                 "group_id": group_id,
                 "status": MembershipStatus.ACTIVE
             }).update_many({"$set": {"status": MembershipStatus.REMOVED}})
+            await group_member_index.invalidate(group_id)
             
             logger.info(f"Group deleted/archived: {group_id} by owner {current_user.id}")
             return True
@@ -730,13 +737,17 @@ class PremiumGroupService:
                 "privacy_level": {"$in": [GroupPrivacyLevel.PUBLIC, GroupPrivacyLevel.DISCOVERABLE]}
             }
             
-            # Add text search if query provided
+            # Add token search if query provided
+            token_filter = None
             if query:
-                search_query["$or"] = [
-                    {"name": {"$regex": query, "$options": "i"}},
-                    {"description": {"$regex": query, "$options": "i"}},
-                    {"custom_tags": {"$in": [query]}}
-                ]
+                query = InputValidator.sanitize_string(query.strip(), max_length=100)
+                if InputValidator.detect_injection_attempts(query):
+                    logger.warning(f"Suspicious group search query from user {current_user.id}")
+                    return []
+                token_filter = query_filter(query)
+                if token_filter is None:
+                    return []
+                search_query["$and"] = [token_filter]
             
             # Add filters
             if filters.group_type:
@@ -751,15 +762,35 @@ class PremiumGroupService:
                 search_query.setdefault("total_members", {})["$lte"] = filters.max_members
             
             # Execute search
-            groups = await PremiumGroup.find(search_query)\
-                .sort([("average_engagement_score", -1), ("total_members", -1)])\
-                .skip(skip)\
-                .limit(limit)\
-                .to_list()
+            if token_filter is None:
+                groups = await PremiumGroup.find(search_query)\
+                    .sort([("average_engagement_score", -1), ("total_members", -1)])\
+                    .skip(skip)\
+                    .limit(limit)\
+                    .to_list()
+                scores = [1.0] * len(groups)
+            else:
+                # Rank index matches by relevance, then engagement as before
+                candidates = await PremiumGroup.find(search_query)\
+                    .limit(max(settings.SEARCH_CANDIDATE_LIMIT, skip + limit))\
+                    .to_list()
+                ranked = sorted(
+                    (
+                        (relevance(query, [
+                            (group.name, 1.0), (" ".join(group.custom_tags), 0.8), (group.description, 0.5)
+                        ]), group)
+                        for group in candidates
+                    ),
+                    key=lambda item: (item[0], item[1].average_engagement_score, item[1].total_members),
+                    reverse=True
+                )
+                ranked = [(score, group) for score, group in ranked if score > 0][skip:skip + limit]
+                scores = [score for score, _ in ranked]
+                groups = [group for _, group in ranked]
             
             # Convert to search results
             results = []
-            for group in groups:
+            for group, score in zip(groups, scores):
                 result = GroupSearchResult(
                     id=str(group.id),
                     name=group.name,
@@ -774,7 +805,7 @@ class PremiumGroupService:
                     average_engagement_score=group.average_engagement_score,
                     created_at=group.created_at,
                     last_activity_at=group.last_activity_at,
-                    relevance_score=1.0,  # Would calculate based on search match
+                    relevance_score=score,
                     user_can_join=True,
                     join_requirements=["Premium subscription required"]
                 )
@@ -0,0 +1,299 @@
+# app/services/presence_registry.py
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from ..core.config import settings
+from ..core.pubsub import PubSubBackend, InProcessPubSub, REPLICA_ID
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TypingState:
+    """One user typing in a group (or one of its threads)"""
+    user_id: str
+    username: str
+    display_name: Optional[str]
+    thread_id: Optional[str]
+    expires_at: float  # Wall-clock seconds, so replicas agree on it
+    broadcast_at: float = 0.0
+
+    def to_event(self, group_id: str, is_typing: bool) -> Dict[str, Any]:
+        return {
+            "group_id": group_id,
+            "user_id": self.user_id,
+            "username": self.username,
+            "display_name": self.display_name,
+            "thread_id": self.thread_id,
+            "expires_at": self.expires_at,
+            "is_typing": is_typing
+        }
+
+# (is_typing, group_id, state) -> broadcast to this replica's connections
+ChangeHandler = Callable[[bool, str, TypingState], Awaitable[None]]
+
+class PresenceRegistry:
+    """In-memory typing state with TTL expiry, shared across replicas over pub/sub.
+
+    Typing events only touch memory. A start is broadcast when a user begins typing and
+    then at most once per debounce window while they keep typing; each broadcast carries
+    a fresh expiry, so replicas keep the entry alive without seeing every keystroke.
+    Entries that are not refreshed expire locally on every replica, which broadcasts the
+    stop to its own connections.
+    """
+
+    CHANNEL = "typing"
+
+    def __init__(
+        self,
+        pubsub: Optional[PubSubBackend] = None,
+        ttl_seconds: Optional[float] = None,
+        debounce_seconds: Optional[float] = None,
+        sweep_interval_seconds: float = 1.0
+    ):
+        self.pubsub = pubsub or InProcessPubSub()
+        self.ttl_seconds = ttl_seconds or settings.TYPING_INDICATOR_TTL_SECONDS
+        self.debounce_seconds = (
+            settings.TYPING_BROADCAST_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+        )
+        self.sweep_interval_seconds = sweep_interval_seconds
+        # group_id -> (user_id, thread_id) -> state
+        self._typing: Dict[str, Dict[Tuple[str, Optional[str]], TypingState]] = {}
+        self._on_change: Optional[ChangeHandler] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def on_change(self, handler: ChangeHandler):
+        """Register the callback that broadcasts typing changes to local connections"""
+        self._on_change = handler
+
+    async def start(self):
+        await self.pubsub.subscribe(self.CHANNEL, self._handle_remote_event)
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_expired())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    async def set_typing(
+        self,
+        group_id: str,
+        user_id: str,
+        username: str,
+        display_name: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        is_typing: bool = True
+    ):
+        """Record a typing start or stop from a user connected to this replica"""
+        now = time.time()
+        entries = self._typing.setdefault(group_id, {})
+        key = (user_id, thread_id)
+        state = entries.get(key)
+
+        if not is_typing:
+            if state is None:
+                self._drop_empty(group_id)
+                return
+            del entries[key]
+            self._drop_empty(group_id)
+            await self._notify(False, group_id, state)
+            return
+
+        if state is not None and state.expires_at > now:
+            state.expires_at = now + self.ttl_seconds
+            if now - state.broadcast_at < self.debounce_seconds:
+                return  # Still typing; the last broadcast covers it
+        else:
+            state = TypingState(user_id, username, display_name, thread_id, now + self.ttl_seconds)
+            entries[key] = state
+
+        state.broadcast_at = now
+        await self._notify(True, group_id, state)
+
+    async def clear_user(self, user_id: str):
+        """Stop every typing indicator of a user, e.g. when their last connection closes"""
+        for group_id, entries in list(self._typing.items()):
+            for key in [key for key in entries if key[0] == user_id]:
+                state = entries.pop(key, None)
+                if state is not None:
+                    await self._notify(False, group_id, state)
+            self._drop_empty(group_id)
+
+    def get_typing(self, group_id: str, exclude_user_id: Optional[str] = None) -> List[TypingState]:
+        """Users typing in a group right now; reads memory only"""
+        now = time.time()
+        return [
+            state for state in self._typing.get(group_id, {}).values()
+            if state.expires_at > now and state.user_id != exclude_user_id
+        ]
+
+    async def _notify(self, is_typing: bool, group_id: str, state: TypingState):
+        await self._broadcast_locally(is_typing, group_id, state)
+        try:
+            await self.pubsub.publish(self.CHANNEL, state.to_event(group_id, is_typing))
+        except Exception as e:
+            logger.error(f"Error publishing typing event for group {group_id}: {e}")
+
+    async def _broadcast_locally(self, is_typing: bool, group_id: str, state: TypingState):
+        if self._on_change is None:
+            return
+        try:
+            await self._on_change(is_typing, group_id, state)
+        except Exception as e:
+            logger.error(f"Error broadcasting typing change for group {group_id}: {e}")
+
+    async def _handle_remote_event(self, event: Dict[str, Any]):
+        """Apply a typing change published by another replica"""
+        if event.get("origin") == REPLICA_ID:
+            return
+
+        group_id = event["group_id"]
+        key = (event["user_id"], event.get("thread_id"))
+        if event["is_typing"]:
+            state = TypingState(
+                user_id=event["user_id"],
+                username=event["username"],
+                display_name=event.get("display_name"),
+                thread_id=event.get("thread_id"),
+                expires_at=float(event["expires_at"]),
+                broadcast_at=time.time()
+            )
+            self._typing.setdefault(group_id, {})[key] = state
+        else:
+            state = self._typing.get(group_id, {}).pop(key, None)
+            self._drop_empty(group_id)
+            if state is None:
+                return
+        await self._broadcast_locally(event["is_typing"], group_id, state)
+
+    async def _sweep_expired(self):
+        """Expire typing entries that were not refreshed within the TTL"""
+        while True:
+            try:
+                await asyncio.sleep(self.sweep_interval_seconds)
+                now = time.time()
+                for group_id, entries in list(self._typing.items()):
+                    expired = [key for key, state in entries.items() if state.expires_at <= now]
+                    for key in expired:
+                        # Every replica expires its own copy, so this is not published
+                        state = entries.pop(key, None)
+                        if state is not None:
+                            await self._broadcast_locally(False, group_id, state)
+                    self._drop_empty(group_id)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error expiring typing indicators: {e}")
+
+    def _drop_empty(self, group_id: str):
+        if not self._typing.get(group_id):
+            self._typing.pop(group_id, None)
+
+
+class OnlinePresence:
+    """Which users hold a websocket connection on any replica.
+
+    Each replica announces users as their first local connection opens and their last
+    one closes, and republishes a full snapshot of its local users every heartbeat. A
+    replica's snapshot is a lease: if it is not renewed within a few heartbeats (the
+    replica crashed or lost the broker) its users stop counting as online.
+    """
+
+    CHANNEL = "online"
+    LEASE_HEARTBEATS = 3
+
+    def __init__(self, pubsub: Optional[PubSubBackend] = None, heartbeat_seconds: Optional[float] = None):
+        self.pubsub = pubsub or InProcessPubSub()
+        self.heartbeat_seconds = heartbeat_seconds or settings.REALTIME_PRESENCE_HEARTBEAT_SECONDS
+        self._local: Set[str] = set()
+        # replica_id -> (user_ids, lease expiry in wall-clock seconds)
+        self._remote: Dict[str, Tuple[Set[str], float]] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self.pubsub.subscribe(self.CHANNEL, self._handle_remote_event)
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._publish_snapshots())
+
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+        # Let the other replicas forget our users now rather than when the lease runs out
+        await self._publish({"replica_down": True})
+        await self.pubsub.unsubscribe(self.CHANNEL, self._handle_remote_event)
+        # No longer following the other replicas, so their leases would only go stale
+        self._remote.clear()
+
+    async def user_connected(self, user_id: str):
+        """Call when a user's first connection on this replica opens"""
+        self._local.add(user_id)
+        await self._publish({"user_id": user_id, "online": True})
+
+    async def user_disconnected(self, user_id: str):
+        """Call when a user's last connection on this replica closes"""
+        self._local.discard(user_id)
+        await self._publish({"user_id": user_id, "online": False})
+
+    def is_online(self, user_id: str) -> bool:
+        if user_id in self._local:
+            return True
+        now = time.time()
+        return any(user_id in users and expires_at > now for users, expires_at in self._remote.values())
+
+    def online_users(self) -> Set[str]:
+        now = time.time()
+        online = set(self._local)
+        for users, expires_at in self._remote.values():
+            if expires_at > now:
+                online |= users
+        return online
+
+    def peer_count(self) -> int:
+        """Other replicas whose lease is current"""
+        now = time.time()
+        return sum(1 for _, expires_at in self._remote.values() if expires_at > now)
+
+    async def _publish(self, event: Dict[str, Any]):
+        try:
+            await self.pubsub.publish(self.CHANNEL, event)
+        except Exception as e:
+            logger.error(f"Error publishing presence event: {e}")
+
+    async def _publish_snapshots(self):
+        while True:
+            try:
+                await self._publish({"snapshot": sorted(self._local)})
+                await asyncio.sleep(self.heartbeat_seconds)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error publishing presence snapshot: {e}")
+                await asyncio.sleep(self.heartbeat_seconds)
+
+    async def _handle_remote_event(self, event: Dict[str, Any]):
+        """Apply a presence change or snapshot published by another replica"""
+        origin = event.get("origin")
+        if origin is None or origin == REPLICA_ID:
+            return
+
+        if event.get("replica_down"):
+            self._remote.pop(origin, None)
+            return
+
+        lease = time.time() + self.heartbeat_seconds * self.LEASE_HEARTBEATS
+        if "snapshot" in event:
+            self._remote[origin] = (set(event["snapshot"]), lease)
+            return
+
+        users, expires_at = self._remote.get(origin, (set(), lease))
+        if event["online"]:
+            users.add(event["user_id"])
+        else:
+            users.discard(event["user_id"])
+        self._remote[origin] = (users, expires_at)
@@ -0,0 +1,57 @@
+# app/services/search_index_service.py
+"""
+Backfill of search tokens.
+
+Users and groups refresh their ``search_tokens`` on every save. Documents written
+before the tokens existed (or by raw updates that bypassed the model) are filled in
+here in batches by a scheduled job, until none are left.
+"""
+
+import logging
+from typing import List, Type
+
+from beanie import Document
+from pymongo import UpdateOne
+
+from ..core.config import settings
+from ..core.scheduler import Every, Job
+from ..models.premium_group import PremiumGroup
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_INTERVAL_SECONDS = 600
+
+
+class SearchIndexService:
+    """Fills in missing search tokens"""
+
+    @staticmethod
+    async def backfill(model: Type[Document], batch_size: int = 500) -> int:
+        """Compute tokens for every document of ``model`` without them; returns how many"""
+        updated = 0
+        while True:
+            documents = await model.find({"search_tokens": {"$exists": False}}).limit(batch_size).to_list()
+            if not documents:
+                return updated
+            await model.get_motor_collection().bulk_write([
+                UpdateOne({"_id": document.id}, {"$set": {"search_tokens": document.build_search_tokens()}})
+                for document in documents
+            ], ordered=False)
+            updated += len(documents)
+
+    @staticmethod
+    def models() -> List[Type[Document]]:
+        # Groups are only registered with Beanie when group features are enabled
+        return [User, PremiumGroup] if settings.ENABLE_GROUP_FEATURES else [User]
+
+    @staticmethod
+    async def backfill_all() -> None:
+        for model in SearchIndexService.models():
+            updated = await SearchIndexService.backfill(model)
+            if updated:
+                logger.info(f"Backfilled search tokens for {updated} {model.__name__} documents")
+
+
+def register_search_jobs(scheduler) -> None:
+    scheduler.register(Job("search.backfill", SearchIndexService.backfill_all, Every(BACKFILL_INTERVAL_SECONDS)))
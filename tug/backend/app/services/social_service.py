@@ -18,7 +18,11 @@ from ..schemas.social import (
     SocialStatisticsResponse, PostTypeStats, FriendshipData
 )
 from .notification_service import NotificationService
+from .timeline_service import TimelineService
+from .friend_graph import friend_graph
 from ..utils.validation import InputValidator
+from ..utils.search_tokens import query_filter, relevance
+from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -45,25 +49,20 @@ class SocialService:
                 )
             
             # Check if friendship already exists
-            existing_friendship = await Friendship.find_one({
-                "$or": [
-                    {"requester_id": str(current_user.id), "addressee_id": request.addressee_id},
-                    {"requester_id": request.addressee_id, "addressee_id": str(current_user.id)}
-                ]
-            })
+            existing_status = await friend_graph.status_between(str(current_user.id), request.addressee_id)
             
-            if existing_friendship:
-                if existing_friendship.status == FriendshipStatus.ACCEPTED:
+            if existing_status:
+                if existing_status == FriendshipStatus.ACCEPTED:
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
                         detail="Already friends with this user"
                     )
-                elif existing_friendship.status == FriendshipStatus.PENDING:
+                elif existing_status == FriendshipStatus.PENDING:
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
                         detail="Friend request already pending"
                     )
-                elif existing_friendship.status == FriendshipStatus.BLOCKED:
+                elif existing_status == FriendshipStatus.BLOCKED:
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
                         detail="Cannot send friend request to blocked user"
@@ -77,6 +76,7 @@ class SocialService:
             )
             
             await friendship.save()
+            await friend_graph.record(friendship)
             logger.info(f"Friend request sent from {current_user.id} to {request.addressee_id}")
             
             # Create notification for the addressee
@@ -130,11 +130,19 @@ class SocialService:
             else:
                 # For rejection, we delete the friendship record
                 await friendship.delete()
+                await friend_graph.remove(friendship)
                 logger.info(f"Friend request rejected and deleted: {friendship_id}")
                 return friendship
             
             friendship.update_timestamp()
             await friendship.save()
+            await friend_graph.record(friendship)
+            
+            # Bring each side's recent posts into the other's feed
+            try:
+                await TimelineService.backfill_friendship(friendship.requester_id, friendship.addressee_id)
+            except Exception as e:
+                logger.error(f"Failed to backfill feeds for friendship {friendship.id}: {e}")
             
             # Create notification for the requester that their request was accepted
             requester = await User.get(friendship.requester_id)
@@ -161,50 +169,38 @@ class SocialService:
     async def get_friends(current_user: User) -> List[FriendshipData]:
         """Get list of user's friends with friendship data"""
         try:
-            # Find all accepted friendships where user is involved
-            friendships = await Friendship.find({
-                "$and": [
-                    {"status": FriendshipStatus.ACCEPTED},
-                    {"$or": [
-                        {"requester_id": str(current_user.id)},
-                        {"addressee_id": str(current_user.id)}
-                    ]}
-                ]
-            }).to_list()
-            
-            # Extract friend user IDs and create ID mapping
-            friend_ids = []
-            friendship_map = {}
-            for friendship in friendships:
-                if friendship.requester_id == str(current_user.id):
-                    friend_id = friendship.addressee_id
-                else:
-                    friend_id = friendship.requester_id
-                friend_ids.append(friend_id)
-                friendship_map[friend_id] = friendship
-            
-            # Get friend user objects
-            friends = await User.find({"_id": {"$in": [ObjectId(fid) for fid in friend_ids]}}).to_list()
+            user_id = str(current_user.id)
+            adjacency = await friend_graph.get(user_id)
+            friend_ids = adjacency.friend_ids()
+            
+            # Only the fields shown in the list are loaded
+            cursor = User.get_motor_collection().find(
+                {"_id": {"$in": [ObjectId(fid) for fid in friend_ids]}},
+                projection={"username": 1, "display_name": 1, "email": 1}
+            )
+            friends = [doc async for doc in cursor]
             
             # Build friendship data with user info
             friendship_data_list = []
             for friend in friends:
-                friend_id = str(friend.id)
-                friendship = friendship_map[friend_id]
+                friend_id = str(friend["_id"])
+                edge = adjacency.edges[friend_id]
                 
                 # Ensure friend has username
-                if not friend.username:
-                    await friend.ensure_username()
+                username = friend.get("username")
+                if not username:
+                    friend_user = await User.get(friend["_id"])
+                    username = await friend_user.ensure_username() if friend_user else None
                 
                 friendship_data = FriendshipData(
-                    id=str(friendship.id),
-                    requester_id=friendship.requester_id,
-                    addressee_id=friendship.addressee_id,
-                    status=friendship.status,
-                    created_at=friendship.created_at,
-                    updated_at=friendship.updated_at,
-                    friend_username=friend.username or friend.effective_username,
-                    friend_display_name=friend.display_name
+                    id=edge["friendship_id"],
+                    requester_id=user_id if edge["outgoing"] else friend_id,
+                    addressee_id=friend_id if edge["outgoing"] else user_id,
+                    status=edge["status"],
+                    created_at=edge["created_at"],
+                    updated_at=edge["updated_at"],
+                    friend_username=username or "Unknown",
+                    friend_display_name=friend.get("display_name")
                 )
                 friendship_data_list.append(friendship_data)
             
@@ -281,39 +277,31 @@ class SocialService:
                     detail={"error": "invalid_search", "message": "Invalid search query"}
                 )
             
-            # Escape regex special characters to prevent regex injection
-            import re
-            escaped_query = re.escape(sanitized_query)
+            token_filter = query_filter(sanitized_query)
+            if token_filter is None:
+                return []
             
             # Validate limit
             limit = min(max(limit, 1), 50)  # Limit between 1 and 50
             
-            # Search users by username, display_name, or email (case insensitive)
-            users = await User.find({
+            # Find users by username, display_name, or email through the search tokens
+            candidates = await User.find({
                 "$and": [
                     {"_id": {"$ne": ObjectId(current_user.id)}},  # Exclude current user
-                    {"$or": [
-                        {"username": {"$regex": escaped_query, "$options": "i"}},
-                        {"display_name": {"$regex": escaped_query, "$options": "i"}},
-                        {"email": {"$regex": escaped_query, "$options": "i"}}
-                    ]}
+                    token_filter
                 ]
-            }).limit(limit).to_list()
+            }).limit(settings.SEARCH_CANDIDATE_LIMIT).to_list()
             
-            # Get friendship statuses for found users
-            user_ids = [str(user.id) for user in users]
-            friendships = await Friendship.find({
-                "$or": [
-                    {"requester_id": str(current_user.id), "addressee_id": {"$in": user_ids}},
-                    {"requester_id": {"$in": user_ids}, "addressee_id": str(current_user.id)}
-                ]
-            }).to_list()
+            # Rank by relevance; candidates that only matched on tokens score 0
+            scored = [
+                (relevance(sanitized_query, [(user.username, 1.0), (user.display_name, 0.8), (user.email, 0.5)]), user)
+                for user in candidates
+            ]
+            scored.sort(key=lambda item: item[0], reverse=True)
+            users = [user for score, user in scored if score > 0][:limit]
             
-            # Create friendship status map
-            friendship_map = {}
-            for friendship in friendships:
-                other_user_id = friendship.addressee_id if friendship.requester_id == str(current_user.id) else friendship.requester_id
-                friendship_map[other_user_id] = friendship.status.value
+            # Get friendship statuses for found users
+            adjacency = await friend_graph.get(str(current_user.id))
             
             # Build search results
             results = []
@@ -328,7 +316,7 @@ class SocialService:
                     id=user_id,
                     username=user.username or user.effective_username,
                     display_name=user.display_name,
-                    friendship_status=friendship_map.get(user_id)
+                    friendship_status=adjacency.edges.get(user_id, {}).get("status")
                 ))
             
             return results
@@ -358,6 +346,8 @@ class SocialService:
             await post.save()
             logger.info(f"Social post created by user {current_user.id}: {post.id}")
             
+            await SocialService._fan_out(post)
+            
             return post
             
         except Exception as e:
@@ -367,6 +357,14 @@ class SocialService:
                 detail="Failed to create post"
             )
     
+    @staticmethod
+    async def _fan_out(post: SocialPost) -> None:
+        """Write a new post into feeds; on failure it is still read on demand"""
+        try:
+            await TimelineService.fan_out(post)
+        except Exception as e:
+            logger.error(f"Failed to fan out post {post.id}: {e}", exc_info=True)
+    
     @staticmethod
     async def update_post(current_user: User, post_id: str, post_data: SocialPostUpdate) -> SocialPost:
         """Update a social post (only content can be updated)"""
@@ -424,8 +422,9 @@ class SocialService:
             # Delete all comments for this post first
             await PostComment.find({"post_id": post_id}).delete()
             
-            # Delete the post
+            # Delete the post and take it out of feeds
             await post.delete()
+            await TimelineService.remove_post(post_id)
             
             logger.info(f"Social post deleted by user {current_user.id}: {post_id}")
             
@@ -463,6 +462,7 @@ class SocialService:
             )
             
             await post.save()
+            await SocialService._fan_out(post)
             logger.info(f"Vice milestone post created for user {user.id}: {milestone} days clean from {vice.name}")
             
             return post
@@ -475,39 +475,25 @@ class SocialService:
     @staticmethod
     async def get_social_feed(current_user: User, limit: int = 20, skip: int = 0) -> List[SocialPostData]:
         """Get social feed for current user (posts from friends)"""
+        posts, _ = await SocialService.get_social_feed_page(current_user, limit, skip)
+        return posts
+    
+    @staticmethod
+    async def get_social_feed_page(
+        current_user: User,
+        limit: int = 20,
+        skip: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[SocialPostData], Optional[str]]:
+        """Get a page of the social feed and the cursor for the next one"""
         try:
-            # Get user's friends
-            friendships = await SocialService.get_friends(current_user)
-            friend_ids = []
-            for friendship in friendships:
-                # Get the friend's ID (the other person in the friendship)
-                if friendship.requester_id == str(current_user.id):
-                    friend_ids.append(friendship.addressee_id)
-                else:
-                    friend_ids.append(friendship.requester_id)
-            
-            # Include current user's posts in feed
-            user_ids = friend_ids + [str(current_user.id)]
-            
-            # Get posts from friends and self, ordered by creation date
-            posts = await SocialPost.find({
-                "user_id": {"$in": user_ids},
-                "is_public": True
-            }).sort([("created_at", -1)]).skip(skip).limit(limit).to_list()
-            
-            logger.info(f"Social feed: Current user {current_user.id}, Friend IDs: {friend_ids}, Total user IDs: {user_ids}, Found {len(posts)} posts")
-            
-            # Debug: Check if there are any posts at all from these users
-            all_posts_from_users = await SocialPost.find({"user_id": {"$in": user_ids}}).to_list()
-            public_posts_from_users = await SocialPost.find({"user_id": {"$in": user_ids}, "is_public": True}).to_list()
-            logger.info(f"Debug: Total posts from these users: {len(all_posts_from_users)}, Public posts: {len(public_posts_from_users)}")
-            
-            # Debug: Check all posts in database
-            all_posts = await SocialPost.find({}).to_list()
-            logger.info(f"Debug: Total posts in database: {len(all_posts)}")
-            if all_posts:
-                sample_post = all_posts[0]
-                logger.info(f"Debug: Sample post - user_id: {sample_post.user_id}, is_public: {sample_post.is_public}, content: {sample_post.content[:50]}...")
+            try:
+                posts, next_cursor = await TimelineService.get_page(str(current_user.id), limit, skip, cursor)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid feed cursor"
+                )
             
             # Get user info for posts
             post_user_ids = list(set([post.user_id for post in posts]))
@@ -563,8 +549,10 @@ class SocialService:
                 )
                 feed_posts.append(post_data)
             
-            return feed_posts
+            return feed_posts, next_cursor
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error getting social feed: {e}", exc_info=True)
             raise HTTPException(
@@ -668,25 +656,14 @@ class SocialService:
             # Get all user's posts
             user_posts = await SocialPost.find({"user_id": str(current_user.id)}).to_list()
             
-            # Get friends count
-            friends = await Friendship.find({
-                "$or": [
-                    {"requester_id": str(current_user.id), "status": FriendshipStatus.ACCEPTED},
-                    {"addressee_id": str(current_user.id), "status": FriendshipStatus.ACCEPTED}
-                ]
-            }).to_list()
-            
-            # Get pending friend requests
-            pending_requests = await Friendship.find({
-                "addressee_id": str(current_user.id),
-                "status": FriendshipStatus.PENDING
-            }).to_list()
+            # Get friends and pending friend requests
+            adjacency = await friend_graph.get(str(current_user.id))
             
             # Calculate basic stats
             total_posts = len(user_posts)
             total_comments = sum(post.comments_count for post in user_posts)
-            friends_count = len(friends)
-            pending_requests_count = len(pending_requests)
+            friends_count = len(adjacency.friend_ids())
+            pending_requests_count = len(adjacency.ids_with_status(FriendshipStatus.PENDING, outgoing=False))
             
             # Calculate averages
             avg_comments_per_post = total_comments / total_posts if total_posts > 0 else 0.0
@@ -0,0 +1,201 @@
+# app/services/timeline_service.py
+"""
+Materialized social feeds.
+
+When a public post is created, an entry is written into the feed of the author and of
+each of the author's friends (fan-out on write), so reading a feed page is one indexed
+range scan over ``feed_entries``. Authors with more friends than
+``TIMELINE_FANOUT_MAX_FRIENDS`` are not fanned out; their posts, and posts from before
+feeds were materialized, are read from ``social_posts`` when the feed is requested and
+merged with the entries (fan-out on read). Pages are ordered by ``(created_at, post id)``
+descending and can be continued with an opaque keyset cursor instead of ``skip``.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from ..core.config import settings
+from ..models.feed_entry import FeedEntry
+from ..models.social_post import SocialPost
+from .friend_graph import friend_graph
+
+logger = logging.getLogger(__name__)
+
+# Feed keys sort newest first: (created_at, post id)
+FeedKey = Tuple[datetime, str]
+
+INSERT_CHUNK_SIZE = 500
+DUPLICATE_KEY_ERROR = 11000
+
+
+def encode_cursor(created_at: datetime, post_id: str) -> str:
+    return f"{created_at.isoformat()}_{post_id}"
+
+
+def decode_cursor(cursor: str) -> FeedKey:
+    """Parse a cursor from ``encode_cursor``; raises ValueError if it is malformed"""
+    created_at, separator, post_id = cursor.rpartition("_")
+    if not separator or not ObjectId.is_valid(post_id):
+        raise ValueError("Invalid feed cursor")
+    return datetime.fromisoformat(created_at), post_id
+
+
+def merge_feed_keys(entry_keys: List[FeedKey], post_keys: List[FeedKey], skip: int, limit: int) -> List[FeedKey]:
+    """Merge keys from both sources newest first, once per post, and slice out a page"""
+    merged = sorted(set(entry_keys) | set(post_keys), reverse=True)
+    return merged[skip:skip + limit]
+
+
+class TimelineService:
+    """Writes feed entries for new posts and reads feed pages"""
+
+    @staticmethod
+    async def _insert_entries(documents: List[Dict]) -> int:
+        """Insert feed entries in chunks, skipping ones that already exist"""
+        inserted = 0
+        collection = FeedEntry.get_motor_collection()
+        for start in range(0, len(documents), INSERT_CHUNK_SIZE):
+            chunk = documents[start:start + INSERT_CHUNK_SIZE]
+            try:
+                result = await collection.insert_many(chunk, ordered=False)
+                inserted += len(result.inserted_ids)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                    raise
+                inserted += e.details.get("nInserted", 0)
+        return inserted
+
+    @staticmethod
+    def _entry(owner_id: str, post: SocialPost) -> Dict:
+        return {
+            "owner_id": owner_id,
+            "post_id": str(post.id),
+            "author_id": post.user_id,
+            "created_at": post.created_at
+        }
+
+    @staticmethod
+    async def fan_out(post: SocialPost) -> int:
+        """Write a new post into its readers' feeds; returns how many entries were written
+
+        Private posts never appear in feeds. Posts from authors with too many friends are
+        left to be read on demand.
+        """
+        if not post.is_public:
+            return 0
+
+        # Not the cache: a friend it misses would never see the post, as fanned-out posts
+        # are no longer read from social_posts
+        friend_ids = await friend_graph.stored_friend_ids(post.user_id)
+        if len(friend_ids) > settings.TIMELINE_FANOUT_MAX_FRIENDS:
+            return 0
+
+        owners = friend_ids + [post.user_id]
+        inserted = await TimelineService._insert_entries(
+            [TimelineService._entry(owner_id, post) for owner_id in owners]
+        )
+        # Only now may the read path stop looking for it in social_posts
+        await SocialPost.get_motor_collection().update_one(
+            {"_id": post.id}, {"$set": {"timeline_fanout": True}}
+        )
+        post.timeline_fanout = True
+        logger.info(f"Fanned out post {post.id} to {inserted} feeds")
+        return inserted
+
+    @staticmethod
+    async def remove_post(post_id: str) -> None:
+        """Remove a deleted post from every feed"""
+        await FeedEntry.get_motor_collection().delete_many({"post_id": post_id})
+
+    @staticmethod
+    async def remove_user(user_id: str) -> None:
+        """Remove a deleted user's feed and their posts in other feeds"""
+        await FeedEntry.get_motor_collection().delete_many(
+            {"$or": [{"owner_id": user_id}, {"author_id": user_id}]}
+        )
+
+    @staticmethod
+    async def backfill_friendship(user_a: str, user_b: str, limit: int = 50) -> int:
+        """Copy each new friend's recent fanned-out posts into the other's feed"""
+        documents = []
+        for author_id, owner_id in ((user_a, user_b), (user_b, user_a)):
+            posts = await SocialPost.find({
+                "timeline_fanout": True,
+                "user_id": author_id,
+                "is_public": True
+            }).sort([("created_at", -1)]).limit(limit).to_list()
+            documents.extend(TimelineService._entry(owner_id, post) for post in posts)
+        return await TimelineService._insert_entries(documents) if documents else 0
+
+    @staticmethod
+    def _before(cursor_key: Optional[FeedKey], id_field: str, to_id=str) -> Dict:
+        """Filter for keys strictly after the cursor in feed order"""
+        if cursor_key is None:
+            return {}
+        created_at, post_id = cursor_key
+        return {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, id_field: {"$lt": to_id(post_id)}}
+        ]}
+
+    @staticmethod
+    async def get_page(
+        user_id: str,
+        limit: int = 20,
+        skip: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[SocialPost], Optional[str]]:
+        """Get a feed page newest first and the cursor for the next one
+
+        ``cursor`` (from a previous page) takes the place of ``skip``; a malformed cursor
+        raises ValueError.
+        """
+        cursor_key = decode_cursor(cursor) if cursor else None
+        if cursor_key is not None:
+            skip = 0
+        friend_ids = await friend_graph.friend_ids(user_id)
+        author_ids = set(friend_ids) | {user_id}
+        window = skip + limit
+
+        entries_query = {"owner_id": user_id, **TimelineService._before(cursor_key, "post_id")}
+        on_demand_query = {
+            "timeline_fanout": {"$ne": True},
+            "user_id": {"$in": list(author_ids)},
+            "is_public": True,
+            **TimelineService._before(cursor_key, "_id", ObjectId)
+        }
+
+        entries, on_demand = await asyncio.gather(
+            FeedEntry.get_motor_collection().find(
+                entries_query, projection={"post_id": 1, "author_id": 1, "created_at": 1, "_id": 0}
+            ).sort([("created_at", -1), ("post_id", -1)]).limit(window).to_list(length=window),
+            SocialPost.find(on_demand_query).sort([("created_at", -1), ("_id", -1)]).limit(window).to_list()
+        )
+
+        # Entries left behind by an unfriending are not shown
+        entry_keys = [
+            (entry["created_at"], entry["post_id"])
+            for entry in entries if entry["author_id"] in author_ids
+        ]
+        posts_by_id = {str(post.id): post for post in on_demand}
+        post_keys = [(post.created_at, post_id) for post_id, post in posts_by_id.items()]
+        page_keys = merge_feed_keys(entry_keys, post_keys, skip, limit)
+
+        missing = [ObjectId(post_id) for _, post_id in page_keys if post_id not in posts_by_id]
+        if missing:
+            for post in await SocialPost.find({"_id": {"$in": missing}}).to_list():
+                posts_by_id[str(post.id)] = post
+
+        # Posts deleted or made private since they were fanned out are skipped
+        posts = [
+            posts_by_id[post_id] for _, post_id in page_keys
+            if post_id in posts_by_id and posts_by_id[post_id].is_public
+        ]
+        next_cursor = encode_cursor(*page_keys[-1]) if len(page_keys) == limit else None
+        return posts, next_cursor
@@ -9,6 +9,7 @@ from ..models.user import User
 from ..models.value import Value
 from ..models.activity import Activity
 from ..schemas.value import ValueCreate, ValueUpdate, ValueResponse
+from .data_version_service import DataVersionService
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,7 @@ class ValueService:
         )
         
         await new_value.insert()
+        await DataVersionService.bump(user)
         return new_value
 
     @staticmethod
@@ -120,6 +122,7 @@ class ValueService:
                 
                 value.updated_at = datetime.utcnow()
                 await value.save()
+                await DataVersionService.bump(user)
                 logger.info(f"Value updated successfully: {value_id}")
             
             return value
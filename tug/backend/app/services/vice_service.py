@@ -10,6 +10,7 @@ from ..models.vice import Vice
 from ..models.indulgence import Indulgence
 from ..schemas.vice import ViceCreate, ViceUpdate
 from ..schemas.indulgence import IndulgenceCreate
+from .data_version_service import DataVersionService
 
 logger = logging.getLogger(__name__)
 
@@ -152,6 +153,7 @@ class ViceService:
         )
         
         await new_indulgence.insert()
+        await DataVersionService.bump(user)
         
         # Update the vice's streak information
         await vice.update_streak_on_indulgence()
@@ -186,6 +188,7 @@ class ViceService:
         )
         
         await new_indulgence.insert()
+        await DataVersionService.bump(user)
         
         # Update all associated vices' streak information
         await new_indulgence.update_vice_streaks()
@@ -249,6 +252,7 @@ class ViceService:
         
         indulgence.updated_at = datetime.utcnow()
         await indulgence.save()
+        await DataVersionService.bump(user)
         
         return indulgence
 
@@ -257,6 +261,7 @@ class ViceService:
         """Delete an indulgence"""
         indulgence = await ViceService.get_indulgence_by_id(user, indulgence_id)
         await indulgence.delete()
+        await DataVersionService.bump(user)
 
     @staticmethod
     async def get_indulgences(user: User, vice_id: str, limit: Optional[int] = None) -> List[Indulgence]:
@@ -357,6 +362,7 @@ class ViceService:
             # Create the social post with user's own words
             # Import here to avoid circular imports
             from ..models.social_post import SocialPost, PostType
+            from .timeline_service import TimelineService
             
             social_post = SocialPost(
                 user_id=str(user.id),
@@ -367,6 +373,7 @@ class ViceService:
             )
             
             await social_post.save()
+            await TimelineService.fan_out(social_post)
             logger.info(f"Created social post for indulgence {indulgence.id} by user {user.id}")
             
         except Exception as e:
@@ -1,10 +1,12 @@
 # app/services/websocket_manager.py
 import json
+import time
+import heapq
 import asyncio
 import logging
-from typing import Dict, List, Set, Optional, Any
-from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Set, Tuple, Optional, Any
+from datetime import datetime
+from dataclasses import dataclass, asdict, field
 from enum import Enum
 import weakref
 
@@ -13,11 +15,13 @@ from fastapi.websockets import WebSocketState
 from pydantic import ValidationError
 
 from ..models.user import User
-from ..models.group_message import GroupMessage, MessageReaction, TypingIndicator
+from ..models.group_message import GroupMessage, MessageReaction
 from ..models.premium_group import GroupMembership, MembershipStatus
-from ..schemas.group_message import WebSocketMessage, WebSocketMessageType, WebSocketError
+from ..schemas.group_message import WebSocketMessage, WebSocketMessageType, WebSocketError, TypingIndicatorRequest
 from ..core.auth import verify_firebase_token
 from ..core.config import settings
+from ..core.pubsub import PubSubBackend, build_pubsub, REPLICA_ID
+from .presence_registry import PresenceRegistry, OnlinePresence, TypingState
 
 logger = logging.getLogger(__name__)
 
@@ -29,9 +33,13 @@ class ConnectionStatus(str, Enum):
     DISCONNECTING = "disconnecting"
     DISCONNECTED = "disconnected"
 
-@dataclass
+@dataclass(slots=True)
 class WebSocketConnection:
-    """Represents a WebSocket connection with metadata"""
+    """Represents a WebSocket connection with metadata.
+    
+    Slotted, with constant-size rate limiting state, since a replica holds tens of
+    thousands of these for mostly idle clients.
+    """
     websocket: WebSocket
     user_id: str
     username: str
@@ -41,7 +49,14 @@ class WebSocketConnection:
     status: ConnectionStatus
     subscribed_groups: Set[str]
     active_threads: Set[str]
-    rate_limit_bucket: List[datetime]
+    # Monotonic clock of the last heartbeat, used for expiry
+    heartbeat_at: float = field(default_factory=time.monotonic, repr=False)
+    # Token bucket: filled lazily to the per-minute limit on first use
+    rate_limit_tokens: Optional[float] = field(default=None, repr=False)
+    rate_limit_refilled_at: float = field(default=0.0, repr=False)
+    # (serialized payload, broadcast) pairs waiting for this connection's writer task
+    send_queue: Optional[asyncio.Queue] = field(default=None, repr=False)
+    writer_task: Optional[asyncio.Task] = field(default=None, repr=False)
     
     def is_alive(self) -> bool:
         """Check if connection is alive and authenticated"""
@@ -50,30 +65,48 @@ class WebSocketConnection:
     
     def is_heartbeat_expired(self, timeout_seconds: int = 60) -> bool:
         """Check if heartbeat has expired"""
-        return datetime.utcnow() - self.last_heartbeat > timedelta(seconds=timeout_seconds)
+        return time.monotonic() - self.heartbeat_at > timeout_seconds
     
     def can_send_message(self, rate_limit_per_minute: int = 30) -> bool:
-        """Check rate limiting for message sending"""
-        now = datetime.utcnow()
-        # Remove old entries
-        self.rate_limit_bucket = [
-            timestamp for timestamp in self.rate_limit_bucket 
-            if now - timestamp < timedelta(minutes=1)
-        ]
-        return len(self.rate_limit_bucket) < rate_limit_per_minute
+        """Check rate limiting for message sending (bursts up to the per-minute limit)"""
+        now = time.monotonic()
+        if self.rate_limit_tokens is None:
+            self.rate_limit_tokens = float(rate_limit_per_minute)
+        else:
+            refill = (now - self.rate_limit_refilled_at) * rate_limit_per_minute / 60.0
+            self.rate_limit_tokens = min(float(rate_limit_per_minute), self.rate_limit_tokens + refill)
+        self.rate_limit_refilled_at = now
+        return self.rate_limit_tokens >= 1.0
     
     def add_rate_limit_entry(self):
-        """Add current timestamp to rate limit bucket"""
-        self.rate_limit_bucket.append(datetime.utcnow())
+        """Spend a token for a sent message"""
+        if self.rate_limit_tokens is not None:
+            self.rate_limit_tokens -= 1.0
     
     def update_heartbeat(self):
         """Update heartbeat timestamp"""
         self.last_heartbeat = datetime.utcnow()
+        self.heartbeat_at = time.monotonic()
+
+class FanOut:
+    """Tracks one broadcast until every recipient's writer has handled it"""
+    
+    __slots__ = ("group_id", "started_at", "pending")
+    
+    def __init__(self, group_id: str):
+        self.group_id = group_id
+        self.started_at = time.perf_counter()
+        self.pending = 0
+    
+    def settle(self) -> bool:
+        """Mark one recipient done (sent or dropped); True once the last one is"""
+        self.pending -= 1
+        return self.pending == 0
 
 class WebSocketManager:
     """Manages WebSocket connections for real-time messaging"""
     
-    def __init__(self):
+    def __init__(self, pubsub: Optional[PubSubBackend] = None):
         # Active connections by connection_id
         self.connections: Dict[str, WebSocketConnection] = {}
         
@@ -86,21 +119,41 @@ class WebSocketManager:
         # Thread connections mapping (thread_id -> set of connection_ids)
         self.thread_connections: Dict[str, Set[str]] = {}
         
-        # Message broadcast queues
-        self.broadcast_queues: Dict[str, asyncio.Queue] = {}
+        # Per-connection send queues and what to do when a consumer falls behind
+        self.send_queue_size = settings.WEBSOCKET_SEND_QUEUE_SIZE
+        self.slow_consumer_policy = settings.WEBSOCKET_SLOW_CONSUMER_POLICY.lower()
+        self.send_timeout_seconds = settings.WEBSOCKET_SEND_TIMEOUT_SECONDS
         
-        # Connection cleanup task
+        # Connection cleanup task. Heartbeat deadlines sit in a min-heap that is only
+        # corrected lazily when an entry comes due, so heartbeats never touch it and a
+        # sweep only looks at the connections that might have expired.
         self.cleanup_task: Optional[asyncio.Task] = None
+        self.heartbeat_sweep_interval_seconds = 10
+        self._heartbeat_deadlines: List[Tuple[float, str]] = []
+        
+        # Stats maintained as connections change, so reading them is O(1)
+        self._status_counts: Dict[ConnectionStatus, int] = {status: 0 for status in ConnectionStatus}
+        self._queued_messages = 0
         
         # Rate limiting settings
         self.rate_limit_messages_per_minute = 30
         self.rate_limit_connections_per_user = 5
         self.heartbeat_timeout_seconds = 60
         
+        # Ephemeral typing state, broadcasts and presence, shared with other replicas over
+        # pub/sub. Each replica subscribes to the group and user channels it holds local
+        # connections for.
+        self.pubsub = pubsub or build_pubsub()
+        self.presence = PresenceRegistry(self.pubsub)
+        self.presence.on_change(self._broadcast_typing_change)
+        self.online = OnlinePresence(self.pubsub)
+        
     async def start_manager(self):
         """Start the WebSocket manager background tasks"""
         logger.info("Starting WebSocket manager")
         self.cleanup_task = asyncio.create_task(self._cleanup_expired_connections())
+        await self.presence.start()
+        await self.online.start()
     
     async def stop_manager(self):
         """Stop the WebSocket manager and cleanup"""
@@ -111,6 +164,10 @@ class WebSocketManager:
         # Disconnect all connections gracefully
         for conn in list(self.connections.values()):
             await self.disconnect_user(conn.connection_id, "Server shutdown")
+        
+        await self.presence.stop()
+        await self.online.stop()
+        await self.pubsub.close()
     
     async def connect_user(
         self, 
@@ -133,8 +190,7 @@ class WebSocketManager:
                 last_heartbeat=datetime.utcnow(),
                 status=ConnectionStatus.AUTHENTICATING,
                 subscribed_groups=set(),
-                active_threads=set(),
-                rate_limit_bucket=[]
+                active_threads=set()
             )
             
             # Authenticate user
@@ -162,12 +218,11 @@ class WebSocketManager:
                 temp_connection.status = ConnectionStatus.AUTHENTICATED
                 
                 # Store connection
-                self.connections[connection_id] = temp_connection
+                self._register_connection(temp_connection)
                 
                 # Update user connections mapping
-                if user_id not in self.user_connections:
-                    self.user_connections[user_id] = set()
-                self.user_connections[user_id].add(connection_id)
+                await self._add_user_connection(temp_connection)
+                self._start_writer(temp_connection)
                 
                 logger.info(f"User {username} ({user_id}) connected via WebSocket: {connection_id}")
                 
@@ -208,7 +263,7 @@ class WebSocketManager:
         
         try:
             # Update connection status
-            connection.status = ConnectionStatus.DISCONNECTING
+            self._set_status(connection, ConnectionStatus.DISCONNECTING)
             
             # Leave all groups
             for group_id in list(connection.subscribed_groups):
@@ -219,18 +274,21 @@ class WebSocketManager:
                 await self.leave_thread(connection_id, thread_id)
             
             # Remove from user connections
-            if connection.user_id in self.user_connections:
-                self.user_connections[connection.user_id].discard(connection_id)
-                if not self.user_connections[connection.user_id]:
-                    del self.user_connections[connection.user_id]
+            await self._remove_user_connection(connection)
+            
+            # Stop the writer; anything still queued is discarded
+            if connection.writer_task and connection.writer_task is not asyncio.current_task():
+                connection.writer_task.cancel()
+            if connection.send_queue is not None:
+                self._queued_messages -= connection.send_queue.qsize()
+                connection.send_queue = None
             
             # Close WebSocket if still open
             if connection.websocket.client_state == WebSocketState.CONNECTED:
                 await connection.websocket.close()
             
             # Remove connection
-            connection.status = ConnectionStatus.DISCONNECTED
-            del self.connections[connection_id]
+            self._unregister_connection(connection)
             
         except Exception as e:
             logger.error(f"Error during disconnection: {e}")
@@ -257,12 +315,7 @@ class WebSocketManager:
                 return False
             
             # Add to group connections
-            if group_id not in self.group_connections:
-                self.group_connections[group_id] = set()
-            self.group_connections[group_id].add(connection_id)
-            
-            # Update connection
-            connection.subscribed_groups.add(group_id)
+            await self._add_group_connection(connection, group_id)
             
             # Notify other group members
             await self._broadcast_to_group(group_id, {
@@ -289,13 +342,7 @@ class WebSocketManager:
             return
         
         # Remove from group connections
-        if group_id in self.group_connections:
-            self.group_connections[group_id].discard(connection_id)
-            if not self.group_connections[group_id]:
-                del self.group_connections[group_id]
-        
-        # Update connection
-        connection.subscribed_groups.discard(group_id)
+        await self._remove_group_connection(connection, group_id)
         
         # Notify other group members
         await self._broadcast_to_group(group_id, {
@@ -377,6 +424,15 @@ class WebSocketManager:
             "timestamp": datetime.utcnow().isoformat()
         })
     
+    async def broadcast_read_receipt(self, group_id: str, read_data: Dict[str, Any]):
+        """Broadcast a reader's new read watermarks to group"""
+        await self._broadcast_to_group(group_id, {
+            "type": WebSocketMessageType.MESSAGE_READ,
+            "group_id": group_id,
+            "data": read_data,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    
     async def broadcast_typing_start(self, group_id: str, user_data: Dict[str, Any], thread_id: Optional[str] = None):
         """Broadcast typing start indicator"""
         await self._broadcast_to_group(group_id, {
@@ -399,11 +455,54 @@ class WebSocketManager:
             }
         })
     
+    async def set_typing(
+        self,
+        group_id: str,
+        user_id: str,
+        username: str,
+        display_name: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        is_typing: bool = True
+    ):
+        """Record a typing change; broadcasts are debounced by the presence registry"""
+        await self.presence.set_typing(group_id, user_id, username, display_name, thread_id, is_typing)
+    
+    def get_typing_users(self, group_id: str, exclude_user_id: Optional[str] = None) -> List[TypingState]:
+        """Users typing in a group, from memory"""
+        return self.presence.get_typing(group_id, exclude_user_id)
+    
+    def is_subscribed(self, user_id: str, group_id: str) -> bool:
+        """Whether one of the user's connections joined the group (membership was verified then)"""
+        group_connection_ids = self.group_connections.get(group_id)
+        if not group_connection_ids:
+            return False
+        return any(connection_id in group_connection_ids for connection_id in self.user_connections.get(user_id, ()))
+    
+    async def _broadcast_typing_change(self, is_typing: bool, group_id: str, state: TypingState):
+        user_data = {"user_id": state.user_id, "username": state.username}
+        if is_typing:
+            await self.broadcast_typing_start(group_id, user_data, state.thread_id)
+        else:
+            await self.broadcast_typing_stop(group_id, user_data, state.thread_id)
+    
+    def is_user_online(self, user_id: str) -> bool:
+        """Whether the user has a websocket connection on any replica"""
+        return user_id in self.user_connections or self.online.is_online(user_id)
+    
     async def send_to_user(self, user_id: str, message_data: Dict[str, Any]):
-        """Send message to all connections of a specific user"""
-        user_connection_ids = self.user_connections.get(user_id, set())
+        """Send message to all connections of a specific user, on every replica"""
+        payload = json.dumps(message_data, default=str)
+        self._send_to_user_locally(user_id, payload)
+        await self._publish(self._user_channel(user_id), {"user_id": user_id, "payload": payload})
+    
+    def _send_to_user_locally(self, user_id: str, payload: str):
+        user_connection_ids = self.user_connections.get(user_id)
+        if not user_connection_ids:
+            return
         for connection_id in list(user_connection_ids):
-            await self._send_to_connection(connection_id, message_data)
+            connection = self.connections.get(connection_id)
+            if connection:
+                self._enqueue(connection, payload)
     
     async def handle_message(self, connection_id: str, raw_message: str) -> bool:
         """Handle incoming WebSocket message from client"""
@@ -460,9 +559,13 @@ class WebSocketManager:
             from ..models.user import User
             from ..schemas.group_message import (
                 SendMessageRequest, EditMessageRequest, ReactToMessageRequest,
-                MarkMessagesReadRequest, TypingIndicatorRequest
+                MarkMessagesReadRequest
             )
             
+            # Typing events are frequent and only touch memory, so skip the user lookup
+            if message.type in (WebSocketMessageType.START_TYPING, WebSocketMessageType.STOP_TYPING):
+                return await self._handle_typing_message(connection, message)
+            
             # Get current user
             user = await User.get(connection.user_id)
             if not user:
@@ -585,30 +688,6 @@ class WebSocketManager:
                     )
                     return False
             
-            elif message.type == WebSocketMessageType.START_TYPING:
-                # Start typing indicator
-                try:
-                    typing_data = TypingIndicatorRequest(is_typing=True, **message.data)
-                    await group_messaging_service.handle_typing_indicator(user, message.group_id, typing_data)
-                    return True
-                except Exception as e:
-                    await self._send_error_to_connection(
-                        connection.connection_id, "typing_failed", str(e)
-                    )
-                    return False
-            
-            elif message.type == WebSocketMessageType.STOP_TYPING:
-                # Stop typing indicator
-                try:
-                    typing_data = TypingIndicatorRequest(is_typing=False, **message.data)
-                    await group_messaging_service.handle_typing_indicator(user, message.group_id, typing_data)
-                    return True
-                except Exception as e:
-                    await self._send_error_to_connection(
-                        connection.connection_id, "typing_failed", str(e)
-                    )
-                    return False
-            
             elif message.type == WebSocketMessageType.JOIN_THREAD:
                 # Join thread
                 thread_id = message.data.get("thread_id")
@@ -650,44 +729,219 @@ class WebSocketManager:
             )
             return False
     
+    async def _handle_typing_message(self, connection: WebSocketConnection, message: WebSocketMessage) -> bool:
+        """Start or stop a typing indicator for a group this connection joined"""
+        try:
+            if message.group_id not in connection.subscribed_groups:
+                await self._send_error_to_connection(
+                    connection.connection_id, "access_denied", "Join the group before sending typing events"
+                )
+                return False
+            
+            typing_data = TypingIndicatorRequest(
+                is_typing=message.type == WebSocketMessageType.START_TYPING,
+                **message.data
+            )
+            await self.set_typing(
+                message.group_id,
+                connection.user_id,
+                connection.username,
+                thread_id=typing_data.thread_id,
+                is_typing=typing_data.is_typing
+            )
+            return True
+        except Exception as e:
+            await self._send_error_to_connection(
+                connection.connection_id, "typing_failed", str(e)
+            )
+            return False
+    
     async def _broadcast_to_group(self, group_id: str, message_data: Dict[str, Any], exclude_connection: Optional[str] = None):
-        """Broadcast message to all connections in a group"""
-        group_connection_ids = self.group_connections.get(group_id, set())
+        """Broadcast message to all connections in a group.
+        
+        The payload is serialized once and handed to each connection's send queue without
+        awaiting any socket, so a slow member never delays delivery to the others.
+        """
+        payload = json.dumps(message_data, default=str)
+        self._broadcast_locally(group_id, payload, exclude_connection)
+        # Members connected to other replicas get it from their replica
+        await self._publish(self._group_channel(group_id), {
+            "group_id": group_id,
+            "payload": payload,
+            "exclude": exclude_connection
+        })
+    
+    def _broadcast_locally(self, group_id: str, payload: str, exclude_connection: Optional[str] = None):
+        group_connection_ids = self.group_connections.get(group_id)
+        if not group_connection_ids:
+            return
         
+        fanout = FanOut(group_id)
         for connection_id in list(group_connection_ids):
             if exclude_connection and connection_id == exclude_connection:
                 continue
-            await self._send_to_connection(connection_id, message_data)
+            connection = self.connections.get(connection_id)
+            if connection and self._enqueue(connection, payload, fanout):
+                fanout.pending += 1
+    
+    @staticmethod
+    def _group_channel(group_id: str) -> str:
+        return f"group:{group_id}"
+    
+    @staticmethod
+    def _user_channel(user_id: str) -> str:
+        return f"user:{user_id}"
+    
+    async def _publish(self, channel: str, event: Dict[str, Any]):
+        try:
+            await self.pubsub.publish(channel, event)
+        except Exception as e:
+            logger.error(f"Error publishing to {channel}: {e}")
+    
+    async def _add_group_connection(self, connection: WebSocketConnection, group_id: str):
+        if group_id not in self.group_connections:
+            self.group_connections[group_id] = set()
+            await self.pubsub.subscribe(self._group_channel(group_id), self._handle_remote_group_event)
+        self.group_connections[group_id].add(connection.connection_id)
+        connection.subscribed_groups.add(group_id)
+    
+    async def _remove_group_connection(self, connection: WebSocketConnection, group_id: str):
+        group_connection_ids = self.group_connections.get(group_id)
+        if group_connection_ids is not None:
+            group_connection_ids.discard(connection.connection_id)
+            if not group_connection_ids:
+                del self.group_connections[group_id]
+                await self.pubsub.unsubscribe(self._group_channel(group_id), self._handle_remote_group_event)
+        connection.subscribed_groups.discard(group_id)
+    
+    async def _add_user_connection(self, connection: WebSocketConnection):
+        user_id = connection.user_id
+        if user_id not in self.user_connections:
+            self.user_connections[user_id] = set()
+            await self.pubsub.subscribe(self._user_channel(user_id), self._handle_remote_user_event)
+            await self.online.user_connected(user_id)
+        self.user_connections[user_id].add(connection.connection_id)
+    
+    async def _remove_user_connection(self, connection: WebSocketConnection):
+        user_id = connection.user_id
+        user_connection_ids = self.user_connections.get(user_id)
+        if user_connection_ids is None:
+            return
+        user_connection_ids.discard(connection.connection_id)
+        if not user_connection_ids:
+            del self.user_connections[user_id]
+            await self.pubsub.unsubscribe(self._user_channel(user_id), self._handle_remote_user_event)
+            await self.online.user_disconnected(user_id)
+            await self.presence.clear_user(user_id)
+    
+    async def _handle_remote_group_event(self, event: Dict[str, Any]):
+        """Deliver a broadcast published by another replica to this replica's connections"""
+        if event.get("origin") == REPLICA_ID:
+            return
+        self._broadcast_locally(event["group_id"], event["payload"], event.get("exclude"))
+    
+    async def _handle_remote_user_event(self, event: Dict[str, Any]):
+        if event.get("origin") == REPLICA_ID:
+            return
+        self._send_to_user_locally(event["user_id"], event["payload"])
     
     async def _send_to_connection(self, connection_id: str, message_data: Dict[str, Any]) -> bool:
-        """Send message to a specific connection"""
+        """Queue a message for a specific connection"""
         connection = self.connections.get(connection_id)
-        if not connection or not connection.is_alive():
+        if not connection:
             return False
-        
-        try:
-            message_json = json.dumps(message_data, default=str)
-            await connection.websocket.send_text(message_json)
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send message to connection {connection_id}: {e}")
-            # Schedule connection cleanup
-            asyncio.create_task(self.disconnect_user(connection_id, "Send failed"))
+        return self._enqueue(connection, json.dumps(message_data, default=str))
+    
+    def _start_writer(self, connection: WebSocketConnection):
+        connection.send_queue = asyncio.Queue(maxsize=self.send_queue_size)
+        connection.writer_task = asyncio.create_task(self._write_loop(connection))
+    
+    def _enqueue(self, connection: WebSocketConnection, payload: str, fanout: Optional[FanOut] = None) -> bool:
+        """Add a serialized message to a connection's queue, applying the slow-consumer policy"""
+        queue = connection.send_queue
+        if queue is None or not connection.is_alive():
             return False
+        
+        if queue.full():
+            if self.slow_consumer_policy == "disconnect":
+                self._disconnect_slow_consumer(connection, "Send queue full")
+                return False
+            
+            # Make room by dropping the oldest message; the client resyncs over REST
+            _, dropped_fanout = queue.get_nowait()
+            self._queued_messages -= 1
+            self._record_metric("websocket_messages_dropped_total", {"policy": self.slow_consumer_policy})
+            if dropped_fanout is not None and dropped_fanout.settle():
+                self._record_fanout(dropped_fanout)
+        
+        queue.put_nowait((payload, fanout))
+        self._queued_messages += 1
+        return True
+    
+    async def _write_loop(self, connection: WebSocketConnection):
+        """Drain one connection's send queue; slow sends only ever delay this connection"""
+        queue = connection.send_queue
+        while True:
+            try:
+                payload, fanout = await queue.get()
+            except asyncio.CancelledError:
+                break
+            self._queued_messages -= 1
+            
+            try:
+                await asyncio.wait_for(connection.websocket.send_text(payload), self.send_timeout_seconds)
+            except asyncio.CancelledError:
+                break
+            except asyncio.TimeoutError:
+                self._disconnect_slow_consumer(connection, "Send timed out")
+                break
+            except Exception as e:
+                logger.error(f"Failed to send message to connection {connection.connection_id}: {e}")
+                # Schedule connection cleanup
+                self._set_status(connection, ConnectionStatus.DISCONNECTING)
+                asyncio.create_task(self.disconnect_user(connection.connection_id, "Send failed"))
+                break
+            finally:
+                if fanout is not None and fanout.settle():
+                    self._record_fanout(fanout)
+    
+    def _disconnect_slow_consumer(self, connection: WebSocketConnection, reason: str):
+        if connection.status == ConnectionStatus.DISCONNECTING:
+            return
+        logger.warning(f"Disconnecting slow WebSocket consumer {connection.connection_id}: {reason}")
+        # Stop queueing for it right away; the actual cleanup runs in its own task
+        self._set_status(connection, ConnectionStatus.DISCONNECTING)
+        self._record_metric("websocket_slow_consumer_disconnects_total", {"reason": reason})
+        asyncio.create_task(self.disconnect_user(connection.connection_id, reason))
+    
+    def _record_fanout(self, fanout: FanOut):
+        self._observe_metric(
+            "websocket_fanout_duration_seconds",
+            time.perf_counter() - fanout.started_at,
+            {"group_id": fanout.group_id}
+        )
+    
+    @staticmethod
+    def _record_metric(name: str, labels: Dict[str, str]):
+        # Imported lazily: the monitoring package pulls in the whole app
+        from ..monitoring.metrics import metrics_collector
+        metrics_collector.increment_counter(name, labels=labels)
+    
+    @staticmethod
+    def _observe_metric(name: str, value: float, labels: Dict[str, str]):
+        from ..monitoring.metrics import metrics_collector
+        metrics_collector.observe_histogram(name, value, labels)
     
     async def _send_error_to_connection(self, connection_id: str, error_code: str, error_message: str):
         """Send error message to connection"""
-        await self._send_to_connection(connection_id, {
-            "type": WebSocketMessageType.ERROR,
-            "data": {
-                "error_code": error_code,
-                "error_message": error_message,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        })
+        connection = self.connections.get(connection_id)
+        if not connection:
+            return
+        # Written directly rather than queued: callers may close the socket right after
+        await self._send_error(connection.websocket, error_code, error_message)
     
     async def _send_error(self, websocket: WebSocket, error_code: str, error_message: str):
-        """Send error to websocket before connection is established"""
+        """Send error straight to a websocket, bypassing the send queue"""
         try:
             error_data = {
                 "type": WebSocketMessageType.ERROR,
@@ -697,7 +951,7 @@ class WebSocketManager:
                     "timestamp": datetime.utcnow().isoformat()
                 }
             }
-            await websocket.send_text(json.dumps(error_data, default=str))
+            await asyncio.wait_for(websocket.send_text(json.dumps(error_data, default=str)), self.send_timeout_seconds)
         except:
             pass  # Connection might already be closed
     
@@ -705,12 +959,9 @@ class WebSocketManager:
         """Background task to cleanup expired connections"""
         while True:
             try:
-                await asyncio.sleep(30)  # Check every 30 seconds
+                await asyncio.sleep(self.heartbeat_sweep_interval_seconds)
                 
-                expired_connections = []
-                for connection_id, connection in self.connections.items():
-                    if connection.is_heartbeat_expired(self.heartbeat_timeout_seconds):
-                        expired_connections.append(connection_id)
+                expired_connections = self._pop_expired_heartbeats(time.monotonic())
                 
                 # Disconnect expired connections
                 for connection_id in expired_connections:
@@ -724,19 +975,58 @@ class WebSocketManager:
             except Exception as e:
                 logger.error(f"Error in connection cleanup: {e}")
     
+    def _pop_expired_heartbeats(self, now: float) -> List[str]:
+        """Connections whose heartbeat expired, reading only the heap entries that came due.
+        
+        An entry that comes due for a connection that heartbeated since is pushed back with
+        its real deadline, so each connection costs at most one heap operation per timeout.
+        """
+        expired = []
+        deadlines = self._heartbeat_deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, connection_id = heapq.heappop(deadlines)
+            connection = self.connections.get(connection_id)
+            if connection is None:
+                continue  # Already disconnected
+            deadline = connection.heartbeat_at + self.heartbeat_timeout_seconds
+            if deadline <= now:
+                expired.append(connection_id)
+            else:
+                heapq.heappush(deadlines, (deadline, connection_id))
+        return expired
+    
+    def _register_connection(self, connection: WebSocketConnection):
+        self.connections[connection.connection_id] = connection
+        self._status_counts[connection.status] += 1
+        heapq.heappush(
+            self._heartbeat_deadlines,
+            (connection.heartbeat_at + self.heartbeat_timeout_seconds, connection.connection_id)
+        )
+    
+    def _unregister_connection(self, connection: WebSocketConnection):
+        self._set_status(connection, ConnectionStatus.DISCONNECTED)
+        if self.connections.get(connection.connection_id) is connection:
+            del self.connections[connection.connection_id]
+            self._status_counts[connection.status] -= 1
+    
+    def _set_status(self, connection: WebSocketConnection, status: ConnectionStatus):
+        if self.connections.get(connection.connection_id) is connection:
+            self._status_counts[connection.status] -= 1
+            self._status_counts[status] += 1
+        connection.status = status
+    
     def get_connection_stats(self) -> Dict[str, Any]:
         """Get WebSocket connection statistics"""
         return {
             "total_connections": len(self.connections),
-            "authenticated_connections": sum(1 for conn in self.connections.values() 
-                                           if conn.status == ConnectionStatus.AUTHENTICATED),
+            "authenticated_connections": self._status_counts[ConnectionStatus.AUTHENTICATED],
             "unique_users": len(self.user_connections),
             "active_groups": len(self.group_connections),
             "active_threads": len(self.thread_connections),
-            "connections_by_status": {
-                status.value: sum(1 for conn in self.connections.values() if conn.status == status)
-                for status in ConnectionStatus
-            }
+            "cluster_online_users": len(self.online.online_users()),
+            "peer_replicas": self.online.peer_count(),
+            "queued_messages": self._queued_messages,
+            "connections_by_status": {status.value: count for status, count in self._status_counts.items()}
         }
 
 # Global WebSocket manager instance
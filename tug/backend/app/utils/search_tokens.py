@@ -0,0 +1,103 @@
+# app/utils/search_tokens.py
+"""
+Search tokens for user and group discovery.
+
+Searchable documents store ``search_tokens``: the prefixes of each normalized word
+(``p:``) and, for short fields such as names, its trigrams (``t:``). A query word
+matches a document holding its prefix token or all of its trigrams, so both
+search-as-you-type prefixes and substrings are answered through a multikey index
+instead of an unanchored ``$regex`` scan. Candidates are re-checked and ranked with
+``relevance``.
+"""
+
+import html
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+FIELD = "search_tokens"
+
+# Words are indexed by prefixes up to this length; longer query words are re-checked
+MAX_PREFIX_LENGTH = 10
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase words without accents or punctuation"""
+    if not text:
+        return []
+    # Queries arrive HTML-escaped by InputValidator.sanitize_string
+    text = unicodedata.normalize("NFKD", html.unescape(text))
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    return [word for word in _SEPARATORS.split(text) if word]
+
+
+def _prefix(word: str) -> str:
+    return f"p:{word[:MAX_PREFIX_LENGTH]}"
+
+
+def _trigrams(word: str) -> List[str]:
+    return [f"t:{word[i:i + 3]}" for i in range(len(word) - 2)]
+
+
+def index_tokens(*texts: Optional[str], prefix_only: Iterable[Optional[str]] = ()) -> List[str]:
+    """Tokens to store for the given fields; ``prefix_only`` fields get no trigrams
+
+    Long free text (descriptions) goes in ``prefix_only`` to keep documents small; its
+    words still match by prefix.
+    """
+    tokens = set()
+    for text, with_trigrams in [(text, True) for text in texts] + [(text, False) for text in prefix_only]:
+        for word in normalize(text):
+            tokens.update(f"p:{word[:length]}" for length in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1))
+            if with_trigrams:
+                tokens.update(_trigrams(word))
+    return sorted(tokens)
+
+
+def query_filter(query: str) -> Optional[Dict[str, Any]]:
+    """Filter matching documents that contain every query word; None for an empty query"""
+    words = normalize(query)
+    if not words:
+        return None
+    clauses = []
+    for word in dict.fromkeys(words):
+        alternatives: List[Dict[str, Any]] = [{FIELD: _prefix(word)}]
+        if len(word) >= 3:
+            alternatives.append({FIELD: {"$all": _trigrams(word)}})
+        clauses.append(alternatives[0] if len(alternatives) == 1 else {"$or": alternatives})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def relevance(query: str, fields: Sequence[Tuple[Optional[str], float]]) -> float:
+    """Score a document from 0 to 1 for a query; 0 means it does not actually match
+
+    ``fields`` pairs each field's text with its weight (1.0 for the most important).
+    A field equal to the query scores highest, then one starting with it, then one with
+    a word starting with it, then one merely containing it. Documents that only match
+    word by word across fields score lower still. Tokens can over-match (trigrams out
+    of order, prefixes of long words), so every query word must be found in the text.
+    """
+    words = normalize(query)
+    if not words:
+        return 0.0
+    phrase = " ".join(words)
+    texts = [(" ".join(normalize(text)), weight) for text, weight in fields]
+    if not all(any(word in text for text, _ in texts) for word in words):
+        return 0.0
+
+    best = 0.0
+    for text, weight in texts:
+        if text == phrase:
+            score = 1.0
+        elif text.startswith(phrase):
+            score = 0.8
+        elif f" {phrase}" in f" {text}":
+            score = 0.6
+        elif phrase in text:
+            score = 0.4
+        else:
+            score = 0.2 * sum(word in text for word in words) / len(words)
+        best = max(best, score * weight)
+    return round(best, 3)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Migration script to replace per-message read receipts with read watermarks.
+
+Each (user, group, thread) gets one message_read_watermarks document pointing at the
+newest message the user had a receipt for; the embedded read_receipts arrays are then
+emptied. Re-running it is safe: watermarks only ever move forward.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("MONGODB_DB_NAME", "tug")
+BATCH_SIZE = 1000
+
+
+def watermark_update(user_id, group_id, thread_id, message_id, created_at, read_at):
+    """Upsert that moves a watermark forward and never back"""
+    return UpdateOne(
+        {"user_id": user_id, "group_id": group_id, "thread_id": thread_id},
+        [{"$set": {
+            "last_read_message_id": {"$cond": [
+                {"$gt": [created_at, {"$ifNull": ["$last_read_at", None]}]},
+                str(message_id),
+                "$last_read_message_id"
+            ]},
+            "last_read_at": {"$max": ["$last_read_at", created_at]},
+            "read_at": {"$max": ["$read_at", read_at]}
+        }}],
+        upsert=True
+    )
+
+
+async def migrate_read_receipts():
+    """Fold embedded read receipts into per-timeline watermarks"""
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DATABASE_NAME]
+    messages = db.group_messages
+    watermarks = db.message_read_watermarks
+
+    logger.info("Starting read receipt migration...")
+
+    await watermarks.create_indexes([
+        IndexModel([("user_id", ASCENDING), ("group_id", ASCENDING), ("thread_id", ASCENDING)], unique=True),
+        IndexModel([("group_id", ASCENDING), ("thread_id", ASCENDING), ("last_read_at", DESCENDING)]),
+    ])
+
+    # Newest message each user has read, per group and thread
+    cursor = messages.aggregate([
+        {"$match": {"read_receipts.0": {"$exists": True}}},
+        {"$unwind": "$read_receipts"},
+        {"$sort": {"created_at": DESCENDING}},
+        {"$group": {
+            "_id": {
+                "user_id": "$read_receipts.user_id",
+                "group_id": "$group_id",
+                "thread_id": {"$ifNull": ["$thread_id", None]}
+            },
+            "message_id": {"$first": "$_id"},
+            "created_at": {"$first": "$created_at"},
+            "read_at": {"$max": "$read_receipts.read_at"}
+        }}
+    ], allowDiskUse=True)
+
+    updates = []
+    migrated = 0
+
+    async for doc in cursor:
+        key = doc["_id"]
+        if not key.get("user_id"):
+            continue
+        updates.append(watermark_update(
+            key["user_id"], key["group_id"], key["thread_id"],
+            doc["message_id"], doc["created_at"], doc.get("read_at") or doc["created_at"]
+        ))
+        if len(updates) >= BATCH_SIZE:
+            await watermarks.bulk_write(updates, ordered=False)
+            migrated += len(updates)
+            updates = []
+
+    if updates:
+        await watermarks.bulk_write(updates, ordered=False)
+        migrated += len(updates)
+
+    logger.info(f"Wrote {migrated} read watermarks")
+
+    # The receipts are now represented by the watermarks
+    result = await messages.update_many(
+        {"read_receipts.0": {"$exists": True}},
+        {"$set": {"read_receipts": []}}
+    )
+    logger.info(f"Cleared read receipts on {result.modified_count} messages")
+
+    # Verify migration
+    remaining = await messages.count_documents({"read_receipts.0": {"$exists": True}})
+    total_watermarks = await watermarks.count_documents({})
+
+    logger.info("Migration verification:")
+    logger.info(f"  Messages still holding receipts: {remaining}")
+    logger.info(f"  Read watermarks: {total_watermarks}")
+
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate_read_receipts())
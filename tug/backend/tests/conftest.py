@@ -6,10 +6,14 @@ from httpx import AsyncClient
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from faker import Faker
+from fastapi.websockets import WebSocketState
 from datetime import datetime, timedelta
 import logging
 import os
 
+# Run compute-pool work on threads so tests can patch chart/PDF rendering in-process
+os.environ.setdefault("COMPUTE_POOL_SIZE", "0")
+
 # Import app and models
 from app.main import app
 from app.core.config import settings
@@ -19,10 +23,14 @@ from app.models.activity import Activity
 from app.models.vice import Vice
 from app.models.indulgence import Indulgence
 from app.models.friendship import Friendship
+from app.models.friend_graph import UserFriendGraph
 from app.models.social_post import SocialPost
+from app.models.feed_entry import FeedEntry
 from app.models.post_comment import PostComment
 from app.models.notification import Notification, NotificationBatch
 from app.models.mood import MoodEntry
+from app.models.analytics import DailyActivityRollup, AnalyticsRollupState
+from app.services.websocket_manager import ConnectionStatus, WebSocketConnection
 
 # Configure logging for tests
 logging.basicConfig(level=logging.INFO)
@@ -67,11 +75,15 @@ async def test_db_client() -> AsyncGenerator[AsyncIOMotorClient, None]:
             Vice,
             Indulgence,
             Friendship,
+            UserFriendGraph,
             SocialPost,
+            FeedEntry,
             PostComment,
             Notification,
             NotificationBatch,
             MoodEntry,
+            DailyActivityRollup,
+            AnalyticsRollupState,
         ]
     )
     
@@ -88,8 +100,9 @@ async def cleanup_db(test_db_client):
     # Clean all collections before each test
     collections = [
         User, Value, Activity, Vice, Indulgence,
-        Friendship, SocialPost, PostComment, 
-        Notification, NotificationBatch, MoodEntry
+        Friendship, UserFriendGraph, SocialPost, FeedEntry, PostComment, 
+        Notification, NotificationBatch, MoodEntry,
+        DailyActivityRollup, AnalyticsRollupState
     ]
     
     for collection in collections:
@@ -378,6 +391,82 @@ def valid_value_data():
     }
 
 
+# Stand-ins for unit tests without a database or client
+class FakeQuery:
+    """Chainable stand-in for Beanie find and aggregation queries"""
+
+    def __init__(self, results):
+        self.results = results
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def skip(self, *args):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    async def to_list(self):
+        return self.results
+
+    async def count(self):
+        return len(self.results)
+
+
+class FakeWebSocket:
+    """Records sent frames; a blocked socket never completes a send"""
+
+    def __init__(self, blocked: bool = False):
+        self.client_state = WebSocketState.CONNECTED
+        self.sent = []
+        self.blocked = blocked
+        self.closed = False
+
+    async def send_text(self, text):
+        if self.blocked:
+            await asyncio.Event().wait()
+        self.sent.append(text)
+
+    async def close(self, *args, **kwargs):
+        self.closed = True
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+@pytest.fixture
+def fake_query():
+    """Build a FakeQuery returning the given results"""
+    return FakeQuery
+
+
+@pytest.fixture
+def websocket_connection():
+    """Build a WebSocketConnection over a FakeWebSocket, not yet registered with a manager"""
+    def build(connection_id, user_id=None, status=ConnectionStatus.AUTHENTICATED, blocked=False):
+        user_id = user_id or f"user_{connection_id}"
+        return WebSocketConnection(
+            websocket=FakeWebSocket(blocked),
+            user_id=user_id,
+            username=user_id,
+            connection_id=connection_id,
+            connected_at=datetime.utcnow(),
+            last_heartbeat=datetime.utcnow(),
+            status=status,
+            subscribed_groups=set(),
+            active_threads=set()
+        )
+    return build
+
+
+@pytest.fixture
+def settle():
+    """Let queued writer and listener tasks run"""
+    async def run_pending():
+        for _ in range(5):
+            await asyncio.sleep(0)
+    return run_pending
+
+
 # Test settings override
 @pytest.fixture(autouse=True)
 def override_settings(monkeypatch):
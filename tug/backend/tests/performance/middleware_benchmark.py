@@ -0,0 +1,179 @@
+"""
+Microbenchmark for per-request middleware overhead.
+
+Compares the request pipeline (one raw-ASGI middleware) against the same stages wrapped
+in four BaseHTTPMiddleware layers, the way ErrorHandlingMiddleware, MonitoringMiddleware,
+RequestTrackingMiddleware and SecurityMiddleware used to be stacked in main.py. Requests
+are driven straight through the ASGI interface so the numbers exclude the server.
+
+Usage:
+    python tests/performance/middleware_benchmark.py [--requests 20000] [--no-metrics]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.middleware import (
+    ErrorHandlingStage,
+    PipelineStage,
+    RateLimitStage,
+    RequestContext,
+    RequestPipelineMiddleware,
+    RequestSizeLimitStage,
+    RequestTrackingStage,
+    SecurityHeadersStage,
+)
+
+
+class LegacyLayer(BaseHTTPMiddleware):
+    """Runs pipeline stages inside a BaseHTTPMiddleware, as the old middleware classes did"""
+
+    def __init__(self, app, stages: List[PipelineStage]):
+        super().__init__(app)
+        self.stages = stages
+
+    async def dispatch(self, request: Request, call_next):
+        ctx = RequestContext(request.scope)
+        for stage in self.stages:
+            response = stage.on_request(ctx)
+            if response is not None:
+                return response
+
+        try:
+            response = await call_next(request)
+        except Exception as exc:
+            ctx.error = exc
+            response = next(
+                (r for r in (stage.on_error(ctx, exc) for stage in reversed(self.stages)) if r), None
+            )
+            if response is None:
+                raise
+
+        ctx.status_code = response.status_code
+        extra_headers = []
+        for stage in self.stages:
+            stage.on_response_start(ctx, extra_headers)
+        for name, value in extra_headers:
+            response.headers.append(name.decode("latin-1"), value.decode("latin-1"))
+        for stage in reversed(self.stages):
+            stage.on_complete(ctx)
+        return response
+
+
+def build_endpoint_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/values")
+    async def values():
+        return [{"id": "1", "name": "Health", "importance": 4}]
+
+    return app
+
+
+def build_stages(with_metrics: bool) -> Dict[str, List[PipelineStage]]:
+    """Stages grouped by the middleware class they replaced, outermost first"""
+    stages = {
+        "security": [SecurityHeadersStage(), RequestSizeLimitStage(), RateLimitStage(requests_per_minute=10 ** 9)],
+        "tracking": [RequestTrackingStage(enable_detailed_logging=False)],
+        "monitoring": [],
+        "errors": [ErrorHandlingStage()],
+    }
+    if with_metrics:
+        from app.monitoring.middleware import MonitoringStage
+        stages["monitoring"].append(MonitoringStage())
+    return stages
+
+
+def build_legacy_app(with_metrics: bool) -> FastAPI:
+    app = build_endpoint_app()
+    stages = build_stages(with_metrics)
+    # add_middleware wraps outermost last
+    for layer in ("errors", "monitoring", "tracking", "security"):
+        if stages[layer]:
+            app.add_middleware(LegacyLayer, stages=stages[layer])
+    return app
+
+
+def build_pipeline_app(with_metrics: bool) -> FastAPI:
+    app = build_endpoint_app()
+    stages = build_stages(with_metrics)
+    app.add_middleware(
+        RequestPipelineMiddleware,
+        stages=[*stages["tracking"], *stages["security"], *stages["monitoring"], *stages["errors"]]
+    )
+    return app
+
+
+async def measure(app, requests: int) -> List[float]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/values",
+        "raw_path": b"/api/v1/values",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"user-agent", b"benchmark")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+
+    # Warm up routing, the middleware stack and the metrics registry
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await app(dict(scope), receive, send)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return timings
+
+
+def summarize(name: str, timings: List[float], baseline_p50: float = None) -> float:
+    ordered = sorted(timings)
+    p50 = statistics.median(ordered)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    overhead = f"  overhead p50 {p50 - baseline_p50:7.1f}us" if baseline_p50 is not None else ""
+    print(f"{name:<28} p50 {p50:7.1f}us  p99 {p99:7.1f}us  mean {statistics.mean(ordered):7.1f}us{overhead}")
+    return p50
+
+
+async def main(requests: int, with_metrics: bool) -> None:
+    results = {
+        "no middleware": await measure(build_endpoint_app(), requests),
+        "BaseHTTPMiddleware x4": await measure(build_legacy_app(with_metrics), requests),
+        "raw-ASGI pipeline": await measure(build_pipeline_app(with_metrics), requests),
+    }
+
+    print(f"{requests} requests per configuration, metrics {'on' if with_metrics else 'off'}")
+    baseline = summarize("no middleware", results["no middleware"])
+    summarize("BaseHTTPMiddleware x4", results["BaseHTTPMiddleware x4"], baseline)
+    summarize("raw-ASGI pipeline", results["raw-ASGI pipeline"], baseline)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--no-metrics", action="store_true", help="leave out the monitoring stage")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, not args.no_metrics))
@@ -0,0 +1,121 @@
+"""
+Microbenchmark for WebSocketManager housekeeping at high idle connection counts.
+
+Registers N idle connections that heartbeat on schedule, then compares one heartbeat
+sweep through the deadline heap against the full scan the cleanup task used to do
+every 30 seconds. Also reports the memory held per connection object and the cost of
+a rate limit check.
+
+Usage:
+    python tests/performance/websocket_housekeeping_benchmark.py [--connections 50000] [--sweeps 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from fastapi.websockets import WebSocketState
+
+from app.services.websocket_manager import ConnectionStatus, WebSocketConnection, WebSocketManager
+
+
+class IdleWebSocket:
+    __slots__ = ()
+    client_state = WebSocketState.CONNECTED
+
+
+def build_connections(count: int) -> List[WebSocketConnection]:
+    now = datetime.utcnow()
+    websocket = IdleWebSocket()
+    return [
+        WebSocketConnection(
+            websocket=websocket,
+            user_id=f"user_{index}",
+            username=f"user_{index}",
+            connection_id=f"conn_{index}",
+            connected_at=now,
+            last_heartbeat=now,
+            status=ConnectionStatus.AUTHENTICATED,
+            subscribed_groups=set(),
+            active_threads=set()
+        )
+        for index in range(count)
+    ]
+
+
+def measure_memory(count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    connections = build_connections(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del connections
+    return (after - before) / count
+
+
+def full_scan(manager: WebSocketManager) -> List[str]:
+    """The sweep the cleanup task used to run"""
+    return [
+        connection_id for connection_id, connection in manager.connections.items()
+        if connection.is_heartbeat_expired(manager.heartbeat_timeout_seconds)
+    ]
+
+
+def measure_sweeps(count: int, sweeps: int):
+    manager = WebSocketManager()
+    for connection in build_connections(count):
+        manager._register_connection(connection)
+
+    heap_timings, scan_timings = [], []
+    now = time.monotonic()
+    for _ in range(sweeps):
+        # Every client heartbeats each 25s against a 60s timeout, so nothing expires
+        now += manager.heartbeat_sweep_interval_seconds
+        for connection in manager.connections.values():
+            if now - connection.heartbeat_at >= 25:
+                connection.heartbeat_at = now
+
+        start = time.perf_counter()
+        expired = manager._pop_expired_heartbeats(now)
+        heap_timings.append((time.perf_counter() - start) * 1000)
+        assert not expired
+
+        start = time.perf_counter()
+        full_scan(manager)
+        scan_timings.append((time.perf_counter() - start) * 1000)
+    return heap_timings, scan_timings
+
+
+def measure_rate_limit(checks: int) -> float:
+    connection = build_connections(1)[0]
+    start = time.perf_counter()
+    for _ in range(checks):
+        if connection.can_send_message(10 ** 9):
+            connection.add_rate_limit_entry()
+    return (time.perf_counter() - start) / checks * 1_000_000
+
+
+def main(connections: int, sweeps: int) -> None:
+    print(f"{connections} idle connections, {sweeps} sweeps")
+    print(f"memory per connection object   {measure_memory(connections):8.0f} bytes")
+
+    heap_timings, scan_timings = measure_sweeps(connections, sweeps)
+    for name, timings in (("deadline heap sweep", heap_timings), ("full scan sweep", scan_timings)):
+        print(f"{name:<30} p50 {statistics.median(timings):8.3f}ms  max {max(timings):8.3f}ms")
+
+    print(f"rate limit check               {measure_rate_limit(100000):8.3f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=50000)
+    parser.add_argument("--sweeps", type=int, default=20)
+    args = parser.parse_args()
+    main(args.connections, args.sweeps)
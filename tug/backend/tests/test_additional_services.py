@@ -268,6 +268,70 @@ class TestNotificationService:
         assert result.user_id == str(sample_user.id)
         assert result.type == "comment"
 
+    async def test_create_many_inserts_in_one_write(self, monkeypatch):
+        """Test bulk notification fan-out uses one insert_many per chunk"""
+        # Arrange
+        inserts = []
+        original_insert_many = Notification.insert_many
+
+        async def counting_insert_many(documents, *args, **kwargs):
+            inserts.append(len(documents))
+            return await original_insert_many(documents, *args, **kwargs)
+
+        monkeypatch.setattr(Notification, "insert_many", counting_insert_many)
+        group_id = str(ObjectId())
+        notifications = [
+            NotificationService.build_group_message_notification(
+                user_id=f"member_{i}",
+                sender_id="sender",
+                sender_name="Sender",
+                group_id=group_id,
+                group_name="Runners",
+                message_content="@all meetup at 6",
+                is_mention=True
+            )
+            for i in range(25)
+        ]
+
+        # Act
+        created = await NotificationService.create_many(notifications, chunk_size=10)
+
+        # Assert
+        assert created == 25
+        assert inserts == [10, 10, 5]
+        assert await Notification.find({"related_id": group_id}).count() == 25
+
+    async def test_create_many_updates_batches_in_bulk(self):
+        """Test bulk notifications join existing batches and open new ones"""
+        # Arrange
+        group_id = str(ObjectId())
+
+        def build(user_id):
+            return NotificationService.build_group_message_notification(
+                user_id=user_id,
+                sender_id="sender",
+                sender_name="Sender",
+                group_id=group_id,
+                group_name="Runners",
+                message_content="hello"
+            )
+
+        await NotificationService.create_many(
+            [build("member_1")], batch_window_minutes=5, related_user_names={"sender": "Sender"}
+        )
+
+        # Act
+        await NotificationService.create_many(
+            [build("member_1"), build("member_2")], batch_window_minutes=5, related_user_names={"sender": "Sender"}
+        )
+
+        # Assert
+        batches = {b.user_id: b for b in await NotificationBatch.find({"related_id": group_id}).to_list()}
+        assert set(batches) == {"member_1", "member_2"}
+        assert batches["member_1"].notification_count == 2
+        assert batches["member_2"].notification_count == 1
+        assert batches["member_2"].user_names == ["Sender"]
+
     async def test_get_notifications(self, sample_user):
         """Test getting user notifications"""
         # Arrange - create some notifications
@@ -0,0 +1,180 @@
+# tests/test_analytics_rollups.py
+import random
+import statistics
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.cache import TieredCache
+from app.models.analytics import ALL_VALUES_KEY, AnalyticsType
+from app.services import analytics_service
+from app.services.analytics_rollup_service import (
+    ActivityContribution, AnalyticsRollupService, RollupSummary
+)
+from app.services.analytics_service import AnalyticsService
+
+
+def _activity(when: datetime, duration: int, value_ids=None):
+    return SimpleNamespace(
+        user_id="user_1",
+        date=when,
+        duration=duration,
+        effective_value_ids=value_ids or ["value_1"]
+    )
+
+
+def _rollups_for(activities):
+    """Build the rollup documents the incremental updates would produce"""
+    rollups = {}
+    for activity in activities:
+        contribution = ActivityContribution.from_activity(activity)
+        for value_id in contribution.rollup_keys:
+            key = (value_id, contribution.day)
+            rollup = rollups.setdefault(key, SimpleNamespace(
+                value_id=value_id,
+                day=datetime(contribution.day.year, contribution.day.month, contribution.day.day),
+                weekday=contribution.day.weekday(),
+                activity_count=0,
+                total_duration=0,
+                hour_counts=defaultdict(int),
+                duration_counts=defaultdict(int)
+            ))
+            rollup.activity_count += 1
+            rollup.total_duration += contribution.duration
+            rollup.hour_counts[str(contribution.hour)] += 1
+            rollup.duration_counts[str(contribution.duration)] += 1
+    return list(rollups.values())
+
+
+def _summaries_for(activities, start_day: date, end_day: date):
+    summaries = {ALL_VALUES_KEY: RollupSummary(start_day, end_day)}
+    for rollup in _rollups_for(activities):
+        summaries.setdefault(rollup.value_id, RollupSummary(start_day, end_day)).add(rollup)
+    return summaries
+
+
+def _reference_streaks(days):
+    ordered = sorted(days)
+    streaks, current = [], 1
+    for previous, day in zip(ordered, ordered[1:]):
+        if (day - previous).days == 1:
+            current += 1
+        else:
+            streaks.append(current)
+            current = 1
+    return streaks + [current] if ordered else []
+
+
+class TestRollupSummary:
+    """Merged rollups must reproduce the per-activity calculations"""
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_streaks_match_reference(self, seed):
+        rng = random.Random(seed)
+        start = date(2024, 1, 1)
+        days = {start + timedelta(days=d) for d in range(90) if rng.random() < 0.6}
+        today = start + timedelta(days=89)
+        activities = [_activity(datetime(d.year, d.month, d.day, 8), 20) for d in days]
+
+        summary = _summaries_for(activities, start, today)["value_1"]
+
+        expected_current = 0
+        while today - timedelta(days=expected_current) in days:
+            expected_current += 1
+        assert summary.streak_lengths() == _reference_streaks(days)
+        assert summary.current_streak(today) == expected_current
+        assert summary.active_day_count == len(days)
+
+    def test_duration_stats_match_statistics(self):
+        rng = random.Random(7)
+        durations = [rng.choice([10, 15, 15, 30, 45, 60, 90]) for _ in range(41)]
+        start = date(2024, 3, 1)
+        activities = [
+            _activity(datetime(2024, 3, 1) + timedelta(hours=6 * i), d) for i, d in enumerate(durations)
+        ]
+
+        stats = _summaries_for(activities, start, start + timedelta(days=15))[ALL_VALUES_KEY].duration_stats()
+
+        assert stats["average"] == round(statistics.mean(durations), 2)
+        assert stats["median"] == round(statistics.median(durations), 2)
+        assert stats["std_dev"] == round(statistics.stdev(durations), 2)
+        assert stats["mode"] in statistics.multimode(durations)
+
+    def test_deleted_activities_leave_no_trace(self):
+        start = date(2024, 1, 1)
+        rollup = SimpleNamespace(
+            value_id="value_1", day=datetime(2024, 1, 2), weekday=1,
+            activity_count=1, total_duration=30,
+            hour_counts={"8": 1, "9": 0}, duration_counts={"30": 1, "45": 0}
+        )
+        summary = RollupSummary(start, start + timedelta(days=6))
+        summary.add(rollup)
+
+        assert summary.duration_counts == {30: 1}
+        assert summary.min_duration == summary.max_duration == 30
+
+
+class TestRollupUpdates:
+    """Incremental rollup maintenance"""
+
+    def test_updates_cover_total_and_each_value(self):
+        activity = _activity(datetime(2024, 5, 6, 14, 30), 25, ["value_1", "value_2", "value_1"])
+
+        updates = AnalyticsRollupService._rollup_updates(
+            "user_1", ActivityContribution.from_activity(activity), -1
+        )
+
+        assert [u._filter["value_id"] for u in updates] == [ALL_VALUES_KEY, "value_1", "value_2"]
+        assert updates[0]._doc["$inc"] == {
+            "activity_count": -1,
+            "total_duration": -25,
+            "hour_counts.14": -1,
+            "duration_counts.25": -1,
+        }
+        assert updates[0]._doc["$setOnInsert"] == {"weekday": 0}
+
+    @pytest.mark.asyncio
+    async def test_unchanged_contribution_skips_write(self):
+        activity = _activity(datetime(2024, 5, 6, 14, 30), 25)
+        contribution = ActivityContribution.from_activity(activity)
+
+        # Any database access would fail here
+        await AnalyticsRollupService.record_activity_updated(contribution, activity)
+
+
+@pytest.mark.asyncio
+class TestSectionedAnalytics:
+    """Endpoints compute only the sections they return"""
+
+    async def test_only_requested_sections_are_computed(self, monkeypatch):
+        now = datetime.now(timezone.utc)
+        activities = [
+            _activity((now - timedelta(days=d)).replace(hour=7), 30 + d) for d in (0, 1, 1, 3, 10)
+        ]
+
+        async def fake_load_summaries(user_id, start_day, end_day, value_ids=None):
+            assert list(value_ids) == []
+            return _summaries_for(activities, start_day, end_day)
+
+        async def fail_predictions(*args, **kwargs):
+            raise AssertionError("predictions should not be computed")
+
+        monkeypatch.setattr(
+            analytics_service.AnalyticsRollupService, "load_summaries", staticmethod(fake_load_summaries)
+        )
+        monkeypatch.setattr(AnalyticsService, "_generate_predictions", staticmethod(fail_predictions))
+        monkeypatch.setattr(analytics_service, "analytics_cache", TieredCache("analytics"))
+        user = SimpleNamespace(id="user_1", data_version=0)
+
+        analytics = await AnalyticsService.generate_user_analytics(
+            user, AnalyticsType.DAILY, days_back=30, sections=("trends", "overview")
+        )
+
+        assert set(analytics) == {"trends", "overview", "generated_at"}
+        assert analytics["overview"]["total_activities"] == 5
+        assert analytics["overview"]["active_days"] == 4
+        assert analytics["overview"]["total_days"] == 31
+        assert sum(t["activity_count"] for t in analytics["trends"]) == 5
+        assert analytics["trends"][-1]["period"] == now.strftime("%Y-%m-%d")
@@ -185,6 +185,99 @@ class TestAPIEndpoints:
         assert data["name"] == "Updated Value Name"
         assert data["importance"] == 3
 
+    async def test_delete_value(self, test_client: AsyncClient, mock_firebase_auth, sample_user, sample_value):
+        """Test deleting a value"""
+        # Arrange
+        headers = {"Authorization": "Bearer valid_token"}
+
+        # Act
+        response = await test_client.delete(
+            f"{settings.API_V1_PREFIX}/values/{sample_value.id}",
+            headers=headers
+        )
+
+        # Assert
+        assert response.status_code == 204
+        follow_up = await test_client.get(
+            f"{settings.API_V1_PREFIX}/values/{sample_value.id}",
+            headers=headers
+        )
+        assert follow_up.status_code == 404
+        from app.models.user import User
+        stored_user = await User.get(sample_user.id)
+        assert stored_user.data_version == sample_user.data_version + 1
+
+    async def test_delete_value_removes_its_activities_from_analytics(
+        self, test_client: AsyncClient, mock_firebase_auth, sample_user, sample_value, sample_activity
+    ):
+        """Test that analytics stop counting a deleted value's activities"""
+        from datetime import timedelta
+        from app.models.analytics import ALL_VALUES_KEY
+        from app.services.analytics_rollup_service import AnalyticsRollupService
+
+        # Arrange - build the rollups with the activity in them
+        headers = {"Authorization": "Bearer valid_token"}
+        user_id = str(sample_user.id)
+        today = datetime.utcnow().date()
+        start = today - timedelta(days=7)
+        before = await AnalyticsRollupService.load_summaries(user_id, start, today)
+        assert before[ALL_VALUES_KEY].activity_count == 1
+
+        # Act
+        response = await test_client.delete(
+            f"{settings.API_V1_PREFIX}/values/{sample_value.id}",
+            headers=headers
+        )
+
+        # Assert
+        assert response.status_code == 204
+        after = await AnalyticsRollupService.load_summaries(user_id, start, today)
+        assert after[ALL_VALUES_KEY].activity_count == 0
+        assert str(sample_value.id) not in after
+
+    async def test_patch_and_delete_activity_update_analytics(
+        self, test_client: AsyncClient, mock_firebase_auth, sample_user, sample_value, sample_activity
+    ):
+        """Test that analytics follow activities edited and deleted through the API"""
+        from datetime import timedelta
+        from app.models.analytics import ALL_VALUES_KEY
+        from app.services.analytics_rollup_service import AnalyticsRollupService
+
+        # Arrange - build the rollups with the activity in them
+        headers = {"Authorization": "Bearer valid_token"}
+        user_id = str(sample_user.id)
+        today = datetime.utcnow().date()
+        start = today - timedelta(days=7)
+        before = await AnalyticsRollupService.load_summaries(user_id, start, today)
+        assert before[ALL_VALUES_KEY].total_duration == 30
+
+        # Act - edit the duration
+        response = await test_client.patch(
+            f"{settings.API_V1_PREFIX}/activities/{sample_activity.id}",
+            json={"duration": 75},
+            headers=headers
+        )
+
+        # Assert
+        assert response.status_code == 200
+        edited = await AnalyticsRollupService.load_summaries(user_id, start, today)
+        assert edited[ALL_VALUES_KEY].activity_count == 1
+        assert edited[ALL_VALUES_KEY].total_duration == 75
+        assert edited[str(sample_value.id)].total_duration == 75
+
+        # Act - delete it
+        response = await test_client.delete(
+            f"{settings.API_V1_PREFIX}/activities/{sample_activity.id}",
+            headers=headers
+        )
+
+        # Assert
+        assert response.status_code == 204
+        after = await AnalyticsRollupService.load_summaries(user_id, start, today)
+        assert after[ALL_VALUES_KEY].activity_count == 0
+        assert after[ALL_VALUES_KEY].total_duration == 0
+        assert after[ALL_VALUES_KEY].active_days == 0
+
     async def test_get_value_not_found(self, test_client: AsyncClient, mock_firebase_auth, sample_user):
         """Test getting non-existent value"""
         # Arrange
@@ -304,6 +397,93 @@ class TestAPIEndpoints:
         # Assert
         assert response.status_code == 204
 
+    async def test_patch_activity_bumps_data_version(self, test_client: AsyncClient, mock_firebase_auth, sample_user, sample_activity):
+        """Test that editing an activity invalidates derived-data caches"""
+        # Arrange
+        headers = {"Authorization": "Bearer valid_token"}
+
+        # Act
+        response = await test_client.patch(
+            f"{settings.API_V1_PREFIX}/activities/{sample_activity.id}",
+            json={"duration": 90},
+            headers=headers
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["duration"] == 90
+        from app.models.user import User
+        stored_user = await User.get(sample_user.id)
+        assert stored_user.data_version == sample_user.data_version + 1
+
+    async def test_delete_activity_bumps_data_version(self, test_client: AsyncClient, mock_firebase_auth, sample_user, sample_activity):
+        """Test that deleting an activity invalidates derived-data caches"""
+        # Arrange
+        headers = {"Authorization": "Bearer valid_token"}
+
+        # Act
+        response = await test_client.delete(
+            f"{settings.API_V1_PREFIX}/activities/{sample_activity.id}",
+            headers=headers
+        )
+
+        # Assert
+        assert response.status_code == 204
+        from app.models.user import User
+        stored_user = await User.get(sample_user.id)
+        assert stored_user.data_version == sample_user.data_version + 1
+
+    async def test_update_mood_entry_bumps_data_version(self, test_client: AsyncClient, mock_firebase_auth, sample_user):
+        """Test that editing a mood entry invalidates derived-data caches"""
+        from app.models.mood import MoodEntry, MoodType
+        from app.models.user import User
+
+        # Arrange
+        headers = {"Authorization": "Bearer valid_token"}
+        entry = MoodEntry.create_mood_entry(user_id=str(sample_user.id), mood_type=MoodType.NEUTRAL)
+        await entry.insert()
+
+        # Act
+        response = await test_client.put(
+            f"{settings.API_V1_PREFIX}/mood/entries/{entry.id}",
+            json={"mood_type": "joyful"},
+            headers=headers
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["mood_type"] == "joyful"
+        stored_user = await User.get(sample_user.id)
+        assert stored_user.data_version == sample_user.data_version + 1
+
+    async def test_delete_mood_entry_bumps_data_version(self, test_client: AsyncClient, mock_firebase_auth, sample_user):
+        """Test that deleting a mood entry invalidates derived-data caches"""
+        from app.models.mood import MoodEntry, MoodType
+        from app.models.user import User
+
+        # Arrange
+        headers = {"Authorization": "Bearer valid_token"}
+        entry = MoodEntry.create_mood_entry(user_id=str(sample_user.id), mood_type=MoodType.NEUTRAL)
+        await entry.insert()
+
+        # Act
+        response = await test_client.delete(
+            f"{settings.API_V1_PREFIX}/mood/entries/{entry.id}",
+            headers=headers
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert await MoodEntry.get(entry.id) is None
+        stored_user = await User.get(sample_user.id)
+        assert stored_user.data_version == sample_user.data_version + 1
+
+        missing = await test_client.delete(
+            f"{settings.API_V1_PREFIX}/mood/entries/{entry.id}",
+            headers=headers
+        )
+        assert missing.status_code == 404
+
     async def test_get_activity_statistics(self, test_client: AsyncClient, mock_firebase_auth, sample_user, sample_activities_batch):
         """Test getting activity statistics"""
         # Arrange
@@ -0,0 +1,171 @@
+# tests/test_cache.py
+import asyncio
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.cache import MemoryLRUTier, SharedCacheBackend, TieredCache
+from app.services.prediction_cache_service import PredictionCacheService
+
+
+class DictBackend(SharedCacheBackend):
+    """Shared tier kept in a dict, standing in for another worker's view of MongoDB/Redis"""
+
+    name = "dict"
+
+    def __init__(self):
+        self.entries = {}
+        self.fail = False
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("shared tier down")
+        entry = self.entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0], entry[1] - time.monotonic()
+
+    async def set(self, key, payload, ttl_seconds, tags=()):
+        if self.fail:
+            raise ConnectionError("shared tier down")
+        self.entries[key] = (payload, time.monotonic() + ttl_seconds, tuple(tags))
+
+    async def delete(self, key):
+        self.entries.pop(key, None)
+
+    async def delete_tag(self, tag):
+        keys = [k for k, (_, _, tags) in self.entries.items() if tag in tags]
+        for key in keys:
+            del self.entries[key]
+        return len(keys)
+
+
+class TestMemoryLRUTier:
+    """Tests for the in-process LRU tier"""
+
+    def test_evicts_least_recently_used(self):
+        tier = MemoryLRUTier(max_entries=2)
+        tier.set("a", "1", 60)
+        tier.set("b", "2", 60)
+        tier.get("a")  # "b" is now the least recently used
+
+        assert tier.set("c", "3", 60) == 1
+        assert tier.get("b") is None
+        assert tier.get("a") is not None
+        assert tier.evictions == 1
+
+    def test_expired_entries_are_misses(self):
+        tier = MemoryLRUTier(max_entries=10)
+        tier.set("a", "1", -1)
+
+        assert tier.get("a") is None
+        assert len(tier) == 0
+
+    def test_delete_tag_removes_only_tagged_entries(self):
+        tier = MemoryLRUTier(max_entries=10)
+        tier.set("a", "1", 60, tags=["user_1"])
+        tier.set("b", "2", 60, tags=["user_1"])
+        tier.set("c", "3", 60, tags=["user_2"])
+
+        assert tier.delete_tag("user_1") == 2
+        assert tier.get("c") is not None
+        assert len(tier) == 1
+
+
+@pytest.mark.asyncio
+class TestTieredCache:
+    """Tests for the tiered cache"""
+
+    async def test_concurrent_misses_compute_once(self):
+        cache = TieredCache("test")
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"value": 42}
+
+        results = await asyncio.gather(*[cache.get_or_compute("key", compute, 60) for _ in range(10)])
+
+        assert calls == 1
+        assert all(result == {"value": 42} for result in results)
+        stats = await cache.get_stats()
+        assert stats["coalesced"] == 9
+
+    async def test_compute_errors_reach_every_waiter(self):
+        cache = TieredCache("test")
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *[cache.get_or_compute("key", compute, 60) for _ in range(3)], return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert await cache.get("key") is None
+
+    async def test_shared_tier_serves_other_workers(self):
+        shared = DictBackend()
+        writer = TieredCache("test", shared=shared)
+        reader = TieredCache("test", shared=shared)
+
+        await writer.set("key", {"when": datetime(2024, 1, 1, tzinfo=timezone.utc)}, 60, tags=["user_1"])
+
+        assert await reader.get("key") == {"when": "2024-01-01T00:00:00+00:00"}
+        assert (await reader.get_stats())["shared_hits"] == 1
+        # Second read is served from the reader's memory tier
+        await reader.get("key")
+        assert (await reader.get_stats())["memory_hits"] == 1
+
+    async def test_shared_tier_failures_fall_back_to_memory(self):
+        shared = DictBackend()
+        shared.fail = True
+        cache = TieredCache("test", shared=shared)
+
+        await cache.set("key", [1, 2, 3], 60)
+
+        assert await cache.get("key") == [1, 2, 3]
+        assert (await cache.get_stats())["shared_errors"] == 1
+
+    async def test_delete_tag_clears_both_tiers(self):
+        shared = DictBackend()
+        cache = TieredCache("test", shared=shared)
+        await cache.set("a", 1, 60, tags=["user_1"])
+        await cache.set("b", 2, 60, tags=["user_2"])
+
+        await cache.delete_tag("user_1")
+
+        assert await cache.get("a") is None
+        assert await cache.get("b") == 2
+        assert "a" not in shared.entries
+
+
+@pytest.mark.asyncio
+class TestPredictionCacheService:
+    """Tests for prediction caching on top of the tiered cache"""
+
+    async def test_predictions_generated_once_and_invalidated(self):
+        service = PredictionCacheService()
+        service.cache = TieredCache("predictions")
+        user = SimpleNamespace(id="user_1", data_version=0, is_premium=True)
+        calls = 0
+
+        async def generate():
+            nonlocal calls
+            calls += 1
+            return {"confidence_metrics": {"overall_confidence": 90}}
+
+        first = await service.get_or_generate_predictions(user, generate, "analytics")
+        second = await service.get_or_generate_predictions(user, generate, "analytics")
+
+        assert calls == 1
+        assert first["predictions"] == second["predictions"]
+        assert first["ttl_hours"] == 8
+
+        assert await service.invalidate_user_cache(user)
+        assert await service.get_cached_predictions(user, "analytics") is None
@@ -0,0 +1,129 @@
+# tests/test_coaching_generation.py
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.models.scheduled_job import JobCheckpoint
+from app.services.coaching_background_service import CoachingBackgroundService, UserBatch
+
+
+def _activity(days_ago):
+    return SimpleNamespace(date=datetime.utcnow() - timedelta(days=days_ago))
+
+
+def _message(hours_ago, priority="medium", status="pending"):
+    return {"created_at": datetime.utcnow() - timedelta(hours=hours_ago), "priority": priority, "status": status}
+
+
+class TestShouldGenerate:
+    """Eligibility is decided from the batch's prefetched data"""
+
+    def test_daily_limit(self):
+        profile = SimpleNamespace(message_frequency="minimal")
+        assert CoachingBackgroundService._should_generate_messages_for_user(profile, [_activity(1)], []) is True
+        assert CoachingBackgroundService._should_generate_messages_for_user(
+            profile, [_activity(1)], [_message(0)]
+        ) is False
+
+    def test_cancelled_messages_do_not_count(self):
+        profile = SimpleNamespace(message_frequency="optimal")
+        messages = [_message(0, status="cancelled")] * 3
+        assert CoachingBackgroundService._should_generate_messages_for_user(profile, [_activity(1)], messages) is True
+
+    def test_inactive_users_wait_two_days(self):
+        assert CoachingBackgroundService._should_generate_messages_for_user(None, [_activity(10)], [_message(30)]) is False
+        assert CoachingBackgroundService._should_generate_messages_for_user(None, [_activity(10)], [_message(60)]) is True
+        assert CoachingBackgroundService._should_generate_messages_for_user(None, [_activity(1)], [_message(30)]) is True
+
+
+@pytest.mark.asyncio
+class TestStreamingGeneration:
+    """Users are walked in _id order and a checkpointed run resumes after its last batch"""
+
+    def _service(self, monkeypatch, user_ids, checkpoint=None):
+        service = CoachingBackgroundService()
+        service.batch_size = 2
+        loads, saves = [], []
+
+        async def load_batch(after_id, cutoff_date):
+            loads.append(after_id)
+            remaining = [user_id for user_id in user_ids if after_id is None or user_id > after_id]
+            return UserBatch(users=[SimpleNamespace(id=user_id) for user_id in remaining[:2]])
+
+        async def process_batch(batch, cutoff_date, semaphore):
+            return {"users_processed": len(batch.users), "messages_generated": 1, "errors": 0}
+
+        async def load_checkpoint(job_name, now):
+            return checkpoint or JobCheckpoint.model_construct(job_name=job_name, started_at=now, stats={})
+
+        async def save_checkpoint(state, last_key, stats, status="running"):
+            saves.append((last_key, stats["users_processed"], status))
+
+        monkeypatch.setattr(service, "_load_user_batch", load_batch)
+        monkeypatch.setattr(service, "_process_user_batch", process_batch)
+        monkeypatch.setattr(service, "_load_checkpoint", load_checkpoint)
+        monkeypatch.setattr(service, "_save_checkpoint", save_checkpoint)
+        return service, loads, saves
+
+    async def test_users_are_streamed_in_batches(self, monkeypatch):
+        user_ids = sorted(ObjectId() for _ in range(5))
+        service, loads, saves = self._service(monkeypatch, user_ids)
+
+        stats = await service.process_all_users_for_coaching_messages(checkpoint="generation")
+
+        assert stats["users_processed"] == 5
+        assert stats["messages_generated"] == 3
+        assert loads == [None, user_ids[1], user_ids[3], user_ids[4]]
+        assert saves == [
+            (str(user_ids[1]), 2, "running"),
+            (str(user_ids[3]), 4, "running"),
+            (str(user_ids[4]), 5, "running"),
+            (None, 5, "completed"),
+        ]
+
+    async def test_resumes_after_last_checkpointed_user(self, monkeypatch):
+        user_ids = sorted(ObjectId() for _ in range(5))
+        checkpoint = JobCheckpoint.model_construct(
+            job_name="generation",
+            status="running",
+            started_at=datetime.utcnow() - timedelta(minutes=30),
+            last_key=str(user_ids[3]),
+            stats={"users_processed": 4, "messages_generated": 2, "errors": 0}
+        )
+        service, loads, saves = self._service(monkeypatch, user_ids, checkpoint)
+
+        stats = await service.process_all_users_for_coaching_messages(checkpoint="generation")
+
+        assert loads[0] == user_ids[3]
+        assert stats["users_processed"] == 5
+        assert stats["messages_generated"] == 3
+        assert saves[-1] == (None, 5, "completed")
+
+    async def test_failed_run_cancels_the_read_ahead(self, monkeypatch):
+        user_ids = sorted(ObjectId() for _ in range(5))
+        service, _, _ = self._service(monkeypatch, user_ids)
+        cancelled = []
+
+        async def load_batch(after_id, cutoff_date):
+            if after_id is None:
+                return UserBatch(users=[SimpleNamespace(id=user_id) for user_id in user_ids[:2]])
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.append(after_id)
+                raise
+
+        async def process_batch(batch, cutoff_date, semaphore):
+            await asyncio.sleep(0)
+            raise RuntimeError("analysis failed")
+
+        monkeypatch.setattr(service, "_load_user_batch", load_batch)
+        monkeypatch.setattr(service, "_process_user_batch", process_batch)
+
+        stats = await service.process_all_users_for_coaching_messages(checkpoint="generation")
+
+        assert stats["errors"] == 1
+        assert cancelled == [user_ids[1]]
@@ -0,0 +1,92 @@
+# tests/test_compute_executor.py
+import asyncio
+import base64
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.compute_executor import ComputeExecutor
+from app.core.errors import ServiceOverloadedException, create_http_exception
+from app.services import analytics_service
+from app.services.analytics_service import AnalyticsService
+
+
+def _square(x):
+    return x * x
+
+
+def _wait_for(event: threading.Event):
+    event.wait(timeout=5)
+    return "done"
+
+
+@pytest.mark.asyncio
+class TestComputeExecutor:
+    """Tests for the bounded CPU work executor"""
+
+    async def test_runs_task_in_process_pool(self):
+        executor = ComputeExecutor(pool_size=1, queue_size=1)
+        try:
+            assert await executor.run("test", _square, 12) == 144
+            assert executor.pending == 0
+        finally:
+            executor.shutdown()
+
+    async def test_rejects_when_saturated(self):
+        executor = ComputeExecutor(pool_size=0, queue_size=0, retry_after_seconds=7)
+        release = threading.Event()
+
+        running = asyncio.create_task(executor.run("test", _wait_for, release))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(ServiceOverloadedException) as exc_info:
+            await executor.run("test", _square, 2)
+
+        release.set()
+        assert await running == "done"
+        assert exc_info.value.retry_after == 7
+        assert executor.pending == 0
+
+    async def test_overload_maps_to_503_with_retry_after(self):
+        http_exc = create_http_exception(ServiceOverloadedException(resource="compute", retry_after=7))
+
+        assert http_exc.status_code == 503
+        assert http_exc.headers == {"Retry-After": "7"}
+
+    async def test_errors_propagate_and_release_capacity(self):
+        executor = ComputeExecutor(pool_size=0, queue_size=0)
+
+        with pytest.raises(TypeError):
+            await executor.run("test", _square, None)
+
+        assert executor.pending == 0
+        assert await executor.run("test", _square, 3) == 9
+
+
+@pytest.mark.asyncio
+class TestAnalyticsPdfOffload:
+    """PDF export goes through the compute executor"""
+
+    async def test_pdf_export_renders_through_executor(self, monkeypatch):
+        monkeypatch.setattr(analytics_service, "compute_executor", ComputeExecutor(pool_size=0, queue_size=4))
+        user = SimpleNamespace(id="user_1", email="user@example.com", created_at=datetime.now(timezone.utc))
+        analytics = {
+            'overview': {'total_activities': 3},
+            'value_breakdown': [
+                {'value_name': 'Health', 'value_color': '#10B981', 'total_duration': 120},
+                {'value_name': 'Learning', 'value_color': '#6366F1', 'total_duration': 60},
+            ],
+            'trends': [{'period': '2024-01-01', 'activity_count': 2, 'total_duration': 90}],
+        }
+
+        result = await AnalyticsService.export_to_pdf(
+            analytics=analytics,
+            user=user,
+            requested_types=['activities', 'breakdown', 'trends'],
+            days_back=30,
+            include_charts=True
+        )
+
+        assert base64.b64decode(result['pdf_base64']).startswith(b'%PDF')
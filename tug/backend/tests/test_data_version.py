@@ -0,0 +1,121 @@
+# tests/test_data_version.py
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.cache import TieredCache
+from app.models.analytics import AnalyticsType
+from app.models.user import User
+from app.services import analytics_service
+from app.services.analytics_service import AnalyticsService
+from app.services.data_version_service import DataVersionService
+from app.services.prediction_cache_service import PredictionCacheService
+
+
+class FakeUsersCollection:
+    """Stands in for the users collection's atomic counter update"""
+
+    def __init__(self, fail=False):
+        self.versions = {}
+        self.fail = fail
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        if self.fail:
+            raise ConnectionError("database down")
+        user_id = query["_id"]
+        self.versions[user_id] = self.versions.get(user_id, 0) + update["$inc"]["data_version"]
+        return {"_id": user_id, "data_version": self.versions[user_id]}
+
+    async def find_one(self, query, projection=None):
+        if self.fail:
+            raise ConnectionError("database down")
+        return {"_id": query["_id"], "data_version": self.versions.get(query["_id"], 0)}
+
+
+@pytest.mark.asyncio
+class TestDataVersionService:
+    """Tests for the per-user data-version counter"""
+
+    async def test_bump_increments_and_updates_user(self, monkeypatch):
+        collection = FakeUsersCollection()
+        monkeypatch.setattr(User, "get_motor_collection", classmethod(lambda cls: collection), raising=False)
+        user = SimpleNamespace(id="user_1", data_version=0)
+
+        assert await DataVersionService.bump(user) == 1
+        assert await DataVersionService.bump(user) == 2
+        assert user.data_version == 2
+
+    async def test_bump_failure_keeps_current_version(self, monkeypatch):
+        collection = FakeUsersCollection(fail=True)
+        monkeypatch.setattr(User, "get_motor_collection", classmethod(lambda cls: collection), raising=False)
+        user = SimpleNamespace(id="user_1", data_version=3)
+
+        assert await DataVersionService.bump(user) == 3
+
+    async def test_current_reads_the_stored_version(self, monkeypatch):
+        collection = FakeUsersCollection()
+        monkeypatch.setattr(User, "get_motor_collection", classmethod(lambda cls: collection), raising=False)
+        # A principal-cache copy from before a write on another replica
+        user = SimpleNamespace(id="user_1", data_version=0)
+        collection.versions["user_1"] = 4
+
+        assert await DataVersionService.current(user) == 4
+        assert user.data_version == 4
+
+        collection.fail = True
+        assert await DataVersionService.current(user) == 4
+
+
+@pytest.mark.asyncio
+class TestVersionedCaches:
+    """Caches reuse entries until the user's data version changes"""
+
+    async def test_prediction_cache_keys_on_data_version(self, monkeypatch):
+        collection = FakeUsersCollection()
+        monkeypatch.setattr(User, "get_motor_collection", classmethod(lambda cls: collection), raising=False)
+        service = PredictionCacheService()
+        service.cache = TieredCache("predictions")
+        user = SimpleNamespace(id="user_1", data_version=0, is_premium=True)
+        calls = 0
+
+        async def generate():
+            nonlocal calls
+            calls += 1
+            return {"confidence_metrics": {"overall_confidence": 90}, "run": calls}
+
+        await service.get_or_generate_predictions(user, generate, "analytics")
+        await service.get_or_generate_predictions(user, generate, "analytics")
+        assert calls == 1
+
+        # Written through another replica: the in-memory user still has the old version
+        collection.versions["user_1"] = 1
+        fresh = await service.get_or_generate_predictions(user, generate, "analytics")
+        assert calls == 2
+        assert fresh["predictions"]["run"] == 2
+
+    async def test_analytics_sections_recomputed_after_bump(self, monkeypatch):
+        collection = FakeUsersCollection()
+        monkeypatch.setattr(User, "get_motor_collection", classmethod(lambda cls: collection), raising=False)
+        calls = []
+
+        async def fake_sections(user_id, requested, analytics_type, start_date, end_date):
+            calls.append(list(requested))
+            return {"overview": {"total_activities": len(calls)}}
+
+        monkeypatch.setattr(AnalyticsService, "_calculate_rollup_sections", staticmethod(fake_sections))
+        monkeypatch.setattr(analytics_service, "analytics_cache", TieredCache("analytics"))
+        user = SimpleNamespace(id="user_1", data_version=0)
+
+        for _ in range(2):
+            analytics = await AnalyticsService.generate_user_analytics(
+                user, AnalyticsType.DAILY, days_back=30, sections=("overview",)
+            )
+        assert len(calls) == 1
+        assert analytics["overview"]["total_activities"] == 1
+
+        collection.versions["user_1"] = 1
+        analytics = await AnalyticsService.generate_user_analytics(
+            user, AnalyticsType.DAILY, days_back=30, sections=("overview",)
+        )
+        assert len(calls) == 2
+        assert analytics["overview"]["total_activities"] == 2
@@ -0,0 +1,99 @@
+# tests/test_friend_graph.py
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.core.cache import encode_value
+from app.core.pubsub import InProcessPubSub
+from app.models.friendship import FriendshipStatus
+from app.services.friend_graph import FriendAdjacency, FriendGraphService
+
+
+def _edge(status, outgoing=False):
+    return {
+        "friendship_id": "f1",
+        "status": status.value,
+        "outgoing": outgoing,
+        "created_at": datetime(2025, 1, 1).isoformat(),
+        "updated_at": datetime(2025, 1, 1).isoformat()
+    }
+
+
+class TestAdjacency:
+    """Statuses are looked up by the other user's id"""
+
+    def test_lookups(self):
+        adjacency = FriendAdjacency("me", {
+            "a": _edge(FriendshipStatus.ACCEPTED),
+            "b": _edge(FriendshipStatus.PENDING, outgoing=False),
+            "c": _edge(FriendshipStatus.PENDING, outgoing=True)
+        })
+
+        assert adjacency.status("a") == FriendshipStatus.ACCEPTED
+        assert adjacency.status("nobody") is None
+        assert adjacency.friend_ids() == ["a"]
+        assert adjacency.ids_with_status(FriendshipStatus.PENDING, outgoing=False) == ["b"]
+
+
+@pytest.mark.asyncio
+class TestCache:
+    """Cache misses are loaded together; invalidations drop entries everywhere"""
+
+    async def test_misses_are_loaded_in_one_batch(self, monkeypatch):
+        graph = FriendGraphService()
+        graph.cache.set("a", encode_value({"x": _edge(FriendshipStatus.ACCEPTED)}), 60)
+        batches = []
+
+        async def load(user_ids):
+            batches.append(user_ids)
+            return {user_id: {} for user_id in user_ids}
+
+        monkeypatch.setattr(graph, "_load", load)
+
+        result = await graph.get_many(["a", "b", "c", "b"])
+
+        assert batches == [["b", "c"]]
+        assert {user_id: adjacency.friend_ids() for user_id, adjacency in result.items()} == {
+            "a": ["x"], "b": [], "c": []
+        }
+
+    async def test_stored_friend_ids_bypass_the_cache(self, monkeypatch):
+        graph = FriendGraphService()
+        # A stale entry, as left on this replica by a friendship accepted on another one
+        graph.cache.set("a", encode_value({}), 60)
+
+        async def load(user_ids):
+            return {user_id: {"x": _edge(FriendshipStatus.ACCEPTED)} for user_id in user_ids}
+
+        monkeypatch.setattr(graph, "_load", load)
+
+        assert await graph.friend_ids("a") == []
+        assert await graph.stored_friend_ids("a") == ["x"]
+
+    async def test_load_racing_an_invalidation_is_not_cached(self, monkeypatch):
+        graph = FriendGraphService()
+
+        async def load(user_ids):
+            await graph.invalidate(user_ids)
+            return {user_id: {} for user_id in user_ids}
+
+        monkeypatch.setattr(graph, "_load", load)
+
+        await graph.get("a")
+
+        assert graph.cache.get("a") is None
+
+    async def test_invalidation_reaches_other_replicas(self, monkeypatch):
+        bus = InProcessPubSub()
+        local, remote = FriendGraphService(pubsub=bus), FriendGraphService(pubsub=bus)
+        await local.start()
+        await remote.start()
+        remote.cache.set("a", encode_value({}), 60)
+        # Both services share one process here; pretend the event came from another replica
+        monkeypatch.setattr("app.services.friend_graph.REPLICA_ID", "other_replica")
+
+        await local.invalidate(["a"])
+        await asyncio.sleep(0)
+
+        assert remote.cache.get("a") is None
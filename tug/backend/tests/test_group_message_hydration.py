@@ -0,0 +1,127 @@
+# tests/test_group_message_hydration.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.models.group_message import (
+    GroupMessage, MessageReaction, MessageReadWatermark, MessageStatus, MessageType
+)
+from app.models.premium_group import GroupMembership, GroupRole
+from app.models.user import User
+from app.services.group_messaging_service import GroupMessagingService
+
+
+def _message(index, user_id):
+    return SimpleNamespace(
+        id=ObjectId(),
+        group_id="group_1",
+        user_id=user_id,
+        content=f"message {index}",
+        message_type=MessageType.TEXT,
+        status=MessageStatus.SENT,
+        thread_id=None,
+        reply_count=0,
+        is_thread_starter=False,
+        is_pinned=False,
+        is_announcement=False,
+        is_edited=False,
+        is_deleted=False,
+        created_at=datetime(2024, 1, 1) - timedelta(minutes=index),
+        updated_at=datetime(2024, 1, 1),
+        edited_at=None,
+        media_urls=[],
+        attachment_data={},
+        mentioned_user_ids=[],
+        delivery_receipts=[],
+        read_receipts=[],
+    )
+
+
+@pytest.mark.asyncio
+class TestGroupMessageHydration:
+    """A page of messages is formatted with a fixed number of queries"""
+
+    async def test_page_uses_one_query_per_relation(self, monkeypatch, fake_query):
+        author_ids = [str(ObjectId()) for _ in range(3)]
+        caller = SimpleNamespace(id=author_ids[0])
+        messages = [_message(i, author_ids[i % 3]) for i in range(50)]
+        calls = {"users": 0, "reactions": 0, "reads": 0, "memberships": 0}
+
+        async def verify_access(self, user_id, group_id):
+            calls["memberships"] += 1
+            return SimpleNamespace(role=GroupRole.MEMBER)
+
+        def find_users(query):
+            calls["users"] += 1
+            assert len(query["_id"]["$in"]) == 3
+            return fake_query([
+                SimpleNamespace(id=ObjectId(uid), username=f"user{n}", display_name=None, profile_picture_url=None)
+                for n, uid in enumerate(author_ids[:2])
+            ])
+
+        def aggregate_reactions(pipeline):
+            calls["reactions"] += 1
+            assert len(pipeline[0]["$match"]["message_id"]["$in"]) == 50
+            return fake_query([{
+                "_id": str(messages[0].id),
+                "reactions": [
+                    {"reaction_type": "like", "user_ids": [author_ids[0], author_ids[1]], "custom_emoji": None},
+                    {"reaction_type": "love", "user_ids": [author_ids[2]], "custom_emoji": None},
+                ]
+            }])
+
+        def aggregate_reads(pipeline):
+            calls["reads"] += 1
+            # Another member read up to the first message, the author of the first message too
+            return fake_query([{"_id": None, "readers": [
+                {"user_id": "reader", "last_read_at": messages[0].created_at},
+                {"user_id": author_ids[0], "last_read_at": messages[0].created_at},
+            ]}])
+        
+        def forbidden(*args, **kwargs):
+            raise AssertionError("per-message lookups must not be used for a page")
+
+        monkeypatch.setattr(GroupMessagingService, "_verify_group_access", verify_access)
+        monkeypatch.setattr(GroupMessage, "find", lambda query: fake_query(messages + [_message(99, author_ids[0])]))
+        monkeypatch.setattr(User, "find", find_users)
+        monkeypatch.setattr(MessageReaction, "aggregate", aggregate_reactions)
+        monkeypatch.setattr(MessageReadWatermark, "aggregate", aggregate_reads)
+        monkeypatch.setattr(User, "get", forbidden)
+        monkeypatch.setattr(MessageReaction, "find", forbidden)
+        monkeypatch.setattr(GroupMembership, "find_one", forbidden)
+
+        page = await GroupMessagingService().get_group_messages(caller, "group_1", limit=50)
+
+        assert calls == {"users": 1, "reactions": 1, "reads": 1, "memberships": 1}
+        assert page.has_more is True
+        assert len(page.messages) == 50
+
+        first = page.messages[0]
+        assert [r.reaction_type.value for r in first.reactions] == ["like", "love"]
+        assert first.reactions[0].count == 2 and first.reactions[0].user_reacted
+        assert not first.reactions[1].user_reacted
+        assert first.author.username == "user0"
+        assert first.user_can_edit and first.read_count == 1
+        assert page.messages[1].read_count == 2  # Older, read by both; not written by either
+
+        # Authors that no longer exist fall back to a placeholder; members can't edit others
+        third = page.messages[2]
+        assert third.author.username == "Unknown User"
+        assert not third.user_can_edit and not third.user_can_delete
+        assert page.messages[1].reactions == []
+
+    async def test_admins_can_edit_every_message(self, monkeypatch, fake_query):
+        service = GroupMessagingService()
+        caller = SimpleNamespace(id=str(ObjectId()))
+        messages = [_message(i, str(ObjectId())) for i in range(3)]
+
+        monkeypatch.setattr(User, "find", lambda query: fake_query([]))
+        monkeypatch.setattr(MessageReaction, "aggregate", lambda pipeline: fake_query([]))
+        monkeypatch.setattr(MessageReadWatermark, "aggregate", lambda pipeline: fake_query([]))
+
+        formatted = await service._hydrate_messages(messages, caller, SimpleNamespace(role=GroupRole.ADMIN))
+
+        assert all(m.user_can_edit and m.user_can_delete for m in formatted)
+        assert await service._hydrate_messages([], caller, SimpleNamespace(role=GroupRole.ADMIN)) == []
@@ -0,0 +1,163 @@
+# tests/test_job_scheduler.py
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app.core.scheduler import DailyAt, Every, Job, JobScheduler
+from app.models.scheduled_job import ScheduledJobLease
+
+
+class TestSchedules:
+    """Slots are aligned so every replica computes the same ones"""
+
+    def test_interval_is_aligned_to_the_epoch(self):
+        schedule = Every(3600)
+        assert schedule.next_after(datetime(2024, 5, 1, 10, 17, 3)) == datetime(2024, 5, 1, 11, 0)
+        assert schedule.next_after(datetime(2024, 5, 1, 11, 0)) == datetime(2024, 5, 1, 12, 0)
+
+    def test_daily_weekly_and_monthly(self):
+        moment = datetime(2024, 5, 1, 10, 0)  # a Wednesday
+        assert DailyAt(2).next_after(moment) == datetime(2024, 5, 2, 2, 0)
+        assert DailyAt(12, 30).next_after(moment) == datetime(2024, 5, 1, 12, 30)
+        assert DailyAt(3, weekday=6).next_after(moment) == datetime(2024, 5, 5, 3, 0)
+        assert DailyAt(5, day=1).next_after(moment) == datetime(2024, 6, 1, 5, 0)
+        assert DailyAt(0, day=31).next_after(datetime(2024, 5, 31, 1, 0)) == datetime(2024, 7, 31, 0, 0)
+
+
+class FakeLeases:
+    """find_one_and_update with the upsert semantics of a unique job_name index"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        name = query["job_name"]
+        doc = self.docs.get(name)
+        if doc is not None:
+            stale, expired = query["$or"]
+            matches = doc["slot"] < stale["slot"]["$lt"] or (
+                doc["slot"] == expired["slot"]
+                and doc["status"] == "running"
+                and doc["lease_expires_at"] <= expired["lease_expires_at"]["$lte"]
+            )
+            if not matches:
+                raise DuplicateKeyError("job_name")
+        self.docs[name] = {"job_name": name, **update["$set"]}
+        return self.docs[name]
+
+
+@pytest.mark.asyncio
+class TestLeases:
+    """Each slot of a distributed job is claimed by one replica"""
+
+    async def test_only_one_replica_claims_a_slot(self, monkeypatch):
+        leases = FakeLeases()
+        monkeypatch.setattr(ScheduledJobLease, "get_motor_collection", lambda: leases)
+        first, second = JobScheduler(lease_seconds=60), JobScheduler(lease_seconds=60)
+        slot = datetime(2024, 5, 1, 2, 0)
+
+        assert await first.claim("nightly", slot) is True
+        assert await second.claim("nightly", slot) is False
+        assert await second.claim("nightly", datetime(2024, 5, 2, 2, 0)) is True
+
+    async def test_expired_lease_is_taken_over(self, monkeypatch):
+        leases = FakeLeases()
+        monkeypatch.setattr(ScheduledJobLease, "get_motor_collection", lambda: leases)
+        scheduler = JobScheduler(lease_seconds=60)
+        slot = datetime(2024, 5, 1, 2, 0)
+
+        assert await scheduler.claim("nightly", slot) is True
+        leases.docs["nightly"]["lease_expires_at"] = datetime(2000, 1, 1)
+        assert await scheduler.claim("nightly", slot) is True
+
+        leases.docs["nightly"]["status"] = "succeeded"
+        assert await scheduler.claim("nightly", slot) is False
+
+
+@pytest.mark.asyncio
+class TestExecution:
+    """Due jobs run on the loop without overlapping and within the concurrency limit"""
+
+    async def _run_due(self, scheduler, now):
+        for slot, job in scheduler.due_jobs(now):
+            scheduler._running[job.name] = asyncio.create_task(scheduler._execute(job, slot))
+
+    async def test_running_job_is_not_started_again(self, monkeypatch):
+        scheduler = JobScheduler(max_concurrent_jobs=2)
+        scheduler._semaphore = asyncio.Semaphore(2)
+        release = asyncio.Event()
+        runs = []
+
+        async def job():
+            runs.append(1)
+            await release.wait()
+
+        async def record_run(*args):
+            pass
+
+        monkeypatch.setattr(scheduler, "_record_run", record_run)
+        scheduler.register(Job("local", job, Every(60), distributed=False))
+        scheduler.jobs["local"].next_slot = datetime(2024, 5, 1)
+
+        await self._run_due(scheduler, datetime(2024, 5, 1, 0, 0, 1))
+        await asyncio.sleep(0)
+        scheduler.jobs["local"].next_slot = datetime(2024, 5, 1, 0, 1)
+        await self._run_due(scheduler, datetime(2024, 5, 1, 0, 1, 1))
+        release.set()
+        await asyncio.gather(*scheduler._running.values())
+
+        assert runs == [1]
+        assert scheduler.jobs["local"].last_run["status"] == "succeeded"
+
+    async def test_concurrency_limit(self, monkeypatch):
+        scheduler = JobScheduler(max_concurrent_jobs=2)
+        scheduler._semaphore = asyncio.Semaphore(2)
+        active, peak = 0, 0
+
+        async def job():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        async def record_run(*args):
+            pass
+
+        monkeypatch.setattr(scheduler, "_record_run", record_run)
+        for index in range(5):
+            scheduler.register(Job(f"job_{index}", job, Every(60), distributed=False))
+            scheduler.jobs[f"job_{index}"].next_slot = datetime(2024, 5, 1)
+
+        await self._run_due(scheduler, datetime(2024, 5, 1, 0, 0, 1))
+        await asyncio.gather(*scheduler._running.values())
+
+        assert peak == 2
+
+    async def test_failed_run_is_recorded(self, monkeypatch):
+        scheduler = JobScheduler()
+        scheduler._semaphore = asyncio.Semaphore(1)
+        recorded = []
+
+        async def job():
+            raise RuntimeError("boom")
+
+        async def claim(name, slot):
+            return True
+
+        async def renew(name, slot):
+            await asyncio.Event().wait()
+
+        async def record_run(job, slot, started_at, duration, status, error):
+            recorded.append((job.name, slot, status, error))
+
+        monkeypatch.setattr(scheduler, "claim", claim)
+        monkeypatch.setattr(scheduler, "_renew_lease", renew)
+        monkeypatch.setattr(scheduler, "_record_run", record_run)
+        slot = datetime(2024, 5, 1, 2, 0)
+
+        await scheduler._execute(Job("nightly", job, DailyAt(2)), slot)
+
+        assert recorded == [("nightly", slot, "failed", "boom")]
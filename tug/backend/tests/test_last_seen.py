@@ -0,0 +1,85 @@
+# tests/test_last_seen.py
+from datetime import datetime, timedelta
+
+import pytest
+from beanie import PydanticObjectId
+
+from app.core.last_seen import LastSeenTracker
+from app.models.user import User
+
+
+def _user(minutes_ago):
+    return User.model_construct(
+        id=PydanticObjectId(),
+        firebase_uid="uid",
+        last_login=datetime.utcnow() - timedelta(minutes=minutes_ago)
+    )
+
+
+class FakeUsers:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.writes = []
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.fail:
+            raise RuntimeError("mongo unavailable")
+        self.writes.append((operations, ordered))
+
+
+class TestTouch:
+    """A user is recorded at most once per granularity window"""
+
+    def test_recent_login_is_not_recorded(self):
+        tracker = LastSeenTracker(granularity_seconds=60)
+        tracker.touch(_user(minutes_ago=0.5))
+        assert tracker.pending == 0
+
+    def test_repeated_requests_are_coalesced(self):
+        tracker = LastSeenTracker(granularity_seconds=60)
+        user = _user(minutes_ago=5)
+
+        tracker.touch(user)
+        first = user.last_login
+        # The next request's copy of the user still has the old last_login
+        stale_copy = User.model_construct(id=user.id, firebase_uid="uid", last_login=first - timedelta(minutes=5))
+        tracker.touch(stale_copy)
+
+        assert tracker.pending == 1
+        assert datetime.utcnow() - first < timedelta(seconds=5)
+
+
+@pytest.mark.asyncio
+class TestFlush:
+    """Buffered times are written as one unordered bulk of $max updates"""
+
+    async def test_flush_writes_max_updates(self, monkeypatch):
+        users = FakeUsers()
+        monkeypatch.setattr(User, "get_motor_collection", lambda: users)
+        tracker = LastSeenTracker(granularity_seconds=60)
+        seen = [_user(minutes_ago=5), _user(minutes_ago=10)]
+        for user in seen:
+            tracker.touch(user)
+
+        assert await tracker.flush() == 2
+        operations, ordered = users.writes[0]
+        assert ordered is False
+        assert [op._filter["_id"] for op in operations] == [user.id for user in seen]
+        assert all("$max" in op._doc for op in operations)
+        assert tracker.pending == 0
+
+        # A stale copy of a just-flushed user is not recorded again
+        tracker.touch(User.model_construct(id=seen[0].id, firebase_uid="uid", last_login=datetime(2024, 1, 1)))
+        assert tracker.pending == 0
+
+    async def test_failed_flush_is_retried(self, monkeypatch):
+        users = FakeUsers(fail=True)
+        monkeypatch.setattr(User, "get_motor_collection", lambda: users)
+        tracker = LastSeenTracker(granularity_seconds=60)
+        tracker.touch(_user(minutes_ago=5))
+
+        assert await tracker.flush() == 0
+        assert tracker.pending == 1
+
+        users.fail = False
+        assert await tracker.flush() == 1
@@ -0,0 +1,196 @@
+# tests/test_message_delivery.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.cache import TieredCache
+from app.models.group_message import MessageQueue
+from app.services import message_delivery_service as delivery_module
+from app.services.group_member_index import GroupMemberIndex
+from app.services.message_delivery_service import MessageDeliveryWorker, coalesce
+
+
+def _item(message_id, recipients, group_id="group_1"):
+    return MessageQueue.model_construct(
+        message_id=message_id,
+        group_id=group_id,
+        recipient_user_ids=recipients,
+        status="processing",
+        created_at=datetime.utcnow() - timedelta(seconds=5)
+    )
+
+
+def _message(message_id, minutes_ago, is_deleted=False):
+    return SimpleNamespace(
+        id=message_id,
+        user_id="sender",
+        content=f"message {message_id}",
+        created_at=datetime(2024, 1, 1) - timedelta(minutes=minutes_ago),
+        is_deleted=is_deleted
+    )
+
+
+class TestCoalesce:
+    """A batch becomes one digest per recipient and group"""
+
+    def test_messages_are_grouped_per_recipient_and_group(self):
+        items = [
+            _item("m1", ["alice", "bob"]),
+            _item("m2", ["alice"]),
+            _item("m3", ["alice"], group_id="group_2"),
+            _item("m4", ["bob"]),
+        ]
+        messages = {
+            "m1": _message("m1", 3),
+            "m2": _message("m2", 5),
+            "m3": _message("m3", 1),
+            "m4": _message("m4", 1, is_deleted=True),
+        }
+
+        digests = coalesce(items, messages)
+
+        assert {key: [m.id for m in value] for key, value in digests.items()} == {
+            ("alice", "group_1"): ["m2", "m1"],
+            ("bob", "group_1"): ["m1"],
+            ("alice", "group_2"): ["m3"],
+        }
+
+
+class TestRetryBackoff:
+    """Failed deliveries back off exponentially until increment_retry gives up"""
+
+    def test_backoff_doubles_then_fails(self):
+        worker = MessageDeliveryWorker(retry_backoff_seconds=30)
+        item = _item("m1", ["alice"])
+        delays = []
+
+        for _ in range(2):
+            before = datetime.utcnow()
+            worker.schedule_retry(item, RuntimeError("boom"))
+            assert item.status == "pending"
+            assert item.claimed_by is None and item.lease_expires_at is None
+            delays.append(round((item.scheduled_for - before).total_seconds()))
+
+        worker.schedule_retry(item, RuntimeError("boom"))
+
+        assert delays == [30, 60]
+        assert item.status == "failed"
+        assert item.retry_count == 3
+        assert item.last_error == "boom"
+
+
+@pytest.mark.asyncio
+class TestDeliveryWorker:
+    """One batch is claimed, delivered and completed or rescheduled as a whole"""
+
+    async def test_failed_batch_is_rescheduled(self, monkeypatch):
+        worker = MessageDeliveryWorker(batch_size=10)
+        items = [_item("m1", ["alice"]), _item("m2", ["bob"])]
+        saved = []
+
+        async def claim_batch():
+            return items
+
+        async def deliver(batch):
+            raise RuntimeError("mongo unavailable")
+
+        async def save(self):
+            saved.append(self.message_id)
+
+        monkeypatch.setattr(worker, "claim_batch", claim_batch)
+        monkeypatch.setattr(worker, "_deliver", deliver)
+        monkeypatch.setattr(MessageQueue, "save", save)
+
+        assert await worker.run_once() == 2
+        assert saved == ["m1", "m2"]
+        assert all(item.status == "pending" and item.retry_count == 1 for item in items)
+
+    async def test_delivered_batch_is_completed(self, monkeypatch):
+        from app.monitoring.metrics import metrics_collector
+
+        worker = MessageDeliveryWorker(batch_size=10)
+        items = [_item("m1", ["alice"])]
+        completed = []
+        delivered_before = metrics_collector.get_metric_value(
+            "message_delivery_items_total", {"result": "delivered"}
+        ) or 0
+
+        async def claim_batch():
+            return items
+
+        async def deliver(batch):
+            return 1
+
+        async def complete(batch):
+            completed.extend(batch)
+
+        monkeypatch.setattr(worker, "claim_batch", claim_batch)
+        monkeypatch.setattr(worker, "_deliver", deliver)
+        monkeypatch.setattr(worker, "_complete", complete)
+
+        assert await worker.run_once() == 1
+        assert completed == items
+        assert metrics_collector.get_metric_value(
+            "message_delivery_items_total", {"result": "delivered"}
+        ) == delivered_before + 1
+
+    async def test_online_recipients_are_skipped(self, monkeypatch):
+        worker = MessageDeliveryWorker()
+        items = [_item("m1", ["online_user"])]
+
+        class FakeQuery:
+            def __init__(self, results):
+                self.results = results
+
+            async def to_list(self):
+                return self.results
+
+        monkeypatch.setattr(
+            delivery_module.GroupMessage, "find",
+            lambda query: FakeQuery([_message("m1", 1)])
+        )
+        monkeypatch.setattr(delivery_module.websocket_manager, "is_user_online", lambda user_id: True)
+        # Would fail without a database if the worker tried to create notifications
+        monkeypatch.setattr(delivery_module.Notification, "insert_many", None)
+
+        assert await worker._deliver(items) == 0
+
+
+@pytest.mark.asyncio
+class TestGroupMemberIndex:
+    """Member lists are loaded once per group until invalidated"""
+
+    async def test_members_are_cached_until_invalidated(self, monkeypatch):
+        index = GroupMemberIndex()
+        index.cache = TieredCache("group_members_test")
+        scans = []
+
+        class FakeCursor:
+            def __init__(self, docs):
+                self.docs = docs
+
+            def __aiter__(self):
+                return self._iterate()
+
+            async def _iterate(self):
+                for doc in self.docs:
+                    yield doc
+
+        class FakeCollection:
+            def find(self, query, projection=None):
+                scans.append(query["group_id"])
+                return FakeCursor([{"user_id": "alice"}, {"user_id": "bob"}])
+
+        monkeypatch.setattr(
+            "app.services.group_member_index.GroupMembership.get_motor_collection",
+            lambda: FakeCollection()
+        )
+
+        assert await index.get_active_member_ids("group_1") == ["alice", "bob"]
+        assert await index.get_active_member_ids("group_1") == ["alice", "bob"]
+        assert scans == ["group_1"]
+
+        await index.invalidate("group_1")
+        await index.get_active_member_ids("group_1")
+        assert scans == ["group_1", "group_1"]
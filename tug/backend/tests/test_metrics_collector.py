@@ -0,0 +1,182 @@
+# tests/test_metrics_collector.py
+import random
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+# The monitoring package starts background tasks on import, which needs a running
+# event loop, so its modules are imported inside the tests.
+
+
+@pytest.mark.asyncio
+class TestMetricsCollector:
+    """Tests for label-keyed, constant-memory metric series"""
+
+    async def test_counters_keep_exact_totals_per_label_set(self):
+        from app.monitoring.metrics import MetricsCollector
+
+        collector = MetricsCollector()
+
+        def hammer():
+            for _ in range(5000):
+                collector.increment_counter("http_requests_total", labels={"endpoint": "/a", "method": "GET"})
+
+        threads = [threading.Thread(target=hammer) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        collector.increment_counter("http_requests_total", 3, labels={"method": "POST", "endpoint": "/a"})
+
+        metric = collector.metrics["http_requests_total"]
+        assert len(metric.series) == 2
+        assert collector.get_metric_value("http_requests_total", {"endpoint": "/a", "method": "GET"}) == 20000
+        assert collector.get_metric_value("http_requests_total", {"endpoint": "/a", "method": "POST"}) == 3
+        assert collector.get_metric_value("http_requests_total") == 20003
+
+    async def test_gauges_return_latest_value(self):
+        from app.monitoring.metrics import MetricsCollector
+
+        collector = MetricsCollector()
+        collector.set_gauge("system_cpu_usage_percent", 10)
+        collector.set_gauge("system_cpu_usage_percent", 42)
+        collector.set_gauge("compute_tasks_pending", 1, {"task_type": "ml"})
+        collector.set_gauge("compute_tasks_pending", 5, {"task_type": "analytics"})
+
+        assert collector.get_metric_value("system_cpu_usage_percent") == 42
+        assert collector.get_metric_value("compute_tasks_pending", {"task_type": "ml"}) == 1
+        assert collector.get_metric_value("compute_tasks_pending") == 5
+        assert collector.get_metric_value("compute_tasks_pending", {"task_type": "missing"}) is None
+
+    async def test_histogram_exports_cumulative_buckets(self):
+        from app.monitoring.metrics import MetricsCollector
+
+        collector = MetricsCollector()
+        labels = {"endpoint": "/api/v1/values/{value_id}", "method": "GET", "status_code": "200"}
+        for value in (0.003, 0.02, 0.02, 0.3, 20.0):
+            collector.observe_histogram("http_request_duration_seconds", value, labels)
+
+        lines = collector.get_prometheus_format().splitlines()
+        prefix = 'http_request_duration_seconds_bucket{endpoint="/api/v1/values/{value_id}",method="GET",status_code="200",'
+
+        assert f'{prefix}le="0.005"}} 1' in lines
+        assert f'{prefix}le="0.01"}} 1' in lines
+        assert f'{prefix}le="0.025"}} 3' in lines
+        assert f'{prefix}le="0.5"}} 4' in lines
+        assert f'{prefix}le="10.0"}} 4' in lines
+        assert f'{prefix}le="+Inf"}} 5' in lines
+        assert any(line.startswith("http_request_duration_seconds_count{") and line.endswith(" 5") for line in lines)
+
+    async def test_summary_quantiles_are_within_sketch_accuracy(self):
+        from app.monitoring.metrics import MetricsCollector, QuantileSketch
+
+        rng = random.Random(7)
+        values = [rng.lognormvariate(0, 1.5) for _ in range(50000)]
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        ordered = sorted(values)
+        for q in (0.5, 0.9, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            assert abs(sketch.quantile(q) - exact) <= exact * 0.02
+
+        collector = MetricsCollector()
+        for value in values[:1000]:
+            collector.observe_summary("job_duration_seconds", value)
+        series = collector.metrics["job_duration_seconds"].series[()]
+        assert series.count == 1000
+        assert len(series.sketch.bins) < 1000
+        assert 'job_duration_seconds{quantile="0.99"}' in collector.get_prometheus_format()
+
+    async def test_label_values_are_escaped_and_series_are_capped(self):
+        from app.monitoring.metrics import MetricsCollector
+
+        collector = MetricsCollector(max_series_per_metric=3)
+        collector.increment_counter("errors_total", labels={"error_type": 'say "hi"\n'})
+        for i in range(10):
+            collector.increment_counter("errors_total", labels={"error_type": f"E{i}"})
+
+        output = collector.get_prometheus_format()
+        assert 'errors_total{error_type="say \\"hi\\"\\n"} 1.0' in output
+        assert len(collector.metrics["errors_total"].series) == 4
+        assert collector.get_metric_value("errors_total", {"series_overflow": "true"}) == 8
+
+    async def test_reset_and_summaries(self):
+        from app.monitoring.metrics import MetricsCollector
+
+        collector = MetricsCollector()
+        collector.track_request_duration("/api/v1/values", "GET", 20.0, 200)
+        collector.track_request_duration("/api/v1/values", "GET", 40.0, 500)
+
+        performance = collector.get_performance_summary()
+        assert performance["requests"]["total"] == 2
+        assert performance["requests"]["error_rate"] == 50
+        assert 20.0 < performance["requests"]["avg_duration_ms"] < 40.0
+
+        durations = collector.get_metrics_summary()["metrics"]["http_request_duration_seconds"]
+        assert durations["sample_count"] == 2
+        assert durations["series_count"] == 2
+        assert durations["min"] == 0.02 and durations["max"] == 0.04
+
+        collector.reset()
+        assert collector.get_metric_value("http_requests_total") is None
+        assert collector.get_performance_summary()["requests"]["total"] == 0
+        assert "http_requests_total" in collector.metrics
+
+    async def test_up_down_gauges_are_atomic(self):
+        from app.monitoring.metrics import MetricsCollector
+
+        collector = MetricsCollector()
+
+        def up_and_down():
+            for _ in range(5000):
+                collector.inc_gauge("database_connections_active")
+                collector.dec_gauge("database_connections_active")
+            collector.inc_gauge("database_connections_active")
+
+        threads = [threading.Thread(target=up_and_down) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert collector.get_metric_value("database_connections_active") == 4
+
+    async def test_monitoring_stage_tracks_in_flight_per_route(self, monkeypatch):
+        from app.monitoring import middleware as monitoring_middleware
+        from app.monitoring.metrics import MetricsCollector
+        from app.core.middleware import RequestPipelineMiddleware
+
+        collector = MetricsCollector()
+        monkeypatch.setattr(monitoring_middleware, "metrics_collector", collector)
+        observed = []
+
+        app = FastAPI()
+
+        @app.get("/api/v1/values/{value_id}")
+        async def get_value(value_id: str):
+            observed.append((
+                collector.get_metric_value("http_requests_in_flight"),
+                collector.get_metric_value("http_route_requests_in_flight", {"endpoint": "/api/v1/values/{value_id}"})
+            ))
+            return {"id": value_id}
+
+        app.add_middleware(RequestPipelineMiddleware, stages=[monitoring_middleware.MonitoringStage()])
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            stamped = f"t={int((time.time() - 0.25) * 1_000_000)}"
+            await client.get("/api/v1/values/1", headers={"X-Request-Start": stamped})
+            await client.get("/api/v1/values/2")
+            await client.get("/nope")
+
+        assert observed == [(1, 1), (1, 1)]
+        assert collector.get_metric_value("http_requests_in_flight") == 0
+        endpoints = {dict(key)["endpoint"] for key in collector.metrics["http_requests_total"].series}
+        assert endpoints == {"/api/v1/values/{value_id}", "unmatched"}
+        queue_wait = collector.metrics["http_request_queue_wait_seconds"].series[()]
+        assert queue_wait.count == 1
+        assert 0.2 < queue_wait.sum < 5
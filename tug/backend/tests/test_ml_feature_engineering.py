@@ -0,0 +1,169 @@
+# tests/test_ml_feature_engineering.py
+import random
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.ml_feature_engineering import build_prediction_features, build_training_features
+
+
+# Reference implementations: the original per-row loops the vectorized pipeline replaces
+
+def _reference_streak_at_point(activities, target_date):
+    activity_dates = sorted(set(a.date.date() for a in activities if a.date.date() <= target_date))
+    if not activity_dates:
+        return 0
+    streak = 0
+    current_date = target_date
+    for date in reversed(activity_dates):
+        if date == current_date:
+            streak += 1
+            current_date -= timedelta(days=1)
+        elif (current_date - date).days == 1:
+            streak += 1
+            current_date = date - timedelta(days=1)
+        else:
+            break
+    return streak
+
+
+def _reference_prediction_features(user, activities, values):
+    features = []
+    value_map = {str(v.id): v for v in values}
+    total_activities = len(activities)
+    start_date = activities[0].date
+    total_days = max((activities[-1].date - start_date).days + 1, 1)
+    user_features = {
+        'user_age_days': (datetime.now(timezone.utc) - user.created_at).days,
+        'total_activities': total_activities,
+        'avg_daily_activities': total_activities / total_days,
+        'total_values': len(values),
+        'is_premium': user.is_premium,
+        'days_since_signup': (datetime.now(timezone.utc) - user.created_at).days
+    }
+    for i, activity in enumerate(activities):
+        row = user_features.copy()
+        row.update({
+            'hour': activity.date.hour,
+            'day_of_week': activity.date.weekday(),
+            'month': activity.date.month,
+            'is_weekend': 1 if activity.date.weekday() >= 5 else 0,
+            'days_since_start': (activity.date - start_date).days,
+            'duration': activity.duration,
+            'activity_sequence': i,
+            'has_notes': 1 if activity.notes else 0,
+            'is_public': 1 if activity.is_public else 0,
+            'value_count': len(activity.effective_value_ids),
+        })
+        row['time_since_last_activity'] = (
+            (activity.date - activities[i-1].date).total_seconds() / 3600 if i > 0 else 0
+        )
+        primary = activity.effective_value_ids[0] if activity.effective_value_ids else None
+        if primary and primary in value_map:
+            row['value_importance'] = value_map[primary].importance
+            row['value_age_days'] = (activity.date - value_map[primary].created_at).days
+        else:
+            row['value_importance'] = 3
+            row['value_age_days'] = 0
+        if i > 0:
+            prev = activities[:i]
+            row['current_streak'] = _reference_streak_at_point(prev, activity.date.date())
+            recent = prev[-7:] if len(prev) >= 7 else prev
+            row['week_consistency'] = len(set(a.date.date() for a in recent))
+            row['avg_duration_week'] = np.mean([a.duration for a in recent])
+        else:
+            row.update({'current_streak': 0, 'week_consistency': 0, 'avg_duration_week': activity.duration})
+        features.append(row)
+    return pd.DataFrame(features)
+
+
+def _reference_training_features(user, activities, values):
+    value_map = {str(v.id): v for v in values}
+    features = []
+    for i, activity in enumerate(activities):
+        if i == 0:
+            continue
+        row = {
+            'user_id': str(user.id),
+            'hour': activity.date.hour,
+            'day_of_week': activity.date.weekday(),
+            'is_weekend': 1 if activity.date.weekday() >= 5 else 0,
+            'duration': activity.duration,
+            'has_notes': 1 if activity.notes else 0,
+            'is_premium': 1 if user.is_premium else 0,
+            'user_age_days': (activity.date - user.created_at).days
+        }
+        primary = activity.effective_value_ids[0] if activity.effective_value_ids else None
+        row['value_importance'] = value_map[primary].importance if primary in value_map else 3
+        prev = activities[:i]
+        row['time_since_last_activity'] = (activity.date - prev[-1].date).total_seconds() / 3600
+        week_start = activity.date - timedelta(days=7)
+        recent = [a for a in prev if a.date >= week_start]
+        row['week_consistency'] = len(set(a.date.date() for a in recent))
+        row['avg_duration_week'] = np.mean([a.duration for a in recent]) if recent else activity.duration
+        row['current_streak'] = _reference_streak_at_point(prev, activity.date.date())
+        row['habit_success'] = 1 if row['current_streak'] >= 7 else 0
+        future = activities[i+1:i+8]
+        if future:
+            row['streak_break_risk'] = 1 if len(set(a.date.date() for a in future)) < 3 else 0
+        else:
+            row['streak_break_risk'] = 0
+        features.append(row)
+    return pd.DataFrame(features)
+
+
+def _make_history(seed: int, count: int):
+    rng = random.Random(seed)
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    user = SimpleNamespace(id=f"user_{seed}", created_at=created, is_premium=bool(seed % 2))
+    values = [
+        SimpleNamespace(id=f"value_{k}", importance=rng.randint(1, 5), created_at=created + timedelta(days=k))
+        for k in range(3)
+    ]
+    activities = []
+    current = created + timedelta(days=5, hours=6)
+    for _ in range(count):
+        # Mix of same-day repeats, consecutive days, one-day gaps and long breaks
+        current += timedelta(hours=rng.choice([1, 3, 20, 24, 30, 48, 49, 72, 200]), minutes=rng.randint(0, 59))
+        value_ids = rng.choice([[], ["value_0"], ["value_1", "value_2"], ["missing"]])
+        activities.append(SimpleNamespace(
+            date=current,
+            duration=rng.randint(1, 120),
+            notes=rng.choice([None, "", "note"]),
+            is_public=rng.choice([True, False]),
+            effective_value_ids=value_ids,
+        ))
+    return user, activities, values
+
+
+class TestFeatureParity:
+    """The vectorized features must match the original per-row implementations"""
+
+    @pytest.mark.parametrize("seed,count", [(1, 1), (2, 2), (3, 8), (4, 60), (5, 365)])
+    def test_prediction_features_match_reference(self, seed, count):
+        user, activities, values = _make_history(seed, count)
+
+        expected = _reference_prediction_features(user, activities, values)
+        actual = build_prediction_features(user, activities, values)
+
+        assert list(actual.columns) == list(expected.columns)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+    @pytest.mark.parametrize("seed,count", [(6, 2), (7, 10), (8, 90), (9, 365)])
+    def test_training_features_match_reference(self, seed, count):
+        user, activities, values = _make_history(seed, count)
+
+        expected = _reference_training_features(user, activities, values)
+        actual = build_training_features(user, activities, values)
+
+        assert list(actual.columns) == list(expected.columns)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+    def test_empty_inputs(self):
+        user, _, values = _make_history(10, 0)
+
+        assert build_prediction_features(user, [], values).empty
+        assert build_training_features(user, [], values).empty
@@ -0,0 +1,118 @@
+# tests/test_ml_model_registry.py
+import pytest
+import numpy as np
+import pandas as pd
+from joblib import dump
+from sklearn.ensemble import RandomForestClassifier
+
+from app.services.ml_model_registry import ModelRegistry
+from app.services import ml_prediction_service
+from app.services.ml_prediction_service import MLPredictionService
+
+
+HABIT_FEATURES = ['hour', 'day_of_week', 'duration', 'current_streak', 'week_consistency']
+
+
+def _training_frame(rows: int = 60) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        'hour': rng.integers(0, 24, rows),
+        'day_of_week': rng.integers(0, 7, rows),
+        'duration': rng.integers(5, 90, rows),
+        'current_streak': rng.integers(0, 20, rows),
+        'week_consistency': rng.integers(0, 8, rows),
+    })
+    df['habit_success'] = (df['current_streak'] >= 7).astype(int)
+    return df
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Registry with a published habit_formation model"""
+    registry = ModelRegistry(models_dir=str(tmp_path), refresh_seconds=300)
+    df = _training_frame()
+    model = RandomForestClassifier(n_estimators=10, random_state=42)
+    model.fit(df[HABIT_FEATURES], df['habit_success'])
+
+    version_dir = registry.version_dir("20240101000000")
+    version_dir.mkdir(parents=True)
+    model_path = version_dir / "habit_formation_model.joblib"
+    dump(model, model_path)
+
+    registry.publish("20240101000000", {
+        "habit_formation": {
+            "status": "success",
+            "model_path": str(model_path),
+            "features_used": HABIT_FEATURES,
+            "model_type": "classifier",
+            "metrics": {"accuracy": np.float64(0.9)},
+        },
+        "streak_risk": {"error": "Insufficient training samples: 3"},
+    })
+    return registry
+
+
+@pytest.mark.asyncio
+class TestModelRegistry:
+    """Tests for loading published global models"""
+
+    async def test_ensure_loaded_reads_published_version(self, registry):
+        assert registry.get("habit_formation") is None
+
+        await registry.ensure_loaded()
+
+        model = registry.get("habit_formation")
+        assert model is not None
+        assert model.version == "20240101000000"
+        assert model.features == HABIT_FEATURES
+        assert registry.get("streak_risk") is None
+
+    async def test_ensure_loaded_skips_manifest_until_refresh(self, registry, tmp_path):
+        await registry.ensure_loaded()
+        loaded = registry.get("habit_formation")
+
+        # A new manifest is not picked up before the refresh interval elapses
+        (tmp_path / ModelRegistry.MANIFEST_NAME).write_text('{"version": "other", "models": {}}')
+        await registry.ensure_loaded()
+
+        assert registry.get("habit_formation") is loaded
+
+    async def test_missing_manifest_leaves_registry_empty(self, tmp_path):
+        registry = ModelRegistry(models_dir=str(tmp_path / "empty"))
+
+        await registry.ensure_loaded()
+
+        assert registry.version is None
+        assert registry.get("habit_formation") is None
+
+    async def test_publish_without_successful_models(self, tmp_path):
+        registry = ModelRegistry(models_dir=str(tmp_path))
+
+        assert registry.publish("v1", {"habit_formation": {"error": "boom"}}) is False
+        assert not registry.manifest_path.exists()
+
+
+@pytest.mark.asyncio
+class TestGlobalModelInference:
+    """Tests for serving predictions from the global models"""
+
+    async def test_habit_formation_uses_global_model(self, registry, monkeypatch):
+        await registry.ensure_loaded()
+        monkeypatch.setattr(ml_prediction_service, "model_registry", registry)
+        features_df = _training_frame(20).drop(columns=['habit_success'])
+
+        result = await MLPredictionService()._predict_habit_formation(None, features_df)
+
+        assert result["model_type"] == "global_random_forest_classifier"
+        assert result["model_version"] == "20240101000000"
+        assert result["confidence_score"] == 90.0
+        assert 0 <= result["formation_probability"] <= 100
+
+    async def test_habit_formation_without_model_skips_fitting(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ml_prediction_service, "model_registry", ModelRegistry(models_dir=str(tmp_path)))
+        monkeypatch.setattr(ml_prediction_service.settings, "ML_PER_USER_FITTING", False)
+        features_df = _training_frame(30).drop(columns=['habit_success'])
+
+        result = await MLPredictionService()._predict_habit_formation(None, features_df)
+
+        assert result["model_type"] == "heuristic"
@@ -0,0 +1,122 @@
+# tests/test_presence_registry.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.pubsub import PubSubBackend
+from app.models.premium_group import GroupMembership
+from app.models.user import User
+from app.schemas.group_message import TypingIndicatorRequest
+from app.services.group_messaging_service import GroupMessagingService
+from app.services.presence_registry import PresenceRegistry
+from app.services.websocket_manager import WebSocketManager
+
+
+class PeerBus(PubSubBackend):
+    """Delivers each published event to the other replicas' backends"""
+
+    def __init__(self, peers):
+        super().__init__()
+        self.peers = peers
+        self.published = []
+        peers.append(self)
+
+    async def publish(self, channel, event):
+        self.published.append(event)
+        for peer in self.peers:
+            if peer is not self:
+                await peer._dispatch(channel, {**event, "origin": f"replica-{id(self)}"})
+
+
+def _recording_registry(pubsub=None, **kwargs):
+    registry = PresenceRegistry(pubsub, ttl_seconds=kwargs.pop("ttl_seconds", 10), **kwargs)
+    changes = []
+
+    async def record(is_typing, group_id, state):
+        changes.append((is_typing, group_id, state.user_id))
+
+    registry.on_change(record)
+    return registry, changes
+
+
+@pytest.mark.asyncio
+class TestPresenceRegistry:
+    """Tests for in-memory typing state"""
+
+    async def test_repeated_typing_is_debounced(self):
+        registry, changes = _recording_registry(debounce_seconds=0.05)
+
+        for _ in range(20):
+            await registry.set_typing("group_1", "user_1", "alice")
+        assert changes == [(True, "group_1", "user_1")]
+
+        await asyncio.sleep(0.06)
+        await registry.set_typing("group_1", "user_1", "alice")
+        await registry.set_typing("group_1", "user_1", "alice", is_typing=False)
+        await registry.set_typing("group_1", "user_1", "alice", is_typing=False)
+
+        assert changes[1:] == [(True, "group_1", "user_1"), (False, "group_1", "user_1")]
+        assert registry.get_typing("group_1") == []
+
+    async def test_unrefreshed_typing_expires(self):
+        registry, changes = _recording_registry(ttl_seconds=0.05, sweep_interval_seconds=0.02)
+        await registry.start()
+        try:
+            await registry.set_typing("group_1", "user_1", "alice", thread_id="thread_1")
+            await registry.set_typing("group_1", "user_2", "bob")
+            assert {s.user_id for s in registry.get_typing("group_1", exclude_user_id="user_2")} == {"user_1"}
+
+            await asyncio.sleep(0.15)
+        finally:
+            await registry.stop()
+
+        assert registry.get_typing("group_1") == []
+        assert sorted(c for c in changes if not c[0]) == [(False, "group_1", "user_1"), (False, "group_1", "user_2")]
+
+    async def test_typing_is_shared_between_replicas(self):
+        peers = []
+        first, first_changes = _recording_registry(PeerBus(peers), debounce_seconds=60)
+        second, second_changes = _recording_registry(PeerBus(peers), debounce_seconds=60)
+        await first.start()
+        await second.start()
+        try:
+            for _ in range(5):
+                await first.set_typing("group_1", "user_1", "alice", display_name="Alice")
+            typing_elsewhere = second.get_typing("group_1")
+
+            await first.clear_user("user_1")
+        finally:
+            await first.stop()
+            await second.stop()
+
+        assert len(peers[0].published) == 2  # One start, one stop
+        assert [(s.user_id, s.display_name) for s in typing_elsewhere] == [("user_1", "Alice")]
+        assert second_changes == [(True, "group_1", "user_1"), (False, "group_1", "user_1")]
+        assert second.get_typing("group_1") == []
+
+    async def test_typing_endpoints_make_no_database_calls(self, monkeypatch):
+        from app.services import group_messaging_service as messaging_module
+
+        manager = WebSocketManager()
+        manager.user_connections = {"user_1": {"conn_1"}, "user_2": {"conn_2"}}
+        manager.group_connections = {"group_1": {"conn_1", "conn_2"}}
+        monkeypatch.setattr(messaging_module, "websocket_manager", manager)
+
+        def forbidden(*args, **kwargs):
+            raise AssertionError("typing must not touch the database")
+
+        monkeypatch.setattr(GroupMembership, "find_one", forbidden)
+        monkeypatch.setattr(User, "get", forbidden)
+
+        service = GroupMessagingService()
+        typer = SimpleNamespace(id="user_1", username="alice", display_name="Alice")
+        reader = SimpleNamespace(id="user_2", username="bob", display_name=None)
+
+        await service.handle_typing_indicator(typer, "group_1", TypingIndicatorRequest(is_typing=True))
+        response = await service.get_typing_users(reader, "group_1")
+        own_view = await service.get_typing_users(typer, "group_1")
+
+        assert response.count == 1
+        assert response.typing_users[0].display_name == "Alice"
+        assert own_view.count == 0
@@ -0,0 +1,101 @@
+# tests/test_principal_cache.py
+import asyncio
+import time
+
+import pytest
+from beanie import PydanticObjectId
+
+from app.core import auth as auth_module
+from app.core.config import settings
+from app.core.principal_cache import PrincipalCache
+from app.core.pubsub import InProcessPubSub
+from app.models.user import User
+
+
+def _user(firebase_uid="uid_1"):
+    return User.model_construct(
+        id=PydanticObjectId(),
+        firebase_uid=firebase_uid,
+        email=f"{firebase_uid}@example.com",
+        username=firebase_uid,
+        display_name="Test User",
+        data_version=3
+    )
+
+
+class TestTokenClaims:
+    """Verified claims are served until the token expires"""
+
+    def test_claims_are_cached_until_expiry(self):
+        cache = PrincipalCache()
+        cache.put_claims("token", {"uid": "uid_1", "exp": time.time() + 3600})
+
+        assert cache.get_claims("token")["uid"] == "uid_1"
+        assert cache.get_claims("other") is None
+
+    def test_expired_tokens_are_not_cached(self):
+        cache = PrincipalCache()
+        cache.put_claims("token", {"uid": "uid_1", "exp": time.time() - 1})
+
+        assert cache.get_claims("token") is None
+
+
+@pytest.mark.asyncio
+class TestUsers:
+    """Cached users are fresh instances, dropped on invalidation"""
+
+    async def test_each_hit_is_a_separate_instance(self):
+        cache = PrincipalCache()
+        user = _user()
+        cache.put_user(user, cache.generation)
+
+        first, second = cache.get_user("uid_1"), cache.get_user("uid_1")
+
+        assert first.id == user.id and first.data_version == 3
+        first.display_name = "Changed"
+        assert second.display_name == "Test User"
+
+    async def test_load_racing_an_invalidation_is_not_cached(self):
+        cache = PrincipalCache()
+        generation = cache.generation
+        await cache.invalidate_user("uid_1")
+        cache.put_user(_user(), generation)
+
+        assert cache.get_user("uid_1") is None
+
+    async def test_invalidation_reaches_other_replicas(self, monkeypatch):
+        bus = InProcessPubSub()
+        local, remote = PrincipalCache(pubsub=bus), PrincipalCache(pubsub=bus)
+        await local.start()
+        await remote.start()
+        remote.put_user(_user(), remote.generation)
+        # Both caches share one process here; pretend the event came from another replica
+        monkeypatch.setattr("app.core.principal_cache.REPLICA_ID", "other_replica")
+
+        await local.invalidate_user("uid_1")
+
+        assert remote.get_user("uid_1") is None
+
+
+@pytest.mark.asyncio
+class TestVerification:
+    """Tokens are verified off the loop, once however many requests carry them"""
+
+    async def test_concurrent_requests_verify_once(self, monkeypatch):
+        calls = []
+
+        async def verify(token):
+            calls.append(token)
+            await asyncio.sleep(0.01)
+            return {"uid": "uid_1", "exp": time.time() + 3600}
+
+        monkeypatch.setattr(settings, "MOCK_AUTH", False)
+        monkeypatch.setattr(auth_module, "principal_cache", PrincipalCache())
+        monkeypatch.setattr(auth_module, "_verify_token_off_loop", verify)
+
+        results = await asyncio.gather(*(auth_module.verify_firebase_token("token") for _ in range(5)))
+        again = await auth_module.verify_firebase_token("token")
+
+        assert calls == ["token"]
+        assert all(result["uid"] == "uid_1" for result in results)
+        assert again["uid"] == "uid_1"
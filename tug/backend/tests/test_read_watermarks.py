@@ -0,0 +1,125 @@
+# tests/test_read_watermarks.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.models.group_message import GroupMessage, MessageReadWatermark
+from app.schemas.group_message import MarkMessagesReadRequest
+from app.services.group_messaging_service import GroupMessagingService
+
+
+class FakeCollection:
+    """Records the writes sent to a Motor collection"""
+
+    def __init__(self):
+        self.bulk_writes = []
+        self.update_many_calls = []
+
+    async def bulk_write(self, requests, ordered=True):
+        self.bulk_writes.append(requests)
+
+    async def update_many(self, query, update):
+        self.update_many_calls.append((query, update))
+
+
+@pytest.mark.asyncio
+class TestReadWatermarks:
+    """Reads move one watermark per timeline instead of rewriting messages"""
+
+    async def test_marking_a_backlog_read_is_one_upsert_per_timeline(self, monkeypatch, fake_query):
+        from app.services import group_messaging_service as messaging_module
+
+        reader = SimpleNamespace(id="reader", username="reader")
+        message_ids = [str(ObjectId()) for _ in range(300)]
+        newest_main = {"_id": None, "message_id": ObjectId(message_ids[0]), "created_at": datetime(2024, 1, 3)}
+        newest_thread = {"_id": "thread_1", "message_id": ObjectId(message_ids[1]), "created_at": datetime(2024, 1, 2)}
+        watermarks = FakeCollection()
+        messages = FakeCollection()
+        events = []
+
+        async def verify_access(self, user_id, group_id):
+            return SimpleNamespace()
+
+        def aggregate_messages(pipeline):
+            assert len(pipeline[0]["$match"]["_id"]["$in"]) == 300
+            return fake_query([newest_main, newest_thread])
+
+        async def broadcast_read_receipt(group_id, data):
+            events.append((group_id, data))
+
+        monkeypatch.setattr(GroupMessagingService, "_verify_group_access", verify_access)
+        monkeypatch.setattr(GroupMessage, "aggregate", aggregate_messages)
+        monkeypatch.setattr(GroupMessage, "get_motor_collection", lambda: messages, raising=False)
+        monkeypatch.setattr(MessageReadWatermark, "get_motor_collection", lambda: watermarks, raising=False)
+        monkeypatch.setattr(messaging_module.websocket_manager, "broadcast_read_receipt", broadcast_read_receipt)
+
+        await GroupMessagingService().mark_messages_read(
+            reader, "group_1", MarkMessagesReadRequest(message_ids=message_ids)
+        )
+
+        assert len(watermarks.bulk_writes) == 1
+        updates = watermarks.bulk_writes[0]
+        assert [update._filter for update in updates] == [
+            {"user_id": "reader", "group_id": "group_1", "thread_id": None},
+            {"user_id": "reader", "group_id": "group_1", "thread_id": "thread_1"},
+        ]
+        assert all(update._upsert for update in updates)
+
+        # Status flips in a single statement, only for other people's messages
+        assert len(messages.update_many_calls) == 1
+        assert messages.update_many_calls[0][0]["user_id"] == {"$ne": "reader"}
+
+        assert len(events) == 1
+        group_id, data = events[0]
+        assert group_id == "group_1" and data["reader_user_id"] == "reader"
+        assert [(w["thread_id"], w["last_read_message_id"]) for w in data["watermarks"]] == [
+            (None, message_ids[0]), ("thread_1", message_ids[1])
+        ]
+
+    async def test_unread_count_starts_after_the_watermark(self, monkeypatch, fake_query):
+        reader = SimpleNamespace(id="reader")
+        last_read_at = datetime(2024, 1, 1)
+        queries = []
+
+        async def verify_access(self, user_id, group_id):
+            return SimpleNamespace()
+
+        async def find_watermark(query):
+            return SimpleNamespace(last_read_at=last_read_at, last_read_message_id="m1")
+
+        def find_messages(query):
+            queries.append(query)
+            return fake_query([object()] * 7)
+
+        monkeypatch.setattr(GroupMessagingService, "_verify_group_access", verify_access)
+        monkeypatch.setattr(MessageReadWatermark, "find_one", find_watermark)
+        monkeypatch.setattr(GroupMessage, "find", find_messages)
+
+        unread = await GroupMessagingService().get_unread_count(reader, "group_1")
+
+        assert unread.unread_count == 7 and unread.last_read_message_id == "m1"
+        assert queries == [{
+            "group_id": "group_1",
+            "thread_id": None,
+            "is_deleted": False,
+            "user_id": {"$ne": "reader"},
+            "created_at": {"$gt": last_read_at}
+        }]
+
+    async def test_read_counts_exclude_the_author(self, monkeypatch, fake_query):
+        created_at = datetime(2024, 1, 1)
+        message = SimpleNamespace(id=ObjectId(), group_id="group_1", thread_id=None, user_id="author", created_at=created_at)
+        readers = [
+            {"user_id": "author", "last_read_at": created_at},
+            {"user_id": "caught_up", "last_read_at": created_at + timedelta(hours=1)},
+            {"user_id": "behind", "last_read_at": created_at - timedelta(hours=1)},
+        ]
+        monkeypatch.setattr(
+            MessageReadWatermark, "aggregate", lambda pipeline: fake_query([{"_id": None, "readers": readers}])
+        )
+
+        counts = await GroupMessagingService()._get_read_counts([message])
+
+        assert counts == {str(message.id): 1}
@@ -0,0 +1,150 @@
+# tests/test_request_pipeline.py
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.core.middleware import (
+    ErrorHandlingStage,
+    LoadSheddingStage,
+    RateLimitStage,
+    RequestPipelineMiddleware,
+    RequestSizeLimitStage,
+    RequestTrackingStage,
+    SecurityHeadersStage,
+)
+
+
+def _build_app(requests_per_minute: int = 100) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok():
+        return {"ok": True}
+
+    @app.post("/echo")
+    async def echo(payload: dict):
+        return payload
+
+    @app.get("/invalid")
+    async def invalid():
+        raise ValueError("bad input")
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk{i};".encode()
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(
+        RequestPipelineMiddleware,
+        stages=[
+            RequestTrackingStage(enable_detailed_logging=False),
+            SecurityHeadersStage(),
+            RequestSizeLimitStage(max_request_size=64),
+            RateLimitStage(requests_per_minute=requests_per_minute),
+            ErrorHandlingStage()
+        ]
+    )
+    return app
+
+
+def _client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://test")
+
+
+@pytest.mark.asyncio
+class TestRequestPipeline:
+    """Tests for the raw-ASGI request pipeline"""
+
+    async def test_adds_correlation_and_security_headers(self):
+        async with _client(_build_app()) as client:
+            response = await client.get("/ok", headers={"X-Correlation-ID": "abc-123"})
+            generated = await client.get("/ok")
+
+        assert response.status_code == 200
+        assert response.headers["x-correlation-id"] == "abc-123"
+        assert response.headers["x-response-time"].endswith("ms")
+        assert response.headers["x-frame-options"] == "DENY"
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert generated.headers["x-correlation-id"] not in ("", "abc-123")
+
+    async def test_rejects_oversized_payloads(self):
+        async with _client(_build_app()) as client:
+            small = await client.post("/echo", json={"a": 1})
+            large = await client.post("/echo", json={"a": "x" * 100})
+
+        assert small.status_code == 200
+        assert large.status_code == 413
+        assert large.json()["error"] == "payload_too_large"
+        # Short-circuited responses still carry the headers of the stages before the limit
+        assert "x-correlation-id" in large.headers
+
+    async def test_rate_limits_per_client(self):
+        async with _client(_build_app(requests_per_minute=2)) as client:
+            statuses = [(await client.get("/ok")).status_code for _ in range(3)]
+            limited = await client.get("/ok")
+
+        assert statuses == [200, 200, 429]
+        assert limited.headers["x-ratelimit-remaining"] == "0"
+        assert int(limited.headers["retry-after"]) <= 60
+
+    async def test_exceptions_become_error_envelopes(self):
+        async with _client(_build_app()) as client:
+            invalid = await client.get("/invalid", headers={"X-Correlation-ID": "req-1"})
+            boom = await client.get("/boom", headers={"X-Correlation-ID": "req-2"})
+
+        assert invalid.status_code == 400
+        assert invalid.json() == {"error": "validation_error", "message": "bad input", "correlation_id": "req-1"}
+        assert boom.status_code == 500
+        assert boom.json()["error"] == "internal_server_error"
+        assert boom.json()["correlation_id"] == boom.headers["x-correlation-id"] == "req-2"
+
+    async def test_streaming_responses_pass_through(self):
+        async with _client(_build_app()) as client:
+            async with client.stream("GET", "/stream") as response:
+                chunks = [chunk async for chunk in response.aiter_bytes()]
+
+        assert b"".join(chunks) == b"chunk0;chunk1;chunk2;"
+        assert response.headers["x-frame-options"] == "DENY"
+
+    async def test_sheds_low_priority_routes_when_overloaded(self):
+        app = FastAPI()
+        release = asyncio.Event()
+
+        @app.get("/api/slow")
+        async def slow():
+            await release.wait()
+            return {"ok": True}
+
+        @app.get("/api/export")
+        async def export():
+            return {"ok": True}
+
+        shedding = LoadSheddingStage(max_in_flight=2, low_priority_prefixes=["/api/export"], retry_after_seconds=3)
+        app.add_middleware(RequestPipelineMiddleware, stages=[shedding])
+
+        async with _client(app) as client:
+            busy = [asyncio.create_task(client.get("/api/slow")) for _ in range(2)]
+            while shedding.in_flight < 2:
+                await asyncio.sleep(0.01)
+
+            shed = await client.get("/api/export")
+            interactive = asyncio.create_task(client.get("/api/slow"))
+            await asyncio.sleep(0.05)
+            release.set()
+            responses = await asyncio.gather(*busy, interactive)
+            recovered = await client.get("/api/export")
+
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "3"
+        assert [r.status_code for r in responses] == [200, 200, 200]
+        assert recovered.status_code == 200
+        assert shedding.in_flight == 0
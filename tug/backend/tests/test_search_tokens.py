@@ -0,0 +1,86 @@
+# tests/test_search_tokens.py
+import pytest
+
+from app.utils.search_tokens import index_tokens, normalize, query_filter, relevance
+
+
+class TestNormalize:
+    """Text is split into lowercase words without accents or punctuation"""
+
+    def test_normalize(self):
+        assert normalize("José_O&#x27;Brien  Smith!") == ["jose", "o", "brien", "smith"]
+        assert normalize(None) == []
+
+
+class TestTokens:
+    """Prefixes match search-as-you-type, trigrams match substrings"""
+
+    def test_index_tokens(self):
+        tokens = set(index_tokens("Runner", prefix_only=["Morning miles"]))
+
+        assert {"p:r", "p:run", "p:runner", "t:unn", "t:ner"} <= tokens
+        assert {"p:morn", "p:miles"} <= tokens
+        assert "t:orn" not in tokens
+
+    def test_query_filter(self):
+        assert query_filter("ru") == {"search_tokens": "p:ru"}
+        assert query_filter("!!") is None
+
+        clause = query_filter("Run club")
+        assert clause["$and"][0] == {"$or": [
+            {"search_tokens": "p:run"},
+            {"search_tokens": {"$all": ["t:run"]}}
+        ]}
+        assert len(clause["$and"]) == 2
+
+    def test_substring_matches_by_trigrams(self):
+        tokens = set(index_tokens("testuser2"))
+        by_prefix, by_trigrams = query_filter("user2")["$or"]
+
+        assert by_prefix["search_tokens"] not in tokens
+        assert set(by_trigrams["search_tokens"]["$all"]) <= tokens
+
+
+class TestRelevance:
+    """Exact and prefix matches outrank substring matches; non-matches score 0"""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("testuser", 1.0),
+        ("testuser2", 0.8),
+        ("Best testuser", 0.6),
+        ("mytestuser", 0.4),
+        ("tesuser", 0.0),
+    ])
+    def test_match_kinds(self, text, expected):
+        assert relevance("testuser", [(text, 1.0)]) == expected
+
+    def test_fields_are_weighted(self):
+        assert relevance("runner", [("Other", 1.0), ("runner", 0.5)]) == 0.5
+
+
+@pytest.mark.asyncio
+class TestSearchBackfill:
+    """The backfill job only touches collections registered with Beanie"""
+
+    async def test_groups_are_skipped_without_group_features(self, monkeypatch):
+        from app.core.config import settings
+        from app.models.premium_group import PremiumGroup
+        from app.models.user import User
+        from app.services.search_index_service import SearchIndexService
+
+        backfilled = []
+
+        async def fake_backfill(model, batch_size=500):
+            backfilled.append(model)
+            return 0
+
+        monkeypatch.setattr(SearchIndexService, "backfill", staticmethod(fake_backfill))
+
+        monkeypatch.setattr(settings, "ENABLE_GROUP_FEATURES", False)
+        await SearchIndexService.backfill_all()
+        assert backfilled == [User]
+
+        backfilled.clear()
+        monkeypatch.setattr(settings, "ENABLE_GROUP_FEATURES", True)
+        await SearchIndexService.backfill_all()
+        assert backfilled == [User, PremiumGroup]
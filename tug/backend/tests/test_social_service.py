@@ -6,8 +6,10 @@ from bson import ObjectId
 from unittest.mock import patch, AsyncMock
 
 from app.services.social_service import SocialService
+from app.services.friend_graph import friend_graph
 from app.models.friendship import Friendship, FriendshipStatus
 from app.models.social_post import SocialPost, PostType
+from app.models.feed_entry import FeedEntry
 from app.models.post_comment import PostComment
 from app.models.user import User
 from app.schemas.social import (
@@ -588,6 +590,64 @@ class TestSocialService:
         second_ids = {p.id for p in second_page}
         assert not first_ids.intersection(second_ids)
 
+    async def test_social_feed_cursor_pagination(self, sample_user, sample_user_2, sample_friendship):
+        """Fanned-out and on-demand posts page together by cursor"""
+        # Arrange - posts created through the service are fanned out, saved ones are not
+        for i in range(6):
+            await SocialService.create_post(
+                sample_user_2, SocialPostCreate(content=f"Fanned {i}", post_type=PostType.GENERAL, is_public=True)
+            )
+            await SocialPost(
+                user_id=str(sample_user.id), content=f"Saved {i}", post_type=PostType.GENERAL, is_public=True
+            ).save()
+        assert await FeedEntry.find({"owner_id": str(sample_user.id)}).count() == 6
+
+        # Act
+        first_page, cursor = await SocialService.get_social_feed_page(sample_user, limit=8)
+        second_page, last_cursor = await SocialService.get_social_feed_page(sample_user, limit=8, cursor=cursor)
+
+        # Assert
+        assert len(first_page) == 8 and len(second_page) == 4
+        assert last_cursor is None
+        assert not {p.id for p in first_page} & {p.id for p in second_page}
+        created = [p.created_at for p in first_page + second_page]
+        assert created == sorted(created, reverse=True)
+
+    async def test_deleted_post_leaves_feeds(self, sample_user, sample_user_2, sample_friendship):
+        """Deleting a post removes its feed entries"""
+        post = await SocialService.create_post(
+            sample_user_2, SocialPostCreate(content="Soon gone", post_type=PostType.GENERAL, is_public=True)
+        )
+
+        await SocialService.delete_post(sample_user_2, str(post.id))
+
+        assert await FeedEntry.find({"post_id": str(post.id)}).count() == 0
+        assert await SocialService.get_social_feed(sample_user) == []
+
+    async def test_social_feed_invalid_cursor(self, sample_user):
+        """A malformed cursor is rejected"""
+        with pytest.raises(HTTPException) as exc_info:
+            await SocialService.get_social_feed_page(sample_user, cursor="not-a-cursor")
+        assert exc_info.value.status_code == 400
+
+    async def test_friend_graph_follows_friend_requests(self, sample_user, sample_user_2):
+        """The friend graph is built from existing friendships and follows changes"""
+        user_id, other_id = str(sample_user.id), str(sample_user_2.id)
+        assert await friend_graph.status_between(user_id, other_id) is None
+
+        with patch('app.services.social_service.NotificationService.create_friend_request_notification'):
+            friendship = await SocialService.send_friend_request(
+                sample_user, FriendRequestCreate(addressee_id=other_id)
+            )
+        assert await friend_graph.status_between(other_id, user_id) == FriendshipStatus.PENDING
+
+        with patch('app.services.social_service.NotificationService.create_friend_accepted_notification'):
+            await SocialService.respond_to_friend_request(sample_user_2, str(friendship.id), True)
+
+        assert await friend_graph.friend_ids(user_id) == [other_id]
+        friends = await SocialService.get_friends(sample_user_2)
+        assert [f.requester_id for f in friends] == [user_id]
+
     async def test_vice_milestone_post_error_handling(self, sample_user, sample_vice):
         """Test that vice milestone post errors don't propagate"""
         # Mock SocialPost.save to raise exception
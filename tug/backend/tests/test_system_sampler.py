@@ -0,0 +1,64 @@
+# tests/test_system_sampler.py
+import asyncio
+import time
+from dataclasses import replace
+
+import psutil
+import pytest
+
+# The monitoring package starts background tasks on import, which needs a running
+# event loop, so its modules are imported inside the tests.
+
+
+@pytest.mark.asyncio
+class TestSystemSampler:
+    """Tests for off-loop system sampling"""
+
+    async def test_sample_is_taken_once_and_cached(self):
+        from app.monitoring.metrics import metrics_collector
+        from app.monitoring.system_sampler import SystemSampler
+
+        sampler = SystemSampler(interval_seconds=60)
+        sample = await sampler.get_sample()
+
+        assert await sampler.get_sample() is sample
+        assert sample.memory_total > 0
+        assert sample.process_rss > 0
+        assert 0 <= sample.disk_percent <= 100
+        assert metrics_collector.get_metric_value("system_memory_usage_bytes") == sample.memory_used
+
+    async def test_lag_probe_detects_blocked_loop(self):
+        from app.monitoring.system_sampler import SystemSampler
+
+        sampler = SystemSampler(interval_seconds=60, lag_probe_seconds=0.01)
+        sampler.start()
+        try:
+            await asyncio.sleep(0.05)
+            time.sleep(0.2)  # Block the event loop
+            await asyncio.sleep(0.05)
+            sample = await sampler.get_sample()
+        finally:
+            await sampler.stop()
+
+        assert sample.event_loop_lag_max_ms >= 100
+        assert not sampler.running
+
+    async def test_health_checks_read_cached_sample(self, monkeypatch):
+        from app.monitoring.health import HealthChecker, HealthStatus
+        from app.monitoring.system_sampler import system_sampler
+
+        sample = await system_sampler.get_sample()
+        monkeypatch.setattr(system_sampler, "_latest", replace(sample, cpu_percent=97.0, event_loop_lag_max_ms=400.0))
+
+        def blocking_cpu_percent(*args, **kwargs):
+            raise AssertionError("health checks must not measure CPU themselves")
+
+        monkeypatch.setattr(psutil, "cpu_percent", blocking_cpu_percent)
+        checker = HealthChecker()
+
+        cpu = await checker._check_cpu_usage()
+        loop_lag = await checker._check_event_loop()
+
+        assert cpu.status == HealthStatus.UNHEALTHY
+        assert cpu.details["usage_percent"] == 97.0
+        assert loop_lag.status == HealthStatus.DEGRADED
@@ -0,0 +1,41 @@
+# tests/test_timeline.py
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.services.timeline_service import decode_cursor, encode_cursor, merge_feed_keys
+
+
+class TestCursor:
+    """Cursors round-trip the (created_at, post id) feed key"""
+
+    def test_round_trip(self):
+        key = (datetime(2025, 3, 1, 12, 30, 15, 123000), str(ObjectId()))
+        assert decode_cursor(encode_cursor(*key)) == key
+
+    @pytest.mark.parametrize("cursor", ["", "garbage", "2025-03-01T12:00:00_notanid", f"yesterday_{ObjectId()}"])
+    def test_malformed_cursors_are_rejected(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestMerge:
+    """Entries and on-demand posts merge newest first, once per post"""
+
+    def test_merge_orders_and_dedupes(self):
+        now = datetime(2025, 3, 1)
+        ids = sorted(str(ObjectId()) for _ in range(4))
+        entries = [(now, ids[3]), (now - timedelta(minutes=2), ids[1])]
+        # ids[3] is in both sources, as after a fan-out that did not finish
+        on_demand = [(now, ids[3]), (now, ids[2]), (now - timedelta(minutes=1), ids[0])]
+
+        page = merge_feed_keys(entries, on_demand, skip=0, limit=10)
+
+        assert [post_id for _, post_id in page] == [ids[3], ids[2], ids[0], ids[1]]
+
+    def test_skip_and_limit(self):
+        now = datetime(2025, 3, 1)
+        keys = [(now - timedelta(minutes=i), str(ObjectId())) for i in range(5)]
+
+        assert merge_feed_keys(keys[:2], keys[2:], skip=1, limit=2) == keys[1:3]
@@ -0,0 +1,122 @@
+# tests/test_websocket_cluster.py
+import json
+import time
+
+import pytest
+
+from app.core.pubsub import PubSubBackend
+from app.services.presence_registry import OnlinePresence
+from app.services.websocket_manager import WebSocketManager
+
+
+class PeerBus(PubSubBackend):
+    """Delivers each published event to the other replicas' backends"""
+
+    def __init__(self, peers):
+        super().__init__()
+        self.peers = peers
+        peers.append(self)
+
+    async def publish(self, channel, event):
+        for peer in self.peers:
+            if peer is not self:
+                await peer._dispatch(channel, {**event, "origin": f"replica-{id(self)}"})
+
+
+@pytest.fixture
+def connect(websocket_connection):
+    """Add a connection through the manager, subscribing the replica to its channels"""
+    async def register(manager, connection_id, user_id, group_id=None):
+        connection = websocket_connection(connection_id, user_id=user_id)
+        manager._register_connection(connection)
+        await manager._add_user_connection(connection)
+        manager._start_writer(connection)
+        if group_id:
+            await manager._add_group_connection(connection, group_id)
+        return connection
+    return register
+
+
+def _received(connection):
+    return [json.loads(text) for text in connection.websocket.sent]
+
+
+@pytest.fixture
+def replicas():
+    peers = []
+    return WebSocketManager(PeerBus(peers)), WebSocketManager(PeerBus(peers))
+
+
+@pytest.mark.asyncio
+class TestCrossReplicaFanOut:
+    """Broadcasts and presence reach connections held by other replicas"""
+
+    async def test_group_broadcast_reaches_members_on_other_replicas(self, replicas, connect, settle):
+        replica_a, replica_b = replicas
+        local = await connect(replica_a, "conn_a", "user_a", "group_1")
+        remote = await connect(replica_b, "conn_b", "user_b", "group_1")
+        elsewhere = await connect(replica_b, "conn_c", "user_c", "group_2")
+
+        await replica_a.broadcast_message("group_1", {"content": "hello"})
+        await settle()
+
+        assert [m["data"] for m in _received(local)] == [{"content": "hello"}]
+        assert [m["data"] for m in _received(remote)] == [{"content": "hello"}]
+        assert _received(elsewhere) == []
+
+    async def test_replica_unsubscribes_when_its_last_group_member_leaves(self, replicas, connect, settle):
+        replica_a, replica_b = replicas
+        remote = await connect(replica_b, "conn_b", "user_b", "group_1")
+        assert "group:group_1" in replica_b.pubsub._handlers
+
+        await replica_b._remove_group_connection(remote, "group_1")
+        await replica_a.broadcast_message("group_1", {"content": "hello"})
+        await settle()
+
+        assert "group:group_1" not in replica_b.pubsub._handlers
+        assert _received(remote) == []
+
+    async def test_send_to_user_reaches_other_replicas(self, replicas, connect, settle):
+        replica_a, replica_b = replicas
+        remote = await connect(replica_b, "conn_b", "user_b")
+
+        await replica_a.send_to_user("user_b", {"type": "notification", "data": {"id": 1}})
+        await settle()
+
+        assert _received(remote) == [{"type": "notification", "data": {"id": 1}}]
+
+    async def test_users_on_other_replicas_count_as_online(self, replicas, connect):
+        replica_a, replica_b = replicas
+        await replica_a.online.start()
+        await replica_b.online.start()
+        remote = await connect(replica_b, "conn_b", "user_b")
+
+        assert replica_a.is_user_online("user_b")
+        assert replica_a.online.peer_count() == 1
+
+        await replica_b._remove_user_connection(remote)
+        assert not replica_a.is_user_online("user_b")
+
+        # A replica that stops is forgotten by the ones still running
+        await replica_b.online.stop()
+        assert replica_a.online.peer_count() == 0
+
+        await replica_a.online.stop()
+        assert replica_a.online.peer_count() == 0
+
+
+@pytest.mark.asyncio
+class TestOnlinePresence:
+    """Tests for the cluster-wide online view"""
+
+    async def test_remote_users_expire_with_the_replica_lease(self):
+        presence = OnlinePresence(heartbeat_seconds=0.01)
+        await presence._handle_remote_event({"origin": "replica-2", "snapshot": ["user_1", "user_2"]})
+        assert presence.online_users() == {"user_1", "user_2"}
+
+        await presence._handle_remote_event({"origin": "replica-2", "user_id": "user_2", "online": False})
+        assert presence.online_users() == {"user_1"}
+
+        time.sleep(0.05)
+        assert not presence.is_online("user_1")
+        assert presence.peer_count() == 0
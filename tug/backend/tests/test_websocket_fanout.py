@@ -0,0 +1,100 @@
+# tests/test_websocket_fanout.py
+import asyncio
+import json
+
+import pytest
+
+from app.services import websocket_manager as manager_module
+from app.services.websocket_manager import ConnectionStatus, WebSocketManager
+
+
+@pytest.fixture
+def connect(websocket_connection):
+    """Register a connection in a group straight in the manager's maps and start its writer"""
+    def register(manager, connection_id, group_id="group_1", blocked=False):
+        connection = websocket_connection(connection_id, blocked=blocked)
+        connection.subscribed_groups.add(group_id)
+        manager._register_connection(connection)
+        manager.user_connections.setdefault(connection.user_id, set()).add(connection_id)
+        manager.group_connections.setdefault(group_id, set()).add(connection_id)
+        manager._start_writer(connection)
+        return connection
+    return register
+
+
+@pytest.mark.asyncio
+class TestWebSocketFanOut:
+    """Broadcasts are serialized once and never wait on a slow member"""
+
+    async def test_slow_member_does_not_delay_the_group(self, monkeypatch, connect, settle):
+        manager = WebSocketManager()
+        members = [connect(manager, f"conn_{i}") for i in range(50)]
+        slow = connect(manager, "slow", blocked=True)
+
+        dumps_calls = []
+        real_dumps = json.dumps
+        monkeypatch.setattr(manager_module.json, "dumps", lambda *a, **kw: dumps_calls.append(1) or real_dumps(*a, **kw))
+
+        await asyncio.wait_for(manager.broadcast_message("group_1", {"content": "hello"}), timeout=1)
+        await settle()
+
+        assert len(dumps_calls) == 1
+        assert all(len(member.websocket.sent) == 1 for member in members)
+        assert json.loads(members[0].websocket.sent[0])["data"] == {"content": "hello"}
+        assert slow.websocket.sent == []
+
+        for connection in manager.connections.values():
+            connection.writer_task.cancel()
+
+    async def test_full_queue_drops_the_oldest_message(self, connect):
+        from app.monitoring.metrics import metrics_collector
+
+        manager = WebSocketManager()
+        manager.send_queue_size = 2
+        slow = connect(manager, "slow", blocked=True)
+        dropped_before = metrics_collector.get_metric_value("websocket_messages_dropped_total") or 0
+
+        for index in range(4):
+            await manager.broadcast_message("group_1", {"index": index})
+
+        queued = [json.loads(slow.send_queue.get_nowait()[0])["data"]["index"] for _ in range(slow.send_queue.qsize())]
+        # Broadcasting never yields to the writer, so 0 and 1 made room for 2 and 3
+        assert queued == [2, 3]
+        assert metrics_collector.get_metric_value("websocket_messages_dropped_total") == dropped_before + 2
+        assert slow.status == ConnectionStatus.AUTHENTICATED
+
+        slow.writer_task.cancel()
+
+    async def test_disconnect_policy_closes_slow_consumers(self, connect, settle):
+        manager = WebSocketManager()
+        manager.send_queue_size = 1
+        manager.slow_consumer_policy = "disconnect"
+        healthy = connect(manager, "healthy")
+        slow = connect(manager, "slow", blocked=True)
+
+        for index in range(3):
+            await manager.broadcast_message("group_1", {"index": index})
+            await settle()
+
+        assert "slow" not in manager.connections
+        assert slow.websocket.closed and slow.writer_task.done()
+        assert [json.loads(text)["data"]["index"] for text in healthy.websocket.sent] == [0, 1, 2]
+
+        healthy.writer_task.cancel()
+
+    async def test_fanout_latency_is_recorded_per_group(self, connect, settle):
+        from app.monitoring.metrics import metrics_collector
+
+        manager = WebSocketManager()
+        for i in range(3):
+            connect(manager, f"conn_{i}", group_id="group_latency")
+
+        await manager.broadcast_message("group_latency", {"content": "hi"})
+        await settle()
+
+        series = metrics_collector.metrics["websocket_fanout_duration_seconds"].series
+        recorded = [s for s in series.values() if s.labels == (("group_id", "group_latency"),)]
+        assert len(recorded) == 1 and recorded[0].count == 1
+
+        for connection in manager.connections.values():
+            connection.writer_task.cancel()
@@ -0,0 +1,81 @@
+# tests/test_websocket_housekeeping.py
+import time
+
+from app.services.websocket_manager import ConnectionStatus, WebSocketManager
+
+
+class TestHeartbeatSweep:
+    """Expiry only inspects the heap entries that came due"""
+
+    def test_only_silent_connections_expire(self, websocket_connection):
+        manager = WebSocketManager()
+        manager.heartbeat_timeout_seconds = 60
+        connections = [websocket_connection(f"conn_{i}") for i in range(5)]
+        for connection in connections:
+            manager._registerwebsocket_connection(connection)
+        start = connections[0].heartbeat_at
+
+        connections[1].heartbeat_at = start + 45
+        assert manager._pop_expired_heartbeats(start + 30) == []
+
+        expired = manager._pop_expired_heartbeats(start + 61)
+        assert sorted(expired) == ["conn_0", "conn_2", "conn_3", "conn_4"]
+        # The connection that heartbeated was re-queued with its real deadline
+        assert manager._heartbeat_deadlines == [(start + 105, "conn_1")]
+
+    def test_disconnected_connections_are_skipped(self, websocket_connection):
+        manager = WebSocketManager()
+        connection = websocket_connection("conn_1")
+        manager._registerwebsocket_connection(connection)
+        manager._unregisterwebsocket_connection(connection)
+
+        assert manager._pop_expired_heartbeats(time.monotonic() + 3600) == []
+        assert manager._heartbeat_deadlines == []
+
+
+class TestTokenBucketRateLimit:
+    """Rate limiting keeps constant-size state per connection"""
+
+    def test_burst_then_refill(self, monkeypatch, websocket_connection):
+        clock = [1000.0]
+        monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+        connection = websocket_connection("conn_1")
+
+        for _ in range(30):
+            assert connection.can_send_message(30)
+            connection.add_rate_limit_entry()
+        assert not connection.can_send_message(30)
+
+        clock[0] += 2  # 30 per minute refills one token every two seconds
+        assert connection.can_send_message(30)
+        connection.add_rate_limit_entry()
+        assert not connection.can_send_message(30)
+
+        clock[0] += 3600
+        connection.can_send_message(30)
+        assert connection.rate_limit_tokens == 30
+
+    def test_connections_are_slotted(self, websocket_connection):
+        assert not hasattr(websocket_connection("conn_1"), "__dict__")
+
+
+class TestConnectionStats:
+    """Stats are maintained incrementally"""
+
+    def test_status_counts_follow_transitions(self, websocket_connection):
+        manager = WebSocketManager()
+        first, second = websocket_connection("conn_1"), websocket_connection("conn_2")
+        manager._registerwebsocket_connection(first)
+        manager._registerwebsocket_connection(second)
+
+        manager._set_status(second, ConnectionStatus.DISCONNECTING)
+        stats = manager.get_connection_stats()
+        assert stats["total_connections"] == 2
+        assert stats["authenticated_connections"] == 1
+        assert stats["connections_by_status"]["disconnecting"] == 1
+
+        manager._unregisterwebsocket_connection(second)
+        stats = manager.get_connection_stats()
+        assert stats["total_connections"] == 1
+        assert stats["connections_by_status"]["disconnecting"] == 0
+        assert stats["connections_by_status"]["disconnected"] == 0